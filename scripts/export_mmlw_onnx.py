@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Eksport modelu MMLW do ONNX (int8) i sprawdzenie zgodności z modelem fp32
+
+Uruchamiany raz na hoście produkcyjnym (lub przy budowaniu obrazu), zanim
+włączy się MMLW_BACKEND=onnx. Artefakt trafia do MMLW_ONNX_CACHE_DIR.
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Dodaj ścieżkę do modułów backend
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERIES = [
+    "zapytanie: jak długo można przechowywać mleko w lodówce?",
+    "zapytanie: przepis na szybki obiad z kurczakiem",
+    "zapytanie: ile kosztowały zakupy w Biedronce?",
+    "zapytanie: jakie produkty kończą się w spiżarni?",
+]
+
+DOCUMENTS = [
+    "Otwarte mleko należy zużyć w ciągu 3-4 dni, przechowując je w lodówce.",
+    "Kurczak z warzywami na patelni jest gotowy w 20 minut.",
+    "Paragon z Biedronki: chleb, masło, jajka, razem 34,50 zł.",
+    "W spiżarni zostało mało mąki, ryżu i makaronu.",
+    "Pomidory najlepiej przechowywać w temperaturze pokojowej.",
+    "Zupa pomidorowa z ryżem to klasyczny polski obiad.",
+    "Paragon z Lidla: ser żółty, szynka, pomidory, razem 27,80 zł.",
+    "Mrożone warzywa można przechowywać do 12 miesięcy.",
+]
+
+
+async def main() -> int:
+    from backend.core.mmlw_embedding_client import MMLWEmbeddingClient
+    from backend.settings import settings
+
+    client = MMLWEmbeddingClient(settings.MMLW_MODEL_NAME, backend="onnx")
+    if not await client.initialize() or client.backend != "onnx":
+        logger.error("ONNX export failed (is onnxruntime installed?)")
+        return 1
+
+    report = await client.check_onnx_parity(QUERIES, DOCUMENTS, k=3)
+    await client.shutdown()
+    logger.info(f"Parity report: {report}")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
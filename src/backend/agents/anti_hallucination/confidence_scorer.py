@@ -61,7 +61,7 @@ class ConfidenceScorer:
         
         # Check for common OCR artifacts
         artifact_patterns = [
-            r'[^\w\s\.,\-\(\)\$\€\zł\@\#\&\*\+]',  # Unusual characters
+            r'[^\w\s\.,\-\(\)\$\€zł\@\#\&\*\+]',  # Unusual characters
             r'\s{3,}',  # Multiple consecutive spaces
             r'[A-Z]{5,}',  # All caps words (likely OCR error)
         ]
@@ -0,0 +1,268 @@
+"""
+Write-behind, append-only persistence of conversation messages
+
+MemoryManager przekazuje tu tylko nowe wiadomości (powyżej znacznika
+``persisted_count`` kontekstu). Wiadomości z wielu sesji trafiają do
+ograniczonej kolejki, a zadanie w tle zapisuje je okresowo jednym
+zbiorczym INSERT-em. Partia, której nie udało się zapisać, wraca do kolejki
+i jest ponawiana przy następnym zapisie - MemoryManager przesunął już
+znacznik, więc writer odpowiada za wiadomości aż do ich zapisu. Odczyt sesji
+pobiera tylko ostatnie okno wiadomości.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from backend.core.database import get_db
+from backend.models.conversation import Conversation, Message
+from backend.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_QueueItem = Tuple[str, Dict[str, Any]]
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+class ConversationWriter:
+    """Batches new messages of all sessions into periodic bulk inserts"""
+
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize conversation writer
+
+        Args:
+            flush_interval: Seconds between background flushes
+            batch_size: Maximum number of messages in one bulk insert
+            queue_size: Maximum number of messages waiting for a flush
+        """
+        self.flush_interval = flush_interval or settings.MEMORY_PERSIST_FLUSH_INTERVAL
+        self.batch_size = batch_size or settings.MEMORY_PERSIST_BATCH_SIZE
+        self.queue_size = queue_size or settings.MEMORY_PERSIST_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Messages of failed writes (oldest first), retried before the queue
+        self._retry: List[_QueueItem] = []
+        self._conversation_ids: Dict[str, int] = {}
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "flushes": 0,
+            "failed": 0,
+            "dropped": 0,
+        }
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        if self._queue is None or self._task is None or self._task.get_loop() is not loop:
+            # Queue and lock are bound to the loop they were created on;
+            # messages still queued on the old loop are carried over
+            if self._queue is not None:
+                while not self._queue.empty():
+                    self._retry.append(self._queue.get_nowait())
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        logger.debug("Conversation writer started")
+
+    async def enqueue(self, session_id: str, messages: Iterable[Dict[str, Any]]) -> None:
+        """Queue new messages of a session (waits while the queue is full)"""
+        self._ensure_started()
+        for message in messages:
+            await self._queue.put((session_id, message))
+            self._stats["enqueued"] += 1
+
+    async def flush(self) -> int:
+        """Write everything queued so far, returns the number of written messages"""
+        if self._queue is None:
+            return 0
+        written = 0
+        async with self._flush_lock:
+            # Messages put back during this flush wait for the next one
+            pending, self._retry = self._retry, []
+            queued = self._queue.qsize()
+            while pending or queued:
+                batch = pending[: self.batch_size]
+                del pending[: self.batch_size]
+                while queued and len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+                    queued -= 1
+                try:
+                    written += await self._write_batch(batch)
+                except Exception as e:
+                    # Database unavailable - retry on the next flush
+                    self._stats["failed"] += len(batch)
+                    self._requeue(batch)
+                    logger.error(f"Error persisting {len(batch)} conversation messages: {e}")
+                    break
+            self._requeue(pending)
+        return written
+
+    def _requeue(self, items: List[_QueueItem]) -> None:
+        """Put unwritten messages on the retry list, oldest dropped past the bound"""
+        self._retry.extend(items)
+        overflow = len(self._retry) - self.queue_size
+        if overflow > 0:
+            del self._retry[:overflow]
+            self._stats["dropped"] += overflow
+            logger.error(f"Dropped {overflow} conversation messages after failed writes")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Conversation writer flush failed: {e}")
+
+    async def _write_batch(self, batch: List[_QueueItem]) -> int:
+        """
+        Bulk insert one batch of messages (one transaction for all sessions)
+
+        Raises on database errors; messages of sessions whose conversation
+        could not be resolved are put back for the next flush.
+        """
+        if not batch:
+            return 0
+        session_ids = {session_id for session_id, _ in batch}
+        unresolved: List[_QueueItem] = []
+        async for db in get_db():
+            conversation_ids = await self._resolve_conversation_ids(db, session_ids)
+            unresolved = [item for item in batch if item[0] not in conversation_ids]
+            batch = [item for item in batch if item[0] in conversation_ids]
+            if batch:
+                rows = []
+                for session_id, message in batch:
+                    row = {
+                        "conversation_id": conversation_ids[session_id],
+                        "content": message.get("content", ""),
+                        "role": message.get("role", "user"),
+                        "message_metadata": message.get("metadata", {}),
+                    }
+                    created_at = _parse_timestamp(message.get("timestamp"))
+                    if created_at is not None:
+                        row["created_at"] = created_at
+                    rows.append(row)
+                await db.execute(insert(Message), rows)
+                await db.commit()
+        if unresolved:
+            self._requeue(unresolved)
+            logger.warning(f"No conversation for {len(unresolved)} messages, retrying later")
+        self._stats["written"] += len(batch)
+        self._stats["flushes"] += 1
+        logger.debug(f"Persisted {len(batch)} messages from {len(session_ids)} sessions")
+        return len(batch)
+
+    async def _resolve_conversation_ids(
+        self, db: Any, session_ids: Iterable[str]
+    ) -> Dict[str, int]:
+        """
+        Map session ids to conversation ids, creating missing conversations
+
+        Sessions whose conversation could not be created or found are left out.
+        """
+        missing = [s for s in session_ids if s not in self._conversation_ids]
+        if missing:
+            stmt = select(Conversation.session_id, Conversation.id).where(
+                Conversation.session_id.in_(missing)
+            )
+            for session_id, conversation_id in (await db.execute(stmt)).all():
+                self._conversation_ids[session_id] = conversation_id
+
+            to_create = [s for s in missing if s not in self._conversation_ids]
+            if to_create:
+                try:
+                    await db.execute(
+                        insert(Conversation), [{"session_id": s} for s in to_create]
+                    )
+                    await db.commit()
+                except IntegrityError:
+                    # Created concurrently by another worker
+                    await db.rollback()
+                stmt = select(Conversation.session_id, Conversation.id).where(
+                    Conversation.session_id.in_(to_create)
+                )
+                for session_id, conversation_id in (await db.execute(stmt)).all():
+                    self._conversation_ids[session_id] = conversation_id
+        return {
+            s: self._conversation_ids[s] for s in session_ids if s in self._conversation_ids
+        }
+
+    def forget_session(self, session_id: str) -> None:
+        """Drop the cached conversation id after the conversation was deleted"""
+        self._conversation_ids.pop(session_id, None)
+
+    async def load_tail(
+        self, session_id: str, limit: Optional[int] = None
+    ) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        """Load the conversation id and its last ``limit`` messages (oldest first)"""
+        limit = limit or settings.MEMORY_LOAD_WINDOW
+        async for db in get_db():
+            stmt = select(Conversation.id).where(Conversation.session_id == session_id)
+            conversation_id = (await db.execute(stmt)).scalar_one_or_none()
+            if conversation_id is None:
+                return None
+            self._conversation_ids[session_id] = conversation_id
+
+            stmt = (
+                select(Message)
+                .where(Message.conversation_id == conversation_id)
+                .order_by(Message.created_at.desc(), Message.id.desc())
+                .limit(limit)
+            )
+            messages = (await db.execute(stmt)).scalars().all()
+            history = [
+                {
+                    "role": msg.role,
+                    "content": msg.content,
+                    "timestamp": msg.created_at.isoformat() if msg.created_at else None,
+                    "metadata": msg.message_metadata or {},
+                }
+                for msg in reversed(messages)
+            ]
+            return conversation_id, history
+        return None
+
+    async def stop(self) -> None:
+        """Flush pending messages and stop the background task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "pending": (self._queue.qsize() if self._queue is not None else 0)
+            + len(self._retry),
+        }
+
+
+# Shared writer so that messages of all sessions are batched together
+conversation_writer = ConversationWriter()
@@ -4,14 +4,17 @@ Zgodnie z planem ewolucji - Faza 2: Rdzeń Inteligencji
 """
 
 import asyncio
+import inspect
+import json
 import logging
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 
 from backend.agents.planner import ExecutionPlan, PlanStep
 from backend.agents.tools.registry import tool_registry
 from backend.agents.interfaces import AgentResponse
 from backend.agents.general_conversation_agent import GeneralConversationAgent
+from backend.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +49,7 @@ class Executor:
         self.tool_registry = tool_registry
         self.general_conversation_agent = GeneralConversationAgent()
         self._initialized = False
-        self._stream_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._stream_callback: Optional[Callable[[Dict[str, Any]], Any]] = None
         self._execution_context: Dict[str, Any] = {}
     
     async def initialize(self) -> None:
@@ -58,8 +61,10 @@ class Executor:
         self._initialized = True
         logger.info("Executor initialized")
     
-    def set_stream_callback(self, callback: Callable[[Dict[str, Any]], None]) -> None:
-        """Ustaw callback dla streamingu statusu"""
+    def set_stream_callback(
+        self, callback: Optional[Callable[[Dict[str, Any]], Any]]
+    ) -> None:
+        """Ustaw callback dla streamingu statusu (sync lub async, None wyłącza)"""
         self._stream_callback = callback
     
     async def execute_plan(
@@ -68,17 +73,21 @@ class Executor:
         context: Optional[Dict[str, Any]] = None
     ) -> ExecutionResult:
         """
-        Wykonaj plan krok po kroku
+        Wykonaj plan jako graf zależności kroków
+        
+        Kroki bez wzajemnych zależności są wykonywane równolegle (z limitem
+        EXECUTOR_MAX_PARALLEL_STEPS i timeoutem EXECUTOR_STEP_TIMEOUT na krok),
+        a identyczne wywołania narzędzia (tool + args) są wykonywane raz.
         
         Args:
             plan: Plan do wykonania
             context: Dodatkowy kontekst
             
         Returns:
-            ExecutionResult z wynikami wszystkich kroków
+            ExecutionResult z wynikami wszystkich kroków (w kolejności planu)
         """
         start_time = asyncio.get_event_loop().time()
-        step_results = []
+        step_results: List[StepResult] = []
         errors = []
         warnings = []
         
@@ -95,81 +104,83 @@ class Executor:
         logger.debug(f"Plan complexity: {plan.estimated_complexity}")
         
         # Wyślij informację o rozpoczęciu
-        self._send_stream_event("plan_started", {
+        await self._send_stream_event("plan_started", {
             "total_steps": len(plan.steps),
             "complexity": plan.estimated_complexity,
             "query": plan.query
         })
         
         try:
-            # Wykonuj kroki sekwencyjnie
-            for i, step in enumerate(plan.steps):
-                step_start_time = asyncio.get_event_loop().time()
+            dependencies, ancestors = self._resolve_dependencies(plan.steps)
+            memo_sources = self._find_memoized_steps(plan.steps)
+            semaphore = asyncio.Semaphore(max(1, settings.EXECUTOR_MAX_PARALLEL_STEPS))
+            tasks: Dict[int, asyncio.Task] = {}
+            
+            async def run_step(i: int) -> StepResult:
+                step = plan.steps[i]
+                if dependencies[i]:
+                    await asyncio.gather(*(tasks[d] for d in dependencies[i]))
                 
-                # Wyślij informację o rozpoczęciu kroku
-                self._send_stream_event("step_started", {
-                    "step_number": i + 1,
-                    "total_steps": len(plan.steps),
-                    "tool": step.tool,
-                    "description": step.description
-                })
+                if i in memo_sources:
+                    # Identyczne narzędzie i argumenty - użyj wyniku wcześniejszego kroku
+                    source = await tasks[memo_sources[i]]
+                    logger.debug(f"Step {i + 1} reuses result of step {memo_sources[i] + 1}")
+                    step_result = StepResult(
+                        step=step,
+                        success=source.success,
+                        result=source.result,
+                        error=source.error,
+                        metadata={**(source.metadata or {}), "memoized": True}
+                    )
+                else:
+                    async with semaphore:
+                        step_result = await self._run_step(
+                            i, plan, context, [tasks[a].result() for a in ancestors[i]]
+                        )
                 
-                logger.info(f"Executing step {i + 1}/{len(plan.steps)}: {step.tool}")
-                logger.debug(f"Step args: {step.args}")
+                # Aktualizuj kontekst wykonania
+                self._execution_context["step_results"][f"step_{i+1}"] = {
+                    "success": step_result.success,
+                    "result": step_result.result,
+                    "error": step_result.error,
+                    "execution_time": step_result.execution_time
+                }
                 
-                try:
-                    # Wykonaj krok
-                    step_result = await self._execute_step(step, context, step_results)
-                    step_results.append(step_result)
-                    
-                    # Aktualizuj kontekst wykonania
-                    self._execution_context["step_results"][f"step_{i+1}"] = {
-                        "success": step_result.success,
-                        "result": step_result.result,
-                        "error": step_result.error,
-                        "execution_time": step_result.execution_time
-                    }
-                    
+                if step_result.success:
                     # Wyślij informację o zakończeniu kroku
-                    self._send_stream_event("step_completed", {
+                    await self._send_stream_event("step_completed", {
                         "step_number": i + 1,
                         "success": step_result.success,
                         "execution_time": step_result.execution_time,
                         "result_summary": self._summarize_result(step_result.result)
                     })
-                    
-                    # Jeśli krok się nie powiódł, dodaj błąd
-                    if not step_result.success:
-                        error_msg = f"Step {i + 1} failed: {step_result.error}"
-                        errors.append(error_msg)
-                        logger.warning(error_msg)
-                    else:
-                        logger.info(f"Step {i + 1} completed successfully in {step_result.execution_time:.2f}s")
-                    
-                except Exception as e:
-                    error_msg = f"Unexpected error in step {i + 1}: {str(e)}"
-                    errors.append(error_msg)
-                    logger.error(error_msg, exc_info=True)
-                    
-                    # Utwórz wynik błędu
-                    step_result = StepResult(
-                        step=step,
-                        success=False,
-                        result=None,
-                        error=error_msg,
-                        execution_time=asyncio.get_event_loop().time() - step_start_time
-                    )
-                    step_results.append(step_result)
-                    
+                    logger.info(f"Step {i + 1} completed successfully in {step_result.execution_time:.2f}s")
+                else:
                     # Wyślij informację o błędzie
-                    self._send_stream_event("step_failed", {
+                    await self._send_stream_event("step_failed", {
                         "step_number": i + 1,
-                        "error": error_msg
+                        "error": step_result.error
                     })
+                    logger.warning(f"Step {i + 1} failed: {step_result.error}")
+                return step_result
+            
+            # Wszystkie zadania muszą istnieć, zanim którekolwiek zacznie czekać na zależności
+            for i in range(len(plan.steps)):
+                tasks[i] = asyncio.create_task(run_step(i))
+            
+            try:
+                step_results = list(await asyncio.gather(*tasks.values()))
+            finally:
+                for task in tasks.values():
+                    task.cancel()
+            
+            for i, step_result in enumerate(step_results):
+                if not step_result.success:
+                    errors.append(f"Step {i + 1} failed: {step_result.error}")
             
             # Wyślij informację o zakończeniu planu
             successful_steps = len([r for r in step_results if r.success])
-            self._send_stream_event("plan_completed", {
+            await self._send_stream_event("plan_completed", {
                 "total_steps": len(plan.steps),
                 "successful_steps": successful_steps,
                 "failed_steps": len(plan.steps) - successful_steps
@@ -181,7 +192,7 @@ class Executor:
             logger.error(error_msg, exc_info=True)
             
             # Wyślij informację o krytycznym błędzie
-            self._send_stream_event("plan_failed", {
+            await self._send_stream_event("plan_failed", {
                 "error": error_msg
             })
         
@@ -208,6 +219,107 @@ class Executor:
         logger.info(f"Plan execution completed in {total_execution_time:.2f}s, success: {success}")
         return execution_result
     
+    async def _run_step(
+        self,
+        i: int,
+        plan: ExecutionPlan,
+        context: Optional[Dict[str, Any]],
+        previous_results: List[StepResult],
+    ) -> StepResult:
+        """Wykonaj krok z timeoutem, zamieniając błędy na StepResult"""
+        step = plan.steps[i]
+        step_start_time = asyncio.get_event_loop().time()
+        
+        # Wyślij informację o rozpoczęciu kroku
+        await self._send_stream_event("step_started", {
+            "step_number": i + 1,
+            "total_steps": len(plan.steps),
+            "tool": step.tool,
+            "description": step.description
+        })
+        
+        logger.info(f"Executing step {i + 1}/{len(plan.steps)}: {step.tool}")
+        logger.debug(f"Step args: {step.args}")
+        
+        try:
+            return await asyncio.wait_for(
+                self._execute_step(step, context, previous_results),
+                timeout=settings.EXECUTOR_STEP_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            error_msg = f"Step timed out after {settings.EXECUTOR_STEP_TIMEOUT}s"
+            error_type = "TimeoutError"
+        except Exception as e:
+            error_msg = f"Unexpected error in step {i + 1}: {str(e)}"
+            error_type = type(e).__name__
+            logger.error(error_msg, exc_info=True)
+        
+        return StepResult(
+            step=step,
+            success=False,
+            result=None,
+            error=error_msg,
+            execution_time=asyncio.get_event_loop().time() - step_start_time,
+            metadata={"tool_type": step.tool, "error_type": error_type}
+        )
+    
+    def _resolve_dependencies(
+        self, steps: List[PlanStep]
+    ) -> Tuple[List[Set[int]], List[List[int]]]:
+        """
+        Zamień depends_on (numery kroków) na indeksy bezpośrednich zależności
+        i posortowane listy wszystkich przodków każdego kroku.
+        
+        Krok bez depends_on zależy od poprzedniego kroku (dawne zachowanie
+        sekwencyjne). Zależności od kroków późniejszych lub nieznanych są
+        pomijane, więc graf jest zawsze acykliczny.
+        """
+        index_by_number: Dict[int, int] = {}
+        for i, step in enumerate(steps):
+            index_by_number.setdefault(step.step, i)
+        
+        dependencies: List[Set[int]] = []
+        ancestors: List[List[int]] = []
+        for i, step in enumerate(steps):
+            if step.depends_on is None:
+                deps = {i - 1} if i > 0 else set()
+            else:
+                deps = set()
+                for number in step.depends_on:
+                    d = index_by_number.get(number)
+                    if d is None or d >= i:
+                        logger.warning(
+                            f"Step {i + 1} has invalid dependency on step {number}, ignoring"
+                        )
+                        continue
+                    deps.add(d)
+            dependencies.append(deps)
+            
+            all_ancestors = set(deps)
+            for d in deps:
+                all_ancestors.update(ancestors[d])
+            ancestors.append(sorted(all_ancestors))
+        
+        return dependencies, ancestors
+    
+    def _find_memoized_steps(self, steps: List[PlanStep]) -> Dict[int, int]:
+        """Zwróć mapę: indeks kroku -> indeks pierwszego kroku z tym samym narzędziem i argumentami"""
+        first_by_key: Dict[str, int] = {}
+        memo_sources: Dict[int, int] = {}
+        for i, step in enumerate(steps):
+            # Odpowiedź general_conversation zależy od wyników poprzednich kroków
+            if step.tool == "general_conversation":
+                continue
+            try:
+                key = f"{step.tool}:{json.dumps(step.args, sort_keys=True, default=str)}"
+            except (TypeError, ValueError):
+                continue
+            if key in first_by_key:
+                memo_sources[i] = first_by_key[key]
+            else:
+                first_by_key[key] = i
+        return memo_sources
+    
     async def _execute_step(
         self, 
         step: PlanStep, 
@@ -263,7 +375,6 @@ class Executor:
         args = self._prepare_step_args(step.args, context, previous_results)
         
         # Sprawdź, jakie argumenty przyjmuje funkcja narzędzia
-        import inspect
         sig = inspect.signature(tool_def.function)
         valid_args = {}
         
@@ -304,9 +415,9 @@ class Executor:
         
         # Przygotuj kontekst z poprzednich kroków
         conversation_context = []
-        for i, result in enumerate(previous_results):
+        for result in previous_results:
             if result.success and result.result:
-                conversation_context.append(f"Step {i+1} result: {result.result}")
+                conversation_context.append(f"Step {result.step.step} result: {result.result}")
         
         input_data = {
             "query": message,
@@ -342,12 +453,12 @@ class Executor:
         if previous_results:
             args["previous_results"] = [r.result for r in previous_results if r.success]
         
-        # Dodaj szczegółowe wyniki poprzednich kroków
-        for i, result in enumerate(previous_results):
+        # Dodaj szczegółowe wyniki poprzednich kroków (numeracja z planu)
+        for result in previous_results:
             if result.success and result.result:
-                args[f"step_{i+1}_result"] = result.result
-                args[f"step_{i+1}_success"] = result.success
-                args[f"step_{i+1}_execution_time"] = result.execution_time
+                args[f"step_{result.step.step}_result"] = result.result
+                args[f"step_{result.step.step}_success"] = result.success
+                args[f"step_{result.step.step}_execution_time"] = result.execution_time
         
         # Dodaj kontekst wykonania
         args["execution_context"] = self._execution_context
@@ -392,8 +503,8 @@ class Executor:
         
         return str(result)[:100] + "..." if len(str(result)) > 100 else str(result)
     
-    def _send_stream_event(self, event_type: str, data: Dict[str, Any]) -> None:
-        """Wyślij zdarzenie przez stream callback"""
+    async def _send_stream_event(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Wyślij zdarzenie przez stream callback (async callback daje backpressure)"""
         if self._stream_callback:
             try:
                 event_data = {
@@ -401,7 +512,9 @@ class Executor:
                     "timestamp": asyncio.get_event_loop().time(),
                     **data
                 }
-                self._stream_callback(event_data)
+                result = self._stream_callback(event_data)
+                if inspect.isawaitable(result):
+                    await result
             except Exception as e:
                 logger.warning(f"Error sending stream event: {e}")
     
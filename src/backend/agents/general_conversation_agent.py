@@ -21,6 +21,7 @@ from backend.core.decorators import handle_exceptions
 from backend.core.hybrid_llm_client import ModelComplexity, hybrid_llm_client
 from backend.core.mmlw_embedding_client import mmlw_client
 from backend.core.perplexity_client import perplexity_client
+from backend.core.prompt_assembly import prompt_assembler
 from backend.core.rag_document_processor import RAGDocumentProcessor
 from backend.core.rag_integration import RAGDatabaseIntegration
 from backend.core.vector_store import vector_store
@@ -31,6 +32,15 @@ from backend.agents.tools import get_current_date
 
 logger = logging.getLogger(__name__)
 
+# Stały prompt systemowy trybu streamingu (bez danych z zapytania)
+STREAMING_SYSTEM_PROMPT = (
+    "Jesteś asystentem AI FoodSave, pomocnym i przyjaznym. "
+    "Odpowiadaj zwięźle, ale kompletnie. "
+    "WAŻNE: Jeśli nie znasz odpowiedzi, przyznaj to zamiast wymyślać informacje. "
+    "NIGDY nie twórz fikcyjnych faktów, dat, liczb ani szczegółów. "
+    "Używaj tylko informacji z podanych źródeł lub swojej sprawdzonej wiedzy ogólnej."
+)
+
 
 class GeneralConversationAgent(BaseAgent):
     """Agent do obsługi swobodnych konwersacji z wykorzystaniem RAG i wyszukiwania internetowego"""
@@ -523,17 +533,15 @@ class GeneralConversationAgent(BaseAgent):
         context_text = "\n\n".join(context_parts) if context_parts else ""
 
         # Buduj wiadomości
-        messages = [{"role": "system", "content": system_prompt}]
-
-        if context_text:
-            messages.append(
-                {
-                    "role": "system",
-                    "content": f"DOSTĘPNE INFORMACJE:\n{context_text}\n\nKRYTYCZNE: Użyj TYLKO tych informacji do udzielenia dokładnej odpowiedzi. NIGDY nie wymyślaj dodatkowych faktów, szczegółów ani informacji. Jeśli informacji brakuje, przyznaj to zamiast wymyślać. Uwzględnij informacje o weryfikacji wiedzy jeśli są dostępne.",
-                }
-            )
-
-        messages.append({"role": "user", "content": query})
+        messages = prompt_assembler.build(
+            system_prompt,
+            query,
+            context=(
+                f"DOSTĘPNE INFORMACJE:\n{context_text}\n\nKRYTYCZNE: Użyj TYLKO tych informacji do udzielenia dokładnej odpowiedzi. NIGDY nie wymyślaj dodatkowych faktów, szczegółów ani informacji. Jeśli informacji brakuje, przyznaj to zamiast wymyślać. Uwzględnij informacje o weryfikacji wiedzy jeśli są dostępne."
+                if context_text
+                else None
+            ),
+        )
 
         # Generuj odpowiedź używając odpowiedniego modelu
         try:
@@ -880,45 +888,29 @@ class GeneralConversationAgent(BaseAgent):
         self, query: str, conversation_history: List[Dict[str, str]], context: str
     ) -> List[Dict[str, str]]:
         """Prepare messages for LLM with optimized context and conversation history"""
-        messages = []
-
-        # System message with instructions
-        system_message = (
-            "Jesteś asystentem AI FoodSave, pomocnym i przyjaznym. "
-            "Odpowiadaj zwięźle, ale kompletnie. "
-            "WAŻNE: Jeśli nie znasz odpowiedzi, przyznaj to zamiast wymyślać informacje. "
-            "NIGDY nie twórz fikcyjnych faktów, dat, liczb ani szczegółów. "
-            "Używaj tylko informacji z podanych źródeł lub swojej sprawdzonej wiedzy ogólnej."
-        )
-
-        if context:
-            system_message += (
-                "\n\nPoniżej znajdują się informacje kontekstowe, które mogą być pomocne "
-                "w odpowiedzi na pytanie użytkownika. Wykorzystaj je, jeśli są przydatne:\n\n"
-                + context
-            )
-
-        messages.append({"role": "system", "content": system_message})
-
         # Use optimized conversation history if available
         if hasattr(conversation_history, 'get_optimized_context'):
             # If conversation_history is a MemoryContext object
-            optimized_messages = conversation_history.get_optimized_context(max_tokens=3000)
-            messages.extend(optimized_messages)
+            history = conversation_history.get_optimized_context(max_tokens=3000)
         else:
             # Fallback to traditional approach with limit
             # Limit conversation history to prevent context window overflow
             max_history_messages = 15  # Keep last 15 messages
-            recent_history = conversation_history[-max_history_messages:] if len(conversation_history) > max_history_messages else conversation_history
-            
-            for entry in recent_history:
-                if isinstance(entry, dict) and "role" in entry and "content" in entry:
-                    messages.append({"role": entry["role"], "content": entry["content"]})
+            history = conversation_history[-max_history_messages:] if len(conversation_history) > max_history_messages else conversation_history
 
-        # Add current query
-        messages.append({"role": "user", "content": query})
+        # Kontekst zmienia się z każdym pytaniem, więc idzie po historii -
+        # stały prompt systemowy i historia tworzą prefiks wspólny między turami
+        context_message = None
+        if context:
+            context_message = (
+                "Poniżej znajdują się informacje kontekstowe, które mogą być pomocne "
+                "w odpowiedzi na pytanie użytkownika. Wykorzystaj je, jeśli są przydatne:\n\n"
+                + context
+            )
 
-        return messages
+        return prompt_assembler.build(
+            STREAMING_SYSTEM_PROMPT, query, history=history, context=context_message
+        )
 
     def _is_date_query(self, query: str) -> bool:
         """Sprawdza czy zapytanie dotyczy daty/czasu"""
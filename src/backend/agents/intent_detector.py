@@ -3,28 +3,19 @@ from __future__ import annotations
 import json
 import logging
 
-import httpx
-
 from backend.agents.interfaces import IntentData, MemoryContext
 from backend.core.hybrid_llm_client import hybrid_llm_client
+from backend.core.llm_client import ollama_health
 from backend.core.utils import extract_json_from_text
 
 logger = logging.getLogger(__name__)
 
 
 class SimpleIntentDetector:
-    def __init__(self) -> None:
-        self.ollama_available = self._check_ollama_availability()
-
-    def _check_ollama_availability(self) -> bool:
-        """Check if Ollama server is available via HTTP"""
-        try:
-            # Try to connect to Ollama server via HTTP
-            response = httpx.get("http://ollama:11434/api/tags", timeout=5)
-            return response.status_code == 200
-        except Exception as e:
-            logger.debug(f"Ollama server not available: {e}")
-            return False
+    @property
+    def ollama_available(self) -> bool:
+        """Cached Ollama availability from the shared health monitor (no I/O)"""
+        return ollama_health.is_available()
 
     async def detect_intent(self, text: str, context: MemoryContext) -> IntentData:
         """
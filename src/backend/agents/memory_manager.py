@@ -6,16 +6,21 @@ Zgodnie z regułami MDC dla zarządzania pamięcią
 import asyncio
 import json
 import logging
+import time
 import weakref
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Any, Dict, List, Optional, TypedDict
 import hashlib
 
+from backend.agents.conversation_persistence import (ConversationWriter,
+                                                     conversation_writer)
 from backend.agents.interfaces import BaseAgent, IMemoryManager
 from backend.core.cache_manager import CacheManager
 from backend.core.database import get_db
 from backend.models.conversation import Conversation, Message, ConversationSession
+from backend.settings import settings
 from backend.tasks.conversation_tasks import update_conversation_summary_task, get_conversation_summary
 from sqlalchemy import select
 
@@ -30,6 +35,10 @@ class MemoryStats(TypedDict):
     cleanup_count: int
     compression_ratio: float
     cache_hit_rate: float
+    context_cache_hits: int
+    context_cache_misses: int
+    context_cache_evictions: int
+    context_cache_bytes: int
 
 
 class ConversationSummary:
@@ -95,6 +104,7 @@ class MemoryContext:
         "conversation_summary",
         "context_window",
         "persistent_id",
+        "persisted_count",
         "semantic_hash",
         "__weakref__",  # Allow weak references
     ]
@@ -111,6 +121,8 @@ class MemoryContext:
         self.conversation_summary: Optional[ConversationSummary] = None
         self.context_window: Optional[ContextWindow] = None
         self.persistent_id: Optional[int] = None
+        # High-water mark: history[:persisted_count] is already persisted
+        self.persisted_count: int = 0
         self.semantic_hash: Optional[str] = None
 
     def set_last_command(self, command: str) -> None:
@@ -249,15 +261,31 @@ class MemoryManager(IMemoryManager):
 
     def __init__(
         self, max_contexts: int = 1000, cleanup_threshold_ratio: float = 0.8,
-        enable_persistence: bool = True, enable_semantic_cache: bool = True
+        enable_persistence: bool = True, enable_semantic_cache: bool = True,
+        writer: Optional[ConversationWriter] = None,
+        max_cache_bytes: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
     ) -> None:
-        # Use weak references to avoid memory leaks
-        self._contexts: Dict[str, weakref.ref] = {}
+        # LRU of live contexts (least recently used first), bounded by count,
+        # approximate size and idle time; evicted contexts go to persistence
+        self._contexts: "OrderedDict[str, MemoryContext]" = OrderedDict()
+        self._context_sizes: Dict[str, int] = {}
+        self._last_access: Dict[str, float] = {}
         self._max_contexts = max_contexts
+        self._max_cache_bytes = max_cache_bytes or settings.MEMORY_MAX_CACHE_BYTES
+        self._idle_ttl = idle_ttl or settings.MEMORY_CONTEXT_IDLE_TTL
+        # Locks disappear together with the last request holding them
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._load_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
         self._cleanup_threshold_ratio = cleanup_threshold_ratio
         self._enable_persistence = enable_persistence
         self._enable_semantic_cache = enable_semantic_cache
         self._cache_manager = CacheManager() if enable_semantic_cache else None
+        self._writer = writer or conversation_writer
         self._stats = {
             "total_contexts": 0,
             "persistent_contexts": 0,
@@ -266,6 +294,10 @@ class MemoryManager(IMemoryManager):
             "cleanup_count": 0,
             "compression_ratio": 0.0,
             "cache_hit_rate": 0.0,
+            "context_cache_hits": 0,
+            "context_cache_misses": 0,
+            "context_cache_evictions": 0,
+            "context_cache_bytes": 0,
         }
         self._initialized = False
 
@@ -277,42 +309,110 @@ class MemoryManager(IMemoryManager):
         logger.info("MemoryManager initialized")
 
     async def store_context(self, context: MemoryContext) -> None:
-        """Store context with weak reference"""
-        if context.session_id in self._contexts:
-            logger.warning(f"Context for session {context.session_id} already exists")
-            return
-
-        # Create weak reference with cleanup callback
-        weak_ref = weakref.ref(context, self._cleanup_callback)
-        self._contexts[context.session_id] = weak_ref
-        self._stats["total_contexts"] += 1
+        """Store context in the LRU cache and persist its new messages"""
+        if self._contexts.get(context.session_id) is not context:
+            if context.session_id not in self._contexts:
+                self._stats["total_contexts"] += 1
+            self._contexts[context.session_id] = context
+
+            # Store in semantic cache if enabled
+            if self._enable_semantic_cache and self._cache_manager:
+                await self._cache_manager.store_semantic_context(
+                    context.session_id, context._generate_semantic_hash(context.history)
+                )
+        self._touch(context)
 
-        # Persist to database if enabled
+        # Persist to database if enabled (only messages not written yet)
         if self._enable_persistence:
             await self._persist_context(context)
 
-        # Store in semantic cache if enabled
-        if self._enable_semantic_cache and self._cache_manager:
-            await self._cache_manager.store_semantic_context(
-                context.session_id, context._generate_semantic_hash(context.history)
-            )
-
+        await self._enforce_cache_limits(keep=context.session_id)
         logger.debug(f"Stored context for session {context.session_id}")
 
-    def _cleanup_callback(self, weak_ref) -> None:
-        """Callback for weak reference cleanup"""
-        self._stats["total_contexts"] -= 1
-        logger.debug("Context cleaned up from memory")
+    def _touch(self, context: MemoryContext) -> None:
+        """Mark context as most recently used and refresh its size estimate"""
+        session_id = context.session_id
+        self._contexts.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+        size = self._estimate_context_size(context)
+        self._stats["context_cache_bytes"] += size - self._context_sizes.get(session_id, 0)
+        self._context_sizes[session_id] = size
+
+    def _estimate_context_size(self, context: MemoryContext) -> int:
+        """Rough memory footprint of a context (message text dominates)"""
+        return 512 + sum(
+            len(message.get("content", "")) + 128 for message in context.history
+        )
+
+    def _forget_cached(self, session_id: str) -> Optional[MemoryContext]:
+        context = self._contexts.pop(session_id, None)
+        if context is not None:
+            self._stats["total_contexts"] -= 1
+        self._stats["context_cache_bytes"] -= self._context_sizes.pop(session_id, 0)
+        self._last_access.pop(session_id, None)
+        return context
+
+    async def _evict(self, session_id: str) -> None:
+        """Drop context from memory, writing its pending messages to persistence"""
+        context = self._forget_cached(session_id)
+        if context is None:
+            return
+        self._stats["context_cache_evictions"] += 1
+        if self._enable_persistence:
+            await self._persist_context(context)
+        logger.debug(f"Evicted context for session {session_id} from memory")
+
+    async def _enforce_cache_limits(self, keep: Optional[str] = None) -> None:
+        """Evict idle contexts, then least recently used ones over count/size limits"""
+        now = time.monotonic()
+        for session_id in list(self._contexts):
+            if now - self._last_access.get(session_id, now) <= self._idle_ttl:
+                break  # LRU order: the rest was used more recently
+            if session_id != keep:
+                await self._evict(session_id)
+
+        for session_id in list(self._contexts):
+            if (
+                len(self._contexts) <= self._max_contexts
+                and self._stats["context_cache_bytes"] <= self._max_cache_bytes
+            ):
+                break
+            if session_id != keep:
+                await self._evict(session_id)
+
+    def _get_cached(self, session_id: str) -> Optional[MemoryContext]:
+        context = self._contexts.get(session_id)
+        if context is None:
+            return None
+        if time.monotonic() - self._last_access.get(session_id, 0.0) > self._idle_ttl:
+            # Expired: treat as a miss, the next store re-inserts it
+            return None
+        self._touch(context)
+        return context
+
+    def session_lock(self, session_id: str) -> asyncio.Lock:
+        """Per-session lock for serializing concurrent requests of one session"""
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        return lock
 
     async def retrieve_context(self, session_id: str) -> Optional[MemoryContext]:
         """Retrieve context with fallback to persistence"""
         # Try memory first
-        weak_ref = self._contexts.get(session_id)
-        if weak_ref:
-            context = weak_ref()
-            if context:
-                logger.debug(f"Retrieved context from memory for session {session_id}")
-                return context
+        context = self._get_cached(session_id)
+        if context is not None:
+            self._stats["context_cache_hits"] += 1
+            logger.debug(f"Retrieved context from memory for session {session_id}")
+            return context
+        self._stats["context_cache_misses"] += 1
+
+        # Expired context still holds the newest state, no need to reload it
+        stale = self._contexts.get(session_id)
+        if stale is not None:
+            await self.store_context(stale)
+            return stale
 
         # Try persistence
         if self._enable_persistence:
@@ -335,11 +435,22 @@ class MemoryManager(IMemoryManager):
 
     async def get_context(self, session_id: str) -> MemoryContext:
         """Get or create context for session"""
-        context = await self.retrieve_context(session_id)
-        if context is None:
-            context = MemoryContext(session_id)
-            await self.store_context(context)
-            logger.info(f"Created new context for session {session_id}")
+        context = self._get_cached(session_id)
+        if context is not None:
+            self._stats["context_cache_hits"] += 1
+            return context
+
+        # Concurrent misses of one session load it from persistence only once
+        lock = self._load_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._load_locks[session_id] = lock
+        async with lock:
+            context = await self.retrieve_context(session_id)
+            if context is None:
+                context = MemoryContext(session_id)
+                await self.store_context(context)
+                logger.info(f"Created new context for session {session_id}")
         return context
 
     async def update_context(
@@ -392,13 +503,13 @@ class MemoryManager(IMemoryManager):
     async def clear_context(self, session_id: str) -> None:
         """Clear context from all storage layers"""
         # Remove from memory
-        if session_id in self._contexts:
-            del self._contexts[session_id]
-            self._stats["total_contexts"] -= 1
+        self._forget_cached(session_id)
 
-        # Clear from persistence
+        # Clear from persistence (pending writes first, so they are not re-created)
         if self._enable_persistence:
+            await self._writer.flush()
             await self._clear_from_persistence(session_id)
+            self._writer.forget_session(session_id)
 
         # Clear from semantic cache
         if self._enable_semantic_cache and self._cache_manager:
@@ -407,76 +518,39 @@ class MemoryManager(IMemoryManager):
         logger.info(f"Cleared context for session {session_id}")
 
     async def _persist_context(self, context: MemoryContext) -> None:
-        """Persist context to database"""
+        """Queue messages added since the last persist for a write-behind bulk insert"""
         try:
-            async for db in get_db():
-                # Check if conversation exists
-                stmt = select(Conversation).where(Conversation.session_id == context.session_id)
-                result = await db.execute(stmt)
-                conversation = result.scalar_one_or_none()
-                
-                if not conversation:
-                    # Create new conversation
-                    conversation = Conversation(session_id=context.session_id)
-                    db.add(conversation)
-                    await db.commit()
-                    await db.refresh(conversation)
-                
-                # Save messages
-                for message_data in context.history[-10:]:  # Save last 10 messages
-                    message = Message(
-                        content=message_data.get("content", ""),
-                        role=message_data.get("role", "user"),
-                        conversation_id=conversation.id,
-                        message_metadata=message_data.get("metadata", {})
-                    )
-                    db.add(message)
-                
-                await db.commit()
-                context.persistent_id = conversation.id
-                logger.debug(f"Persisted context for session {context.session_id}")
-                
+            if context.persisted_count > len(context.history):
+                # History was truncated in place, nothing before the new tail is pending
+                context.persisted_count = len(context.history)
+            new_messages = context.history[context.persisted_count:]
+            if not new_messages:
+                return
+            await self._writer.enqueue(context.session_id, new_messages)
+            context.persisted_count = len(context.history)
+            logger.debug(
+                f"Queued {len(new_messages)} messages for session {context.session_id}"
+            )
         except Exception as e:
             logger.error(f"Error persisting context: {e}")
-            if 'db' in locals():
-                await db.rollback()
 
     async def _load_from_persistence(self, session_id: str) -> Optional[MemoryContext]:
-        """Load context from database"""
+        """Load the recent message window and stored summary from the database"""
         try:
+            # Messages still waiting in the write-behind queue must be visible
+            await self._writer.flush()
+            loaded = await self._writer.load_tail(session_id)
+            if loaded is None:
+                return None
+            conversation_id, history = loaded
+
+            # Create context
+            context = MemoryContext(session_id=session_id, history=history)
+            context.persistent_id = conversation_id
+            context.persisted_count = len(history)
+
+            # Load conversation summary if available
             async for db in get_db():
-                # Find conversation
-                stmt = select(Conversation).where(Conversation.session_id == session_id)
-                result = await db.execute(stmt)
-                conversation = result.scalar_one_or_none()
-                
-                if not conversation:
-                    return None
-                
-                # Load messages
-                stmt = (
-                    select(Message)
-                    .where(Message.conversation_id == conversation.id)
-                    .order_by(Message.created_at)
-                )
-                result = await db.execute(stmt)
-                messages = result.scalars().all()
-                
-                # Convert to context format
-                history = []
-                for msg in messages:
-                    history.append({
-                        "role": msg.role,
-                        "content": msg.content,
-                        "timestamp": msg.created_at.isoformat(),
-                        "metadata": msg.message_metadata or {}
-                    })
-                
-                # Create context
-                context = MemoryContext(session_id=session_id, history=history)
-                context.persistent_id = conversation.id
-                
-                # Load conversation summary if available
                 summary_stmt = select(ConversationSession).where(ConversationSession.session_id == session_id)
                 summary_result = await db.execute(summary_stmt)
                 summary_session = summary_result.scalar_one_or_none()
@@ -488,9 +562,9 @@ class MemoryManager(IMemoryManager):
                         user_preferences=summary_session.user_preferences or {},
                         conversation_style=summary_session.conversation_style or 'friendly'
                     )
-                
-                logger.debug(f"Loaded context for session {session_id} with {len(history)} messages")
-                return context
+            
+            logger.debug(f"Loaded context for session {session_id} with {len(history)} messages")
+            return context
                 
         except Exception as e:
             logger.error(f"Error loading context from persistence: {e}")
@@ -549,21 +623,16 @@ class MemoryManager(IMemoryManager):
             logger.error(f"Error clearing from semantic cache: {e}")
 
     async def _cleanup_old_contexts(self) -> None:
-        """Cleanup old contexts to prevent memory leaks"""
+        """Evict idle and over-limit contexts from memory to persistence"""
         try:
-            valid_contexts = self._get_valid_contexts()
+            before = len(self._contexts)
+            await self._enforce_cache_limits()
+            evicted = before - len(self._contexts)
             
-            if len(valid_contexts) > self._max_contexts * self._cleanup_threshold_ratio:
-                # Remove oldest contexts
-                sorted_contexts = sorted(valid_contexts, key=lambda c: c.last_updated)
-                contexts_to_remove = sorted_contexts[:len(valid_contexts) - self._max_contexts]
-                
-                for context in contexts_to_remove:
-                    await self.clear_context(context.session_id)
-                
-                self._stats["cleanup_count"] += 1
-                self._stats["last_cleanup"] = datetime.now()
-                logger.info(f"Cleaned up {len(contexts_to_remove)} old contexts")
+            self._stats["cleanup_count"] += 1
+            self._stats["last_cleanup"] = datetime.now()
+            if evicted:
+                logger.info(f"Evicted {evicted} old contexts")
 
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
@@ -585,12 +654,7 @@ class MemoryManager(IMemoryManager):
 
     async def get_all_contexts(self) -> Dict[str, MemoryContext]:
         """Get all active contexts"""
-        contexts = {}
-        for session_id, weak_ref in self._contexts.items():
-            context = weak_ref()
-            if context:
-                contexts[session_id] = context
-        return contexts
+        return dict(self._contexts)
 
     def _update_stats(self) -> None:
         """Update memory statistics"""
@@ -607,13 +671,8 @@ class MemoryManager(IMemoryManager):
             self._stats["cache_hit_rate"] = self._cache_manager.get_hit_rate()
 
     def _get_valid_contexts(self) -> List[MemoryContext]:
-        """Get list of valid contexts (not garbage collected)"""
-        contexts = []
-        for weak_ref in self._contexts.values():
-            context = weak_ref()
-            if context:
-                contexts.append(context)
-        return contexts
+        """Get list of contexts held in memory"""
+        return list(self._contexts.values())
 
     async def get_context_stats(self) -> Dict[str, Any]:
         """Get memory manager statistics"""
@@ -632,12 +691,13 @@ class MemoryManager(IMemoryManager):
 
     @asynccontextmanager
     async def context_manager(self, session_id: str):
-        """Context manager for automatic cleanup"""
-        context = await self.get_context(session_id)
-        try:
-            yield context
-        finally:
-            await self.update_context(context)
+        """Context manager for automatic cleanup (serialized per session)"""
+        async with self.session_lock(session_id):
+            context = await self.get_context(session_id)
+            try:
+                yield context
+            finally:
+                await self.update_context(context)
 
     async def __aenter__(self) -> MemoryContext:
         """Async context manager entry"""
@@ -649,9 +709,20 @@ class MemoryManager(IMemoryManager):
 
     def get_memory_stats(self) -> "MemoryStats":
         """Get memory statistics"""
-        return self._stats.copy()
+        stats = self._stats.copy()
+        stats["cached_contexts"] = len(self._contexts)
+        lookups = stats["context_cache_hits"] + stats["context_cache_misses"]
+        stats["context_cache_hit_rate"] = (
+            stats["context_cache_hits"] / lookups if lookups else 0.0
+        )
+        if self._enable_persistence:
+            stats["persistence"] = self._writer.get_stats()
+        return stats
 
     async def shutdown(self) -> None:
-        """Shutdown memory manager"""
-        await self.cleanup_all()
+        """Shutdown memory manager (contexts are evicted to persistence, not deleted)"""
+        for session_id in list(self._contexts):
+            await self._evict(session_id)
+        if self._enable_persistence:
+            await self._writer.stop()
         logger.info("MemoryManager shutdown completed")
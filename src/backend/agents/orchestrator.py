@@ -18,6 +18,7 @@ from backend.agents.interfaces import AgentResponse, AgentType, IntentData
 from backend.agents.memory_manager import MemoryManager
 from backend.agents.orchestrator_errors import OrchestratorError
 from backend.agents.response_generator import ResponseGenerator
+from backend.agents.plan_router import plan_router
 from backend.agents.planner import Planner
 from backend.agents.executor import Executor
 from backend.agents.synthesizer import Synthesizer
@@ -87,10 +88,12 @@ class Orchestrator:
         # Initialize new architecture components
         if self.use_planner_executor:
             self.planner = Planner()
+            self.plan_router = plan_router
             self.executor = Executor()
             self.synthesizer = Synthesizer()
         else:
             self.planner = None
+            self.plan_router = None
             self.executor = None
             self.synthesizer = None
         
@@ -174,77 +177,79 @@ class Orchestrator:
                     OrchestratorError("Memory manager not initialized")
                 )
 
-            context = await self.memory_manager.get_context(session_id)
+            # Turns of one session run one at a time (context read-modify-write)
+            async with self.memory_manager.session_lock(session_id):
+                context = await self.memory_manager.get_context(session_id)
 
-            # 2. Log activity
-            await self.profile_manager.log_activity(
-                session_id, InteractionType.FILE_UPLOAD, filename
-            )
+                # 2. Log activity
+                await self.profile_manager.log_activity(
+                    session_id, InteractionType.FILE_UPLOAD, filename
+                )
 
-            # 3. Determine intent based on file type
-            intent_type = (
-                "image_processing"
-                if content_type.startswith("image/")
-                else (
-                    "document_processing" if content_type == "application/pdf" else None
+                # 3. Determine intent based on file type
+                intent_type = (
+                    "image_processing"
+                    if content_type.startswith("image/")
+                    else (
+                        "document_processing" if content_type == "application/pdf" else None
+                    )
                 )
-            )
 
-            if not intent_type:
-                raise ValueError(f"Unsupported content type: {content_type}")
+                if not intent_type:
+                    raise ValueError(f"Unsupported content type: {content_type}")
 
-            # 4. Create intent data
-            intent = IntentData(
-                type=intent_type,
-                entities={"filename": filename, "content_type": content_type},
-            )
+                # 4. Create intent data
+                intent = IntentData(
+                    type=intent_type,
+                    entities={"filename": filename, "content_type": content_type},
+                )
 
-            # 5. Route to OCR agent with circuit breaker
-            try:
-                if self.agent_router is None:
-                    logger.error("Agent router is None")
-                    return self._format_error_response(
-                        OrchestratorError("Agent router not initialized")
+                # 5. Route to OCR agent with circuit breaker
+                try:
+                    if self.agent_router is None:
+                        logger.error("Agent router is None")
+                        return self._format_error_response(
+                            OrchestratorError("Agent router not initialized")
+                        )
+
+                    # --- STAGE 1: OCR ---
+                    ocr_response = await self.circuit_breaker.call_async(
+                        self.agent_router.route_to_agent,
+                        intent,
+                        context,
+                        user_command=filename,
+                        file_bytes=file_bytes,  # Pass file bytes to agent
                     )
 
-                # --- STAGE 1: OCR ---
-                ocr_response = await self.circuit_breaker.call_async(
-                    self.agent_router.route_to_agent,
-                    intent,
-                    context,
-                    user_command=filename,
-                    file_bytes=file_bytes,  # Pass file bytes to agent
-                )
+                    if not ocr_response.success or not ocr_response.text:
+                        return ocr_response
 
-                if not ocr_response.success or not ocr_response.text:
-                    return ocr_response
-
-                # --- STAGE 2: Structured Receipt Analysis ---
-                # Prepare intent for analysis
-                analysis_intent = IntentData(
-                    type="receipt_processing",
-                    entities={"ocr_text": ocr_response.text, "filename": filename},
-                )
-                analysis_response = await self.circuit_breaker.call_async(
-                    self.agent_router.route_to_agent,
-                    analysis_intent,
-                    context,
-                    user_command=filename,
-                )
+                    # --- STAGE 2: Structured Receipt Analysis ---
+                    # Prepare intent for analysis
+                    analysis_intent = IntentData(
+                        type="receipt_processing",
+                        entities={"ocr_text": ocr_response.text, "filename": filename},
+                    )
+                    analysis_response = await self.circuit_breaker.call_async(
+                        self.agent_router.route_to_agent,
+                        analysis_intent,
+                        context,
+                        user_command=filename,
+                    )
 
-                # Add file data to context
-                await self.memory_manager.update_context(
-                    context,
-                    {"file_processed": filename, "response": analysis_response.data},
-                )
+                    # Add file data to context
+                    await self.memory_manager.update_context(
+                        context,
+                        {"file_processed": filename, "response": analysis_response.data},
+                    )
 
-                return analysis_response
+                    return analysis_response
 
-            except CircuitBreakerError as e:
-                logger.error(f"Circuit breaker tripped: {e}")
-                return self._format_error_response(
-                    OrchestratorError("Service temporarily unavailable")
-                )
+                except CircuitBreakerError as e:
+                    logger.error(f"Circuit breaker tripped: {e}")
+                    return self._format_error_response(
+                        OrchestratorError("Service temporarily unavailable")
+                    )
 
         except Exception as e:
             logger.error(f"Error processing file: {e}")
@@ -263,7 +268,7 @@ class Orchestrator:
         user_command: str,
         session_id: str,
         stream: bool = False,
-        stream_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        stream_callback: Optional[Callable[[Dict[str, Any]], Any]] = None,
         agent_states: Optional[Dict[str, bool]] = None,
         use_perplexity: bool = False,
         use_bielik: bool = True,
@@ -284,15 +289,18 @@ class Orchestrator:
                     request_id=request_id,
                 )
 
-            # Choose processing method based on architecture
-            if self.use_planner_executor and self.planner and self.executor and self.synthesizer:
-                return await self._process_with_planner_executor(
-                    user_command, session_id, request_id, stream_callback
-                )
-            else:
-                return await self._process_with_legacy_architecture(
-                    user_command, session_id, request_id
-                )
+            # Turns of one session run one at a time (context read-modify-write);
+            # the planner path falls back to the legacy path under the same lock
+            async with self.memory_manager.session_lock(session_id):
+                # Choose processing method based on architecture
+                if self.use_planner_executor and self.planner and self.executor and self.synthesizer:
+                    return await self._process_with_planner_executor(
+                        user_command, session_id, request_id, stream_callback
+                    )
+                else:
+                    return await self._process_with_legacy_architecture(
+                        user_command, session_id, request_id
+                    )
 
         except OrchestratorError as e:
             logger.error(
@@ -312,7 +320,7 @@ class Orchestrator:
         user_command: str,
         session_id: str,
         request_id: str,
-        stream_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        stream_callback: Optional[Callable[[Dict[str, Any]], Any]] = None,
     ) -> AgentResponse:
         """Process command using new planner-executor-synthesizer architecture"""
         try:
@@ -341,8 +349,10 @@ class Orchestrator:
             except Exception as e:
                 logger.warning(f"Failed to get conversation summary: {e}")
 
-            # 4. Create execution plan
-            plan = await self.planner.create_plan(user_command, conversation_context)
+            # 4. Create execution plan (routine and repeated queries skip the LLM planner)
+            plan = self.plan_router.route(user_command)
+            if plan is None:
+                plan = await self.planner.create_plan(user_command, conversation_context)
             
             # Validate plan
             if not self.planner.validate_plan(plan):
@@ -350,17 +360,25 @@ class Orchestrator:
                 return await self._process_with_legacy_architecture(
                     user_command, session_id, request_id
                 )
+            self.plan_router.remember(user_command, plan)
 
-            # 5. Set up streaming if requested
-            if stream_callback:
-                self.executor.set_stream_callback(stream_callback)
+            # 5. Set up streaming if requested (executor is reused between requests)
+            self.executor.set_stream_callback(stream_callback)
 
             # 6. Execute plan
-            execution_result = await self.executor.execute_plan(plan, conversation_context)
+            try:
+                execution_result = await self.executor.execute_plan(
+                    plan, conversation_context
+                )
+            finally:
+                self.executor.set_stream_callback(None)
 
-            # 7. Synthesize final response
+            # 7. Synthesize final response (tokens streamed when requested)
             final_response = await self.synthesizer.generate_response(
-                execution_result, user_command, conversation_context
+                execution_result,
+                user_command,
+                conversation_context,
+                stream_callback=stream_callback,
             )
 
             # 8. Update context with final response
@@ -0,0 +1,195 @@
+"""
+Szybka ścieżka przed planistą LLM
+
+Rutynowe zapytania (powitania, pytania o datę, "pokaż spiżarnię", pogoda)
+dostają gotowy jednokrokowy plan bez wywołania LLM. Pozostałe zapytania
+korzystają z cache planów kluczowanego znormalizowanym szablonem zapytania:
+powtarzające się kształty zapytań używają zwalidowanego wcześniej planu.
+"""
+
+import copy
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from backend.agents.intent_detector import SimpleIntentDetector
+from backend.agents.planner import ExecutionPlan, PlanStep
+from backend.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+_PANTRY = re.compile(r"\b(spiżarni\w*|lodówk\w*|lodówce|zapas\w*|pantry)\b")
+_WEATHER = re.compile(r"\b(pogod\w*|prognoz\w*|weather|forecast)\b")
+# Słowa innych narzędzi (przepisy, zmiany spiżarni, zakupy) - zapytanie o więcej
+# niż jedną rzecz wymaga planisty, np. "Co ugotować z rzeczy w lodówce?"
+_OTHER_INTENTS = re.compile(
+    r"\b(przepis\w*|ugotow\w*|ugotuj\w*|gotowa\w*|upiec\w*|upiek\w*|"
+    r"dodaj\w*|usuń\w*|usun\w*|kup\w*|zakup\w*|"
+    r"recipe\w*|cook\w*|add|remove|buy)\b"
+)
+_LOCATION = re.compile(
+    r"\b(?:w|we|dla|in)\s+([A-ZĄĆĘŁŃÓŚŹŻ][\wąćęłńóśźż-]+(?:\s+[A-ZĄĆĘŁŃÓŚŹŻ][\wąćęłńóśźż-]+)?)"
+)
+
+# Intencje klasyfikatora słów kluczowych, na które wystarczy zwykła rozmowa
+_CONVERSATION_INTENTS = {"general_conversation", "date"}
+
+
+def normalize_query(query: str) -> str:
+    """Template of a query: lowercase, no punctuation, numbers replaced"""
+    text = _PUNCTUATION.sub(" ", query.lower())
+    text = _NUMBER.sub("<num>", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _single_step_plan(query: str, tool: str, args: Dict[str, Any], description: str) -> ExecutionPlan:
+    return ExecutionPlan(
+        query=query,
+        steps=[PlanStep(step=1, tool=tool, args=args, description=description, depends_on=[])],
+        total_steps=1,
+        estimated_complexity="simple",
+        source="fast_path",
+    )
+
+
+class PlanRouter:
+    """Routes routine queries to ready plans and caches LLM plans per query template"""
+
+    def __init__(
+        self,
+        max_cached_plans: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_words: Optional[int] = None,
+        min_confidence: Optional[float] = None,
+    ) -> None:
+        """
+        Initialize plan router
+
+        Args:
+            max_cached_plans: Maximum number of cached plan templates
+            ttl: Seconds a cached plan stays valid
+            max_words: Longest query (in words) handled by the fast path
+            min_confidence: Minimal keyword classifier confidence for the fast path
+        """
+        self.max_cached_plans = max_cached_plans or settings.PLAN_CACHE_SIZE
+        self.ttl = ttl or settings.PLAN_CACHE_TTL
+        self.max_words = max_words or settings.PLAN_FAST_PATH_MAX_WORDS
+        self.min_confidence = min_confidence or settings.PLAN_FAST_PATH_MIN_CONFIDENCE
+        self._classifier = SimpleIntentDetector()
+        # template -> (plan, original query, stored at)
+        self._cache: "OrderedDict[str, Tuple[ExecutionPlan, str, float]]" = OrderedDict()
+        self._stats = {"fast_path": 0, "cache_hits": 0, "misses": 0, "stored": 0}
+
+    def route(self, query: str) -> Optional[ExecutionPlan]:
+        """Return a plan without calling the LLM, or None when the planner is needed"""
+        plan = self._fast_path(query)
+        if plan is not None:
+            self._stats["fast_path"] += 1
+            logger.debug(f"Fast-path plan ({plan.steps[0].tool}) for: {query}")
+            return plan
+
+        plan = self._cached_plan(query)
+        if plan is not None:
+            self._stats["cache_hits"] += 1
+            logger.debug(f"Cached plan reused for: {query}")
+            return plan
+
+        self._stats["misses"] += 1
+        return None
+
+    def _fast_path(self, query: str) -> Optional[ExecutionPlan]:
+        if len(query.split()) > self.max_words:
+            return None
+        text = query.lower()
+        pantry, weather = _PANTRY.search(text), _WEATHER.search(text)
+        # Jednokrokowy plan tylko dla zapytania o jedną rzecz
+        if (pantry and weather) or ((pantry or weather) and _OTHER_INTENTS.search(text)):
+            return None
+
+        if pantry:
+            return _single_step_plan(
+                query, "get_pantry_items", {}, "Pobierz produkty ze spiżarni"
+            )
+
+        if weather:
+            match = _LOCATION.search(query)
+            args = {"location": match.group(1) if match else "current"}
+            if "jutr" in text or "tomorrow" in text:
+                args["date"] = "tomorrow"
+            return _single_step_plan(
+                query,
+                "get_weather_forecast",
+                args,
+                f"Pobierz prognozę pogody dla {args['location']}",
+            )
+
+        intent = self._classifier._fallback_intent_detection(query)
+        if intent.type in _CONVERSATION_INTENTS and intent.confidence >= self.min_confidence:
+            return _single_step_plan(
+                query,
+                "general_conversation",
+                {"message": query},
+                "Odpowiedz na zapytanie użytkownika",
+            )
+        return None
+
+    def _cached_plan(self, query: str) -> Optional[ExecutionPlan]:
+        template = normalize_query(query)
+        entry = self._cache.get(template)
+        if entry is None:
+            return None
+        plan, original_query, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._cache[template]
+            return None
+        self._cache.move_to_end(template)
+
+        reused = copy.deepcopy(plan)
+        reused.query = query
+        reused.source = "cache"
+        for step in reused.steps:
+            # Argumenty przepisane dosłownie z zapytania dotyczą nowego zapytania
+            for name, value in step.args.items():
+                if value == original_query:
+                    step.args[name] = query
+        return reused
+
+    def remember(self, query: str, plan: ExecutionPlan) -> None:
+        """Cache a validated LLM plan under the query template"""
+        if plan.source != "llm" or not plan.steps:
+            return
+        # Plan zależny od liczb z zapytania nie pasuje do innych liczb w tym szablonie
+        args = json.dumps([step.args for step in plan.steps], ensure_ascii=False)
+        if any(number in args for number in _NUMBER.findall(query)):
+            return
+
+        template = normalize_query(query)
+        self._cache[template] = (copy.deepcopy(plan), query, time.monotonic())
+        self._cache.move_to_end(template)
+        while len(self._cache) > self.max_cached_plans:
+            self._cache.popitem(last=False)
+        self._stats["stored"] += 1
+
+    def clear(self) -> None:
+        """Drop all cached plans (e.g. after the tool registry changed)"""
+        self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        routed = self._stats["fast_path"] + self._stats["cache_hits"]
+        total = routed + self._stats["misses"]
+        return {
+            **self._stats,
+            "cached_plans": len(self._cache),
+            "planner_skip_rate": round(routed / total, 3) if total else 0.0,
+        }
+
+
+# Wspólny router - orkiestratory są tworzone per żądanie, cache planów nie
+plan_router = PlanRouter()
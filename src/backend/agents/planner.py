@@ -9,6 +9,7 @@ from typing import Any, Dict, List, Optional
 from dataclasses import dataclass
 
 from backend.core.llm_client import llm_client
+from backend.core.prompt_assembly import prompt_assembler
 from backend.settings import settings
 from backend.agents.tools.registry import tool_registry
 from backend.core.utils import extract_json_from_text
@@ -24,6 +25,8 @@ class PlanStep:
     args: Dict[str, Any]
     description: str
     expected_result: Optional[str] = None
+    # Numery kroków, których wyniki są potrzebne; None = zależy od poprzedniego kroku
+    depends_on: Optional[List[int]] = None
 
 
 @dataclass
@@ -33,6 +36,8 @@ class ExecutionPlan:
     steps: List[PlanStep]
     total_steps: int
     estimated_complexity: str  # 'simple', 'medium', 'complex'
+    # Skąd pochodzi plan: 'llm', 'fallback', 'fast_path' lub 'cache'
+    source: str = "llm"
 
 
 class Planner:
@@ -99,6 +104,12 @@ class Planner:
             return self._create_fallback_plan(query)
     
     def _create_planner_prompt(self) -> str:
+        """Prompt systemowy planisty - renderowany raz dla danego zestawu narzędzi"""
+        # Identyczny bajt w bajt prefiks pozwala Ollamie ponownie użyć KV-cache
+        key = ("planner", tuple(self.tool_registry.get_all_tools()))
+        return prompt_assembler.static(key, self._render_planner_prompt)
+
+    def _render_planner_prompt(self) -> str:
         """Twórz prompt systemowy dla planisty"""
         available_tools = self.tool_registry.format_tools_for_planner()
         
@@ -122,7 +133,8 @@ Jesteś ekspertem w planowaniu zadań. Twoim zadaniem jest stworzenie szczegół
             "tool": "nazwa_narzędzia",
             "args": {{"arg1": "wartość1", "arg2": "wartość2"}},
             "description": "Opis tego kroku",
-            "expected_result": "Co oczekujemy otrzymać"
+            "expected_result": "Co oczekujemy otrzymać",
+            "depends_on": []
         }}
     ],
     "total_steps": 1,
@@ -136,7 +148,7 @@ Zasady planowania:
 1. Analizuj zapytanie użytkownika i rozbij je na logiczne kroki
 2. Używaj tylko dostępnych narzędzi
 3. Każdy krok powinien mieć jasny cel i oczekiwany wynik
-4. Planuj sekwencyjnie - wyniki jednego kroku mogą być potrzebne w następnym
+4. W "depends_on" podaj numery kroków, których wyników dany krok potrzebuje; niezależne kroki mają pustą listę [] i są wykonywane równolegle
 5. Uwzględniaj kontekst rozmowy jeśli jest dostępny
 6. Jeśli zapytanie jest proste, użyj tylko jednego kroku
 7. Jeśli zapytanie jest złożone, rozbij je na kilka kroków
@@ -151,7 +163,8 @@ Zapytanie: "Jaka jest pogoda w Warszawie?"
             "tool": "get_weather_forecast",
             "args": {{"location": "Warsaw"}},
             "description": "Pobierz prognozę pogody dla Warszawy",
-            "expected_result": "Informacje o aktualnej pogodzie w Warszawie"
+            "expected_result": "Informacje o aktualnej pogodzie w Warszawie",
+            "depends_on": []
         }}
     ],
     "total_steps": 1,
@@ -166,14 +179,16 @@ Zapytanie: "Zaproponuj przepis na kurczaka biorąc pod uwagę, że jutro będzie
             "tool": "get_weather_forecast",
             "args": {{"location": "current", "date": "tomorrow"}},
             "description": "Sprawdź prognozę pogody na jutro",
-            "expected_result": "Informacje o pogodzie na jutro"
+            "expected_result": "Informacje o pogodzie na jutro",
+            "depends_on": []
         }},
         {{
             "step": 2,
             "tool": "find_recipes",
             "args": {{"ingredients": ["chicken"], "constraints": "rainy_weather"}},
             "description": "Znajdź przepisy na kurczaka odpowiednie na deszczową pogodę",
-            "expected_result": "Lista przepisów na kurczaka odpowiednich na deszczową pogodę"
+            "expected_result": "Lista przepisów na kurczaka odpowiednich na deszczową pogodę",
+            "depends_on": [1]
         }}
     ],
     "total_steps": 2,
@@ -411,7 +426,8 @@ Zapytanie: "Zaproponuj przepis na kurczaka biorąc pod uwagę, że jutro będzie
                 tool=step_data.get("tool", ""),
                 args=step_data.get("args", {}),
                 description=step_data.get("description", ""),
-                expected_result=step_data.get("expected_result")
+                expected_result=step_data.get("expected_result"),
+                depends_on=self._parse_depends_on(step_data.get("depends_on")),
             )
             steps.append(step)
         
@@ -422,6 +438,20 @@ Zapytanie: "Zaproponuj przepis na kurczaka biorąc pod uwagę, że jutro będzie
             estimated_complexity=plan_data.get("estimated_complexity", "medium")
         )
     
+    def _parse_depends_on(self, value: Any) -> Optional[List[int]]:
+        """Parsuj listę zależności kroku (brak pola = zależność od poprzedniego kroku)"""
+        if value is None:
+            return None
+        if not isinstance(value, list):
+            value = [value]
+        depends_on = []
+        for item in value:
+            try:
+                depends_on.append(int(item))
+            except (TypeError, ValueError):
+                logger.debug(f"Ignoring invalid step dependency: {item!r}")
+        return depends_on
+
     def _create_fallback_plan(self, query: str) -> ExecutionPlan:
         """Twórz plan awaryjny dla prostych zapytań"""
         # Dla prostych zapytań, użyj general_conversation_agent
@@ -437,7 +467,8 @@ Zapytanie: "Zaproponuj przepis na kurczaka biorąc pod uwagę, że jutro będzie
             query=query,
             steps=[fallback_step],
             total_steps=1,
-            estimated_complexity="simple"
+            estimated_complexity="simple",
+            source="fallback",
         )
     
     def validate_plan(self, plan: ExecutionPlan) -> bool:
@@ -475,6 +506,8 @@ Zapytanie: "Zaproponuj przepis na kurczaka biorąc pod uwagę, że jutro będzie
                 summary += f"  Argumenty: {step.args}\n"
             if step.expected_result:
                 summary += f"  Oczekiwany wynik: {step.expected_result}\n"
+            if step.depends_on is not None:
+                summary += f"  Zależy od kroków: {step.depends_on}\n"
             summary += "\n"
         
         return summary 
\ No newline at end of file
@@ -173,6 +173,10 @@ class RAGAgent(BaseAgent):
         Returns:
             List of relevant document chunks with metadata
         """
+        if filter_metadata:
+            # Filters are applied inside the index, not on the top-k afterwards
+            return (await self.search_many([query], k, filter_metadata))[0]
+
         await self.initialize()
         query_embedding_list = await self._get_embedding(query)
         if not query_embedding_list:
@@ -193,6 +197,55 @@ class RAGAgent(BaseAgent):
             for chunk, score in search_results
         ]
 
+    async def search_many(
+        self,
+        queries: List[str],
+        k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries (e.g. sub-questions) in one round trip
+
+        Args:
+            queries: Search queries
+            k: Number of results per query
+            filter_metadata: Optional metadata filter applied before ranking
+
+        Returns:
+            One list of document chunks per query, in query order
+        """
+        if not queries:
+            return []
+        await self.initialize()
+        try:
+            embeddings = await hybrid_llm_client.embed_batch(
+                texts=queries, model="nomic-embed-text"
+            )
+        except Exception as e:
+            logger.error(f"Error getting batch embeddings: {str(e)}")
+            return [[] for _ in queries]
+
+        valid = [i for i, embedding in enumerate(embeddings) if embedding]
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        if not valid:
+            return results
+
+        search_results = await self.vector_store.search_batch(
+            np.array([embeddings[i] for i in valid], dtype=np.float32),
+            k=k,
+            metadata_filter=filter_metadata,
+        )
+        for i, hits in zip(valid, search_results):
+            results[i] = [
+                {
+                    "text": chunk.content,
+                    "metadata": chunk.metadata,
+                    "similarity": score,
+                }
+                for chunk, score in hits
+            ]
+        return results
+
     async def process(self, context: Dict[str, Any]) -> AgentResponse:
         """
         Process a query using RAG
@@ -13,6 +13,33 @@ from backend.core.product_name_normalizer import ProductNameNormalizer
 
 logger = logging.getLogger(__name__)
 
+# Stałe instrukcje i format odpowiedzi - tekst z OCR idzie na końcu, w wiadomości
+# użytkownika, więc cały prompt systemowy jest prefiksem wspólnym między paragonami
+RECEIPT_ANALYSIS_SYSTEM_PROMPT = """Jesteś specjalistycznym asystentem do analizy paragonów z polskich sklepów. Wyciągnij strukturalne dane z tekstu paragonu.
+
+Jesteś ekspertem od analizy paragonów. Wyciągnij dane w JSON:
+- store: nazwa sklepu
+- address: adres sklepu
+- date: data w formacie YYYY-MM-DD HH:MM
+- items: lista produktów (name, quantity, unit_price, total_price, tax_category)
+- discounts: rabaty (description, amount)
+- coupons: kupony (code, amount)
+- vat_summary: podsumowanie VAT (tax_category, net, tax_amount, gross)
+- total: suma do zapłaty
+Zwróć tylko JSON, bez komentarzy.
+
+Format:
+{
+  "store": "",
+  "address": "",
+  "date": "",
+  "items": [{"name": "", "quantity": 0.0, "unit_price": 0.0, "total_price": 0.0, "tax_category": ""}],
+  "discounts": [{"description": "", "amount": 0.0}],
+  "coupons": [{"code": "", "amount": 0.0}],
+  "vat_summary": [{"tax_category": "", "net": 0.0, "tax_amount": 0.0, "gross": 0.0}],
+  "total": 0.0
+}"""
+
 
 class ReceiptAnalysisAgent(BaseAgent):
     """Agent odpowiedzialny za analizę danych paragonu po przetworzeniu OCR.
@@ -73,10 +100,7 @@ class ReceiptAnalysisAgent(BaseAgent):
         response = await hybrid_llm_client.chat(
             model=model,
             messages=[
-                {
-                    "role": "system",
-                    "content": "Jesteś specjalistycznym asystentem do analizy paragonów z polskich sklepów. Wyciągnij strukturalne dane z tekstu paragonu.",
-                },
+                {"role": "system", "content": RECEIPT_ANALYSIS_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
             stream=False,
@@ -125,36 +149,8 @@ class ReceiptAnalysisAgent(BaseAgent):
         )
 
     def _create_receipt_analysis_prompt(self, ocr_text: str) -> str:
-        """Tworzy zoptymalizowany prompt dla LLM do analizy polskich paragonów"""
-        
-        system_prompt = """Jesteś ekspertem od analizy paragonów. Wyciągnij dane w JSON:
-- store: nazwa sklepu
-- address: adres sklepu  
-- date: data w formacie YYYY-MM-DD HH:MM
-- items: lista produktów (name, quantity, unit_price, total_price, tax_category)
-- discounts: rabaty (description, amount)
-- coupons: kupony (code, amount) 
-- vat_summary: podsumowanie VAT (tax_category, net, tax_amount, gross)
-- total: suma do zapłaty
-Zwróć tylko JSON, bez komentarzy."""
-
-        user_prompt = f"""Analizuj paragon i zwróć JSON:
-
-{ocr_text}
-
-Format:
-{{
-  "store": "",
-  "address": "",
-  "date": "",
-  "items": [{{"name": "", "quantity": 0.0, "unit_price": 0.0, "total_price": 0.0, "tax_category": ""}}],
-  "discounts": [{{"description": "", "amount": 0.0}}],
-  "coupons": [{{"code": "", "amount": 0.0}}],
-  "vat_summary": [{{"tax_category": "", "net": 0.0, "tax_amount": 0.0, "gross": 0.0}}],
-  "total": 0.0
-}}"""
-
-        return f"{system_prompt}\n\n{user_prompt}"
+        """Tworzy wiadomość użytkownika z tekstem paragonu (instrukcje są w prompcie systemowym)"""
+        return f"Analizuj paragon i zwróć JSON:\n\n{ocr_text}"
 
     def _parse_llm_response(self, llm_response: str) -> Dict[str, Any]:
         """Parsuje odpowiedź LLM aby wyciągnąć strukturalne dane paragonu"""
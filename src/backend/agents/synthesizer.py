@@ -3,8 +3,9 @@ Syntezator Odpowiedzi - generuje finalną, spójną odpowiedź na podstawie wyni
 Zgodnie z planem ewolucji - Faza 2: Rdzeń Inteligencji
 """
 
+import inspect
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from backend.core.hybrid_llm_client import hybrid_llm_client, ModelComplexity
 from backend.settings import settings
@@ -32,7 +33,8 @@ class Synthesizer:
         self, 
         execution_result: ExecutionResult,
         original_query: str,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        stream_callback: Optional[Callable[[Dict[str, Any]], Any]] = None,
     ) -> AgentResponse:
         """
         Generuj finalną odpowiedź na podstawie wyników wykonania planu
@@ -41,6 +43,7 @@ class Synthesizer:
             execution_result: Wynik wykonania planu
             original_query: Oryginalne zapytanie użytkownika
             context: Dodatkowy kontekst
+            stream_callback: Callback dostający zdarzenia ``token`` w trakcie generowania
             
         Returns:
             AgentResponse z finalną odpowiedzią
@@ -53,7 +56,9 @@ class Synthesizer:
             synthesis_data = self._prepare_synthesis_data(execution_result, context)
             
             # Wygeneruj odpowiedź używając LLM
-            response_text = await self._synthesize_with_llm(original_query, synthesis_data)
+            response_text = await self._synthesize_with_llm(
+                original_query, synthesis_data, stream_callback
+            )
             
             # Utwórz AgentResponse
             return AgentResponse(
@@ -107,7 +112,8 @@ class Synthesizer:
     async def _synthesize_with_llm(
         self, 
         original_query: str, 
-        synthesis_data: Dict[str, Any]
+        synthesis_data: Dict[str, Any],
+        stream_callback: Optional[Callable[[Dict[str, Any]], Any]] = None,
     ) -> str:
         """Syntezuj odpowiedź używając LLM"""
         system_prompt = self._create_synthesizer_prompt()
@@ -121,9 +127,16 @@ class Synthesizer:
                 ],
                 model=settings.DEFAULT_MODEL,
                 force_complexity=ModelComplexity.STANDARD,
-                stream=False,
+                stream=stream_callback is not None,
             )
             
+            if stream_callback is not None:
+                raw_response = await self._forward_tokens(response, stream_callback)
+                if raw_response.strip():
+                    return self._clean_synthesis_response(raw_response)
+                logger.warning("Empty streamed response from LLM for synthesis")
+                return self._create_fallback_synthesis(original_query, synthesis_data)
+
             if isinstance(response, dict) and response.get("message"):
                 raw_response = response["message"]["content"]
                 # Clean up the response to remove metadata and formatting
@@ -137,6 +150,30 @@ class Synthesizer:
             logger.error(f"Error in LLM synthesis: {e}")
             return self._create_fallback_synthesis(original_query, synthesis_data)
     
+    async def _forward_tokens(
+        self, stream: Any, stream_callback: Callable[[Dict[str, Any]], Any]
+    ) -> str:
+        """Przekaż tokeny ze strumienia LLM do callbacka i zwróć pełny tekst"""
+        async def _chunks() -> Any:
+            if isinstance(stream, dict):
+                # Cache hit in the LLM client returns the complete response
+                yield stream
+                return
+            async for chunk in stream:
+                yield chunk
+
+        parts: List[str] = []
+        async for chunk in _chunks():
+            message = chunk.get("message") if isinstance(chunk, dict) else None
+            delta = message.get("content", "") if isinstance(message, dict) else ""
+            if not delta:
+                continue
+            parts.append(delta)
+            result = stream_callback({"type": "token", "text": delta})
+            if inspect.isawaitable(result):
+                await result
+        return "".join(parts)
+
     def _clean_synthesis_response(self, response: str) -> str:
         """Clean up the synthesis response to remove metadata and formatting"""
         import re
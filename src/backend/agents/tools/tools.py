@@ -168,7 +168,12 @@ def generate_clarification_question_text(options: List[Any]) -> str:
             formatted_options.append(
                 f"{i}. Produkt '{obj.name}' w cenie {obj.unit_price} zł."
             )
-        else:  # Dla wyników z get_summary
+        elif isinstance(obj, dict) and "store_name" in obj:  # get_summary: lista_wszystkiego
+            formatted_options.append(
+                f"{i}. Paragon ze sklepu '{obj['store_name']}' z dnia {obj['trip_date']} "
+                f"({obj['product_count']} produktów, {obj['total_amount']} zł)."
+            )
+        else:  # Dla pozostałych wyników z get_summary
             formatted_options.append(f"{i}. {obj}")
 
     return "Znalazłem kilka pasujących opcji. Proszę, wybierz jedną:\n" + "\n".join(
@@ -10,17 +10,18 @@ This module provides API endpoints for expense analytics and reporting:
 """
 
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, and_, desc, select
-from sqlalchemy.orm import selectinload
 
+from backend.core.expense_rollups import (get_category_expenses,
+                                          get_expense_totals,
+                                          get_monthly_expenses, get_top_trips,
+                                          month_end, month_start)
 from backend.infrastructure.database.database import get_db
-from backend.models.shopping import ShoppingTrip, Product
 
 router = APIRouter(tags=["Analytics"])
 logger = logging.getLogger(__name__)
@@ -37,80 +38,50 @@ async def get_expense_analytics(
     Get comprehensive expense analytics
     """
     try:
-        # Parse dates
+        # Parse dates (inclusive purchase days)
+        today = date.today()
         if start_date:
-            start_date = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=datetime.now().astimezone().tzinfo)
+            start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
         else:
-            start_date = datetime.now().astimezone() - timedelta(days=30)  # Last 30 days
-            
+            start_date = today - timedelta(days=30)  # Last 30 days
+
         if end_date:
-            end_date = datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=datetime.now().astimezone().tzinfo)
+            end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
         else:
-            end_date = datetime.now().astimezone()
+            end_date = today
+
+        category = str(category_id) if category_id else None
+
+        # Aggregates come from daily rollups (GROUP BY in SQL)
+        totals = await get_expense_totals(db, start_date, end_date, category)
+        total_expenses = totals["total_expenses"]
+        trip_count = totals["trip_count"]
 
-        # Build query
-        query = select(ShoppingTrip).options(
-            selectinload(ShoppingTrip.products)
-        )
-        
-        # Apply date filter
-        query = query.where(
-            and_(
-                ShoppingTrip.created_at >= start_date,
-                ShoppingTrip.created_at <= end_date
-            )
-        )
-        
-        # Apply category filter if specified
-        if category_id:
-            query = query.join(Product).where(Product.category == str(category_id))
-        
-        # Execute query
-        result = await db.execute(query)
-        trips = result.scalars().all()
-        
-        # Calculate analytics
-        total_expenses = sum(trip.total_amount for trip in trips if trip.total_amount)
-        trip_count = len(trips)
-        
         # Category breakdown
-        category_expenses = {}
-        for trip in trips:
-            for product in trip.products:
-                if product.category:
-                    cat_name = product.category
-                    if cat_name not in category_expenses:
-                        category_expenses[cat_name] = 0
-                    category_expenses[cat_name] += product.unit_price or 0
-        
-        # Monthly trend (last 6 months)
+        category_expenses = await get_category_expenses(db, start_date, end_date, category)
+
+        # Monthly trend (last 6 calendar months, newest first)
+        monthly_totals = await get_monthly_expenses(
+            db, month_start(today, 5), month_end(today), category
+        )
         monthly_trend = []
-        now = datetime.now().astimezone()
         for i in range(6):
-            month_start = now.replace(day=1) - timedelta(days=30*i)
-            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            
-            month_trips = [trip for trip in trips 
-                          if month_start <= trip.created_at <= month_end]
-            month_total = sum(trip.total_amount for trip in month_trips if trip.total_amount)
-            
+            month = month_start(today, i)
+            month_data = monthly_totals.get(
+                (month.year, month.month), {"total": 0.0, "trip_count": 0}
+            )
             monthly_trend.append({
-                "month": month_start.strftime("%Y-%m"),
-                "total": month_total,
-                "trip_count": len(month_trips)
+                "month": month.strftime("%Y-%m"),
+                "total": month_data["total"],
+                "trip_count": month_data["trip_count"]
             })
-        
+
         # Average spending per trip
         avg_per_trip = total_expenses / trip_count if trip_count > 0 else 0
-        
+
         # Most expensive trips
-        expensive_trips = sorted(
-            [{"id": trip.id, "total": trip.total_amount, "date": trip.created_at.isoformat()} 
-             for trip in trips if trip.total_amount],
-            key=lambda x: x["total"],
-            reverse=True
-        )[:5]
-        
+        expensive_trips = await get_top_trips(db, start_date, end_date, category)
+
         analytics_data = {
             "period": {
                 "start_date": start_date.isoformat(),
@@ -121,7 +92,7 @@ async def get_expense_analytics(
                 "total_expenses": round(total_expenses, 2),
                 "trip_count": trip_count,
                 "average_per_trip": round(avg_per_trip, 2),
-                "total_products": sum(len(trip.products) for trip in trips)
+                "total_products": totals["total_products"]
             },
             "category_breakdown": [
                 {"category": cat, "amount": round(amount, 2), "percentage": round(amount/total_expenses*100, 1) if total_expenses > 0 else 0}
@@ -164,23 +135,14 @@ async def get_budget_analytics(
     """
     try:
         # Get current month expenses
-        now = datetime.now().astimezone()
-        current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        current_month_end = (current_month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        query = select(ShoppingTrip).where(
-            and_(
-                ShoppingTrip.created_at >= current_month_start,
-                ShoppingTrip.created_at <= current_month_end
-            )
-        )
-        
-        result = await db.execute(query)
-        trips = result.scalars().all()
-        
-        current_month_expenses = sum(trip.total_amount for trip in trips if trip.total_amount)
+        today = date.today()
+        current_month_start = month_start(today)
+        current_month_end = month_end(today)
+
+        totals = await get_expense_totals(db, current_month_start, current_month_end)
+        current_month_expenses = totals["total_expenses"]
         days_in_month = current_month_end.day
-        days_elapsed = datetime.now().day
+        days_elapsed = today.day
         
         # Calculate budget metrics
         budget_used = current_month_expenses
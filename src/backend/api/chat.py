@@ -1,7 +1,6 @@
 import asyncio
 import json
 import logging
-import os
 from typing import Any, AsyncGenerator, Dict, cast, Generator, Optional
 import inspect
 from datetime import datetime
@@ -15,46 +14,19 @@ from backend.core.async_patterns import (CircuitBreakerConfig, timeout_context,
                                          with_backpressure,
                                          with_circuit_breaker)
 from backend.core.llm_client import llm_client
+from backend.core.llm_settings import llm_settings_store
 from backend.infrastructure.database.database import get_db
 from backend.orchestrator_management.orchestrator_pool import orchestrator_pool
 from backend.orchestrator_management.request_queue import request_queue
+from backend.settings import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
 def get_selected_model() -> str:
-    """Get the selected model from config file or fallback to default"""
-    try:
-        # Path to the LLM settings file
-        llm_settings_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            "..",
-            "data",
-            "config",
-            "llm_settings.json",
-        )
-
-        if os.path.exists(llm_settings_path):
-            with open(llm_settings_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                selected_model = data.get("selected_model", "")
-                if selected_model:
-                    logger.info(f"Using selected model from config: {selected_model}")
-                    return selected_model
-
-        # Fallback to hardcoded default
-        fallback_default = "SpeakLeash/bielik-4.5b-v3.0-instruct:Q8_0"
-        logger.info(
-            f"No valid selected model in config, using fallback: {fallback_default}"
-        )
-        return fallback_default
-
-    except Exception as e:
-        logger.warning(f"Error reading selected model from config: {e}")
-        fallback_default = "SpeakLeash/bielik-4.5b-v3.0-instruct:Q8_0"
-        logger.info(f"Using fallback default model: {fallback_default}")
-        return fallback_default
+    """Get the selected model from the cached LLM settings snapshot"""
+    return llm_settings_store.snapshot().selected_model
 
 
 class ChatRequest(BaseModel):
@@ -168,14 +140,32 @@ async def chat_with_model(request: Request) -> Dict[str, Any]:
         }
 
 
+async def _drain_stream_queue(
+    queue: asyncio.Queue, producer: asyncio.Task
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Yield queued stream events until the producer task finishes and the queue is empty"""
+    while not producer.done() or not queue.empty():
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+        if getter.done():
+            yield getter.result()
+        else:
+            getter.cancel()
+
+
 async def memory_chat_generator(
-    request: MemoryChatRequest, db: AsyncSession
+    request: MemoryChatRequest,
+    db: AsyncSession,
+    http_request: Optional[Request] = None,
 ) -> AsyncGenerator[str, None]:
     """
     Generator for streaming responses from the orchestrator.
-    Każdy yield to linia NDJSON: {"text": ...}
+    Każdy yield to linia NDJSON: {"text": ...}; zdarzenia kroków i tokeny
+    syntezatora są wysyłane na bieżąco, ostatnia linia ma "type": "done".
     """
     start_time = asyncio.get_event_loop().time()  # Czas rozpoczęcia przetwarzania
+    orchestrator = None
+    orchestration: Optional[asyncio.Task] = None
     try:
         # Rozszerzone logowanie czatu
         logger.info(
@@ -230,17 +220,16 @@ async def memory_chat_generator(
                 ) + "\n"
             return
 
-        # Process with orchestrator using streaming
-        async with timeout_context(60.0):  # 60 second timeout for memory chat
-            # Create a list to collect chunks
-            chunks = []
+        # Process with orchestrator using streaming: executor events and
+        # synthesizer tokens go through a bounded queue straight to the client
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CHAT_STREAM_QUEUE_SIZE)
 
-            # Define the callback function
-            def handle_chunk(chunk) -> None:
-                chunks.append(chunk)
+        async def handle_chunk(chunk: Dict[str, Any]) -> None:
+            # Blocks the producer while the client is not reading (backpressure)
+            await queue.put(chunk)
 
-            # Process the command with streaming
-            response = await orchestrator.process_command(
+        orchestration = asyncio.create_task(
+            orchestrator.process_command(
                 user_command=request.message,
                 session_id=request.session_id,
                 agent_states=request.agent_states,
@@ -249,6 +238,41 @@ async def memory_chat_generator(
                 stream=True,
                 stream_callback=handle_chunk,
             )
+        )
+
+        async with timeout_context(60.0):  # 60 second timeout for memory chat
+            chunks_count = 0
+            streamed_text = ""
+            async for chunk in _drain_stream_queue(queue, orchestration):
+                if http_request is not None and await http_request.is_disconnected():
+                    logger.info(
+                        "Client disconnected, cancelling memory chat",
+                        extra={
+                            "session_id": request.session_id,
+                            "chat_event": "client_disconnected",
+                        },
+                    )
+                    return
+                chunks_count += 1
+                if chunk.get("type") == "token":
+                    streamed_text += chunk.get("text", "")
+                    line = {
+                        "text": chunk.get("text", ""),
+                        "type": "token",
+                        "success": True,
+                        "session_id": request.session_id,
+                    }
+                else:
+                    line = {
+                        "text": "",
+                        "type": chunk.get("type", "event"),
+                        "success": chunk.get("success", True),
+                        "session_id": request.session_id,
+                        "data": chunk,
+                    }
+                yield json.dumps(line) + "\n"
+
+            response = await orchestration
 
             # Update context with the conversation
             try:
@@ -282,85 +306,70 @@ async def memory_chat_generator(
             except Exception as e:
                 logger.error(f"Error updating conversation context: {e}")
 
-            # If no chunks were collected, use the response
-            if not chunks and response:
-                response_text = response.text or ""
-                
-                # Jeśli orchestrator nie wygenerował odpowiedzi, użyj fallback
-                if not response_text.strip():
-                    logger.warning("Orchestrator returned empty response, using fallback to direct LLM")
-                    try:
-                        # Fallback do bezpośredniego wywołania LLM
-                        fallback_response = await llm_client.generate_stream_from_prompt_async(
-                            model=get_selected_model(),
-                            prompt=request.message,
-                            system_prompt="Jesteś pomocnym asystentem AI. Odpowiadaj w języku polskim."
-                        )
-                        
-                        fallback_text = ""
-                        async for chunk in fallback_response:
-                            if hasattr(chunk, 'response') and chunk.response:
-                                fallback_text += chunk.response
-                            elif isinstance(chunk, dict) and 'response' in chunk:
-                                fallback_text += chunk['response']
-                        
-                        if fallback_text.strip():
-                            response_text = fallback_text
-                            logger.info("Fallback LLM response successful")
-                        else:
-                            response_text = "Przepraszam, nie udało się wygenerować odpowiedzi. Spróbuj ponownie."
-                            logger.error("Fallback LLM also failed")
-                    except Exception as fallback_error:
-                        logger.error(f"Fallback LLM error: {fallback_error}")
-                        response_text = "Przepraszam, wystąpił błąd techniczny. Spróbuj ponownie za chwilę."
-                
-                logger.info(
-                    "Chat response completed",
-                    extra={
-                        "session_id": request.session_id,
-                        "response_length": len(response_text),
-                        "success": response.success,
-                        "chat_event": "response_completed",
-                        "processing_time_ms": int(
-                            (asyncio.get_event_loop().time() - start_time) * 1000
-                        ),
-                    },
-                )
-                yield json.dumps(
-                    {
-                        "text": response_text,
-                        "success": response.success,
-                        "session_id": request.session_id,
-                        "data": response.data,
-                    }
-                ) + "\n"
-            else:
-                # Stream all collected chunks
-                total_response_length = sum(
-                    len(chunk.get("text", "")) for chunk in chunks
-                )
-                logger.info(
-                    "Chat streaming response completed",
-                    extra={
-                        "session_id": request.session_id,
-                        "chunks_count": len(chunks),
-                        "total_response_length": total_response_length,
-                        "success": all(chunk.get("success", True) for chunk in chunks),
-                        "chat_event": "streaming_completed",
-                        "processing_time_ms": int(
-                            (asyncio.get_event_loop().time() - start_time) * 1000
-                        ),
-                    },
-                )
-                for chunk in chunks:
-                    yield json.dumps(
-                        {
-                            "text": chunk.get("text", ""),
-                            "success": chunk.get("success", True),
-                            "session_id": request.session_id,
-                            "data": chunk.get("data"),
-                        }
-                    ) + "\n"
+            response_text = (response.text or "") if response else ""
+
+            # Jeśli orchestrator nie wygenerował odpowiedzi, użyj fallback
+            if not streamed_text and not response_text.strip():
+                logger.warning("Orchestrator returned empty response, using fallback to direct LLM")
+                try:
+                    # Fallback do bezpośredniego wywołania LLM (strumieniowo)
+                    fallback_response = llm_client.generate_stream_from_prompt_async(
+                        model=get_selected_model(),
+                        prompt=request.message,
+                        system_prompt="Jesteś pomocnym asystentem AI. Odpowiadaj w języku polskim."
+                    )
+                    
+                    async for chunk in fallback_response:
+                        delta = ""
+                        if isinstance(chunk, dict) and chunk.get("message"):
+                            delta = chunk["message"].get("content", "")
+                        elif isinstance(chunk, dict) and "response" in chunk:
+                            delta = chunk["response"]
+                        if delta:
+                            streamed_text += delta
+                            yield json.dumps(
+                                {
+                                    "text": delta,
+                                    "type": "token",
+                                    "success": True,
+                                    "session_id": request.session_id,
+                                }
+                            ) + "\n"
+                    
+                    if streamed_text.strip():
+                        response_text = streamed_text
+                        logger.info("Fallback LLM response successful")
+                    else:
+                        response_text = "Przepraszam, nie udało się wygenerować odpowiedzi. Spróbuj ponownie."
+                        logger.error("Fallback LLM also failed")
+                except Exception as fallback_error:
+                    logger.error(f"Fallback LLM error: {fallback_error}")
+                    response_text = "Przepraszam, wystąpił błąd techniczny. Spróbuj ponownie za chwilę."
+
+            logger.info(
+                "Chat streaming response completed",
+                extra={
+                    "session_id": request.session_id,
+                    "chunks_count": chunks_count,
+                    "response_length": len(response_text),
+                    "success": response.success if response else False,
+                    "chat_event": "streaming_completed",
+                    "processing_time_ms": int(
+                        (asyncio.get_event_loop().time() - start_time) * 1000
+                    ),
+                },
+            )
+            # Final line: text not yet streamed as tokens, plus the cleaned full text
+            yield json.dumps(
+                {
+                    "text": "" if streamed_text else response_text,
+                    "type": "done",
+                    "full_text": response_text,
+                    "success": response.success if response else False,
+                    "session_id": request.session_id,
+                    "data": response.data if response else None,
+                }
+            ) + "\n"
 
     except asyncio.TimeoutError:
         logger.error(
@@ -387,6 +396,9 @@ async def memory_chat_generator(
             {"text": f"An error occurred: {str(e)}", "success": False}
         ) + "\n"
     finally:
+        if orchestration is not None and not orchestration.done():
+            # Client went away or timed out: stop the orchestration as well
+            orchestration.cancel()
         if orchestrator:
             orchestrator_pool.release_orchestrator(orchestrator)
             logger.debug(
@@ -397,6 +409,7 @@ async def memory_chat_generator(
 @router.post("/memory_chat")
 async def chat_with_memory(
     request: MemoryChatRequest,
+    http_request: Request,
     background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ) -> StreamingResponse:
@@ -404,7 +417,8 @@ async def chat_with_memory(
     # background_tasks.add_task(cleanup_old_sessions, request.session_id)
     
     return StreamingResponse(
-        memory_chat_generator(request, db), media_type="application/x-ndjson"
+        memory_chat_generator(request, db, http_request),
+        media_type="application/x-ndjson",
     )
 
 
@@ -1,4 +1,3 @@
-import json
 import os
 from typing import Dict, List
 
@@ -6,15 +5,9 @@ import httpx
 import structlog
 from fastapi import APIRouter, HTTPException
 
-router = APIRouter()
+from backend.core.llm_settings import llm_settings_store
 
-LLM_SETTINGS_PATH = os.path.join(
-    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-    "..",
-    "data",
-    "config",
-    "llm_settings.json",
-)
+router = APIRouter()
 
 # Get Ollama URL from environment variables with fallback
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
@@ -60,11 +53,7 @@ async def get_available_models() -> List[Dict[str, str]]:
 async def get_selected_model() -> str:
     """Get currently selected LLM model."""
     try:
-        if os.path.exists(LLM_SETTINGS_PATH):
-            with open(LLM_SETTINGS_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data.get("selected_model", "")
-        return ""
+        return llm_settings_store.snapshot().data.get("selected_model", "")
     except Exception as e:
         logger.error(f"Error reading selected model: {e}", exc_info=True)
         raise HTTPException(
@@ -101,14 +90,8 @@ async def set_selected_model(model_name: str) -> Dict[str, str]:
                     detail=f"Model '{model_name}' nie jest dostępny w Ollama. Dostępne modele: {', '.join(available_models)}",
                 )
 
-        # Ensure config directory exists
-        config_dir = os.path.dirname(LLM_SETTINGS_PATH)
-        os.makedirs(config_dir, exist_ok=True)
-
-        # Save the selected model
-        settings_data = {"selected_model": model_name}
-        with open(LLM_SETTINGS_PATH, "w", encoding="utf-8") as f:
-            json.dump(settings_data, f, indent=2, ensure_ascii=False)
+        # Save the selected model (applied to running clients immediately)
+        llm_settings_store.update(selected_model=model_name)
 
         logger.info(f"Model '{model_name}' set as default")
         return {
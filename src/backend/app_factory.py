@@ -28,6 +28,7 @@ from backend.core.cache_manager import CacheManager
 from backend.core.database import AsyncSessionLocal, Base, engine, get_db
 from backend.core.exceptions import (FoodSaveError, convert_system_exception,
                                      log_error_with_context)
+from backend.core.expense_rollups import ensure_expense_rollups
 from backend.core.middleware import (ErrorHandlingMiddleware,
                                      RequestLoggingMiddleware,
                                      SecurityHeadersMiddleware)
@@ -125,6 +126,15 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
             raise
     logger.info("database.seeding.complete")
 
+    # Backfill expense rollups for databases created before they existed
+    # (runs once across workers; retried on the next start if it fails)
+    async with AsyncSessionLocal() as db:
+        try:
+            await ensure_expense_rollups(db)
+        except Exception as e:
+            logger.error("expense_rollups.backfill.error", error=str(e))
+            await db.rollback()
+
     # Initialize cache
     cache_manager = CacheManager()
     await cache_manager.connect()
@@ -142,6 +152,41 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         except Exception as e:
             logger.error(f"Failed to initialize MMLW embeddings: {e}")
 
+    # Probe Ollama in the background so request paths only read cached state
+    from backend.core.llm_client import ollama_health
+    from backend.core.ollama_transport import ollama_transport
+
+    ollama_health.start()
+
+    # Watch llm_settings.json so model switches apply without file reads per request
+    from backend.core.llm_settings import llm_settings_store
+
+    llm_settings_store.start()
+
+    # Paraphrase cache must be dropped whenever receipts or products change
+    from backend.core.semantic_response_cache import (
+        register_invalidation_listeners,
+        semantic_response_cache,
+    )
+
+    if semantic_response_cache.enabled:
+        register_invalidation_listeners(semantic_response_cache)
+
+    # Restore the persisted RAG vector store (FAISS index + chunk payloads)
+    from backend.core.vector_store import vector_store
+
+    if vector_store is not None:
+        try:
+            await vector_store.load_index_async()
+            stats = await vector_store.get_stats()
+            logger.info(
+                "Vector store loaded",
+                total_documents=stats["total_documents"],
+                total_vectors=stats["total_vectors"],
+            )
+        except Exception as e:
+            logger.error(f"Failed to load vector store: {e}")
+
     logger.info("Initializing orchestrator pool and request queue...")
     # Initialize orchestrator pool with default orchestrator
     async for db in get_db():
@@ -154,6 +199,22 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     yield
 
     # Shutdown logic
+    if vector_store is not None and vector_store.chunks_since_save > 0:
+        try:
+            await vector_store.save_index_async()
+        except Exception as e:
+            logger.error(f"Failed to save vector store: {e}")
+    await ollama_health.stop()
+    await llm_settings_store.stop()
+    await ollama_transport.aclose()
+    if settings.USE_MMLW_EMBEDDINGS:
+        from backend.core.mmlw_embedding_client import mmlw_client
+
+        await mmlw_client.shutdown()
+    if settings.OCR_POOL_ENABLED:
+        from backend.core.ocr_pool import ocr_worker_pool
+
+        ocr_worker_pool.shutdown()
     await cache_manager.disconnect()
     logger.info("Application shutdown.")
 
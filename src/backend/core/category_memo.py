@@ -0,0 +1,195 @@
+"""
+Trwała pamięć kategorii produktów przypisanych przez AI
+
+Kategorie nadane przez Bielika są zapisywane w lokalnym pliku SQLite pod
+kluczem (wersja tabeli kategorii, znormalizowana nazwa produktu). Te same
+produkty kupowane co tydzień nie trafiają więc ponownie do modelu. Zmiana
+pliku kategorii zmienia wersję, więc stare przypisania przestają pasować.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_MAX_VARIABLES = 900
+
+
+def normalize_product_key(name: str) -> str:
+    """Normalize a receipt product name so case and spacing variants share a key"""
+    return " ".join(unicodedata.normalize("NFC", name).lower().split()).strip(" *-")
+
+
+def category_table_version(categories: Sequence[Dict[str, Any]]) -> str:
+    """Version of the category table (hash of its content)"""
+    payload = json.dumps(list(categories), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class CategoryMemo:
+    """SQLite-backed product→category memo keyed by (table version, normalized name)"""
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        """
+        Initialize category memo
+
+        Args:
+            db_path: Path to the SQLite file (defaults to settings.CATEGORY_MEMO_PATH)
+        """
+        self.db_path = db_path or settings.CATEGORY_MEMO_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database lazily so importing the module has no side effects"""
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS product_categories (
+                    table_version TEXT NOT NULL,
+                    name_key TEXT NOT NULL,
+                    category_id TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    method TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (table_version, name_key)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.commit()
+            self._conn = conn
+            logger.info(f"Opened category memo: {self.db_path}")
+        return self._conn
+
+    def get_many(
+        self, table_version: str, names: Sequence[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Look up remembered categories for product names
+
+        Args:
+            table_version: Version of the category table
+            names: Product names as read from the receipt
+
+        Returns:
+            List aligned with ``names`` containing category_id/confidence/method or None on miss
+        """
+        keys = [normalize_product_key(name) for name in names]
+        found: Dict[str, Dict[str, Any]] = {}
+
+        with self._lock:
+            conn = self._connection()
+            unique_keys = list(dict.fromkeys(keys))
+            for i in range(0, len(unique_keys), _SQLITE_MAX_VARIABLES):
+                batch = unique_keys[i : i + _SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    "SELECT name_key, category_id, confidence, method FROM product_categories "
+                    f"WHERE table_version = ? AND name_key IN ({placeholders})",
+                    (table_version, *batch),
+                ).fetchall()
+                for name_key, category_id, confidence, method in rows:
+                    found[name_key] = {
+                        "category_id": category_id,
+                        "confidence": confidence,
+                        "method": method,
+                    }
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for r in results if r is not None)
+        self._stats["hits"] += hits
+        self._stats["misses"] += len(results) - hits
+        return results
+
+    def put_many(
+        self, table_version: str, entries: Sequence[Tuple[str, str, float, str]]
+    ) -> int:
+        """
+        Remember categories assigned by the model
+
+        Args:
+            table_version: Version of the category table
+            entries: (product name, category id, confidence, method) tuples
+
+        Returns:
+            Number of stored entries
+        """
+        now = time.time()
+        rows = [
+            (table_version, normalize_product_key(name), category_id, confidence, method, now)
+            for name, category_id, confidence, method in entries
+            if normalize_product_key(name)
+        ]
+        if not rows:
+            return 0
+
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO product_categories "
+                "(table_version, name_key, category_id, confidence, method, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+
+        self._stats["writes"] += len(rows)
+        return len(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get category memo statistics"""
+        with self._lock:
+            conn = self._connection()
+            per_version = conn.execute(
+                "SELECT table_version, COUNT(*) FROM product_categories GROUP BY table_version"
+            ).fetchall()
+
+        total_lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "db_path": self.db_path,
+            "versions": {version: count for version, count in per_version},
+            "total_entries": sum(count for _, count in per_version),
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "writes": self._stats["writes"],
+            "hit_rate": self._stats["hits"] / max(1, total_lookups),
+        }
+
+    def clear(self, table_version: Optional[str] = None) -> None:
+        """Remove remembered categories (all or for a single table version)"""
+        with self._lock:
+            conn = self._connection()
+            if table_version:
+                conn.execute(
+                    "DELETE FROM product_categories WHERE table_version = ?", (table_version,)
+                )
+            else:
+                conn.execute("DELETE FROM product_categories")
+            conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global category memo instance
+category_memo = CategoryMemo()
@@ -1,13 +1,14 @@
 import logging
 import re
 from datetime import date, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import func, select, update
+from sqlalchemy import Table, func, insert, select, update
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from backend.core.expense_rollups import get_trip_days, refresh_expense_rollups
 from backend.models.conversation import Conversation, Message
 from backend.models.shopping import Product, ShoppingTrip
 from backend.models.user_profile import UserActivity, UserProfile
@@ -99,7 +100,11 @@ def parse_human_date(date_string: str, today: Optional[date] = None) -> Optional
             except ValueError:
                 return None
 
-    return None
+    # Przypadek 4: Data w formacie ISO ("2024-03-15", także z czasem), jak zwraca LLM
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return None
 
 
 async def find_purchase_for_action(
@@ -161,6 +166,15 @@ async def find_item_for_action(
     return produkty
 
 
+async def _affected_days(db: AsyncSession, target_object: Any) -> List[date]:
+    """Dni zakupów, których agregaty zmienia operacja na paragonie lub produkcie."""
+    if isinstance(target_object, ShoppingTrip):
+        return [target_object.trip_date]
+    if isinstance(target_object, Product):
+        return await get_trip_days(db, [target_object.trip_id])
+    return []
+
+
 async def execute_action(
     db: AsyncSession,
     intent: str,
@@ -177,7 +191,10 @@ async def execute_action(
     try:
         if intent in ["DELETE_ITEM", "DELETE_PURCHASE"]:
             logger.info(f"Wykonuję operację DELETE na obiekcie: {target_object}")
+            days = await _affected_days(db, target_object)
             await db.delete(target_object)
+            await db.flush()
+            await refresh_expense_rollups(db, days)
             await db.commit()
             logger.info("Operacja DELETE zakończona sukcesem.")
             return True
@@ -190,6 +207,7 @@ async def execute_action(
                 return False
 
             logger.info(f"Wykonuję operację UPDATE na obiekcie: {target_object}")
+            days = await _affected_days(db, target_object)
             all_ops_successful = True
             for op in operations:
                 human_field_name = op.get("pole_do_zmiany")
@@ -216,6 +234,9 @@ async def execute_action(
                 )
 
             if all_ops_successful:
+                await db.flush()
+                days += await _affected_days(db, target_object)
+                await refresh_expense_rollups(db, days)
                 await db.commit()
                 logger.info("Operacja UPDATE zakończona sukcesem.")
                 return True
@@ -232,51 +253,134 @@ async def execute_action(
     return False
 
 
+def _product_values(product_data: Dict[str, Any], trip_id: int) -> Dict[str, Any]:
+    """Tłumaczy klucze z JSON-a na kolumny tabeli produktów."""
+    values: Dict[str, Any] = {
+        mapped_key: value
+        for key, value in product_data.items()
+        if (mapped_key := FIELD_MAP.get(key, key))
+        and mapped_key in Product.__table__.columns
+    }
+    # Upewniamy się, że ID paragonu jest dodane
+    values["trip_id"] = trip_id
+    return values
+
+
+def _trip_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Wylicza kolumny paragonu z danych z LLM (data, sklep, suma produktów)."""
+    paragon_info = data.get("paragon_info", {})
+    lista_produktow = data.get("produkty", [])
+    return {
+        "trip_date": parse_human_date(paragon_info.get("data", "dzisiaj")),
+        "store_name": paragon_info.get("sklep"),
+        "total_amount": sum(p.get("cena_calkowita", 0) for p in lista_produktow),
+    }
+
+
+async def _bulk_insert(
+    db: AsyncSession, table: Table, rows: List[Dict[str, Any]], return_ids: bool = False
+) -> List[int]:
+    """
+    Wstawia wiersze jednym INSERT-em typu executemany (bez obiektów ORM).
+    Kolejne wiersze z innym zestawem kolumn trafiają do osobnego INSERT-a,
+    żeby brakujące kolumny dostały wartości domyślne jak przy ORM, a ID
+    rosły w kolejności danych wejściowych.
+    Zwraca ID w kolejności wierszy, jeśli return_ids=True (inaczej pustą listę).
+    """
+    runs: List[List[int]] = []
+    previous_keys: Optional[Tuple[str, ...]] = None
+    for index, row in enumerate(rows):
+        keys = tuple(sorted(row))
+        if keys != previous_keys:
+            runs.append([])
+            previous_keys = keys
+        runs[-1].append(index)
+
+    ids: List[int] = [0] * len(rows)
+    dialect = db.get_bind().dialect
+    for indexes in runs:
+        batch = [rows[index] for index in indexes]
+        if not return_ids:
+            await db.execute(insert(table), batch)
+        elif dialect.insert_executemany_returning_sort_by_parameter_order:
+            # SQLite >= 3.35 i PostgreSQL: ID w kolejności parametrów z jednego zapytania
+            result = await db.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True), batch
+            )
+            for index, new_id in zip(indexes, result.scalars().all()):
+                ids[index] = new_id
+        else:
+            for index in indexes:
+                result = await db.execute(insert(table).values(rows[index]))
+                ids[index] = result.inserted_primary_key[0]
+    return ids if return_ids else []
+
+
+async def _insert_trips(db: AsyncSession, trips: List[Dict[str, Any]]) -> List[int]:
+    """Wstawia paragony i wszystkie ich produkty, zwraca ID paragonów w kolejności danych."""
+    trip_rows = [_trip_values(data) for data in trips]
+    trip_ids = await _bulk_insert(db, ShoppingTrip.__table__, trip_rows, return_ids=True)
+    product_rows = [
+        _product_values(produkt_data, trip_id)
+        for data, trip_id in zip(trips, trip_ids)
+        for produkt_data in data.get("produkty", [])
+    ]
+    if product_rows:
+        await _bulk_insert(db, Product.__table__, product_rows)
+    await refresh_expense_rollups(db, (row["trip_date"] for row in trip_rows))
+    return trip_ids
+
+
 async def create_shopping_trip(db: AsyncSession, data: Dict[str, Any]) -> ShoppingTrip:
     """
     Tworzy nowy wpis o zakupach wraz z listą produktów w jednej transakcji.
     WERSJA OSTATECZNA z mapowaniem pól.
     """
     try:
-        paragon_info = data.get("paragon_info", {})
         lista_produktow = data.get("produkty", [])
+        (trip_id,) = await _insert_trips(db, [data])
+        await db.commit()
 
-        obliczona_data = parse_human_date(paragon_info.get("data", "dzisiaj"))
-        kwota_calkowita = sum(p.get("cena_calkowita", 0) for p in lista_produktow)
+        result = await db.execute(
+            select(ShoppingTrip)
+            .where(ShoppingTrip.id == trip_id)
+            .options(selectinload(ShoppingTrip.products))
+        )
+        nowy_paragon = result.scalar_one()
 
-        nowy_paragon = ShoppingTrip(
-            trip_date=obliczona_data,
-            store_name=paragon_info.get("sklep"),
-            total_amount=kwota_calkowita,
+        logger.info(
+            f"Dodano nowy paragon (ID: {nowy_paragon.id}) z "
+            f"{len(lista_produktow)} produktami"
         )
-        db.add(nowy_paragon)
-        await db.flush()
+        return nowy_paragon
 
-        for produkt_data in lista_produktow:
-            # Tłumaczymy klucze z JSON-a na atrybuty modelu SQLAlchemy
-            product_kwargs: Dict[str, Any] = {
-                mapped_key: value
-                for key, value in produkt_data.items()
-                if (mapped_key := FIELD_MAP.get(key, key))
-                and mapped_key in Product.__table__.columns
-            }
-            # Upewniamy się, że ID paragonu jest dodane
-            product_kwargs["trip_id"] = nowy_paragon.id
+    except Exception as e:
+        logger.error(f"Wystąpił błąd podczas tworzenia wpisu: {e}")
+        await db.rollback()
+        raise
 
-            created_product = Product(**product_kwargs)
-            db.add(created_product)
 
+async def import_shopping_trips(
+    db: AsyncSession, trips: List[Dict[str, Any]]
+) -> List[int]:
+    """
+    Importuje wiele paragonów (format jak w create_shopping_trip) w jednej transakcji.
+    Zwraca ID utworzonych paragonów w kolejności danych wejściowych.
+    """
+    if not trips:
+        return []
+    try:
+        trip_ids = await _insert_trips(db, trips)
         await db.commit()
-        await db.refresh(nowy_paragon)
 
         logger.info(
-            f"Dodano nowy paragon (ID: {nowy_paragon.id}) z "
-            f"{len(lista_produktow)} produktami"
+            f"Zaimportowano {len(trip_ids)} paragonów z "
+            f"{sum(len(data.get('produkty', [])) for data in trips)} produktami"
         )
-        return nowy_paragon
+        return trip_ids
 
     except Exception as e:
-        logger.error(f"Wystąpił błąd podczas tworzenia wpisu: {e}")
+        logger.error(f"Błąd podczas importu paragonów: {e}")
         await db.rollback()
         raise
 
@@ -290,13 +394,36 @@ async def get_summary(db: AsyncSession, query_params: Dict[str, Any]) -> List[An
     grupowanie = query_params.get("grupowanie", [])
 
     if metryka == "lista_wszystkiego":
+        # Jeden wiersz na paragon z liczbą produktów - bez ładowania produktów
         stmt = (
-            select(ShoppingTrip)
-            .options(selectinload(ShoppingTrip.products))
-            .order_by(ShoppingTrip.trip_date.desc())
+            select(
+                ShoppingTrip.id,
+                ShoppingTrip.trip_date,
+                ShoppingTrip.store_name,
+                ShoppingTrip.total_amount,
+                func.count(Product.id).label("product_count"),
+            )
+            .outerjoin(Product, Product.trip_id == ShoppingTrip.id)
+            .group_by(
+                ShoppingTrip.id,
+                ShoppingTrip.trip_date,
+                ShoppingTrip.store_name,
+                ShoppingTrip.total_amount,
+            )
+            .order_by(ShoppingTrip.trip_date.desc(), ShoppingTrip.id.desc())
         )
         result = await db.execute(stmt)
-        return list(result.scalars().all())
+        # Słowniki zamiast obiektów Row - stały kształt dla narzędzi i agentów
+        return [
+            {
+                "id": row.id,
+                "trip_date": row.trip_date,
+                "store_name": row.store_name,
+                "total_amount": row.total_amount,
+                "product_count": row.product_count,
+            }
+            for row in result.all()
+        ]
 
     if metryka == "suma_wydatkow":
         selekcja = [func.sum(Product.unit_price * Product.quantity).label("value")]
@@ -354,16 +481,12 @@ async def add_products_to_trip(
         if not shopping_trip:
             raise ValueError(f"Shopping trip with id {shopping_trip_id} not found.")
 
-        for product_data in products_data:
-            product_kwargs: Dict[str, Any] = {
-                mapped_key: value
-                for key, value in product_data.items()
-                if (mapped_key := FIELD_MAP.get(key, key))
-                and mapped_key in Product.__table__.columns
-            }
-            product_kwargs["trip_id"] = shopping_trip.id
-            created_product = Product(**product_kwargs)
-            db.add(created_product)
+        if products_data:
+            await _bulk_insert(
+                db,
+                Product.__table__,
+                [_product_values(product_data, shopping_trip.id) for product_data in products_data],
+            )
 
         # Opcjonalnie: Zaktualizuj sumę na paragonie
         total_products_price = sum(p.get("cena_calkowita", 0) for p in products_data)
@@ -372,6 +495,8 @@ async def add_products_to_trip(
         else:
             shopping_trip.total_amount = total_products_price
 
+        await db.flush()
+        await refresh_expense_rollups(db, [shopping_trip.trip_date])
         await db.commit()
         await db.refresh(shopping_trip)
 
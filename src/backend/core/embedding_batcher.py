@@ -0,0 +1,152 @@
+"""
+Dynamic micro-batching of embedding requests
+
+Równoległe wywołania ``submit`` są zbierane w mikro-batche: kolektor czeka
+na pierwszy tekst, a potem najwyżej ``max_wait`` sekund na kolejne (lub do
+``max_batch_size``). Zebrane teksty są sortowane po długości i dzielone na
+kubełki, żeby ograniczyć padding, a inferencja kubełka działa w dedykowanym
+wątku roboczym, więc pętla zdarzeń nie jest blokowana.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[List[str]], List[List[float]]]
+_Request = Tuple[str, asyncio.Future]
+
+
+class EmbeddingBatcher:
+    """Gathers concurrent embedding requests into length-bucketed batches"""
+
+    def __init__(
+        self,
+        encode_fn: EncodeFn,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        bucket_size: int = 8,
+        thread_name: str = "embedding-worker",
+    ) -> None:
+        """
+        Initialize embedding batcher
+
+        Args:
+            encode_fn: Blocking function embedding a list of texts
+            max_batch_size: Maximum number of texts collected into one batch
+            max_wait: Seconds to wait for more requests after the first one
+            bucket_size: Texts of similar length encoded in one forward pass
+            thread_name: Name prefix of the dedicated worker thread
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.bucket_size = max(1, bucket_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=thread_name)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"requests": 0, "batches": 0, "forward_passes": 0, "failed": 0}
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            # Queue is bound to the loop it was created on
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def run_in_worker(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking call (e.g. model loading) on the worker thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def submit(self, text: str) -> List[float]:
+        """Queue one text and wait for its embedding"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        self._stats["requests"] += 1
+        return await future
+
+    async def encode(
+        self, texts: List[str], bucket_size: Optional[int] = None
+    ) -> List[List[float]]:
+        """Embed a list of texts in length buckets on the worker thread"""
+        if not texts:
+            return []
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        for bucket in self._buckets(texts, bucket_size or self.bucket_size):
+            embeddings = await self.run_in_worker(
+                self.encode_fn, [texts[i] for i in bucket]
+            )
+            self._stats["forward_passes"] += 1
+            for index, embedding in zip(bucket, embeddings):
+                results[index] = embedding
+        return results
+
+    @staticmethod
+    def _buckets(texts: List[str], bucket_size: int) -> List[List[int]]:
+        """Sort indices by text length and split into buckets to minimise padding"""
+        ordered = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        return [
+            ordered[i : i + bucket_size] for i in range(0, len(ordered), bucket_size)
+        ]
+
+    async def _collect(self) -> List[_Request]:
+        """Wait for the first request, then gather more until the deadline"""
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+            self._stats["batches"] += 1
+            try:
+                embeddings = await self.encode([text for text, _ in batch])
+            except Exception as e:
+                self._stats["failed"] += len(batch)
+                logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+    async def stop(self) -> None:
+        """Stop the collector (pending requests are cancelled)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "avg_batch_size": (
+                round(self._stats["requests"] / batches, 2) if batches else 0.0
+            ),
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -0,0 +1,188 @@
+"""
+Persistent, content-addressed embedding store
+
+Embeddingi chunków są zapisywane w lokalnym pliku SQLite pod kluczem
+(model, hash znormalizowanej treści), dzięki czemu ponowna synchronizacja
+niezmienionych danych nie wymaga żadnych wywołań modelu.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_MAX_VARIABLES = 900
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Normalize chunk text so that cosmetic whitespace changes hit the same key"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def chunk_content_hash(text: str) -> str:
+    """Content hash of the normalized chunk text"""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """SQLite-backed embedding store keyed by (model, normalized chunk hash)"""
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        """
+        Initialize embedding store
+
+        Args:
+            db_path: Path to the SQLite file (defaults to settings.EMBEDDING_STORE_PATH)
+        """
+        self.db_path = db_path or settings.EMBEDDING_STORE_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database lazily so importing the module has no side effects"""
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, content_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.commit()
+            self._conn = conn
+            logger.info(f"Opened embedding store: {self.db_path}")
+        return self._conn
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Look up stored embeddings for a list of texts
+
+        Args:
+            model: Embedding model identifier
+            texts: Chunk texts
+
+        Returns:
+            List aligned with ``texts`` containing the embedding or None on miss
+        """
+        hashes = [chunk_content_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            conn = self._connection()
+            unique_hashes = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique_hashes), _SQLITE_MAX_VARIABLES):
+                batch = unique_hashes[i : i + _SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    "SELECT content_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND content_hash IN ({placeholders})",
+                    (model, *batch),
+                ).fetchall()
+                for content_hash, blob in rows:
+                    found[content_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+        results = [found.get(content_hash) for content_hash in hashes]
+        hits = sum(1 for r in results if r is not None)
+        self._stats["hits"] += hits
+        self._stats["misses"] += len(results) - hits
+        return results
+
+    def put_many(
+        self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]
+    ) -> int:
+        """
+        Store embeddings for a list of texts
+
+        Empty and all-zero vectors (fallback values of the LLM clients) are skipped.
+
+        Returns:
+            Number of stored embeddings
+        """
+        now = time.time()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            if not embedding:
+                continue
+            vector = np.asarray(embedding, dtype=np.float32)
+            if not vector.any():
+                continue
+            rows.append(
+                (model, chunk_content_hash(text), int(vector.shape[0]), vector.tobytes(), now)
+            )
+
+        if not rows:
+            return 0
+
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, content_hash, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+
+        self._stats["writes"] += len(rows)
+        return len(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get embedding store statistics"""
+        with self._lock:
+            conn = self._connection()
+            per_model = conn.execute(
+                "SELECT model, COUNT(*) FROM embeddings GROUP BY model"
+            ).fetchall()
+
+        total_lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "db_path": self.db_path,
+            "models": {model: count for model, count in per_model},
+            "total_embeddings": sum(count for _, count in per_model),
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "writes": self._stats["writes"],
+            "hit_rate": self._stats["hits"] / max(1, total_lookups),
+        }
+
+    def clear(self, model: Optional[str] = None) -> None:
+        """Remove stored embeddings (all or for a single model)"""
+        with self._lock:
+            conn = self._connection()
+            if model:
+                conn.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+            else:
+                conn.execute("DELETE FROM embeddings")
+            conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global embedding store instance
+embedding_store = EmbeddingStore()
@@ -0,0 +1,317 @@
+"""
+Dzienne agregaty wydatków i zapytania analityczne GROUP BY
+
+Każdy zapis paragonu lub produktu przelicza - w tej samej transakcji i tylko
+dla dotkniętych dni - wiersze dwóch tabel: daily_expense_rollups (dzień ×
+sklep) oraz daily_category_rollups (dzień × kategoria). Analityka czyta te
+tabele zamiast ładować paragony z produktami, więc czas odpowiedzi nie rośnie
+razem z historią zakupów.
+
+Dni to daty zakupów (trip_date), miesiące są kalendarzowe. Filtr kategorii
+(paragony zawierające produkt z danej kategorii) nie da się odczytać z
+agregatów, więc liczony jest zapytaniem GROUP BY na tabelach źródłowych.
+"""
+
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, extract, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models.shopping import (DailyCategoryRollup, DailyExpenseRollup,
+                                     Product, ShoppingTrip)
+
+logger = logging.getLogger(__name__)
+
+# Dni są wiązane dwukrotnie w jednym zapytaniu - SQLite pozwala na 999 parametrów
+_DAYS_PER_STATEMENT = 400
+
+# Przestrzeń kluczy pg_advisory_xact_lock(namespace, dzień) dla agregatów;
+# klucz 0 (poniżej ordinali dat) blokuje jednorazowe przeliczenie przy starcie
+_LOCK_NAMESPACE = 0x524F4C4C
+_BACKFILL_LOCK_KEY = 0
+
+_expense_table = DailyExpenseRollup.__table__
+_category_table = DailyCategoryRollup.__table__
+
+
+def month_start(day: date, months_back: int = 0) -> date:
+    """First day of the calendar month ``months_back`` months before ``day``"""
+    index = day.year * 12 + day.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_end(day: date) -> date:
+    """Last day of the calendar month containing ``day``"""
+    next_month = month_start(day, -1)
+    return date.fromordinal(next_month.toordinal() - 1)
+
+
+async def refresh_expense_rollups(
+    db: AsyncSession, days: Iterable[Optional[date]]
+) -> None:
+    """
+    Recompute rollup rows for the given purchase days from trips and products.
+
+    Must run inside the writing transaction, after the changes were flushed,
+    so the rollups are committed (or rolled back) together with them.
+    """
+    unique_days = sorted({day for day in days if day is not None})
+    for i in range(0, len(unique_days), _DAYS_PER_STATEMENT):
+        await _refresh_days(db, unique_days[i : i + _DAYS_PER_STATEMENT])
+
+
+async def _advisory_lock(db: AsyncSession, key: int) -> None:
+    """
+    Transaction-scoped lock on PostgreSQL; a no-op elsewhere
+
+    SQLite allows a single writer at a time, so concurrent transactions
+    cannot interleave their rollup writes there anyway.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(_LOCK_NAMESPACE, key)))
+
+
+async def _refresh_days(db: AsyncSession, days: List[date]) -> None:
+    # Dwa zapisy tego samego dnia (np. paragony z kilku workerów) czekają na
+    # siebie, zamiast wstawiać ten sam klucz główny. Dni są posortowane, więc
+    # blokady zawsze zakładane są w tej samej kolejności (bez zakleszczeń).
+    for day in days:
+        await _advisory_lock(db, day.toordinal())
+
+    await db.execute(delete(_expense_table).where(_expense_table.c.day.in_(days)))
+    await db.execute(delete(_category_table).where(_category_table.c.day.in_(days)))
+
+    product_counts = (
+        select(Product.trip_id, func.count(Product.id).label("product_count"))
+        .join(ShoppingTrip, Product.trip_id == ShoppingTrip.id)
+        .where(ShoppingTrip.trip_date.in_(days))
+        .group_by(Product.trip_id)
+        .subquery()
+    )
+    trips = (
+        select(
+            ShoppingTrip.trip_date,
+            ShoppingTrip.store_name,
+            func.count(ShoppingTrip.id),
+            func.coalesce(func.sum(ShoppingTrip.total_amount), 0.0),
+            func.coalesce(func.sum(product_counts.c.product_count), 0),
+        )
+        .outerjoin(product_counts, product_counts.c.trip_id == ShoppingTrip.id)
+        .where(ShoppingTrip.trip_date.in_(days))
+        .group_by(ShoppingTrip.trip_date, ShoppingTrip.store_name)
+    )
+    await db.execute(
+        insert(_expense_table).from_select(
+            ["day", "store_name", "trip_count", "total_amount", "product_count"], trips
+        )
+    )
+
+    categories = (
+        select(
+            ShoppingTrip.trip_date,
+            Product.category,
+            func.coalesce(func.sum(Product.unit_price), 0.0),
+            func.count(Product.id),
+        )
+        .join(ShoppingTrip, Product.trip_id == ShoppingTrip.id)
+        .where(
+            ShoppingTrip.trip_date.in_(days),
+            Product.category.is_not(None),
+            Product.category != "",
+        )
+        .group_by(ShoppingTrip.trip_date, Product.category)
+    )
+    await db.execute(
+        insert(_category_table).from_select(
+            ["day", "category", "amount", "product_count"], categories
+        )
+    )
+
+
+async def get_trip_days(db: AsyncSession, trip_ids: Iterable[int]) -> List[date]:
+    """Purchase days of the given trips (for refreshing after product changes)"""
+    ids = list(set(trip_ids))
+    if not ids:
+        return []
+    result = await db.execute(
+        select(ShoppingTrip.trip_date).where(ShoppingTrip.id.in_(ids)).distinct()
+    )
+    return list(result.scalars().all())
+
+
+async def rebuild_expense_rollups(db: AsyncSession) -> int:
+    """Recompute all rollups from scratch (does not commit); returns number of days"""
+    await db.execute(delete(_expense_table))
+    await db.execute(delete(_category_table))
+    result = await db.execute(select(ShoppingTrip.trip_date).distinct())
+    days = list(result.scalars().all())
+    await refresh_expense_rollups(db, days)
+    return len(days)
+
+
+async def ensure_expense_rollups(db: AsyncSession) -> bool:
+    """
+    Backfill rollups for databases that have trips but were never aggregated
+
+    Every worker calls this at startup; only the first one rebuilds. The
+    others wait on the lock and then see the rollups are already there.
+    """
+    await _advisory_lock(db, _BACKFILL_LOCK_KEY)
+    if await db.scalar(select(_expense_table.c.day).limit(1)) is not None:
+        await db.rollback()
+        return False
+    if await db.scalar(select(ShoppingTrip.id).limit(1)) is None:
+        await db.rollback()
+        return False
+
+    # rebuild zaczyna od DELETE, więc ponowne przeliczenie jest bezpieczne
+    days = await rebuild_expense_rollups(db)
+    await db.commit()
+    logger.info(f"Przeliczono dzienne agregaty wydatków dla {days} dni")
+    return True
+
+
+def _trips_with_category(category: str) -> Any:
+    return select(Product.trip_id).where(Product.category == category)
+
+
+async def get_expense_totals(
+    db: AsyncSession, start: date, end: date, category: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Total spent, trip count and product count for purchase days in [start, end]
+
+    Args:
+        category: Only trips containing a product from this category
+    """
+    if category is None:
+        row = (
+            await db.execute(
+                select(
+                    func.coalesce(func.sum(_expense_table.c.total_amount), 0.0),
+                    func.coalesce(func.sum(_expense_table.c.trip_count), 0),
+                    func.coalesce(func.sum(_expense_table.c.product_count), 0),
+                ).where(_expense_table.c.day.between(start, end))
+            )
+        ).one()
+        total, trip_count, product_count = row
+    else:
+        in_period = (
+            ShoppingTrip.trip_date.between(start, end),
+            ShoppingTrip.id.in_(_trips_with_category(category)),
+        )
+        total, trip_count = (
+            await db.execute(
+                select(
+                    func.coalesce(func.sum(ShoppingTrip.total_amount), 0.0),
+                    func.count(ShoppingTrip.id),
+                ).where(*in_period)
+            )
+        ).one()
+        product_count = await db.scalar(
+            select(func.count(Product.id))
+            .join(ShoppingTrip, Product.trip_id == ShoppingTrip.id)
+            .where(*in_period)
+        )
+
+    return {
+        "total_expenses": float(total),
+        "trip_count": int(trip_count),
+        "total_products": int(product_count or 0),
+    }
+
+
+async def get_category_expenses(
+    db: AsyncSession, start: date, end: date, category: Optional[str] = None
+) -> Dict[str, float]:
+    """Sum of product unit prices per category, largest first"""
+    if category is None:
+        stmt = (
+            select(_category_table.c.category, func.sum(_category_table.c.amount))
+            .where(_category_table.c.day.between(start, end))
+            .group_by(_category_table.c.category)
+        )
+    else:
+        stmt = (
+            select(Product.category, func.coalesce(func.sum(Product.unit_price), 0.0))
+            .join(ShoppingTrip, Product.trip_id == ShoppingTrip.id)
+            .where(
+                ShoppingTrip.trip_date.between(start, end),
+                ShoppingTrip.id.in_(_trips_with_category(category)),
+                Product.category.is_not(None),
+                Product.category != "",
+            )
+            .group_by(Product.category)
+        )
+    rows = (await db.execute(stmt)).all()
+    return {
+        name: float(amount)
+        for name, amount in sorted(rows, key=lambda row: (-row[1], row[0]))
+    }
+
+
+async def get_monthly_expenses(
+    db: AsyncSession, start: date, end: date, category: Optional[str] = None
+) -> Dict[Tuple[int, int], Dict[str, Any]]:
+    """Total spent and trip count per calendar month, keyed by (year, month)"""
+    if category is None:
+        year = extract("year", _expense_table.c.day)
+        month = extract("month", _expense_table.c.day)
+        stmt = (
+            select(
+                year,
+                month,
+                func.sum(_expense_table.c.total_amount),
+                func.sum(_expense_table.c.trip_count),
+            )
+            .where(_expense_table.c.day.between(start, end))
+            .group_by(year, month)
+        )
+    else:
+        year = extract("year", ShoppingTrip.trip_date)
+        month = extract("month", ShoppingTrip.trip_date)
+        stmt = (
+            select(
+                year,
+                month,
+                func.coalesce(func.sum(ShoppingTrip.total_amount), 0.0),
+                func.count(ShoppingTrip.id),
+            )
+            .where(
+                ShoppingTrip.trip_date.between(start, end),
+                ShoppingTrip.id.in_(_trips_with_category(category)),
+            )
+            .group_by(year, month)
+        )
+    return {
+        (int(y), int(m)): {"total": float(total), "trip_count": int(trip_count)}
+        for y, m, total, trip_count in (await db.execute(stmt)).all()
+    }
+
+
+async def get_top_trips(
+    db: AsyncSession,
+    start: date,
+    end: date,
+    category: Optional[str] = None,
+    limit: int = 5,
+) -> List[Dict[str, Any]]:
+    """Most expensive trips in [start, end]"""
+    stmt = (
+        select(ShoppingTrip.id, ShoppingTrip.total_amount, ShoppingTrip.trip_date)
+        .where(
+            ShoppingTrip.trip_date.between(start, end),
+            ShoppingTrip.total_amount.is_not(None),
+            ShoppingTrip.total_amount != 0,
+        )
+        .order_by(ShoppingTrip.total_amount.desc(), ShoppingTrip.id)
+        .limit(limit)
+    )
+    if category is not None:
+        stmt = stmt.where(ShoppingTrip.id.in_(_trips_with_category(category)))
+    return [
+        {"id": trip_id, "total": total, "date": trip_date.isoformat()}
+        for trip_id, total, trip_date in (await db.execute(stmt)).all()
+    ]
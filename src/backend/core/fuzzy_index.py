@@ -0,0 +1,113 @@
+"""
+Indeks n-gramów do dopasowywania nazw (produkty, sklepy)
+
+Zamiast liczyć ``SequenceMatcher`` dla każdego wpisu słownika przy każdej
+linii paragonu, normalizatory pytają indeks o kandydatów:
+
+- ``substrings_of`` / ``superstrings_of`` - wpisy zawarte w zapytaniu lub
+  zawierające zapytanie. Wynik jest dokładny: warunek na liczbie wspólnych
+  trigramów jest konieczny, a każdy kandydat jest potem sprawdzany ``in``.
+- ``similar`` - ograniczona liczba wpisów o największym pokryciu bigramów
+  (z granicami słowa, współczynnik Dice'a), które dopiero potem są oceniane
+  ``SequenceMatcher``. Bigramy, a nie trigramy, bo literówki OCR w krótkich
+  nazwach często nie zostawiają żadnego wspólnego trigramu. Najlepszy wynik
+  może się różnić od pełnego przeglądu tylko wtedy, gdy najlepszy wpis nie
+  trafi do ``candidates`` najbliższych - różnica wyniku mieści się w
+  ``FUZZY_SCORE_TOLERANCE`` (sprawdzane w testach na zaszumionych nazwach).
+
+Kandydaci są zwracani w kolejności wpisów, więc przy remisach wygrywa ten
+sam wpis co przy liniowym przeglądzie.
+"""
+
+import heapq
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Set
+
+# Maksymalna różnica wyniku fuzzy względem pełnego przeglądu słownika
+FUZZY_SCORE_TOLERANCE = 0.1
+
+
+def ngrams(text: str, n: int = 3) -> Set[str]:
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+def _similarity_grams(text: str) -> Set[str]:
+    return ngrams(f"\x02{text}\x03", 2)
+
+
+class NGramIndex:
+    """Inverted index from character n-grams to dictionary entries"""
+
+    def __init__(self, keys: Sequence[str], n: int = 3, candidates: int = 64) -> None:
+        """
+        Build index
+
+        Args:
+            keys: Lowercased dictionary keys, addressed by position
+            n: N-gram length
+            candidates: Entries passed to the exact scorer by ``similar``
+        """
+        self.keys = list(keys)
+        self.n = n
+        self.candidates = candidates
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._sizes: List[int] = []
+        # Klucze krótsze niż n nie mają n-gramów - sprawdzane zawsze
+        self._short: List[int] = []
+        self._similarity_postings: Dict[str, List[int]] = defaultdict(list)
+        self._similarity_sizes: List[int] = []
+        for entry_id, key in enumerate(self.keys):
+            grams = ngrams(key, n)
+            self._sizes.append(len(grams))
+            if not grams:
+                self._short.append(entry_id)
+            for gram in grams:
+                self._postings[gram].append(entry_id)
+            grams = _similarity_grams(key)
+            self._similarity_sizes.append(len(grams))
+            for gram in grams:
+                self._similarity_postings[gram].append(entry_id)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @staticmethod
+    def _overlap(index: Dict[str, List[int]], grams: Set[str]) -> Counter:
+        counts: Counter = Counter()
+        for gram in grams:
+            postings = index.get(gram)
+            if postings:
+                counts.update(postings)
+        return counts
+
+    def substrings_of(self, query: str) -> List[int]:
+        """Entries whose key occurs in ``query``"""
+        grams = ngrams(query, self.n)
+        counts = self._overlap(self._postings, grams)
+        # Klucz zawarty w zapytaniu ma wszystkie swoje n-gramy w zapytaniu
+        found = [i for i, shared in counts.items() if shared == self._sizes[i]]
+        found.extend(self._short)
+        return sorted(i for i in found if self.keys[i] in query)
+
+    def superstrings_of(self, query: str) -> List[int]:
+        """Entries whose key contains ``query``"""
+        grams = ngrams(query, self.n)
+        if not grams:
+            # Zapytanie krótsze niż n-gram - rzadkie, zwykły przegląd
+            return [i for i, key in enumerate(self.keys) if query in key]
+        counts = self._overlap(self._postings, grams)
+        return sorted(
+            i for i, shared in counts.items() if shared == len(grams) and query in self.keys[i]
+        )
+
+    def similar(self, query: str) -> List[int]:
+        """Entries most likely to score highest with ``SequenceMatcher``"""
+        grams = _similarity_grams(query)
+        counts = self._overlap(self._similarity_postings, grams)
+        size = len(grams)
+        best = heapq.nlargest(
+            self.candidates,
+            counts,
+            key=lambda i: 2 * counts[i] / (size + self._similarity_sizes[i]),
+        )
+        return sorted(best)
@@ -1,7 +1,6 @@
 import asyncio
 import json
 import logging
-import os
 import re
 import time
 from datetime import datetime, timedelta
@@ -12,8 +11,11 @@ from pydantic import BaseModel
 
 from backend.core.language_detector import language_detector
 from backend.core.llm_client import LLMCache, llm_client
+from backend.core.llm_settings import LLMSettingsSnapshot, llm_settings_store
 from backend.core.model_selector import ModelTask, model_selector
+from backend.core.semantic_response_cache import semantic_response_cache
 from backend.core.response_length_config import ResponseLengthConfig, ConciseMetrics, ResponseStyle
+from backend.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -106,43 +108,38 @@ class HybridLLMClient:
 
         # Inicjalizacja model_selector
         self.model_selector = model_selector
+
+        # Model wybrany w ustawieniach może się zmienić w trakcie działania
+        llm_settings_store.subscribe(self._on_llm_settings_change)
         logger.info("HybridLLMClient initialized with ModelSelector")
 
     @property
     def default_model(self) -> str:
-        """Get the default model from config file or fallback to hardcoded value"""
-        try:
-            # Path to the LLM settings file
-            llm_settings_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-                "..",
-                "data",
-                "config",
-                "llm_settings.json",
-            )
-
-            if os.path.exists(llm_settings_path):
-                with open(llm_settings_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    selected_model = data.get("selected_model", "")
-                    if selected_model and selected_model in self.model_configs:
-                        logger.info(
-                            f"Using selected model from config: {selected_model}"
-                        )
-                        return selected_model
-
-            # Fallback to hardcoded default
-            fallback_default = "SpeakLeash/bielik-4.5b-v3.0-instruct:Q8_0"
-            logger.info(
-                f"No valid selected model in config, using fallback: {fallback_default}"
-            )
-            return fallback_default
-
-        except Exception as e:
-            logger.warning(f"Error reading selected model from config: {e}")
-            fallback_default = "SpeakLeash/bielik-4.5b-v3.0-instruct:Q8_0"
-            logger.info(f"Using fallback default model: {fallback_default}")
-            return fallback_default
+        """Selected model from the cached LLM settings, or the hardcoded fallback"""
+        selected_model = llm_settings_store.snapshot().selected_model
+        if selected_model in self.model_configs:
+            return selected_model
+        return self.fallback_model
+
+    def _on_llm_settings_change(self, snapshot: LLMSettingsSnapshot) -> None:
+        """Prepare semaphore, cache and stats for a model selected at runtime"""
+        model = snapshot.selected_model
+        if model in self.model_configs:
+            return
+        logger.info(f"Registering runtime-selected model {model}")
+        self.model_configs[model] = ModelConfig(
+            name=model,
+            complexity_levels=list(ModelComplexity),
+            max_tokens=8192,
+            priority=5,
+            concurrency_limit=settings.OLLAMA_MAX_CONCURRENCY_PER_MODEL,
+            description="Model selected in LLM settings",
+        )
+        self.model_stats[model] = ModelUsageStats()
+        self.semaphores[model] = asyncio.Semaphore(
+            settings.OLLAMA_MAX_CONCURRENCY_PER_MODEL
+        )
+        self.caches[model] = LLMCache(max_size=1000, ttl=3600)
 
     def _init_model_configs(self) -> Dict[str, ModelConfig]:
         """Initialize model configs with their capabilities"""
@@ -443,15 +440,24 @@ class HybridLLMClient:
                 logger.warning(f"Model {model} not found, using fallback")
                 model = self.fallback_model
 
-            # Użyj semaphore dla kontroli współbieżności
-            async with self.semaphores[model]:
-                # Sprawdź cache
-                cache_key = self._generate_cache_key(messages, model, options)
-                cached_response = self.caches[model].get(cache_key)
+            # Sprawdź cache
+            cache_key = self._generate_cache_key(messages, model, options)
+            cached_response = self.caches[model].get(cache_key)
+            if cached_response:
+                logger.info(f"Cache hit for model {model}")
+                return cached_response
+
+            # Parafrazy wcześniejszych pytań (opt-in, bez zajmowania slotu modelu)
+            if not stream:
+                cached_response = await semantic_response_cache.lookup(
+                    messages, model, options
+                )
                 if cached_response:
-                    logger.info(f"Cache hit for model {model}")
                     return cached_response
 
+            # Użyj semaphore dla kontroli współbieżności
+            async with self.semaphores[model]:
+
                 # Wywołaj LLM z timeout
                 try:
                     response = await asyncio.wait_for(
@@ -468,6 +474,9 @@ class HybridLLMClient:
                     # Zapisz w cache
                     if not stream:
                         self.caches[model].set(cache_key, response)
+                        await semantic_response_cache.store(
+                            messages, model, options, response
+                        )
                     
                     # Aktualizuj statystyki
                     self._update_model_stats(model, time.time() - start_time, True)
@@ -600,8 +609,8 @@ class HybridLLMClient:
                 "timestamp": datetime.now().isoformat(),
             }
 
-    async def embed(self, text: str, model: Optional[str] = None) -> List[float]:
-        """Get embeddings with automatic model selection"""
+    def _resolve_embedding_model(self, model: Optional[str]) -> str:
+        """Pick the embedding model (Bielik by default)"""
         if not model:
             # Use Bielik as default embedding model
             embedding_models = [
@@ -624,6 +633,11 @@ class HybridLLMClient:
         if model not in self.model_configs:
             logger.warning(f"Unknown embedding model: {model}, falling back to Bielik")
             model = "SpeakLeash/bielik-11b-v2.3-instruct:Q5_K_M"
+        return model
+
+    async def embed(self, text: str, model: Optional[str] = None) -> List[float]:
+        """Get embeddings with automatic model selection"""
+        model = self._resolve_embedding_model(model)
 
         # Update usage stats
         self.model_stats[model].total_requests += 1
@@ -644,6 +658,31 @@ class HybridLLMClient:
             self.model_stats[model].last_error = str(e)
             return []
 
+    async def embed_batch(
+        self, texts: List[str], model: Optional[str] = None
+    ) -> List[List[float]]:
+        """Get embeddings for several texts in a single model request"""
+        model = self._resolve_embedding_model(model)
+
+        # Update usage stats
+        self.model_stats[model].total_requests += 1
+        self.model_stats[model].last_used = datetime.now()
+
+        try:
+            # Use semaphore for resource control
+            async with self.semaphores[model]:
+                embeddings = await self.base_client.embed_batch(model=model, texts=texts)
+
+                # Update success stats
+                self.model_stats[model].successful_requests += 1
+
+                return embeddings
+        except Exception as e:
+            logger.error(f"Error generating batch embeddings: {str(e)}")
+            self.model_stats[model].failed_requests += 1
+            self.model_stats[model].last_error = str(e)
+            return [[] for _ in texts]
+
     def get_models_status(self) -> Dict[str, Dict[str, Any]]:
         """Get status of all models"""
         status = {}
@@ -691,6 +730,7 @@ class HybridLLMClient:
                 stats.total_tokens for stats in self.model_stats.values()
             ),
             "metrics_collected": len(self.selection_metrics),
+            "semantic_cache": semantic_response_cache.get_stats(),
         }
 
     async def with_retry_fallback(
@@ -0,0 +1,103 @@
+"""
+Automat Aho-Corasick dla słów kluczowych kategorii
+
+Wszystkie słowa kluczowe są kompilowane raz w jeden automat, a nazwa
+produktu jest przechodzona jednokrotnie, znak po znaku - bez pętli po
+kategoriach i słowach kluczowych dla każdej nazwy.
+
+Identyfikatory wzorców nadawane są w kolejności pierwszego wystąpienia,
+więc "najdłuższe dopasowanie, przy remisie najwcześniejsze" daje ten sam
+wynik co przegląd kategorii i słów kluczowych po kolei.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over a fixed set of lowercase keywords"""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        """
+        Compile automaton
+
+        Args:
+            patterns: Keywords in priority order; duplicates and empty strings are skipped
+        """
+        self.patterns: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Wzorce kończące się w stanie (także przez łańcuch fail)
+        self._output: List[List[int]] = [[]]
+        for pattern in patterns:
+            if pattern and pattern not in self._ids:
+                self._add(pattern)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _add(self, pattern: str) -> None:
+        pattern_id = len(self.patterns)
+        self.patterns.append(pattern)
+        self._ids[pattern] = pattern_id
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _link(self) -> None:
+        # BFS po stanach - fail wskazuje najdłuższy właściwy sufiks będący prefiksem wzorca
+        queue = deque(self._goto[0].values())
+        self._longest: List[Optional[int]] = [None] * len(self._goto)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                queue.append(next_state)
+            self._output[state].extend(self._output[self._fail[state]])
+            self._longest[state] = min(
+                self._output[state],
+                key=lambda i: (-len(self.patterns[i]), i),
+                default=None,
+            )
+
+    def _step(self, state: int, char: str) -> int:
+        while state and char not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(char, 0)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """All occurrences as ``(end_index, pattern_id)``, end index exclusive"""
+        state = 0
+        for position, char in enumerate(text):
+            state = self._step(state, char)
+            for pattern_id in self._output[state]:
+                yield position + 1, pattern_id
+
+    def longest_match(self, text: str) -> Optional[int]:
+        """Longest keyword occurring in ``text``; ties go to the lowest pattern id"""
+        best: Optional[int] = None
+        best_length = 0
+        state = 0
+        for char in text:
+            state = self._step(state, char)
+            candidate = self._longest[state]
+            if candidate is None:
+                continue
+            length = len(self.patterns[candidate])
+            if length > best_length or (length == best_length and candidate < best):
+                best, best_length = candidate, length
+        return best
@@ -5,10 +5,13 @@ import time
 from datetime import datetime
 from typing import Any, AsyncGenerator, Dict, List, Optional, Union, Generator
 
+import httpx
 import ollama
 import requests  # type: ignore
 import structlog
 
+from backend.core.ollama_transport import ollama_transport
+from backend.core.prompt_assembly import prompt_assembler
 from backend.settings import OLLAMA_URL, settings
 
 logger = structlog.get_logger()
@@ -45,6 +48,135 @@ def test_ollama_connection() -> bool:
 OLLAMA_AVAILABLE = test_ollama_connection()
 
 
+class OllamaHealthMonitor:
+    """Background Ollama health probing with a cached state
+
+    The hot path (``is_available``/``has_model``) only reads cached state; the
+    probes run asynchronously every ``interval`` seconds (``down_interval``
+    while the server is down). Transport errors seen by request paths mark the
+    backend down immediately via ``mark_down``.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        interval: Optional[float] = None,
+        down_interval: Optional[float] = None,
+        timeout: float = 5.0,
+        initial_state: bool = True,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.interval = interval or settings.OLLAMA_HEALTH_CHECK_INTERVAL
+        self.down_interval = down_interval or settings.OLLAMA_HEALTH_CHECK_DOWN_INTERVAL
+        self.timeout = timeout
+        self.available = initial_state
+        self.models: Optional[set] = None
+        self.last_check: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def is_available(self) -> bool:
+        """Cached availability, no I/O (starts the monitor on first use)"""
+        self._ensure_started()
+        return self.available
+
+    def has_model(self, model: str) -> Optional[bool]:
+        """Whether the model is pulled in Ollama, None until the first probe"""
+        self._ensure_started()
+        if self.models is None:
+            return None
+        return model in self.models or f"{model}:latest" in self.models
+
+    def mark_down(self, error: Any) -> None:
+        """Mark the backend unavailable after a transport error"""
+        if self.available:
+            logger.warning(f"Ollama marked unavailable: {error}")
+        self.available = False
+        self.last_error = str(error)
+        # Re-probe soon instead of waiting for the regular interval
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def probe(self) -> bool:
+        """Probe Ollama once and update the cached state"""
+        try:
+            response = await ollama_transport.get("/api/tags", timeout=self.timeout)
+            response.raise_for_status()
+            self.models = {m.get("name", "") for m in response.json().get("models", [])}
+            if not self.available:
+                logger.info("Ollama server is available again")
+            self.available = True
+            self.last_error = None
+        except Exception as e:
+            if self.available:
+                logger.warning(f"Ollama health probe failed: {e}")
+            self.available = False
+            self.last_error = str(e)
+        self.last_check = datetime.now()
+        return self.available
+
+    def _ensure_started(self) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.start()
+
+    def _is_running(self) -> bool:
+        return (
+            self._task is not None
+            and not self._task.done()
+            and self._task.get_loop() is asyncio.get_running_loop()
+        )
+
+    def start(self) -> None:
+        """Start the background probing task on the running loop"""
+        if not self._is_running():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.debug("Ollama health monitor started")
+
+    async def stop(self) -> None:
+        """Stop the background probing task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe()
+            self._wakeup.clear()
+            delay = self.interval if self.available else self.down_interval
+            # asyncio.wait (unlike wait_for) never swallows cancellation
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=delay)
+            finally:
+                waiter.cancel()
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "models": sorted(self.models) if self.models is not None else None,
+            "last_check": self.last_check.isoformat() if self.last_check else None,
+            "last_error": self.last_error,
+        }
+
+
+def is_transport_error(error: Exception) -> bool:
+    """Whether the error means Ollama could not be reached at all"""
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+# Shared health state for all Ollama clients in the process
+ollama_health = OllamaHealthMonitor(OLLAMA_URL, initial_state=OLLAMA_AVAILABLE)
+
+
 class ModelFallbackManager:
     """Manages model fallback strategy when primary model fails"""
     
@@ -76,19 +208,18 @@ class ModelFallbackManager:
         return preferred_model
         
     async def _is_model_healthy(self, model: str) -> bool:
-        """Check if a specific model is healthy and available"""
-        try:
-            # Check if model exists and is accessible
-            response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
-            if response.status_code == 200:
-                models_data = response.json()
-                available_models = [m.get('name', '') for m in models_data.get('models', [])]
-                return model in available_models
-        except Exception as e:
-            logger.debug(f"Health check failed for model {model}: {e}")
-            
-        return False
-        
+        """Check if a specific model is healthy and available (cached state only)"""
+        failed_at = self.last_fallback_time.get(model)
+        if (
+            failed_at is not None
+            and (datetime.now() - failed_at).total_seconds() < self.fallback_timeout
+        ):
+            return False
+        if not ollama_health.is_available():
+            return False
+        # Unknown model list (no probe finished yet) is treated as healthy
+        return ollama_health.has_model(model) is not False
+
     def mark_model_failed(self, model: str):
         """Mark a model as failed for fallback purposes"""
         self.model_health[model] = False
@@ -159,24 +290,18 @@ class EnhancedLLMClient:
         self.last_error: Optional[str] = None
         self.error_count = 0
         self.last_request_time = datetime.now()
-        self.connection_retries = 3
-        self.retry_delay = 1.0
+        self.health_monitor = ollama_health
         self.model_fallback_manager = ModelFallbackManager()
 
     async def _check_ollama_availability(self) -> bool:
-        """Check if Ollama is available with retries"""
-        for attempt in range(self.connection_retries):
-            try:
-                response = requests.get(f"{OLLAMA_URL}/api/version", timeout=5)
-                if response.status_code == 200:
-                    return True
-            except Exception as e:
-                logger.debug(
-                    f"Ollama availability check attempt {attempt + 1} failed: {e}"
-                )
-                if attempt < self.connection_retries - 1:
-                    await asyncio.sleep(self.retry_delay)
-        return False
+        """Check if Ollama is available (cached by the health monitor, no I/O)"""
+        return self.health_monitor.is_available()
+
+    def _record_error(self, error: Exception) -> None:
+        self.last_error = str(error)
+        self.error_count += 1
+        if is_transport_error(error):
+            self.health_monitor.mark_down(error)
 
     async def chat(
         self,
@@ -247,29 +372,26 @@ class EnhancedLLMClient:
         try:
             self.last_request_time = datetime.now()
 
-            # Format messages for Ollama
-            formatted_messages = []
-            for msg in messages:
-                if msg["role"] == "system":
-                    # Add system message as a special parameter
-                    options["system"] = msg["content"]
-                else:
-                    formatted_messages.append(msg)
+            # Wiadomości systemowe zostają na swoim miejscu - /api/chat ignoruje
+            # options["system"], a stały prefiks pozwala Ollamie użyć KV-cache
+            formatted_messages = [
+                {"role": m["role"], "content": m["content"]} for m in messages
+            ]
+            pinned = prompt_assembler.request_params(model)
+            request_options = {"num_ctx": pinned["num_ctx"], **options}
 
             if stream:
                 # Return streaming generator
-                sync_generator = self._stream_response(model, formatted_messages, options, original_messages=messages)
-                return self._convert_to_async_generator(sync_generator)
+                return self._stream_response_async(
+                    model, formatted_messages, request_options, pinned["keep_alive"]
+                )
             else:
                 # For non-streaming, get complete response
-                response = await asyncio.to_thread(
-                    ollama_client.chat,
+                response = await ollama_transport.chat(
                     model=model,
-                    messages=[
-                        {"role": m["role"], "content": m["content"]}
-                        for m in formatted_messages
-                    ],
-                    options=options,
+                    messages=formatted_messages,
+                    options=request_options,
+                    keep_alive=pinned["keep_alive"],
                 )
 
                 # Format response to standard structure
@@ -301,8 +423,7 @@ class EnhancedLLMClient:
                 return result
 
         except Exception as e:
-            self.last_error = str(e)
-            self.error_count += 1
+            self._record_error(e)
             logger.error(f"Error in LLM request to {model}: {str(e)}")
             
             # Mark model as failed for fallback
@@ -334,6 +455,30 @@ class EnhancedLLMClient:
             logger.error(f"Error in async generator conversion: {e}")
             raise
 
+    async def _stream_response_async(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        options: Dict[str, Any],
+        keep_alive: Optional[str] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream chunks from the shared async Ollama transport"""
+        extra = {"keep_alive": keep_alive} if keep_alive else {}
+        try:
+            async for chunk in ollama_transport.chat_stream(
+                model=model,
+                messages=[
+                    {"role": m["role"], "content": m["content"]} for m in messages
+                ],
+                options=options,
+                **extra,
+            ):
+                yield chunk
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Error in Ollama streaming: {e}")
+            raise
+
     def _stream_response(
         self, model: str, messages: List[Dict[str, str]], options: Dict[str, Any], original_messages: Optional[List[Dict[str, str]]] = None
     ) -> Generator[Dict[str, Any], None, None]:
@@ -397,8 +542,7 @@ class EnhancedLLMClient:
             self.last_request_time = datetime.now()
 
             # Get embeddings
-            embeddings = await asyncio.to_thread(
-                ollama_client.embeddings,
+            embeddings = await ollama_transport.embeddings(
                 model=model,
                 prompt=text,
                 options=options,
@@ -413,13 +557,62 @@ class EnhancedLLMClient:
             return embeddings["embedding"]
 
         except Exception as e:
-            self.last_error = str(e)
-            self.error_count += 1
+            self._record_error(e)
             logger.error(f"Error in embedding request to {model}: {str(e)}")
 
             # Return zero vector as fallback
             return [0.0] * 384
 
+    async def embed_batch(
+        self, model: str, texts: List[str], options: Optional[Dict[str, Any]] = None
+    ) -> List[List[float]]:
+        """Get embeddings for several texts with one /api/embed request"""
+        start_time = time.time()
+        options = options or {}
+
+        results: List[List[float]] = []
+        missing: List[int] = []
+        for i, text in enumerate(texts):
+            cached = self.embedding_cache.get(f"embed_{model}_{text}_{str(options)}")
+            results.append(cached or [])
+            if not cached:
+                missing.append(i)
+
+        if not missing:
+            logger.debug(f"Embedding cache hit for whole batch of {len(texts)} ({model})")
+            return results
+
+        # Check if Ollama is available
+        if not await self._check_ollama_availability():
+            logger.error(f"Ollama server not available for embedding model {model}")
+            return results
+
+        try:
+            self.last_request_time = datetime.now()
+
+            response = await ollama_transport.embed(
+                model=model,
+                input=[texts[i] for i in missing],
+                options=options,
+            )
+
+            for i, embedding in zip(missing, response["embeddings"]):
+                results[i] = list(embedding)
+                self.embedding_cache.set(
+                    f"embed_{model}_{texts[i]}_{str(options)}", results[i]
+                )
+
+            logger.debug(
+                f"Batch embedding request ({len(missing)} texts) to {model} "
+                f"completed in {time.time() - start_time:.2f}s"
+            )
+            return results
+
+        except Exception as e:
+            self._record_error(e)
+            logger.error(f"Error in batch embedding request to {model}: {str(e)}")
+            return results
+
     async def get_models(self) -> List[Dict[str, Any]]:
         """Get list of available models"""
         try:
@@ -429,8 +622,7 @@ class EnhancedLLMClient:
                 )
                 return []
 
-            models = await asyncio.to_thread(ollama_client.list)
-            return models.get("models", [])
+            return await ollama_transport.list_models()
         except Exception as e:
             logger.error(f"Error getting models: {str(e)}")
             return []
@@ -483,17 +675,15 @@ class EnhancedLLMClient:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
         
-        sync_generator = self._stream_response(model, messages, options or {})
-        await asyncio.sleep(0)  # Ensure this is always an async generator
-        for chunk in sync_generator:
+        async for chunk in self._stream_response_async(model, messages, options or {}):
             yield chunk
-            await asyncio.sleep(0)
-        # No return here – ensures this is a true async generator
 
     def get_health_status(self) -> Dict[str, Any]:
         """Get health status of the LLM client"""
         return {
-            "ollama_available": OLLAMA_AVAILABLE,
+            "ollama_available": self.health_monitor.available,
+            "ollama_health": self.health_monitor.get_status(),
+            "ollama_transport": ollama_transport.get_stats(),
             "last_error": self.last_error,
             "error_count": self.error_count,
             "last_request_time": self.last_request_time.isoformat(),
@@ -0,0 +1,155 @@
+"""
+Runtime LLM settings (data/config/llm_settings.json)
+
+Plik jest wczytywany raz, a potem obserwowany (mtime) przez zadanie w tle.
+Ścieżka żądania czyta tylko niemutowalny, wersjonowany snapshot - bez
+operacji na plikach i logowania przy każdym wywołaniu. Po zmianie pliku
+(lub zapisie przez API ustawień) wywoływane są zarejestrowane callbacki,
+np. HybridLLMClient dopisuje semafor i cache dla nowo wybranego modelu.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, List, Mapping, Optional
+
+from backend.settings import settings
+
+logger = logging.getLogger(__name__)
+
+LLM_SETTINGS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    "..",
+    "data",
+    "config",
+    "llm_settings.json",
+)
+
+DEFAULT_SELECTED_MODEL = "SpeakLeash/bielik-4.5b-v3.0-instruct:Q8_0"
+
+
+@dataclass(frozen=True)
+class LLMSettingsSnapshot:
+    """Immutable view of llm_settings.json at one point in time"""
+
+    version: int
+    data: Mapping[str, Any] = field(default_factory=dict)
+    mtime: Optional[int] = None
+
+    @property
+    def selected_model(self) -> str:
+        return self.data.get("selected_model") or DEFAULT_SELECTED_MODEL
+
+
+SettingsCallback = Callable[[LLMSettingsSnapshot], None]
+
+
+class LLMSettingsStore:
+    """Loads llm_settings.json once and hot-reloads it on modification"""
+
+    def __init__(self, path: str, poll_interval: Optional[float] = None) -> None:
+        """
+        Initialize settings store
+
+        Args:
+            path: Path of the JSON settings file
+            poll_interval: Seconds between mtime checks of the watcher
+        """
+        self.path = path
+        self.poll_interval = poll_interval or settings.LLM_SETTINGS_POLL_INTERVAL
+        self._snapshot: Optional[LLMSettingsSnapshot] = None
+        self._callbacks: List[SettingsCallback] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def snapshot(self) -> LLMSettingsSnapshot:
+        """Current settings (the file is read only on first use)"""
+        if self._snapshot is None:
+            self.reload()
+        return self._snapshot
+
+    def subscribe(self, callback: SettingsCallback) -> None:
+        """Call ``callback`` with every new snapshot (and the current one, if loaded)"""
+        self._callbacks.append(callback)
+        if self._snapshot is not None:
+            callback(self._snapshot)
+
+    def _mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the file if it changed since the last load, returns True on change"""
+        mtime = self._mtime()
+        if not force and self._snapshot is not None and mtime == self._snapshot.mtime:
+            return False
+
+        data: dict = {}
+        if mtime is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Error reading LLM settings from {self.path}: {e}")
+                if self._snapshot is not None:
+                    # Zostaw poprzednie ustawienia (np. plik w trakcie zapisu)
+                    return False
+
+        previous = self._snapshot
+        self._snapshot = LLMSettingsSnapshot(
+            version=(previous.version + 1) if previous else 1,
+            data=MappingProxyType(dict(data)),
+            mtime=mtime,
+        )
+        logger.info(
+            f"LLM settings loaded (version {self._snapshot.version}), "
+            f"selected model: {self._snapshot.selected_model}"
+        )
+        for callback in self._callbacks:
+            try:
+                callback(self._snapshot)
+            except Exception as e:
+                logger.error(f"LLM settings callback failed: {e}")
+        return True
+
+    def update(self, **values: Any) -> LLMSettingsSnapshot:
+        """Write new values atomically and apply them immediately"""
+        data = {**self.snapshot().data, **values}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        # mtime może się nie zmienić przy zapisie w tej samej sekundzie
+        self.reload(force=True)
+        return self._snapshot
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"LLM settings watcher error: {e}")
+
+    def start(self) -> None:
+        """Start watching the file for changes"""
+        self.snapshot()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+llm_settings_store = LLMSettingsStore(LLM_SETTINGS_PATH)
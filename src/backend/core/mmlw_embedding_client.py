@@ -1,10 +1,14 @@
 """
 MMLW Embedding Client - specjalizowany klient dla polskiego modelu embeddingów
+
+Inferencja działa w dedykowanym wątku roboczym (EmbeddingBatcher), a równoległe
+wywołania embed_text są łączone w mikro-batche, zamiast blokować pętlę zdarzeń
+osobnym przebiegiem modelu dla każdego zapytania.
 """
 
 import asyncio
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 try:
     import torch
@@ -15,6 +19,10 @@ except ImportError:
     TRANSFORMERS_AVAILABLE = False
     logging.warning("Transformers not available. MMLW embeddings will not work.")
 
+from backend.core.embedding_batcher import EmbeddingBatcher
+from backend.core.mmlw_onnx import load_onnx_session, recall_parity
+from backend.settings import settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,14 +32,27 @@ class MMLWEmbeddingClient:
     Specjalizowany dla języka polskiego i zadań wyszukiwania informacji
     """
 
-    def __init__(self, model_name: str = "sdadas/mmlw-retrieval-roberta-base") -> None:
+    def __init__(
+        self,
+        model_name: str = "sdadas/mmlw-retrieval-roberta-base",
+        backend: Optional[str] = None,
+    ) -> None:
         self.model_name = model_name
+        # "torch" (fp32 PyTorch) albo "onnx" (int8 ONNX Runtime na CPU)
+        self.backend = backend or settings.MMLW_BACKEND
         self.tokenizer = None
         self.model = None
         self.device = None
         self.is_initialized = False
         self._initialization_lock = asyncio.Lock()
         self._initialization_task = None
+        self._batcher = EmbeddingBatcher(
+            self._encode,
+            max_batch_size=settings.MMLW_BATCH_MAX_SIZE,
+            max_wait=settings.MMLW_BATCH_MAX_WAIT,
+            bucket_size=settings.MMLW_BATCH_BUCKET_SIZE,
+            thread_name="mmlw-embedding",
+        )
 
     async def _ensure_initialized(self) -> None:
         """Zapewnia, że model jest zainicjalizowany (lazy loading)"""
@@ -62,21 +83,18 @@ class MMLWEmbeddingClient:
             logger.info(f"Initializing MMLW model: {self.model_name}")
 
             # Sprawdź dostępność CUDA
-            if torch.cuda.is_available():
+            if self.backend == "onnx":
+                self.device = torch.device("cpu")
+                logger.info("Using ONNX Runtime (int8, CPU) for MMLW embeddings")
+            elif torch.cuda.is_available():
                 self.device = torch.device("cuda")
                 logger.info("Using CUDA for MMLW embeddings")
             else:
                 self.device = torch.device("cpu")
                 logger.info("Using CPU for MMLW embeddings")
 
-            # Załaduj tokenizer i model
-            logger.info("Loading tokenizer...")
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-
-            logger.info("Loading model...")
-            self.model = AutoModel.from_pretrained(self.model_name)
-            self.model.to(self.device)
-            self.model.eval()
+            # Ładowanie wag blokuje, więc odbywa się w wątku roboczym
+            await self._batcher.run_in_worker(self._load_model)
 
             self.is_initialized = True
             logger.info("MMLW model initialized successfully")
@@ -87,6 +105,58 @@ class MMLWEmbeddingClient:
             self.is_initialized = False
             return False
 
+    def _load_model(self) -> None:
+        """Załaduj tokenizer i model (wywoływane w wątku roboczym)"""
+        logger.info("Loading tokenizer...")
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+
+        if self.backend == "onnx":
+            logger.info("Loading ONNX model...")
+            try:
+                self.model = load_onnx_session(
+                    self.model_name,
+                    settings.MMLW_ONNX_CACHE_DIR,
+                    quantize=settings.MMLW_ONNX_QUANTIZE,
+                    intra_op_threads=settings.MMLW_ONNX_INTRA_OP_THREADS,
+                )
+            except Exception as e:
+                logger.error(f"Failed to prepare MMLW ONNX model: {e}")
+                self.model = None
+            if self.model is not None:
+                return
+            logger.warning("MMLW ONNX backend unavailable, falling back to PyTorch")
+            self.backend = "torch"
+
+        logger.info("Loading model...")
+        self.model = self._load_torch_model()
+
+    def _load_torch_model(self) -> Any:
+        model = AutoModel.from_pretrained(self.model_name)
+        model.to(self.device)
+        model.eval()
+        return model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """Jeden przebieg modelu dla listy tekstów (wywoływane w wątku roboczym)"""
+        if self.backend == "onnx":
+            return self.model.encode(self.tokenizer, texts)
+        return self._encode_torch(self.model, texts)
+
+    def _encode_torch(self, model: Any, texts: List[str]) -> List[List[float]]:
+        inputs = self.tokenizer(
+            texts, return_tensors="pt", max_length=512, truncation=True, padding=True
+        )
+
+        # Przenieś na odpowiednie urządzenie
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+        with torch.no_grad():
+            outputs = model(**inputs)
+            # Użyj [CLS] token jako reprezentację całego tekstu
+            embeddings = outputs.last_hidden_state[:, 0, :].cpu().numpy()
+
+        return embeddings.tolist()
+
     async def initialize(self) -> None:
         """Inicjalizacja modelu MMLW (deprecated - użyj _ensure_initialized)"""
         return await self._ensure_initialized()
@@ -107,21 +177,8 @@ class MMLWEmbeddingClient:
             return []
 
         try:
-            # Tokenizacja tekstu
-            inputs = self.tokenizer(
-                text, return_tensors="pt", max_length=512, truncation=True, padding=True
-            )
-
-            # Przenieś na odpowiednie urządzenie
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-            # Generuj embedding
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                # Użyj [CLS] token jako reprezentację całego tekstu
-                embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-
-            return embedding[0].tolist()
+            # Zapytanie trafia do mikro-batcha razem z równoległymi wywołaniami
+            return await self._batcher.submit(text)
 
         except Exception as e:
             logger.error(f"Error generating MMLW embedding: {e}")
@@ -145,36 +202,13 @@ class MMLWEmbeddingClient:
             logger.error("MMLW model not initialized or tokenizer/model is None")
             return [[] for _ in texts]
 
-        embeddings = []
-
         try:
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i : i + batch_size]
-
-                # Tokenizacja batcha
-                inputs = self.tokenizer(
-                    batch_texts,
-                    return_tensors="pt",
-                    max_length=512,
-                    truncation=True,
-                    padding=True,
-                )
-
-                # Przenieś na odpowiednie urządzenie
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-                # Generuj embeddingi
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                    batch_embeddings = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-
-                embeddings.extend(batch_embeddings.tolist())
+            # Teksty sortowane po długości i kodowane kubełkami w wątku roboczym
+            return await self._batcher.encode(texts, bucket_size=batch_size)
 
         except Exception as e:
             logger.error(f"Error generating MMLW batch embeddings: {e}")
-            embeddings = [[] for _ in texts]
-
-        return embeddings
+            return [[] for _ in texts]
 
     def get_embedding_dimension(self) -> int:
         """Zwraca wymiar embeddingów (768 dla MMLW)"""
@@ -184,10 +218,50 @@ class MMLWEmbeddingClient:
         """Sprawdza czy model jest dostępny i zainicjalizowany"""
         return TRANSFORMERS_AVAILABLE and self.is_initialized
 
+    async def check_onnx_parity(
+        self, queries: List[str], documents: List[str], k: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Porównuje wyszukiwanie modelu ONNX int8 z oryginalnym modelem fp32
+
+        Args:
+            queries: Zapytania testowe
+            documents: Dokumenty, wśród których wyszukiwane są odpowiedzi
+            k: Liczba porównywanych wyników na zapytanie
+
+        Returns:
+            Słownik z recall@k, podobieństwem kosinusowym i flagą "passed"
+        """
+        if self.backend != "onnx":
+            raise RuntimeError("MMLW client is not using the ONNX backend")
+        if not await self._ensure_initialized():
+            raise RuntimeError("MMLW model not initialized")
+
+        def compare() -> Dict[str, Any]:
+            reference = self._load_torch_model()
+            return recall_parity(
+                lambda texts: self._encode_torch(reference, texts),
+                self._encode,
+                queries,
+                documents,
+                k,
+            )
+
+        report = await self._batcher.run_in_worker(compare)
+        report["passed"] = report[f"recall_at_{min(k, len(documents))}"] >= (
+            settings.MMLW_ONNX_MIN_RECALL
+        )
+        return report
+
+    async def shutdown(self) -> None:
+        """Zatrzymuje kolektor mikro-batchy"""
+        await self._batcher.stop()
+
     async def health_check(self) -> Dict[str, Any]:
         """Sprawdza stan modelu"""
         return {
             "model_name": self.model_name,
+            "backend": self.backend,
             "is_available": self.is_available(),
             "transformers_available": TRANSFORMERS_AVAILABLE,
             "is_initialized": self.is_initialized,
@@ -199,6 +273,7 @@ class MMLWEmbeddingClient:
                 if self._initialization_task
                 else False
             ),
+            "batching": self._batcher.get_stats(),
         }
 
 
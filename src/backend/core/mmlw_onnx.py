@@ -0,0 +1,182 @@
+"""
+ONNX Runtime backend dla modelu MMLW (int8, CPU)
+
+Model jest jednorazowo eksportowany do ONNX, kwantyzowany dynamicznie do int8
+i zapisywany w katalogu cache; kolejne starty ładują gotowy artefakt. Sesja
+ONNX Runtime ma ustawioną liczbę wątków intra-op. ``recall_parity`` porównuje
+wyniki wyszukiwania wersji int8 z oryginalnym modelem fp32.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import numpy as np
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+    logging.warning("onnxruntime not available. MMLW ONNX backend will not work.")
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[List[str]], List[List[float]]]
+
+
+def onnx_artifact_path(model_name: str, cache_dir: str, quantize: bool = True) -> Path:
+    """Path of the cached ONNX artifact of a model"""
+    filename = "model.int8.onnx" if quantize else "model.onnx"
+    return Path(cache_dir) / model_name.replace("/", "__") / filename
+
+
+def export_onnx_model(model_name: str, cache_dir: str, quantize: bool = True) -> Path:
+    """
+    Export the model to ONNX once (optionally int8-quantized) and cache it on disk
+
+    Args:
+        model_name: Hugging Face model name
+        cache_dir: Directory of cached ONNX artifacts
+        quantize: Apply dynamic int8 quantization of the weights
+
+    Returns:
+        Path of the ONNX artifact
+    """
+    target = onnx_artifact_path(model_name, cache_dir, quantize)
+    if target.exists():
+        return target
+
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fp32_path = onnx_artifact_path(model_name, cache_dir, quantize=False)
+    if not fp32_path.exists():
+        logger.info(f"Exporting {model_name} to ONNX...")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+        sample = tokenizer(["przykładowe zapytanie"], return_tensors="pt")
+        tmp_path = fp32_path.with_suffix(".onnx.tmp")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"]),
+                str(tmp_path),
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"},
+                },
+                opset_version=17,
+            )
+        os.replace(tmp_path, fp32_path)
+
+    if quantize:
+        logger.info(f"Quantizing {fp32_path} to int8...")
+        tmp_path = target.with_suffix(".onnx.tmp")
+        quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+        os.replace(tmp_path, target)
+
+    logger.info(f"ONNX artifact cached at {target}")
+    return target
+
+
+class OnnxEmbeddingSession:
+    """ONNX Runtime session returning [CLS] embeddings like the PyTorch model"""
+
+    def __init__(self, model_path: Path, intra_op_threads: int = 0) -> None:
+        """
+        Initialize ONNX session
+
+        Args:
+            model_path: Path of the ONNX artifact
+            intra_op_threads: Threads used inside one operator (0 = all cores)
+        """
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or os.cpu_count() or 1
+        # Batches already run one at a time on the embedding worker thread
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.model_path = model_path
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, tokenizer: Any, texts: List[str]) -> List[List[float]]:
+        inputs = tokenizer(
+            texts, return_tensors="np", max_length=512, truncation=True, padding=True
+        )
+        feed = {
+            name: value.astype(np.int64)
+            for name, value in inputs.items()
+            if name in self._input_names
+        }
+        last_hidden_state = self.session.run(None, feed)[0]
+        return last_hidden_state[:, 0, :].tolist()
+
+
+def recall_parity(
+    reference: EncodeFn,
+    candidate: EncodeFn,
+    queries: List[str],
+    documents: List[str],
+    k: int = 5,
+) -> Dict[str, float]:
+    """
+    Compare retrieval of a candidate encoder against the reference (fp32) one
+
+    Args:
+        reference: Encoder producing reference embeddings
+        candidate: Encoder under test (e.g. int8 ONNX)
+        queries: Search queries
+        documents: Documents searched with cosine similarity
+        k: Number of retrieved documents compared per query
+
+    Returns:
+        Mean recall@k of the candidate and mean cosine between both embeddings
+    """
+
+    def normalize(vectors: List[List[float]]) -> "np.ndarray":
+        array = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(array, axis=1, keepdims=True)
+        return array / np.maximum(norms, 1e-12)
+
+    k = min(k, len(documents))
+    ref_queries, ref_docs = normalize(reference(queries)), normalize(reference(documents))
+    cand_queries, cand_docs = normalize(candidate(queries)), normalize(candidate(documents))
+
+    ref_top = np.argsort(-(ref_queries @ ref_docs.T), axis=1)[:, :k]
+    cand_top = np.argsort(-(cand_queries @ cand_docs.T), axis=1)[:, :k]
+    recalls = [
+        len(set(ref_row) & set(cand_row)) / k
+        for ref_row, cand_row in zip(ref_top.tolist(), cand_top.tolist())
+    ]
+    cosines = np.sum(
+        np.vstack([ref_queries, ref_docs]) * np.vstack([cand_queries, cand_docs]), axis=1
+    )
+    return {
+        f"recall_at_{k}": float(np.mean(recalls)),
+        "mean_cosine": float(np.mean(cosines)),
+        "min_cosine": float(np.min(cosines)),
+    }
+
+
+def load_onnx_session(
+    model_name: str,
+    cache_dir: str,
+    quantize: bool = True,
+    intra_op_threads: int = 0,
+) -> Optional[OnnxEmbeddingSession]:
+    """Export (if needed) and open the ONNX model, None when unavailable"""
+    if not ONNXRUNTIME_AVAILABLE:
+        return None
+    path = export_onnx_model(model_name, cache_dir, quantize)
+    return OnnxEmbeddingSession(path, intra_op_threads)
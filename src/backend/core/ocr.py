@@ -1,10 +1,10 @@
 import io
 import logging
-import tempfile
+import re
 import tracemalloc
 import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 import cv2
 import numpy as np
 
@@ -14,6 +14,9 @@ from PIL import Image, ImageEnhance
 from pydantic import BaseModel
 
 from backend.core.decorators import handle_exceptions
+from backend.core.ocr_pool import OCRWorkerPool, ocr_worker_pool
+from backend.core.tesseract_engine import tesseract_engine
+from backend.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -26,14 +29,66 @@ class OCRResult(BaseModel):
     metadata: Dict[str, Any] = {}
 
 
+class OCRCascadeStats:
+    """Czasy i skuteczność etapów kaskadowego OCR (wspólne dla wszystkich instancji)"""
+
+    def __init__(self) -> None:
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, accepted: bool) -> None:
+        with self._lock:
+            entry = self._stages.setdefault(
+                stage, {"runs": 0, "accepted": 0, "total_seconds": 0.0}
+            )
+            entry["runs"] += 1
+            entry["accepted"] += int(accepted)
+            entry["total_seconds"] += seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {
+                    "runs": entry["runs"],
+                    "accepted": entry["accepted"],
+                    "hit_rate": round(entry["accepted"] / entry["runs"], 3),
+                    "avg_ms": round(1000 * entry["total_seconds"] / entry["runs"], 1),
+                }
+                for stage, entry in self._stages.items()
+            }
+
+
+ocr_cascade_stats = OCRCascadeStats()
+
+
+def _pixmap_array(pix: "fitz.Pixmap") -> np.ndarray:
+    """Widok numpy na piksele pixmapy PyMuPDF (H x W x n, bez kopiowania)"""
+    return np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(
+        pix.height, pix.width, pix.n
+    )
+
+
 class OCRProcessor:
     """Główna klasa do przetwarzania OCR z optymalizacją dla polskich paragonów"""
 
     def __init__(
-        self, languages: List[str] = ["eng"], tesseract_config: Optional[str] = None
+        self,
+        languages: List[str] = ["eng"],
+        tesseract_config: Optional[str] = None,
+        pool: Optional[OCRWorkerPool] = None,
+        mode: Optional[str] = None,
     ) -> None:
         self.languages = languages
         self.default_config = tesseract_config or self._get_default_receipt_config()
+        # "tiered": szybka ścieżka i droższe etapy tylko przy niskiej pewności, "full": zawsze pełny preprocessing
+        self.mode = mode or settings.OCR_PREPROCESSING_MODE
+        # Pula procesów dla stron PDF i partii obrazów (None = w bieżącym procesie)
+        self.pool = pool or (ocr_worker_pool if ocr_worker_pool.enabled else None)
+        self._tesseract_config: Optional[str] = None
 
     def _get_default_receipt_config(self) -> str:
         """Generuje domyślną konfigurację Tesseract zoptymalizowaną dla paragonów"""
@@ -41,6 +96,12 @@ class OCRProcessor:
 
     def _get_tesseract_config(self) -> str:
         """Generuje konfigurację Tesseract z uwzględnieniem języków i optymalizacji dla paragonów"""
+        # Sprawdzenie dostępnych języków uruchamia proces tesseract - raz na instancję
+        if self._tesseract_config is None:
+            self._tesseract_config = self._build_tesseract_config()
+        return self._tesseract_config
+
+    def _build_tesseract_config(self) -> str:
         # Specjalna konfiguracja dla paragonów polskich sklepów - ulepszona zgodnie z rekomendacjami audytu
         receipt_config = (
             "--oem 1 --psm 6 "  # LSTM engine, uniform block of text
@@ -286,35 +347,14 @@ class OCRProcessor:
             if len(img_array.shape) == 3:
                 img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
             
-            # 1. Wykryj kontur paragonu
-            contour = self._detect_receipt_contour(img_array)
-            
-            # 2. Korekcja perspektywy jeśli wykryto kontur
-            if contour is not None:
-                img_array = self._perspective_correction(img_array, contour)
-                logger.info("Zastosowano korekcję perspektywy")
-            
-            # 3. Skaluj do 300 DPI
-            img_array = self._scale_to_300_dpi(img_array)
-            logger.info("Przeskalowano do 300 DPI")
-            
-            # 4. Ulepsz kontrast i ostrość
-            img_array = self._enhance_contrast_and_sharpness(img_array)
-            logger.info("Ulepszono kontrast i ostrość")
-            
-            # 5. Adaptacyjny threshold
-            img_array = self._adaptive_threshold(img_array)
-            logger.info("Zastosowano adaptacyjny threshold")
-            
             # Konwersja z powrotem do PIL Image
-            processed_image = Image.fromarray(img_array)
+            processed_image = Image.fromarray(self._preprocess_array(img_array))
             
             logger.info(
                 "Preprocessing obrazu zakończony",
                 extra={
                     "original_size": image.size,
                     "processed_size": processed_image.size,
-                    "contour_detected": contour is not None
                 }
             )
             
@@ -324,6 +364,138 @@ class OCRProcessor:
             logger.error(f"Błąd podczas preprocessingu obrazu: {e}")
             return image
 
+    def _preprocess_array(self, img_array: np.ndarray) -> np.ndarray:
+        """Preprocessing obrazu w formacie OpenCV (BGR lub skala szarości)"""
+        # 1. Wykryj kontur paragonu
+        contour = self._detect_receipt_contour(img_array)
+        
+        # 2. Korekcja perspektywy jeśli wykryto kontur
+        if contour is not None:
+            img_array = self._perspective_correction(img_array, contour)
+            logger.info("Zastosowano korekcję perspektywy")
+        
+        # 3. Skaluj do 300 DPI
+        img_array = self._scale_to_300_dpi(img_array)
+        logger.info("Przeskalowano do 300 DPI")
+        
+        # 4. Ulepsz kontrast i ostrość
+        img_array = self._enhance_contrast_and_sharpness(img_array)
+        logger.info("Ulepszono kontrast i ostrość")
+        
+        # 5. Adaptacyjny threshold
+        img_array = self._adaptive_threshold(img_array)
+        logger.info("Zastosowano adaptacyjny threshold")
+        
+        return img_array
+
+    def _image_to_array(self, image: Image.Image) -> Optional[np.ndarray]:
+        """Konwersja PIL Image do formatu OpenCV (BGR lub skala szarości)"""
+        try:
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            img_array = np.asarray(image)
+            if img_array.ndim == 3:
+                return cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+            if img_array.ndim == 2:
+                return img_array
+        except Exception as e:
+            logger.warning(f"Nie udało się przekonwertować obrazu: {e}")
+        return None
+
+    def _fast_preprocess(self, img_array: np.ndarray) -> np.ndarray:
+        """Szybka ścieżka: skala szarości + Otsu w natywnej rozdzielczości"""
+        gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY) if img_array.ndim == 3 else img_array
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary
+
+    @staticmethod
+    def _with_psm(config: str, psm: int) -> str:
+        config = re.sub(r"--psm \d+", f"--psm {psm}", config)
+        return re.sub(r"tessedit_pageseg_mode=\d+", f"tessedit_pageseg_mode={psm}", config)
+
+    def _recognize_tiered(
+        self,
+        img_array: np.ndarray,
+        config: Optional[str],
+        original_metadata: Dict[str, Any],
+        start_time: float,
+        source: str,
+        timeout: Optional[float] = None,
+    ) -> OCRResult:
+        """
+        Kaskada OCR z wczesnym wyjściem
+
+        Etapy (każdy tylko gdy poprzedni dał pewność poniżej progu):
+        fast (Otsu, natywna rozdzielczość) -> full (kontur, perspektywa, 300 DPI,
+        CLAHE, adaptive threshold) -> alternatywne tryby PSM na obrazie z etapu full.
+        Zwraca pierwszy wynik powyżej progu albo najlepszy ze wszystkich etapów.
+        Strony PDF nie muszą być paragonami (ocena pewności jest pod paragony),
+        więc przechodzą co najwyżej OCR_CASCADE_PDF_MAX_STAGES etapów.
+        """
+        # Import lokalny - pakiet anti_hallucination importuje ten moduł
+        from backend.agents.anti_hallucination.confidence_scorer import ConfidenceScorer
+
+        scorer = ConfidenceScorer()
+        threshold = settings.OCR_CASCADE_MIN_CONFIDENCE
+        base_config = config or self._get_tesseract_config()
+        full: Dict[str, np.ndarray] = {}
+
+        def full_preprocess() -> np.ndarray:
+            if "array" not in full:
+                full["array"] = self._preprocess_array(img_array)
+            return full["array"]
+
+        stages = [
+            ("fast", lambda: self._fast_preprocess(img_array), base_config),
+            ("full", full_preprocess, base_config),
+        ]
+        # Alternatywne PSM tylko dla domyślnej konfiguracji (własnej nie zmieniamy)
+        if config is None:
+            stages += [
+                (f"psm_{psm}", full_preprocess, self._with_psm(base_config, psm))
+                for psm in settings.OCR_CASCADE_ALT_PSM
+            ]
+        if source == "pdf_page":
+            stages = stages[: max(1, settings.OCR_CASCADE_PDF_MAX_STAGES)]
+
+        best: Optional[OCRResult] = None
+        best_stage, best_score = "", -1.0
+        trace = []
+        for stage, prepare, stage_config in stages:
+            stage_start = time.perf_counter()
+            try:
+                prepared = prepare()
+            except Exception as e:
+                logger.warning(f"Etap OCR '{stage}' pominięty - błąd preprocessingu: {e}")
+                continue
+            result = self._recognize(
+                prepared, stage_config, original_metadata, [stage], start_time, source, timeout
+            )
+            score = scorer.calculate_ocr_confidence(result.text).overall_confidence
+            elapsed = time.perf_counter() - stage_start
+            accepted = score >= threshold
+            ocr_cascade_stats.record(stage, elapsed, accepted)
+            trace.append({"stage": stage, "score": round(score, 3), "seconds": round(elapsed, 3)})
+            if score > best_score:
+                best, best_stage, best_score = result, stage, score
+            if accepted:
+                break
+
+        if best is None:
+            raise RuntimeError("Wszystkie etapy preprocessingu OCR zakończyły się błędem")
+
+        best.metadata["processing_time_seconds"] = time.time() - start_time
+        best.metadata["cascade"] = {
+            "stage": best_stage,
+            "score": round(best_score, 3),
+            "threshold": threshold,
+            "stages": trace,
+        }
+        logger.info(
+            f"OCR kaskada: etap '{best_stage}' (pewność {best_score:.2f}, etapów: {len(trace)})"
+        )
+        return best
+
     def process_image(
         self, image_bytes: bytes, config: Optional[str] = None
     ) -> OCRResult:
@@ -340,143 +512,242 @@ class OCRProcessor:
                     "format": image.format,
                     "file_size_bytes": len(image_bytes)
                 }
+
+                if self.mode == "tiered":
+                    img_array = self._image_to_array(image)
+                    if img_array is not None:
+                        return self._recognize_tiered(
+                            img_array, config, original_metadata, start_time, source="image"
+                        )
                 
                 # Preprocessing obrazu dla lepszego OCR
                 processed_image = self._preprocess_receipt_image(image)
                 preprocessing_steps.append("image_preprocessing")
-                
-                # Log preprocessing metadata
-                preprocessing_metadata = {
-                    "original_size": original_metadata["size"],
-                    "processed_size": processed_image.size,
-                    "preprocessing_steps": preprocessing_steps
-                }
 
-                config = config or self._get_tesseract_config()
-                
-                # Log Tesseract configuration
-                logger.info(
-                    "Rozpoczynam OCR z ulepszoną konfiguracją",
-                    extra={
-                        "tesseract_config": config,
-                        "languages": self.languages,
-                        "preprocessing_applied": True
-                    }
-                )
-                
-                data = pytesseract.image_to_data(
-                    processed_image, config=config, output_type=pytesseract.Output.DICT
+                return self._recognize(
+                    processed_image,
+                    config,
+                    original_metadata,
+                    preprocessing_steps,
+                    start_time,
+                    source="image",
                 )
+        except Exception as e:
+            return self._error_result(e, start_time, preprocessing_steps)
 
-                text = "\n".join([line for line in data["text"] if line.strip()])
-                avg_conf = (
-                    sum(conf for conf in data["conf"] if conf > 0) / len(data["conf"])
-                    if data["conf"]
-                    else 0
-                )
+    def process_array(
+        self, array: np.ndarray, config: Optional[str] = None, source: str = "image"
+    ) -> OCRResult:
+        """
+        Przetwarza surowe piksele (H x W x 3/4 RGB(A) lub H x W) bez dekodowania pliku
 
-                # Calculate processing time
-                processing_time = time.time() - start_time
-                
-                # Enhanced metadata
-                enhanced_metadata = {
-                    "source": "image",
-                    "pages": 1,
-                    "language": self.languages[0] if self.languages else "unknown",
-                    "preprocessing_applied": True,
-                    "preprocessing_steps": preprocessing_steps,
-                    "original_metadata": original_metadata,
-                    "preprocessing_metadata": preprocessing_metadata,
-                    "tesseract_config": config,
-                    "processing_time_seconds": processing_time,
-                    "text_blocks": len([line for line in data["text"] if line.strip()]),
-                    "confidence_distribution": {
-                        "high": len([conf for conf in data["conf"] if conf > 80]),
-                        "medium": len([conf for conf in data["conf"] if 50 <= conf <= 80]),
-                        "low": len([conf for conf in data["conf"] if conf < 50])
-                    }
-                }
+        Używane przez pulę procesów OCR - strony PDF przychodzą jako bufory pikseli.
+        """
+        start_time = time.time()
+        preprocessing_steps = []
 
-                logger.info(
-                    "OCR przetwarzanie obrazu zakończone pomyślnie",
-                    extra={
-                        "confidence": avg_conf,
-                        "text_length": len(text),
-                        "language": self.languages[0] if self.languages else "unknown",
-                        "processing_time_seconds": processing_time,
-                        "preprocessing_steps": preprocessing_steps,
-                        "text_blocks": enhanced_metadata["text_blocks"]
-                    },
-                )
+        try:
+            original_metadata = {
+                "size": (array.shape[1], array.shape[0]),
+                "mode": "L" if array.ndim == 2 else ("RGBA" if array.shape[2] == 4 else "RGB"),
+                "format": "raw",
+                "file_size_bytes": array.nbytes,
+            }
+
+            if array.ndim == 3:
+                conversion = cv2.COLOR_RGBA2BGR if array.shape[2] == 4 else cv2.COLOR_RGB2BGR
+                img_array = cv2.cvtColor(array, conversion)
+            else:
+                img_array = array
 
-                return OCRResult(
-                    text=text,
-                    confidence=avg_conf,
-                    metadata=enhanced_metadata,
+            if self.mode == "tiered":
+                return self._recognize_tiered(
+                    img_array, config, original_metadata, start_time, source=source
                 )
-        except Exception as e:
-            processing_time = time.time() - start_time
-            logger.error(
-                f"OCR image processing error: {e}",
-                extra={
-                    "processing_time_seconds": processing_time,
-                    "preprocessing_steps": preprocessing_steps,
-                    "error_type": type(e).__name__
-                }
-            )
-            return OCRResult(
-                text="", 
-                confidence=0, 
-                metadata={
-                    "error": str(e),
-                    "processing_time_seconds": processing_time,
-                    "preprocessing_steps": preprocessing_steps
-                }
+
+            try:
+                img_array = self._preprocess_array(img_array)
+            except Exception as e:
+                logger.error(f"Błąd podczas preprocessingu obrazu: {e}")
+            preprocessing_steps.append("image_preprocessing")
+
+            # Tablica trafia do Tesseract bez konwersji do PIL
+            return self._recognize(
+                img_array,
+                config,
+                original_metadata,
+                preprocessing_steps,
+                start_time,
+                source=source,
             )
+        except Exception as e:
+            return self._error_result(e, start_time, preprocessing_steps)
+
+    def _recognize(
+        self,
+        processed_image: Union[Image.Image, np.ndarray],
+        config: Optional[str],
+        original_metadata: Dict[str, Any],
+        preprocessing_steps: List[str],
+        start_time: float,
+        source: str,
+        timeout: Optional[float] = None,
+    ) -> OCRResult:
+        """Uruchamia Tesseract na przetworzonym obrazie i buduje OCRResult"""
+        if isinstance(processed_image, np.ndarray):
+            processed_size = (processed_image.shape[1], processed_image.shape[0])
+        else:
+            processed_size = processed_image.size
+
+        # Log preprocessing metadata
+        preprocessing_metadata = {
+            "original_size": original_metadata["size"],
+            "processed_size": processed_size,
+            "preprocessing_steps": preprocessing_steps
+        }
+
+        config = config or self._get_tesseract_config()
+        
+        # Log Tesseract configuration
+        logger.info(
+            "Rozpoczynam OCR z ulepszoną konfiguracją",
+            extra={
+                "tesseract_config": config,
+                "languages": self.languages,
+                "preprocessing_applied": True
+            }
+        )
+        
+        data = _image_to_data(processed_image, config, timeout or settings.OCR_JOB_TIMEOUT)
+
+        text = "\n".join([line for line in data["text"] if line.strip()])
+        avg_conf = (
+            sum(conf for conf in data["conf"] if conf > 0) / len(data["conf"])
+            if data["conf"]
+            else 0
+        )
+
+        # Calculate processing time
+        processing_time = time.time() - start_time
+        
+        # Enhanced metadata
+        enhanced_metadata = {
+            "source": source,
+            "pages": 1,
+            "language": self.languages[0] if self.languages else "unknown",
+            "preprocessing_applied": True,
+            "preprocessing_steps": preprocessing_steps,
+            "original_metadata": original_metadata,
+            "preprocessing_metadata": preprocessing_metadata,
+            "tesseract_config": config,
+            "processing_time_seconds": processing_time,
+            "text_blocks": len([line for line in data["text"] if line.strip()]),
+            "confidence_distribution": {
+                "high": len([conf for conf in data["conf"] if conf > 80]),
+                "medium": len([conf for conf in data["conf"] if 50 <= conf <= 80]),
+                "low": len([conf for conf in data["conf"] if conf < 50])
+            }
+        }
+
+        logger.info(
+            "OCR przetwarzanie obrazu zakończone pomyślnie",
+            extra={
+                "confidence": avg_conf,
+                "text_length": len(text),
+                "language": self.languages[0] if self.languages else "unknown",
+                "processing_time_seconds": processing_time,
+                "preprocessing_steps": preprocessing_steps,
+                "text_blocks": enhanced_metadata["text_blocks"]
+            },
+        )
+
+        return OCRResult(
+            text=text,
+            confidence=avg_conf,
+            metadata=enhanced_metadata,
+        )
+
+    def _error_result(
+        self, error: Exception, start_time: float, preprocessing_steps: List[str]
+    ) -> OCRResult:
+        processing_time = time.time() - start_time
+        logger.error(
+            f"OCR image processing error: {error}",
+            extra={
+                "processing_time_seconds": processing_time,
+                "preprocessing_steps": preprocessing_steps,
+                "error_type": type(error).__name__
+            }
+        )
+        return OCRResult(
+            text="", 
+            confidence=0, 
+            metadata={
+                "error": str(error),
+                "processing_time_seconds": processing_time,
+                "preprocessing_steps": preprocessing_steps
+            }
+        )
 
     def process_pdf(self, pdf_bytes: bytes, config: Optional[str] = None) -> OCRResult:
         """Przetwarza plik PDF na tekst z context managerem i cleanup"""
+        if self.pool is not None:
+            return self._pdf_result(
+                self.pool.ocr_pdfs([pdf_bytes], self.languages, config)[0]
+            )
         try:
-            full_text = []
-            with tempfile.NamedTemporaryFile(delete=True, suffix=".pdf") as tmp_pdf:
-                tmp_pdf.write(pdf_bytes)
-                tmp_pdf.flush()
-                pdf_document = fitz.open(tmp_pdf.name)
-
+            page_results = []
+            # PyMuPDF czyta dokument bezpośrednio z pamięci (bez pliku tymczasowego)
+            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+            try:
                 for page_num in range(len(pdf_document)):
                     page = pdf_document.load_page(page_num)
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                    with Image.frombytes(
-                        "RGB", (pix.width, pix.height), pix.samples
-                    ) as image:
-                        page_result = self.process_image(image.tobytes(), config=config)
-                        full_text.append(page_result.text)
-
-            logger.info(
-                "OCR przetwarzanie PDF zakończone",
-                extra={
-                    "pages": len(full_text),
-                    "language": self.languages[0] if self.languages else "unknown",
-                },
-            )
-
-            return OCRResult(
-                text="\n".join(full_text),
-                confidence=0,  # PDF confidence calculation would be more complex
-                metadata={
-                    "source": "pdf",
-                    "pages": len(full_text),
-                    "language": self.languages[0] if self.languages else "unknown",
-                },
-            )
+                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)
+                    # Piksele strony idą do preprocessingu jako widok na bufor pixmapy
+                    page_results.append(
+                        self.process_array(_pixmap_array(pix), config=config, source="pdf_page")
+                    )
+                    del pix
+            finally:
+                pdf_document.close()
+
+            return self._pdf_result(page_results)
         except Exception as e:
             logger.error(f"OCR PDF processing error: {e}")
             return OCRResult(text="", confidence=0, metadata={"error": str(e)})
 
+    def _pdf_result(self, page_results: List[OCRResult]) -> OCRResult:
+        """Łączy wyniki OCR stron PDF w jeden wynik"""
+        errors = [r.metadata["error"] for r in page_results if "error" in r.metadata]
+        if page_results and len(errors) == len(page_results):
+            return OCRResult(text="", confidence=0, metadata={"error": errors[0]})
+
+        logger.info(
+            "OCR przetwarzanie PDF zakończone",
+            extra={
+                "pages": len(page_results),
+                "language": self.languages[0] if self.languages else "unknown",
+            },
+        )
+        return OCRResult(
+            text="\n".join(r.text for r in page_results),
+            confidence=0,  # PDF confidence calculation would be more complex
+            metadata={
+                "source": "pdf",
+                "pages": len(page_results),
+                "language": self.languages[0] if self.languages else "unknown",
+                "failed_pages": len(errors),
+            },
+        )
+
     def process_images_batch(
         self, images: List[bytes], config: Optional[str] = None
     ) -> List[OCRResult]:
         """Batch processing obrazów z monitoringiem pamięci"""
+        if self.pool is not None and len(images) > 1:
+            logger.info(f"Przetwarzanie {len(images)} obrazów w puli procesów OCR")
+            return self.pool.ocr_images(images, self.languages, config)
+
         tracemalloc.start()
         results = []
         for i, img_bytes in enumerate(images):
@@ -494,6 +765,14 @@ class OCRProcessor:
         self, pdfs: List[bytes], config: Optional[str] = None
     ) -> List[OCRResult]:
         """Batch processing PDF z monitoringiem pamięci"""
+        if self.pool is not None:
+            # Strony wszystkich dokumentów trafiają do puli naraz
+            logger.info(f"Przetwarzanie {len(pdfs)} PDF w puli procesów OCR")
+            return [
+                self._pdf_result(pages)
+                for pages in self.pool.ocr_pdfs(pdfs, self.languages, config)
+            ]
+
         tracemalloc.start()
         results = []
         for i, pdf_bytes in enumerate(pdfs):
@@ -508,6 +787,35 @@ class OCRProcessor:
         return results
 
 
+def _image_to_data(
+    image: Union[Image.Image, np.ndarray], config: Optional[str], timeout: float
+) -> Dict[str, List[Any]]:
+    """Word-level OCR data from a persistent Tesseract handle, or a tesseract subprocess"""
+    if tesseract_engine.available:
+        return tesseract_engine.image_to_data(image, config=config, timeout=timeout)
+    try:
+        return pytesseract.image_to_data(
+            image, config=config, output_type=pytesseract.Output.DICT, timeout=timeout
+        )
+    except RuntimeError as e:
+        if "timeout" in str(e).lower():
+            raise TimeoutError(f"OCR processing timed out after {timeout} seconds") from e
+        raise
+
+
+def _image_to_string(image: Image.Image, config: str, timeout: float) -> str:
+    """Recognized text from a persistent Tesseract handle, or a tesseract subprocess"""
+    if tesseract_engine.available:
+        return tesseract_engine.image_to_string(image, config=config, timeout=timeout)
+    try:
+        return pytesseract.image_to_string(image, config=config, timeout=timeout)
+    except RuntimeError as e:
+        # pytesseract zabija proces tesseract i zgłasza RuntimeError
+        if "timeout" in str(e).lower():
+            raise TimeoutError(f"OCR processing timed out after {timeout} seconds") from e
+        raise
+
+
 @handle_exceptions(max_retries=1)
 def _extract_text_from_image_obj(
     image: Image.Image, config: Optional[str] = None, timeout: int = 25
@@ -521,50 +829,74 @@ def _extract_text_from_image_obj(
         or r"--oem 3 --psm 6 -l eng -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzĄĆĘŁŃÓŚŹŻąćęłńóśźż.,:-/%()[] "
     )
     
-    def ocr_with_timeout():
-        try:
-            return pytesseract.image_to_string(image, config=custom_config)
-        except Exception as e:
-            # If language-specific config fails, try without language specification
-            if "tessdata" in str(e) and "pol.traineddata" in str(e):
-                logger.warning("Polish language data not found, falling back to English")
-                fallback_config = r"--oem 3 --psm 6 -l eng -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzĄĆĘŁŃÓŚŹŻąćęłńóśźż.,:-/%()[] "
-                try:
-                    return pytesseract.image_to_string(image, config=fallback_config)
-                except Exception as e2:
-                    logger.warning("English language also failed, trying without language specification")
-                    basic_config = r"--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzĄĆĘŁŃÓŚŹŻąćęłńóśźż.,:-/%()[] "
-                    return pytesseract.image_to_string(image, config=basic_config)
-            else:
-                # For other errors, try basic config
-                logger.warning(f"OCR failed with custom config, trying basic config: {e}")
-                basic_config = r"--oem 3 --psm 6"
-                return pytesseract.image_to_string(image, config=basic_config)
-    
-    # Run OCR with timeout using threading
-    result = [None]
-    exception = [None]
-    
-    def run_ocr():
-        try:
-            result[0] = ocr_with_timeout()
-        except Exception as e:
-            exception[0] = e
-    
-    thread = threading.Thread(target=run_ocr)
-    thread.daemon = True
-    thread.start()
-    thread.join(timeout=timeout)
-    
-    if thread.is_alive():
+    # Limit czasu egzekwuje sam Tesseract (tesserocr) lub pytesseract - bez
+    # dodatkowego wątku, który po timeoucie dalej trzymał proces tesseract
+    try:
+        return _image_to_string(image, custom_config, timeout)
+    except TimeoutError:
         logger.error(f"OCR processing timed out after {timeout} seconds")
-        raise TimeoutError(f"OCR processing timed out after {timeout} seconds")
-    
-    if exception[0]:
-        logger.error(f"OCR processing failed: {exception[0]}")
-        raise exception[0]
-    
-    return result[0]
+        raise
+    except Exception as e:
+        # If language-specific config fails, try without language specification
+        if "tessdata" in str(e) and "pol.traineddata" in str(e):
+            logger.warning("Polish language data not found, falling back to English")
+            fallback_config = r"--oem 3 --psm 6 -l eng -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzĄĆĘŁŃÓŚŹŻąćęłńóśźż.,:-/%()[] "
+            try:
+                return _image_to_string(image, fallback_config, timeout)
+            except Exception as e2:
+                logger.warning("English language also failed, trying without language specification")
+                basic_config = r"--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzĄĆĘŁŃÓŚŹŻąćęłńóśźż.,:-/%()[] "
+                return _image_to_string(image, basic_config, timeout)
+        else:
+            # For other errors, try basic config
+            logger.warning(f"OCR failed with custom config, trying basic config: {e}")
+            basic_config = r"--oem 3 --psm 6"
+            return _image_to_string(image, basic_config, timeout)
+
+
+def _recognize_receipt_image(
+    image: Union[Image.Image, np.ndarray], config: Optional[str], timeout: float, source: str
+) -> str:
+    """
+    OCR of a receipt image through the tiered cascade (OCR_PREPROCESSING_MODE)
+
+    ``image`` is a PIL image or raw RGB/grayscale pixels (PDF pages).
+    Falls back to a single pass with the language fallback chain of
+    _extract_text_from_image_obj if the cascade is disabled or cannot run.
+    """
+    processor = OCRProcessor()
+    if processor.mode == "tiered":
+        if isinstance(image, np.ndarray):
+            img_array = cv2.cvtColor(image, cv2.COLOR_RGB2BGR) if image.ndim == 3 else image
+            original_metadata = {
+                "size": (image.shape[1], image.shape[0]),
+                "mode": "RGB" if image.ndim == 3 else "L",
+                "format": "raw",
+                "file_size_bytes": image.nbytes,
+            }
+        else:
+            img_array = processor._image_to_array(image)
+            original_metadata = {
+                "size": image.size,
+                "mode": image.mode,
+                "format": image.format,
+                "file_size_bytes": img_array.nbytes if img_array is not None else 0,
+            }
+        if img_array is not None:
+            try:
+                return processor._recognize_tiered(
+                    img_array, config, original_metadata, time.time(), source, timeout
+                ).text
+            except TimeoutError:
+                raise
+            except Exception as e:
+                logger.warning(f"Kaskada OCR nie powiodła się, ścieżka jednoprzebiegowa: {e}")
+
+    # Strony PDF jak dotąd bez preprocessingu paragonu
+    if source == "pdf_page":
+        return _extract_text_from_image_obj(image, config=config, timeout=timeout)
+    processed_image = processor._preprocess_receipt_image(image)
+    return _extract_text_from_image_obj(processed_image, config=config, timeout=timeout)
 
 
 @handle_exceptions(max_retries=1, retry_delay=0.5)
@@ -577,10 +909,8 @@ def process_image_file(
     try:
         logger.info("OCR: Rozpoczynam odczyt pliku obrazu...")
         with Image.open(io.BytesIO(file_bytes)) as image:
-            # Preprocessing obrazu dla lepszego OCR
-            processor = OCRProcessor()
-            processed_image = processor._preprocess_receipt_image(image)
-            text = _extract_text_from_image_obj(processed_image, config=config, timeout=timeout)
+            # Kaskada: szybka ścieżka, pełny preprocessing tylko przy niskiej pewności
+            text = _recognize_receipt_image(image, config, timeout, source="image")
         logger.info("OCR: Odczyt obrazu zakończony sukcesem.")
         return text
     except TimeoutError:
@@ -599,23 +929,23 @@ def process_pdf_file(file_bytes: bytes, config: Optional[str] = None, timeout: i
     try:
         logger.info("OCR: Rozpoczynam odczyt pliku PDF...")
         full_text = []
-        with tempfile.NamedTemporaryFile(delete=True, suffix=".pdf") as tmp_pdf:
-            tmp_pdf.write(file_bytes)
-            tmp_pdf.flush()
-            pdf_document = fitz.open(tmp_pdf.name)
-
-            for page_num in range(len(pdf_document)):
+        # PyMuPDF czyta dokument bezpośrednio z pamięci (bez pliku tymczasowego)
+        pdf_document = fitz.open(stream=file_bytes, filetype="pdf")
+        page_count = len(pdf_document)
+        try:
+            for page_num in range(page_count):
                 page = pdf_document.load_page(page_num)
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                with Image.frombytes(
-                    "RGB", (pix.width, pix.height), pix.samples
-                ) as image:
-                    page_text = _extract_text_from_image_obj(image, config=config, timeout=timeout//len(pdf_document))
-                    full_text.append(page_text)
+                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)
+                # Piksele strony idą do OCR jako widok na bufor pixmapy
+                page_text = _recognize_receipt_image(
+                    _pixmap_array(pix), config, timeout // page_count, source="pdf_page"
+                )
+                full_text.append(page_text)
+                del pix
+        finally:
+            pdf_document.close()
 
-        logger.info(
-            f"OCR: Odczyt PDF (stron: {len(pdf_document)}) zakończony sukcesem."
-        )
+        logger.info(f"OCR: Odczyt PDF (stron: {page_count}) zakończony sukcesem.")
         return "\n".join(full_text)
 
     except TimeoutError:
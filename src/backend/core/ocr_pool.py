@@ -0,0 +1,362 @@
+"""
+Pula procesów OCR
+
+Tesseract i preprocessing OpenCV są ograniczone przez CPU, więc strony PDF
+i obrazy z partii są przetwarzane równolegle w ``ProcessPoolExecutor``.
+Każdy proces roboczy raz przygotowuje OCRProcessor (konfiguracja Tesseract,
+sprawdzenie dostępnych języków), wczytuje uchwyt Tesseract z danymi języka
+(gdy dostępny jest tesserocr) i ogranicza OpenCV do jednego wątku.
+
+Strony PDF są renderowane po kolei przez PyMuPDF, a ich piksele trafiają
+do procesów jako bufory pamięci współdzielonej - bez kodowania do PNG i bez
+kopiowania przez pickle. Liczba zadań w locie jest ograniczona: przy pełnej
+kolejce wysyłający czeka, więc długi PDF nie trzyma w pamięci wszystkich
+stron naraz.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Stan procesu roboczego (ustawiany w _init_worker)
+_worker_processors: Dict[Tuple[str, ...], Any] = {}
+
+
+def _worker_processor(languages: Tuple[str, ...]) -> Any:
+    processor = _worker_processors.get(languages)
+    if processor is None:
+        from backend.core.ocr import OCRProcessor
+
+        from backend.core.tesseract_engine import tesseract_engine
+
+        processor = OCRProcessor(languages=list(languages))
+        # Sprawdzenie języków (tesseract --list-langs) tylko raz na proces
+        config = processor._get_tesseract_config()
+        try:
+            tesseract_engine.preload(config)
+        except Exception as e:
+            logger.warning(f"OCR worker: cannot preload Tesseract handle: {e}")
+        _worker_processors[languages] = processor
+    return processor
+
+
+def _init_worker(languages: Tuple[str, ...]) -> None:
+    """Runs once in every worker process"""
+    import cv2
+
+    # Proces roboczy przetwarza strony sam - bez zagnieżdżonej puli
+    ocr_worker_pool.enabled = False
+
+    # Równoległość zapewniają procesy - wątki OpenCV tylko by się przepychały
+    cv2.setNumThreads(1)
+    _worker_processor(languages)
+
+
+def _ocr_shared_array(
+    name: str,
+    shape: Tuple[int, ...],
+    dtype: str,
+    languages: Tuple[str, ...],
+    config: Optional[str],
+    source: str,
+) -> Any:
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        try:
+            return _worker_processor(languages).process_array(
+                array, config=config, source=source
+            )
+        finally:
+            del array
+    finally:
+        block.close()
+
+
+def _ocr_image_bytes(
+    image_bytes: bytes, languages: Tuple[str, ...], config: Optional[str]
+) -> Any:
+    return _worker_processor(languages).process_image(image_bytes, config=config)
+
+
+class OCRWorkerPool:
+    """Process pool running OCR jobs with a bounded number of jobs in flight"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        languages: Optional[Sequence[str]] = None,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        """
+        Initialize OCR worker pool
+
+        Args:
+            workers: Number of worker processes (defaults to the number of cores)
+            max_pending: Maximum number of submitted, unfinished jobs
+            languages: Languages preloaded in every worker
+            enabled: Opt-in switch (defaults to OCR_POOL_ENABLED)
+        """
+        self.workers = workers or settings.OCR_POOL_WORKERS or os.cpu_count() or 1
+        self.max_pending = max_pending or settings.OCR_POOL_MAX_PENDING or 2 * self.workers
+        self.languages = tuple(languages or settings.OCR_POOL_LANGUAGES)
+        self.enabled = settings.OCR_POOL_ENABLED if enabled is None else enabled
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "pages": 0,
+            "backpressure_waits": 0,
+            "restarts": 0,
+            "timeouts": 0,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: proces serwera ma już wątki (uvicorn, torch), fork byłby ryzykowny
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.languages,),
+                )
+                logger.info(f"OCR worker pool started ({self.workers} processes)")
+            return self._executor
+
+    def _acquire_slot(self) -> None:
+        """Block while ``max_pending`` jobs are in flight (backpressure)"""
+        if not self._slots.acquire(blocking=False):
+            self._stats["backpressure_waits"] += 1
+            self._slots.acquire()
+        with self._counter_lock:
+            self._pending += 1
+
+    def _release_slot(self) -> None:
+        with self._counter_lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _dispatch(self, fn: Any, *args: Any, cleanup: Optional[Any] = None) -> Future:
+        """
+        Submit a job holding an acquired slot, freed when the job finishes
+
+        The returned future completes only after ``cleanup`` ran and the slot
+        was released, so a caller seeing the result never sees leaked resources.
+        """
+        try:
+            job = self._get_executor().submit(fn, *args)
+        except BaseException:
+            if cleanup is not None:
+                cleanup()
+            self._release_slot()
+            raise
+        self._stats["submitted"] += 1
+        future: Future = Future()
+
+        def _done(done: Future) -> None:
+            try:
+                if cleanup is not None:
+                    cleanup()
+            finally:
+                self._release_slot()
+            try:
+                if done.cancelled():
+                    future.cancel()
+                elif done.exception() is not None:
+                    future.set_exception(done.exception())
+                else:
+                    future.set_result(done.result())
+            except InvalidStateError:
+                pass  # Wywołujący anulował już zadanie (timeout)
+
+        def _cancelled(outer: Future) -> None:
+            if outer.cancelled():
+                job.cancel()
+
+        future.add_done_callback(_cancelled)
+        job.add_done_callback(_done)
+        return future
+
+    def submit_array(
+        self,
+        array: np.ndarray,
+        languages: Optional[Sequence[str]] = None,
+        config: Optional[str] = None,
+        source: str = "image",
+    ) -> Future:
+        """OCR raw pixels (H x W or H x W x C, uint8) in a worker via shared memory"""
+        self._acquire_slot()
+        try:
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        except BaseException:
+            self._release_slot()
+            raise
+
+        def _free() -> None:
+            block.close()
+            block.unlink()
+
+        try:
+            shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            shared[...] = array
+            del shared
+        except BaseException:
+            _free()
+            self._release_slot()
+            raise
+
+        return self._dispatch(
+            _ocr_shared_array,
+            block.name,
+            array.shape,
+            array.dtype.str,
+            tuple(languages or self.languages),
+            config,
+            source,
+            cleanup=_free,
+        )
+
+    def submit_image(
+        self,
+        image_bytes: bytes,
+        languages: Optional[Sequence[str]] = None,
+        config: Optional[str] = None,
+    ) -> Future:
+        """OCR an encoded image file (decoded in the worker, not here)"""
+        self._acquire_slot()
+        return self._dispatch(
+            _ocr_image_bytes, image_bytes, tuple(languages or self.languages), config
+        )
+
+    def _submit_pdf_pages(
+        self,
+        pdf_bytes: bytes,
+        languages: Optional[Sequence[str]],
+        config: Optional[str],
+        zoom: float,
+    ) -> List[Future]:
+        import fitz
+
+        from backend.core.ocr import _pixmap_array
+
+        futures = []
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+            for page in document:
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                pixels = _pixmap_array(pix)
+                futures.append(
+                    self.submit_array(pixels, languages, config, source="pdf_page")
+                )
+                self._stats["pages"] += 1
+                del pixels, pix
+        return futures
+
+    def _failed(self, error: Exception) -> List[Any]:
+        from backend.core.ocr import OCRResult
+
+        self._stats["failed"] += 1
+        return [OCRResult(text="", confidence=0, metadata={"error": str(error)})]
+
+    def _collect(self, futures: List[Future]) -> List[Any]:
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=settings.OCR_JOB_TIMEOUT))
+                self._stats["completed"] += 1
+            except Exception as e:
+                if isinstance(e, FutureTimeoutError):
+                    # Zadanie w kolejce lub zawieszone - nie czekamy na nie dalej
+                    future.cancel()
+                    self._stats["timeouts"] += 1
+                    e = TimeoutError(
+                        f"OCR job timed out after {settings.OCR_JOB_TIMEOUT:.0f} seconds"
+                    )
+                elif isinstance(e, BrokenProcessPool):
+                    self._restart()
+                logger.error(f"OCR worker job failed: {e}")
+                results.extend(self._failed(e))
+        return results
+
+    def ocr_images(
+        self,
+        images: List[bytes],
+        languages: Optional[Sequence[str]] = None,
+        config: Optional[str] = None,
+    ) -> List[Any]:
+        """OCR encoded images in parallel, results in input order"""
+        futures = [self.submit_image(image, languages, config) for image in images]
+        return self._collect(futures)
+
+    def ocr_pdfs(
+        self,
+        pdfs: List[bytes],
+        languages: Optional[Sequence[str]] = None,
+        config: Optional[str] = None,
+        zoom: float = 2.0,
+    ) -> List[List[Any]]:
+        """OCR all pages of all PDFs in parallel, per-document page results"""
+        started = time.perf_counter()
+        submitted: List[Any] = []
+        for pdf_bytes in pdfs:
+            try:
+                submitted.append(self._submit_pdf_pages(pdf_bytes, languages, config, zoom))
+            except Exception as e:
+                # Uszkodzony dokument nie przerywa pozostałych
+                logger.error(f"OCR pool: cannot render PDF: {e}")
+                submitted.append(e)
+        results = [
+            self._collect(futures) if isinstance(futures, list) else self._failed(futures)
+            for futures in submitted
+        ]
+        logger.debug(
+            f"OCR pool: {sum(len(r) for r in results)} pages in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+        return results
+
+    def _restart(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._stats["restarts"] += 1
+            logger.warning("OCR worker pool broken, restarting on next job")
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+        }
+
+
+# Wspólna pula (domyślnie wyłączona, OCR_POOL_ENABLED)
+ocr_worker_pool = OCRWorkerPool()
@@ -0,0 +1,197 @@
+"""
+Shared async transport for Ollama
+
+Cały ruch do Ollama (chat, streaming, embeddingi, sondy zdrowia) przechodzi
+przez jedną pulę połączeń httpx.AsyncClient z keep-alive, zamiast osobnych
+klientów i wątków (asyncio.to_thread) na każde żądanie. Liczba równoległych
+żądań do jednego modelu jest ograniczona semaforem, żeby kolejka czekała
+w aplikacji, a nie w Ollama.
+"""
+
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+
+import httpx
+
+from backend.settings import OLLAMA_URL, settings
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaTransport:
+    """Process-wide pooled async HTTP transport for the Ollama API"""
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        per_model_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Initialize Ollama transport
+
+        Args:
+            base_url: Ollama server URL
+            max_connections: Upper bound of open connections in the pool
+            max_keepalive_connections: Idle connections kept alive for reuse
+            keepalive_expiry: Seconds an idle connection is kept open
+            per_model_concurrency: Concurrent in-flight requests per model
+            timeout: Read timeout in seconds (generation can be slow)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections
+            or settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry or settings.OLLAMA_KEEPALIVE_EXPIRY,
+        )
+        self.per_model_concurrency = (
+            per_model_concurrency or settings.OLLAMA_MAX_CONCURRENCY_PER_MODEL
+        )
+        self.timeout = httpx.Timeout(
+            timeout or settings.OLLAMA_REQUEST_TIMEOUT, connect=5.0
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled client bound to the running event loop (created lazily)"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            # Pooled connections and semaphores cannot be shared across loops
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, limits=self.limits, timeout=self.timeout
+            )
+            self._loop = loop
+            self._semaphores = {}
+        return self._client
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_model_concurrency)
+            self._semaphores[model] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def model_slot(self, model: str) -> AsyncGenerator[None, None]:
+        """Hold one of the per-model concurrency slots"""
+        self.client  # binds the semaphores to the running loop
+        async with self._semaphore(model):
+            yield
+
+    async def post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a JSON payload, holding a slot of the payload's model"""
+        async with self.model_slot(payload.get("model", "")):
+            response = await self.client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def get(self, path: str, timeout: Optional[float] = None) -> httpx.Response:
+        """Plain GET on the shared pool (health probes, model listing)"""
+        return await self.client.get(
+            path, timeout=timeout if timeout is not None else self.timeout
+        )
+
+    async def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Non-streaming /api/chat request"""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": False,
+            "options": options or {},
+            **kwargs,
+        }
+        return await self.post("/api/chat", payload)
+
+    async def chat_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Streaming /api/chat request yielding the NDJSON chunks as they arrive"""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": True,
+            "options": options or {},
+            **kwargs,
+        }
+        async with self.model_slot(model):
+            async with self.client.stream("POST", "/api/chat", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise RuntimeError(chunk["error"])
+                    yield chunk
+
+    async def embed(
+        self,
+        model: str,
+        input: Union[str, List[str]],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Batch /api/embed request"""
+        return await self.post(
+            "/api/embed", {"model": model, "input": input, "options": options or {}}
+        )
+
+    async def embeddings(
+        self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Single-text /api/embeddings request"""
+        return await self.post(
+            "/api/embeddings",
+            {"model": model, "prompt": prompt, "options": options or {}},
+        )
+
+    async def list_models(self) -> List[Dict[str, Any]]:
+        """Models pulled in Ollama (/api/tags)"""
+        response = await self.get("/api/tags")
+        response.raise_for_status()
+        return response.json().get("models", [])
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            try:
+                await self._client.aclose()
+            except RuntimeError as e:
+                # Client created on another (already closed) event loop
+                logger.debug(f"Could not close Ollama transport cleanly: {e}")
+        self._client = None
+        self._semaphores = {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model free concurrency slots"""
+        return {
+            "base_url": self.base_url,
+            "max_connections": self.limits.max_connections,
+            "per_model_concurrency": self.per_model_concurrency,
+            "free_slots": {
+                model: semaphore._value for model, semaphore in self._semaphores.items()
+            },
+        }
+
+
+# Global instance shared by every Ollama client in the process
+ollama_transport = OllamaTransport(OLLAMA_URL)
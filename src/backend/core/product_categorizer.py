@@ -4,19 +4,36 @@ import re
 from typing import Dict, List, Optional, Tuple, Any
 from difflib import SequenceMatcher
 
+from backend.core.category_memo import (CategoryMemo, category_memo,
+                                        category_table_version,
+                                        normalize_product_key)
 from backend.core.hybrid_llm_client import hybrid_llm_client
+from backend.core.keyword_automaton import KeywordAutomaton
+from backend.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Klucz statystyk z liczbą trafień pamięci kategorii - podkreślenie odróżnia
+# go od nazw kategorii
+CATEGORY_MEMO_HITS_KEY = "_category_memo_hits"
+
 
 class ProductCategorizer:
     """Kategoryzator produktów z integracją modelu Bielik i Google Product Taxonomy"""
 
-    def __init__(self, categories_file: str = "data/config/filtered_gpt_categories.json"):
+    def __init__(
+        self,
+        categories_file: str = "data/config/filtered_gpt_categories.json",
+        memo: Optional[CategoryMemo] = None,
+    ):
         """Inicjalizuje kategoryzator z plikiem kategorii"""
         self.categories_file = categories_file
         self.categories = self._load_categories()
         self.category_keywords = self._build_keyword_index()
+        self._build_keyword_automaton()
+        # Pamięć kategorii AI - wpisy z innej wersji tabeli kategorii nie pasują
+        self.memo = memo if memo is not None else (category_memo if settings.USE_CATEGORY_MEMO else None)
+        self.category_table_version = category_table_version(self.categories)
         logger.info(f"Załadowano {len(self.categories)} kategorii produktów")
 
     def _load_categories(self) -> List[Dict]:
@@ -45,6 +62,18 @@ class ProductCategorizer:
                 keyword_index[keyword_lower].append(category_id)
         return keyword_index
 
+    def _build_keyword_automaton(self) -> None:
+        """Kompiluje słowa kluczowe wszystkich kategorii w jeden automat"""
+        # Kategoria pierwszego wystąpienia słowa - tak jak przy przeglądzie po kolei
+        keyword_categories: Dict[str, Dict] = {}
+        for category in self.categories:
+            for keyword in category.get('keywords', []):
+                keyword_categories.setdefault(keyword.lower(), category)
+        self.keyword_automaton = KeywordAutomaton(keyword_categories)
+        self._keyword_categories = [
+            keyword_categories[keyword] for keyword in self.keyword_automaton.patterns
+        ]
+
     def _get_default_categories(self) -> List[Dict]:
         """Zwraca domyślne kategorie jeśli plik nie jest dostępny"""
         return [
@@ -102,10 +131,19 @@ class ProductCategorizer:
                 logger.info(f"Kategoryzacja słownikowa: {product_name} -> {keyword_match['name_pl']}")
                 return keyword_match
 
+            # Produkt już wcześniej skategoryzowany przez AI
+            remembered = self._get_remembered_categories([product_name])[0]
+            if remembered:
+                category, confidence = remembered
+                return self._category_result(category, confidence, 'category_memo')
+
             # Jeśli słownik nie pomógł, użyj Bielika
             bielik_category = await self._categorize_with_bielik(product_name)
             if bielik_category:
                 logger.info(f"Kategoryzacja Bielik: {product_name} -> {bielik_category['name_pl']}")
+                self._remember_categories(
+                    [(product_name, bielik_category['id'], bielik_category['confidence'], bielik_category['method'])]
+                )
                 return bielik_category
 
             # Fallback do kategorii "Inne"
@@ -126,29 +164,62 @@ class ProductCategorizer:
             Dict z informacjami o kategorii lub None
         """
         product_lower = product_name.lower()
-        best_match = None
-        best_score = 0.0
 
-        for category in self.categories:
-            keywords = category.get('keywords', [])
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
-                
-                # Sprawdź czy słowo kluczowe jest zawarte w nazwie produktu
-                if keyword_lower in product_lower:
-                    score = len(keyword_lower) / len(product_lower)
-                    if score > best_score:
-                        best_score = score
-                        best_match = {
-                            'id': category['id'],
-                            'name_pl': category['name_pl'],
-                            'name_en': category['name_en'],
-                            'gpt_path': category.get('gpt_path', ''),
-                            'confidence': score,
-                            'method': 'keyword_match'
-                        }
+        # Jedno przejście automatu: najdłuższe zawarte słowo kluczowe ma najwyższy wynik
+        pattern_id = self.keyword_automaton.longest_match(product_lower)
+        if pattern_id is None:
+            return None
+
+        keyword_lower = self.keyword_automaton.patterns[pattern_id]
+        category = self._keyword_categories[pattern_id]
+        score = len(keyword_lower) / len(product_lower)
+        if score <= 0.3:
+            return None
 
-        return best_match if best_score > 0.3 else None
+        return {
+            'id': category['id'],
+            'name_pl': category['name_pl'],
+            'name_en': category['name_en'],
+            'gpt_path': category.get('gpt_path', ''),
+            'confidence': score,
+            'method': 'keyword_match'
+        }
+
+    def _category_result(self, category: Dict, confidence: float, method: str) -> Dict[str, str]:
+        return {
+            'id': category['id'],
+            'name_pl': category['name_pl'],
+            'name_en': category['name_en'],
+            'gpt_path': category.get('gpt_path', ''),
+            'confidence': confidence,
+            'method': method
+        }
+
+    def _get_remembered_categories(self, product_names: List[str]) -> List[Optional[Tuple[Dict, float]]]:
+        """Zwraca zapamiętane kategorie AI (kategoria, pewność) dla nazw produktów"""
+        if self.memo is None or not product_names:
+            return [None] * len(product_names)
+        try:
+            entries = self.memo.get_many(self.category_table_version, product_names)
+        except Exception as e:
+            # Pamięć kategorii to tylko optymalizacja - bez niej pytamy model
+            logger.warning(f"Pamięć kategorii niedostępna: {e}")
+            return [None] * len(product_names)
+
+        remembered = []
+        for entry in entries:
+            category = self._get_category_by_id(entry['category_id']) if entry else None
+            remembered.append((category, entry['confidence']) if category else None)
+        return remembered
+
+    def _remember_categories(self, entries: List[Tuple[str, str, float, str]]) -> None:
+        """Zapisuje kategorie przypisane przez AI (nazwa, id kategorii, pewność, metoda)"""
+        if self.memo is None or not entries:
+            return
+        try:
+            self.memo.put_many(self.category_table_version, entries)
+        except Exception as e:
+            logger.warning(f"Nie udało się zapisać pamięci kategorii: {e}")
 
     async def _categorize_with_bielik(self, product_name: str) -> Optional[Dict[str, str]]:
         """
@@ -310,15 +381,26 @@ Jeśli nie jesteś pewny, wybierz kategorię "Inne" (5)."""
     async def _categorize_products_with_ai_batch(self, products: List[Dict[str, Any]]) -> None:
         """
         Kategoryzuje listę produktów w jednym wywołaniu AI dla optymalizacji
-        
+
+        Produkty skategoryzowane już wcześniej przez AI dostają kategorię z pamięci
+        kategorii, a do modelu trafia każda nowa nazwa tylko raz.
+
         Args:
             products: Lista produktów do kategoryzacji
         """
+        pending = products
         try:
-            # Przygotuj listę produktów do kategoryzacji
-            product_names = [p.get('name', '') for p in products if p.get('name')]
-            if not product_names:
+            pending = self._apply_remembered_categories(products)
+
+            # Przygotuj listę nowych produktów do kategoryzacji (bez powtórzeń)
+            products_by_key: Dict[str, List[Dict[str, Any]]] = {}
+            for product in pending:
+                if product.get('name'):
+                    products_by_key.setdefault(normalize_product_key(product['name']), []).append(product)
+            if not products_by_key:
                 return
+            product_groups = list(products_by_key.values())
+            product_names = [group[0]['name'] for group in product_groups]
                 
             # Przygotuj prompt dla batch kategoryzacji
             prompt = self._create_batch_categorization_prompt(product_names)
@@ -341,9 +423,14 @@ Jeśli nie jesteś pewny, wybierz kategorię "Inne" (5)."""
                 category_ids = self._extract_batch_categories_from_response(content)
                 
                 # Przypisz kategorie do produktów
-                for i, product in enumerate(products):
+                remembered = []
+                for i, group in enumerate(product_groups):
+                    category = None
                     if i < len(category_ids) and category_ids[i]:
                         category = self._get_category_by_id(category_ids[i])
+                    if category:
+                        remembered.append((group[0]['name'], category['id'], 0.9, 'bielik_ai_batch'))
+                    for product in group:
                         if category:
                             product['category'] = category['name_pl']
                             product['category_en'] = category['name_en']
@@ -357,24 +444,37 @@ Jeśli nie jesteś pewny, wybierz kategorię "Inne" (5)."""
                             product['gpt_category'] = 'Other'
                             product['category_confidence'] = 0.1
                             product['category_method'] = 'fallback'
-                    else:
-                        # Fallback do kategorii "Inne"
-                        product['category'] = 'Inne'
-                        product['category_en'] = 'Other'
-                        product['gpt_category'] = 'Other'
-                        product['category_confidence'] = 0.1
-                        product['category_method'] = 'fallback'
+
+                self._remember_categories(remembered)
 
         except Exception as e:
             logger.error(f"Błąd podczas batch kategoryzacji AI: {e}")
             # Fallback - przypisz kategorię "Inne" do wszystkich produktów
-            for product in products:
+            for product in pending:
                 product['category'] = 'Inne'
                 product['category_en'] = 'Other'
                 product['gpt_category'] = 'Other'
                 product['category_confidence'] = 0.0
                 product['category_method'] = 'error'
 
+    def _apply_remembered_categories(self, products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Przypisuje zapamiętane kategorie AI i zwraca produkty, które nadal ich potrzebują"""
+        named = [product for product in products if product.get('name')]
+        remembered = self._get_remembered_categories([product['name'] for product in named])
+        hits = {id(product): entry for product, entry in zip(named, remembered) if entry}
+        for product in named:
+            entry = hits.get(id(product))
+            if entry:
+                category, confidence = entry
+                product['category'] = category['name_pl']
+                product['category_en'] = category['name_en']
+                product['gpt_category'] = category.get('gpt_path', '')
+                product['category_confidence'] = confidence
+                product['category_method'] = 'category_memo'
+        if hits:
+            logger.info(f"Pamięć kategorii: {len(hits)}/{len(named)} produktów bez wywołania AI")
+        return [product for product in products if id(product) not in hits]
+
     def _create_batch_categorization_prompt(self, product_names: List[str]) -> str:
         """Tworzy prompt dla batch kategoryzacji produktów"""
         
@@ -416,7 +516,12 @@ Jeśli nie jesteś pewny kategorii, użyj "5" (Inne)."""
     def get_category_statistics(self, products: List[Dict[str, Any]]) -> Dict[str, int]:
         """Zwraca statystyki kategoryzacji produktów"""
         stats = {}
+        memo_hits = 0
         for product in products:
             category = product.get('category', 'Inne')
             stats[category] = stats.get(category, 0) + 1
-        return stats 
\ No newline at end of file
+            if product.get('category_method') == 'category_memo':
+                memo_hits += 1
+        # Produkty skategoryzowane z pamięci kategorii, bez wywołania AI
+        stats[CATEGORY_MEMO_HITS_KEY] = memo_hits
+        return stats
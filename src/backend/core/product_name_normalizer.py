@@ -1,22 +1,67 @@
 import json
 import logging
+import os
 import re
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Tuple
 from difflib import SequenceMatcher
 
+from backend.core.fuzzy_index import NGramIndex
+
 logger = logging.getLogger(__name__)
 
 
 class ProductNameNormalizer:
     """Normalizator nazw produktów z integracją słownika normalizacji"""
 
+    # Co ile sekund sprawdzać, czy plik słownika się zmienił
+    RELOAD_CHECK_INTERVAL = 2.0
+
     def __init__(self, normalization_file: str = "data/config/product_name_normalization.json"):
         """Inicjalizuje normalizator z plikiem normalizacji"""
         self.normalization_file = normalization_file
+        self._file_mtime = self._get_file_mtime()
+        self._last_reload_check = time.monotonic()
         self.normalizations = self._load_normalizations()
         self.normalization_index = self._build_normalization_index()
+        self._build_match_index()
         logger.info(f"Załadowano {len(self.normalizations)} reguł normalizacji nazw produktów")
 
+    def _get_file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.normalization_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _reload_if_changed(self) -> None:
+        """Przeładowuje słownik i indeksy po zmianie pliku JSON"""
+        now = time.monotonic()
+        if now - self._last_reload_check < self.RELOAD_CHECK_INTERVAL:
+            return
+        self._last_reload_check = now
+        mtime = self._get_file_mtime()
+        if mtime == self._file_mtime:
+            return
+        self._file_mtime = mtime
+        self.normalizations = self._load_normalizations()
+        self.normalization_index = self._build_normalization_index()
+        self._build_match_index()
+        logger.info(f"Przeładowano {len(self.normalizations)} reguł normalizacji nazw produktów")
+
+    def _build_match_index(self) -> None:
+        """Buduje indeksy n-gramów dla dopasowania częściowego i fuzzy"""
+        self.original_match_index = NGramIndex(
+            [norm['original'].lower() for norm in self.normalizations]
+        )
+        keywords = []
+        # (indeks reguły, pozycja słowa kluczowego) - kolejność jak przy przeglądzie reguł
+        self._keyword_owners: List[Tuple[int, int]] = []
+        for norm_id, norm in enumerate(self.normalizations):
+            for position, keyword in enumerate(norm.get('keywords', [])):
+                keywords.append(keyword.lower())
+                self._keyword_owners.append((norm_id, position))
+        self.keyword_match_index = NGramIndex(keywords)
+
     def _load_normalizations(self) -> List[Dict]:
         """Ładuje reguły normalizacji z pliku JSON"""
         try:
@@ -93,6 +138,7 @@ class ProductNameNormalizer:
         if not product_name or not product_name.strip():
             return self._get_unknown_product()
 
+        self._reload_if_changed()
         product_name_clean = self._clean_product_name(product_name)
         
         # Najpierw spróbuj dokładnego dopasowania
@@ -166,40 +212,36 @@ class ProductNameNormalizer:
     def _find_partial_match(self, product_name: str) -> Optional[Dict[str, str]]:
         """Znajduje częściowe dopasowanie nazwy produktu"""
         product_name_lower = product_name.lower()
+
+        # Tylko reguły, których nazwa lub słowo kluczowe zawiera się w nazwie produktu
+        # (lub odwrotnie) - wyniki identyczne jak przy przeglądzie wszystkich reguł
+        candidates = []
+        originals = set(self.original_match_index.substrings_of(product_name_lower))
+        originals.update(self.original_match_index.superstrings_of(product_name_lower))
+        for norm_id in originals:
+            original_lower = self.original_match_index.keys[norm_id]
+            similarity = SequenceMatcher(None, product_name_lower, original_lower).ratio()
+            candidates.append(((norm_id, 0), similarity, 'partial_match'))
+
+        for keyword_id in self.keyword_match_index.substrings_of(product_name_lower):
+            norm_id, position = self._keyword_owners[keyword_id]
+            keyword_lower = self.keyword_match_index.keys[keyword_id]
+            similarity = len(keyword_lower) / len(product_name_lower)
+            candidates.append(((norm_id, position + 1), similarity, 'keyword_match'))
+
         best_match = None
         best_score = 0.0
-
-        for norm in self.normalizations:
-            original_lower = norm['original'].lower()
-            keywords = norm.get('keywords', [])
-            
-            # Sprawdź czy nazwa produktu zawiera oryginalną nazwę lub słowa kluczowe
-            if original_lower in product_name_lower or product_name_lower in original_lower:
-                similarity = SequenceMatcher(None, product_name_lower, original_lower).ratio()
-                if similarity > best_score:
-                    best_score = similarity
-                    best_match = {
-                        'original': product_name,
-                        'normalized': norm['normalized'],
-                        'category': norm.get('category', 'unknown'),
-                        'confidence': similarity,
-                        'method': 'partial_match'
-                    }
-            
-            # Sprawdź słowa kluczowe
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
-                if keyword_lower in product_name_lower:
-                    similarity = len(keyword_lower) / len(product_name_lower)
-                    if similarity > best_score:
-                        best_score = similarity
-                        best_match = {
-                            'original': product_name,
-                            'normalized': norm['normalized'],
-                            'category': norm.get('category', 'unknown'),
-                            'confidence': similarity,
-                            'method': 'keyword_match'
-                        }
+        for (norm_id, _), similarity, method in sorted(candidates, key=lambda c: c[0]):
+            if similarity > best_score:
+                norm = self.normalizations[norm_id]
+                best_score = similarity
+                best_match = {
+                    'original': product_name,
+                    'normalized': norm['normalized'],
+                    'category': norm.get('category', 'unknown'),
+                    'confidence': similarity,
+                    'method': method
+                }
 
         return best_match if best_score > 0.5 else None
 
@@ -209,9 +251,11 @@ class ProductNameNormalizer:
         best_match = None
         best_score = 0.0
 
-        for norm in self.normalizations:
-            original_lower = norm['original'].lower()
-            
+        # Ograniczona lista kandydatów wg pokrycia bigramów (FUZZY_SCORE_TOLERANCE)
+        for norm_id in self.original_match_index.similar(product_name_lower):
+            norm = self.normalizations[norm_id]
+            original_lower = self.original_match_index.keys[norm_id]
+
             # Oblicz podobieństwo fuzzy
             similarity = SequenceMatcher(None, product_name_lower, original_lower).ratio()
             if similarity > best_score:
@@ -353,6 +397,7 @@ class ProductNameNormalizer:
             
             # Zaktualizuj indeks normalizacji
             self.normalization_index = self._build_normalization_index()
+            self._build_match_index()
             
             logger.info(f"Dodano niestandardową normalizację: {normalization_info['original']} -> {normalization_info['normalized']}")
             return True
@@ -0,0 +1,81 @@
+"""
+Prefix-aware prompt assembly for Ollama
+
+Ollama ponownie używa KV-cache dla najdłuższego wspólnego prefiksu promptu
+z poprzednim żądaniem do załadowanego modelu. Prefiks jest wspólny tylko
+wtedy, gdy statyczne części (instrukcje systemowe, opis narzędzi) są
+identyczne bajt w bajt i stoją na początku, a model nie jest przeładowywany
+(stały ``keep_alive`` i ``num_ctx``). Kolejność wiadomości:
+
+    [statyczny preambuł] [historia sesji] [kontekst dynamiczny] [pytanie]
+
+Historia sesji rośnie tylko przez dopisywanie, więc kolejne tury tej samej
+rozmowy trafiają w cache aż do nowej wypowiedzi.
+"""
+
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from backend.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PromptAssembler:
+    """Builds chat messages with byte-stable static prefixes"""
+
+    def __init__(self) -> None:
+        self._static: Dict[Hashable, str] = {}
+
+    def static(self, key: Hashable, factory: Callable[[], str]) -> str:
+        """Render a static preamble once and return the identical string afterwards"""
+        text = self._static.get(key)
+        if text is None:
+            text = factory().strip()
+            self._static[key] = text
+        return text
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Forget rendered preambles (all, or one key)"""
+        if key is None:
+            self._static.clear()
+        else:
+            self._static.pop(key, None)
+
+    def build(
+        self,
+        preamble: str,
+        user: str,
+        history: Optional[List[Dict[str, Any]]] = None,
+        context: Optional[str] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Assemble messages: static preamble, history, dynamic context, user turn
+
+        Args:
+            preamble: Static system instructions (must not contain per-request data)
+            user: Current user message
+            history: Earlier turns of the session (oldest first)
+            context: Per-request data (RAG results, search results, dates)
+
+        Returns:
+            Messages for /api/chat
+        """
+        messages = [{"role": "system", "content": preamble}]
+        for entry in history or []:
+            if isinstance(entry, dict) and "role" in entry and "content" in entry:
+                messages.append({"role": entry["role"], "content": entry["content"]})
+        if context:
+            messages.append({"role": "system", "content": context})
+        messages.append({"role": "user", "content": user})
+        return messages
+
+    def request_params(self, model: str) -> Dict[str, Any]:
+        """Pinned keep_alive and context size of a model (changing num_ctx reloads it)"""
+        return {
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+            "num_ctx": settings.OLLAMA_MODEL_NUM_CTX.get(model, settings.OLLAMA_NUM_CTX),
+        }
+
+
+prompt_assembler = PromptAssembler()
@@ -11,8 +11,8 @@ from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import (Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple,
-                    Union)
+from typing import (Any, AsyncGenerator, Awaitable, Callable, Dict, List,
+                    Optional, Tuple, Union)
 
 import numpy as np
 
@@ -25,6 +25,8 @@ except ImportError:
     MMLW_AVAILABLE = False
 
 # Import existing clients
+from backend.core.embedding_store import EmbeddingStore
+from backend.core.embedding_store import embedding_store as global_embedding_store
 from backend.core.hybrid_llm_client import hybrid_llm_client
 from backend.core.interfaces import VectorStore
 from backend.infrastructure.vector_store.vector_store_impl import \
@@ -114,6 +116,7 @@ class RAGDocumentProcessor:
         use_local_embeddings: bool = False,
         pinecone_api_key: Optional[str] = None,
         pinecone_index: Optional[str] = None,
+        embedding_store: Optional[EmbeddingStore] = None,
     ) -> None:
         """
         Initialize the RAG document processor
@@ -126,10 +129,14 @@ class RAGDocumentProcessor:
             use_local_embeddings: Whether to use local SentenceTransformers for embeddings
             pinecone_api_key: API key for Pinecone (if using Pinecone)
             pinecone_index: Index name for Pinecone (if using Pinecone)
+            embedding_store: Persistent embedding store (uses global instance if None)
         """
         self.vector_store = vector_store or EnhancedVectorStoreImpl(
             llm_client=hybrid_llm_client
         )
+        self.embedding_store = embedding_store or (
+            global_embedding_store if settings.USE_EMBEDDING_STORE else None
+        )
 
         # Memory management
         self._processed_documents: Dict[str, weakref.ref[Dict[str, Any]]] = {}
@@ -193,62 +200,148 @@ class RAGDocumentProcessor:
         """
         Generate embeddings for a text chunk
 
+        Thin wrapper around embed_batch so single chunks use the same
+        persistent embedding store and backend priority.
+        """
+        embeddings = await self.embed_batch([text])
+        return embeddings[0] if embeddings else []
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for a list of text chunks
+
+        Embeddings are looked up in the persistent embedding store first
+        (keyed by backend model and normalized chunk hash); only misses are
+        sent to the model, in batches.
+
         Priority order:
         1. MMLW model (if available and enabled) - najlepszy dla języka polskiego
         2. Local SentenceTransformers (if available and configured)
-        3. Ollama embeddings
+        3. Ollama embeddings (batch /api/embed)
         4. Hybrid LLM client as fallback
+
+        Returns:
+            List aligned with ``texts``; an empty list marks a failed chunk
         """
-        # Import settings here to avoid circular imports
-        from backend.config import settings
+        results: List[List[float]] = [[] for _ in texts]
+        pending = [i for i, text in enumerate(texts) if text]
 
-        # Try MMLW first (best for Polish language)
-        if MMLW_AVAILABLE and settings.USE_MMLW_EMBEDDINGS:
-            try:
-                if not mmlw_client.is_available():
-                    await mmlw_client.initialize()
+        for model_key, embed_fn in self._embedding_backends():
+            if not pending:
+                break
 
-                if mmlw_client.is_available():
-                    embedding = await mmlw_client.embed_text(text)
+            pending_texts = [texts[i] for i in pending]
+            if self.embedding_store is not None:
+                try:
+                    cached = await asyncio.to_thread(
+                        self.embedding_store.get_many, model_key, pending_texts
+                    )
+                except Exception as e:
+                    logger.warning(f"Embedding store lookup failed: {e}")
+                    cached = [None] * len(pending)
+                for i, embedding in zip(pending, cached):
                     if embedding:
-                        logger.debug("Using MMLW embeddings")
-                        return embedding
-            except Exception as e:
-                logger.warning(f"Failed to use MMLW embeddings: {e}")
+                        results[i] = embedding
 
-        # Try local SentenceTransformers
-        if self.use_local_embeddings and self.embedding_model_local:
-            try:
-                embedding = self.embedding_model_local.encode(
-                    text, convert_to_tensor=False
-                ).tolist()
-                logger.debug("Using local SentenceTransformers embeddings")
-                return embedding
-            except Exception as e:
-                logger.warning(f"Failed to use local embeddings: {e}")
+            misses = [i for i in pending if not results[i]]
+            if misses:
+                miss_texts = [texts[i] for i in misses]
+                computed: List[List[float]] = []
+                batch_size = max(1, settings.EMBEDDING_BATCH_SIZE)
+                try:
+                    for start in range(0, len(miss_texts), batch_size):
+                        computed.extend(
+                            await embed_fn(miss_texts[start : start + batch_size])
+                        )
+                except Exception as e:
+                    logger.warning(f"Failed to use {model_key} embeddings: {e}")
+                    continue
+
+                for i, embedding in zip(misses, computed):
+                    # All-zero vectors are fallback values of the LLM clients
+                    if embedding and any(embedding):
+                        results[i] = list(embedding)
+
+                if model_key.startswith("mmlw:"):
+                    # Initialization may have fallen back from ONNX to PyTorch
+                    model_key = self._mmlw_model_key()
+                if self.embedding_store is not None:
+                    try:
+                        await asyncio.to_thread(
+                            self.embedding_store.put_many,
+                            model_key,
+                            miss_texts,
+                            computed,
+                        )
+                    except Exception as e:
+                        logger.warning(f"Embedding store write failed: {e}")
 
-        # Try Ollama embeddings
-        try:
-            import ollama
+                logger.debug(
+                    f"Embedded {len(misses)} chunks with {model_key} "
+                    f"({len(pending) - len(misses)} from store)"
+                )
+
+            pending = [i for i in pending if not results[i]]
 
-            response = await asyncio.to_thread(
-                ollama.embeddings, model=self.embedding_model, prompt=text
+        if pending:
+            logger.error(f"All embedding methods failed for {len(pending)} chunks")
+        return results
+
+    def _embedding_backends(
+        self,
+    ) -> List[Tuple[str, Callable[[List[str]], Awaitable[List[List[float]]]]]]:
+        """Return (model key, batch embed function) pairs in priority order"""
+        backends: List[
+            Tuple[str, Callable[[List[str]], Awaitable[List[List[float]]]]]
+        ] = []
+        if MMLW_AVAILABLE and settings.USE_MMLW_EMBEDDINGS:
+            backends.append((self._mmlw_model_key(), self._embed_with_mmlw))
+        if self.use_local_embeddings and self.embedding_model_local:
+            backends.append(
+                ("sentence-transformers:all-MiniLM-L6-v2", self._embed_with_local_model)
             )
-            logger.debug("Using Ollama embeddings")
-            return response["embedding"]
-        except Exception as e:
-            logger.warning(f"Failed to use Ollama embeddings: {e}")
+        backends.append((f"ollama:{self.embedding_model}", self._embed_with_ollama))
+        backends.append(
+            (f"hybrid:{settings.DEFAULT_EMBEDDING_MODEL}", self._embed_with_hybrid_client)
+        )
+        return backends
+
+    @staticmethod
+    def _mmlw_model_key() -> str:
+        """Store key of MMLW vectors - int8 ONNX and fp32 PyTorch vectors differ"""
+        return f"mmlw:{mmlw_client.backend}:{mmlw_client.model_name}"
+
+    async def _embed_with_mmlw(self, texts: List[str]) -> List[List[float]]:
+        """Batch embeddings with the MMLW model (lazy initialization)"""
+        if not mmlw_client.is_available():
+            await mmlw_client.initialize()
+        if not mmlw_client.is_available():
+            raise RuntimeError("MMLW model is not available")
+        return await mmlw_client.embed_batch(texts, batch_size=len(texts))
+
+    async def _embed_with_local_model(self, texts: List[str]) -> List[List[float]]:
+        """Batch embeddings with local SentenceTransformers"""
+        embeddings = await asyncio.to_thread(
+            self.embedding_model_local.encode, texts, convert_to_tensor=False
+        )
+        return [embedding.tolist() for embedding in embeddings]
 
-        # Fall back to hybrid_llm_client
-        try:
-            embedding = await hybrid_llm_client.embed(
+    async def _embed_with_ollama(self, texts: List[str]) -> List[List[float]]:
+        """Batch embeddings through the shared Ollama transport"""
+        from backend.core.ollama_transport import ollama_transport
+
+        # /api/embed accepts a list of inputs in a single request
+        response = await ollama_transport.embed(model=self.embedding_model, input=texts)
+        return [list(embedding) for embedding in response["embeddings"]]
+
+    async def _embed_with_hybrid_client(self, texts: List[str]) -> List[List[float]]:
+        """Fallback embeddings through the hybrid LLM client (one call per text)"""
+        return [
+            await hybrid_llm_client.embed(
                 text=text, model=settings.DEFAULT_EMBEDDING_MODEL
             )
-            logger.debug("Using hybrid LLM client embeddings")
-            return embedding
-        except Exception as e:
-            logger.error(f"All embedding methods failed: {e}")
-            return []
+            for text in texts
+        ]
 
     async def normalize_embedding(self, embedding: List[float]) -> np.ndarray:
         """Normalize embedding with L2 normalization"""
@@ -384,7 +477,7 @@ class RAGDocumentProcessor:
 
     def generate_chunk_id(self, text: str, source: str) -> str:
         """Generate a unique ID for a text chunk"""
-        combined = f"{source}::{text[:100]}"
+        combined = f"{source}::{text}"
         return hashlib.md5(combined.encode()).hexdigest()
 
     async def process_document(
@@ -416,14 +509,16 @@ class RAGDocumentProcessor:
         # Chunk the document
         chunks = self.chunk_text(content)
 
+        # Skip empty chunks and embed the rest in a single batch
+        valid_chunks = [
+            (i, chunk) for i, chunk in enumerate(chunks) if chunk and len(chunk.strip()) >= 10
+        ]
+        embeddings = await self.embed_batch([chunk for _, chunk in valid_chunks])
+
         # Process each chunk
         processed_chunks = []
 
-        for i, chunk in enumerate(chunks):
-            # Skip empty chunks
-            if not chunk or len(chunk.strip()) < 10:
-                continue
-
+        for (i, chunk), embedding in zip(valid_chunks, embeddings):
             # Create chunk metadata
             chunk_metadata = base_metadata.copy()
             chunk_metadata.update(
@@ -436,9 +531,6 @@ class RAGDocumentProcessor:
             # Generate chunk ID
             chunk_id = self.generate_chunk_id(chunk, source_id)
 
-            # Generate embedding
-            embedding = await self.embed_text(chunk)
-
             # Store in vector database
             if self.use_pinecone:
                 # Store in Pinecone
@@ -450,11 +542,15 @@ class RAGDocumentProcessor:
                 except Exception as e:
                     logger.error(f"Failed to store in Pinecone: {e}")
                     # Fall back to vector store
-                    await self.vector_store.add_document(chunk, chunk_metadata)
+                    await self.vector_store.add_document(
+                        chunk, chunk_metadata, embedding=embedding, doc_id=chunk_id
+                    )
                     storage = "vector_store"
             else:
-                # Store in local vector store
-                await self.vector_store.add_document(chunk, chunk_metadata)
+                # Store in local vector store (embedding already computed)
+                await self.vector_store.add_document(
+                    chunk, chunk_metadata, embedding=embedding, doc_id=chunk_id
+                )
                 storage = "vector_store"
 
             # Record processed chunk
@@ -8,6 +8,7 @@ from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.core.expense_rollups import refresh_expense_rollups
 from backend.models.shopping import Product, ShoppingTrip
 
 logger = logging.getLogger(__name__)
@@ -58,6 +59,10 @@ async def seed_database(db: Optional[AsyncSession] = None) -> None:
                 product = Product(trip_id=trip.id, **product_data)
                 db.add(product)
 
+        await db.flush()
+        await refresh_expense_rollups(
+            db, [trip_data["trip_date"] for trip_data in seed_data["shopping_trips"]]
+        )
         await db.commit()
         logger.info(
             f"Successfully seeded database with {len(seed_data['shopping_trips'])} shopping trips."
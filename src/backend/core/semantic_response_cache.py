@@ -0,0 +1,280 @@
+"""
+Semantic response cache for HybridLLMClient
+
+Dokładny cache w HybridLLMClient trafia tylko dla identycznych wiadomości,
+więc parafrazy ("przepis na naleśniki" / "jak zrobić naleśniki") zawsze
+generują odpowiedź od nowa. Ten opcjonalny poziom cache osadza
+znormalizowaną ostatnią wypowiedź użytkownika i szuka podobnej w małym
+indeksie FAISS. Odpowiedź jest zwracana tylko przy tym samym modelu i tym
+samym kontekście (system prompt, wcześniejsze wiadomości, opcje), powyżej
+progu podobieństwa i przed upływem TTL. Zmiana paragonów lub produktów
+w bazie unieważnia cały cache.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.settings import settings
+
+try:
+    import faiss
+
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+    logging.warning("FAISS not available, semantic response cache disabled")
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[str], Awaitable[List[float]]]
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class _CacheEntry:
+    model: str
+    context_hash: str
+    prompt: str
+    response: Dict[str, Any]
+    created_at: float
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    text = _PUNCTUATION.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def split_messages(
+    messages: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None
+) -> Tuple[Optional[str], str]:
+    """Split a chat request into the normalized last user turn and a context hash"""
+    last_user = None
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].get("role") == "user":
+            last_user = index
+            break
+    if last_user is None:
+        return None, ""
+    context = [m for i, m in enumerate(messages) if i != last_user]
+    payload = json.dumps(
+        {"context": context, "options": options or {}}, sort_keys=True, default=str
+    )
+    prompt = normalize_prompt(str(messages[last_user].get("content", "")))
+    # Długie wypowiedzi (np. tekst z OCR) zbyt łatwo uznać za "podobne"
+    if not prompt or len(prompt) > settings.SEMANTIC_CACHE_MAX_PROMPT_CHARS:
+        return None, ""
+    return prompt, hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def _default_embed(text: str) -> List[float]:
+    if settings.USE_MMLW_EMBEDDINGS:
+        from backend.core.mmlw_embedding_client import mmlw_client
+
+        return await mmlw_client.embed_text(text)
+    from backend.core.llm_client import llm_client
+
+    return await llm_client.embed(model=settings.DEFAULT_EMBEDDING_MODEL, text=text)
+
+
+class SemanticResponseCache:
+    """Small in-process FAISS index of recent prompts and their responses"""
+
+    def __init__(
+        self,
+        embed_fn: Optional[EmbedFn] = None,
+        similarity_threshold: Optional[float] = None,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        """
+        Initialize semantic response cache
+
+        Args:
+            embed_fn: Async function embedding a normalized prompt
+            similarity_threshold: Minimal cosine similarity of a cache hit
+            ttl: Seconds a cached response stays valid
+            max_entries: Maximum number of cached responses
+            enabled: Opt-in switch (defaults to SEMANTIC_CACHE_ENABLED)
+        """
+        self.embed_fn = embed_fn or _default_embed
+        self.similarity_threshold = (
+            similarity_threshold or settings.SEMANTIC_CACHE_SIMILARITY_THRESHOLD
+        )
+        self.ttl = ttl or settings.SEMANTIC_CACHE_TTL
+        self.max_entries = max_entries or settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.enabled = (
+            settings.SEMANTIC_CACHE_ENABLED if enabled is None else enabled
+        ) and FAISS_AVAILABLE
+        self._index: Optional["faiss.IndexIDMap2"] = None
+        self._dimension: Optional[int] = None
+        self._entries: Dict[int, _CacheEntry] = {}
+        self._next_id = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    async def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        try:
+            vector = await self.embed_fn(prompt)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return None
+        if not vector:
+            return None
+        array = np.asarray([vector], dtype=np.float32)
+        if self._dimension is not None and array.shape[1] != self._dimension:
+            return None
+        faiss.normalize_L2(array)
+        return array
+
+    async def lookup(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Return a cached response of a similar prompt in the same context"""
+        if not self.enabled or self._index is None or not self._entries:
+            return None
+        prompt, context_hash = split_messages(messages, options)
+        if prompt is None:
+            return None
+        vector = await self._embed(prompt)
+        if vector is None:
+            return None
+
+        now = time.monotonic()
+        k = min(settings.SEMANTIC_CACHE_SEARCH_K, len(self._entries))
+        scores, ids = self._index.search(vector, k)
+        for score, entry_id in zip(scores[0], ids[0]):
+            if entry_id < 0 or score < self.similarity_threshold:
+                break
+            entry = self._entries.get(int(entry_id))
+            if entry is None:
+                continue
+            if now - entry.created_at > self.ttl:
+                self._remove([int(entry_id)])
+                continue
+            if entry.model == model and entry.context_hash == context_hash:
+                self._stats["hits"] += 1
+                logger.info(
+                    f"Semantic cache hit ({score:.3f}) for '{prompt}' ~ '{entry.prompt}'"
+                )
+                return copy.deepcopy(entry.response)
+        self._stats["misses"] += 1
+        return None
+
+    async def store(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        options: Optional[Dict[str, Any]],
+        response: Any,
+    ) -> None:
+        """Cache a successful non-streaming response"""
+        if not self.enabled or not isinstance(response, dict) or response.get("error"):
+            return
+        prompt, context_hash = split_messages(messages, options)
+        if prompt is None:
+            return
+        vector = await self._embed(prompt)
+        if vector is None:
+            return
+
+        if self._index is None:
+            self._dimension = vector.shape[1]
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(self._dimension))
+        entry_id = self._next_id
+        self._next_id += 1
+        self._index.add_with_ids(vector, np.asarray([entry_id], dtype=np.int64))
+        self._entries[entry_id] = _CacheEntry(
+            model=model,
+            context_hash=context_hash,
+            prompt=prompt,
+            response=copy.deepcopy(response),
+            created_at=time.monotonic(),
+        )
+        self._stats["stores"] += 1
+
+        if len(self._entries) > self.max_entries:
+            # Ids rosną z czasem, więc najmniejsze należą do najstarszych wpisów
+            overflow = sorted(self._entries)[: len(self._entries) - self.max_entries]
+            self._remove(overflow)
+            self._stats["evictions"] += len(overflow)
+
+    def _remove(self, entry_ids: List[int]) -> None:
+        for entry_id in entry_ids:
+            self._entries.pop(entry_id, None)
+        if self._index is not None:
+            self._index.remove_ids(np.asarray(entry_ids, dtype=np.int64))
+
+    def invalidate(self, reason: str = "") -> None:
+        """Drop all cached responses (e.g. after pantry or receipt changes)"""
+        if self._entries:
+            logger.debug(f"Semantic cache invalidated ({reason or 'manual'})")
+        self._entries.clear()
+        if self._index is not None:
+            self._index.reset()
+        self._stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+def register_invalidation_listeners(cache: SemanticResponseCache) -> None:
+    """Invalidate the cache after commits that changed receipts or products"""
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    from backend.models.shopping import Product, ShoppingTrip
+
+    watched_models = (Product, ShoppingTrip)
+    watched_tables = {Product.__tablename__, ShoppingTrip.__tablename__}
+
+    @event.listens_for(Session, "after_flush")
+    def _mark_changes(session: Session, flush_context: Any) -> None:
+        changed = list(session.new) + list(session.dirty) + list(session.deleted)
+        if any(isinstance(obj, watched_models) for obj in changed):
+            session.info["semantic_cache_stale"] = True
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _mark_bulk_changes(orm_execute_state: Any) -> None:
+        if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if getattr(table, "name", None) in watched_tables:
+                orm_execute_state.session.info["semantic_cache_stale"] = True
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidate(session: Session) -> None:
+        if session.info.pop("semantic_cache_stale", False):
+            cache.invalidate("receipts/products changed")
+
+    @event.listens_for(Session, "after_rollback")
+    def _reset(session: Session) -> None:
+        session.info.pop("semantic_cache_stale", None)
+
+
+# Wspólny cache semantyczny (domyślnie wyłączony, SEMANTIC_CACHE_ENABLED)
+semantic_response_cache = SemanticResponseCache()
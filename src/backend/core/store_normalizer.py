@@ -1,22 +1,77 @@
 import json
 import logging
+import os
 import re
+import time
 from typing import Dict, List, Optional, Tuple
 from difflib import SequenceMatcher
 
+from backend.core.fuzzy_index import NGramIndex
+
 logger = logging.getLogger(__name__)
 
 
 class StoreNormalizer:
     """Normalizator nazw sklepów z integracją słownika polskich sklepów"""
 
+    # Co ile sekund sprawdzać, czy plik słownika się zmienił
+    RELOAD_CHECK_INTERVAL = 2.0
+
     def __init__(self, stores_file: str = "data/config/polish_stores.json"):
         """Inicjalizuje normalizator z plikiem sklepów"""
         self.stores_file = stores_file
+        self._file_mtime = self._get_file_mtime()
+        self._last_reload_check = time.monotonic()
         self.stores = self._load_stores()
         self.store_variations = self._build_variations_index()
+        self._build_match_index()
         logger.info(f"Załadowano {len(self.stores)} sklepów do normalizacji")
 
+    def _get_file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.stores_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _reload_if_changed(self) -> None:
+        """Przeładowuje słownik i indeksy po zmianie pliku JSON"""
+        now = time.monotonic()
+        if now - self._last_reload_check < self.RELOAD_CHECK_INTERVAL:
+            return
+        self._last_reload_check = now
+        mtime = self._get_file_mtime()
+        if mtime == self._file_mtime:
+            return
+        self._file_mtime = mtime
+        self.stores = self._load_stores()
+        self.store_variations = self._build_variations_index()
+        self._build_match_index()
+        logger.info(f"Przeładowano {len(self.stores)} sklepów do normalizacji")
+
+    def _build_match_index(self) -> None:
+        """Buduje indeks n-gramów wariacji dla dopasowania częściowego i fuzzy"""
+        variations = []
+        # Sklep każdej wariacji - kolejność jak przy przeglądzie sklepów
+        self._variation_stores: List[Dict] = []
+        for store in self.stores:
+            for variation in store.get('variations', []):
+                variations.append(variation.lower())
+                self._variation_stores.append(store)
+        self.variation_match_index = NGramIndex(variations)
+
+    def _store_match(self, variation_id: int, similarity: float, method: str, store_name: str) -> Dict[str, str]:
+        store = self._variation_stores[variation_id]
+        return {
+            'id': store['id'],
+            'normalized_name': store['normalized_name'],
+            'normalized_name_en': store['normalized_name_en'],
+            'chain': store['chain'],
+            'type': store['type'],
+            'confidence': similarity,
+            'method': method,
+            'original_name': store_name
+        }
+
     def _load_stores(self) -> List[Dict]:
         """Ładuje sklepy z pliku JSON"""
         try:
@@ -99,6 +154,7 @@ class StoreNormalizer:
         if not store_name or not store_name.strip():
             return self._get_unknown_store()
 
+        self._reload_if_changed()
         store_name_clean = self._clean_store_name(store_name)
         
         # Najpierw spróbuj dokładnego dopasowania
@@ -175,27 +231,17 @@ class StoreNormalizer:
         best_match = None
         best_score = 0.0
 
-        for store in self.stores:
-            variations = store.get('variations', [])
-            for variation in variations:
-                variation_lower = variation.lower()
-                
-                # Sprawdź czy nazwa sklepu zawiera wariację lub odwrotnie
-                if variation_lower in store_name_lower or store_name_lower in variation_lower:
-                    # Oblicz podobieństwo
-                    similarity = SequenceMatcher(None, store_name_lower, variation_lower).ratio()
-                    if similarity > best_score:
-                        best_score = similarity
-                        best_match = {
-                            'id': store['id'],
-                            'normalized_name': store['normalized_name'],
-                            'normalized_name_en': store['normalized_name_en'],
-                            'chain': store['chain'],
-                            'type': store['type'],
-                            'confidence': similarity,
-                            'method': 'partial_match',
-                            'original_name': store_name
-                        }
+        # Tylko wariacje zawarte w nazwie sklepu lub ją zawierające
+        candidates = set(self.variation_match_index.substrings_of(store_name_lower))
+        candidates.update(self.variation_match_index.superstrings_of(store_name_lower))
+        for variation_id in sorted(candidates):
+            variation_lower = self.variation_match_index.keys[variation_id]
+
+            # Oblicz podobieństwo
+            similarity = SequenceMatcher(None, store_name_lower, variation_lower).ratio()
+            if similarity > best_score:
+                best_score = similarity
+                best_match = self._store_match(variation_id, similarity, 'partial_match', store_name)
 
         return best_match if best_score > 0.5 else None
 
@@ -205,25 +251,15 @@ class StoreNormalizer:
         best_match = None
         best_score = 0.0
 
-        for store in self.stores:
-            variations = store.get('variations', [])
-            for variation in variations:
-                variation_lower = variation.lower()
-                
-                # Oblicz podobieństwo fuzzy
-                similarity = SequenceMatcher(None, store_name_lower, variation_lower).ratio()
-                if similarity > best_score:
-                    best_score = similarity
-                    best_match = {
-                        'id': store['id'],
-                        'normalized_name': store['normalized_name'],
-                        'normalized_name_en': store['normalized_name_en'],
-                        'chain': store['chain'],
-                        'type': store['type'],
-                        'confidence': similarity,
-                        'method': 'fuzzy_match',
-                        'original_name': store_name
-                    }
+        # Ograniczona lista kandydatów wg pokrycia bigramów (FUZZY_SCORE_TOLERANCE)
+        for variation_id in self.variation_match_index.similar(store_name_lower):
+            variation_lower = self.variation_match_index.keys[variation_id]
+
+            # Oblicz podobieństwo fuzzy
+            similarity = SequenceMatcher(None, store_name_lower, variation_lower).ratio()
+            if similarity > best_score:
+                best_score = similarity
+                best_match = self._store_match(variation_id, similarity, 'fuzzy_match', store_name)
 
         return best_match if best_score > 0.6 else None
 
@@ -338,6 +374,7 @@ class StoreNormalizer:
             
             # Zaktualizuj indeks wariacji
             self.store_variations = self._build_variations_index()
+            self._build_match_index()
             
             logger.info(f"Dodano niestandardowy sklep: {store_info['normalized_name']}")
             return True
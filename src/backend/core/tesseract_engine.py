@@ -0,0 +1,233 @@
+"""
+Trwałe uchwyty Tesseract (tesserocr)
+
+pytesseract uruchamia osobny proces ``tesseract`` dla każdego obrazu,
+zapisuje pliki tymczasowe i za każdym razem wczytuje traineddata. Ten
+moduł trzyma w procesie długo żyjące uchwyty ``PyTessBaseAPI`` (po kilka
+na język i tryb OEM), więc koszt inicjalizacji jest płacony raz. Zadania
+czekają na wolny uchwyt w kolejce z limitem czasu, a samo rozpoznawanie
+jest przerywane przez Tesseract po przekroczeniu limitu.
+
+Gdy tesserocr nie jest zainstalowany, OCR korzysta z pytesseract jak
+dotychczas (``tesseract_engine.available`` jest wtedy False).
+"""
+
+import logging
+import queue
+import shlex
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from backend.settings import settings
+
+try:
+    import tesserocr
+
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+    logging.info("tesserocr not available, OCR will use pytesseract subprocesses")
+
+logger = logging.getLogger(__name__)
+
+# Domyślne wartości jak w CLI tesseract
+_DEFAULT_OEM = 3
+_DEFAULT_PSM = 3
+
+
+@dataclass
+class TesseractConfig:
+    """Parsed pytesseract-style config string"""
+
+    lang: str = "eng"
+    oem: int = _DEFAULT_OEM
+    psm: int = _DEFAULT_PSM
+    variables: Dict[str, str] = field(default_factory=dict)
+
+
+def parse_config(config: Optional[str]) -> TesseractConfig:
+    """Parse ``--oem``, ``--psm``, ``-l`` and ``-c name=value`` like the tesseract CLI"""
+    parsed = TesseractConfig()
+    # pytesseract dzieli konfigurację przez shlex - te same reguły cudzysłowów i spacji
+    tokens = shlex.split(config or "")
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        value = tokens[index + 1] if index + 1 < len(tokens) else None
+        if token == "--oem" and value is not None:
+            parsed.oem = int(value)
+            index += 1
+        elif token == "--psm" and value is not None:
+            parsed.psm = int(value)
+            index += 1
+        elif token == "-l" and value is not None:
+            parsed.lang = value
+            index += 1
+        elif token == "-c" and value is not None and "=" in value:
+            name, _, variable_value = value.partition("=")
+            parsed.variables[name] = variable_value
+            index += 1
+        index += 1
+    return parsed
+
+
+class _Handle:
+    """One initialized PyTessBaseAPI with the variables it currently has set"""
+
+    def __init__(self, api: Any) -> None:
+        self.api = api
+        self.defaults: Dict[str, str] = {}
+
+    def configure(self, config: TesseractConfig) -> None:
+        # Zmienne z poprzedniego zadania wracają do wartości domyślnych
+        for name, default in self.defaults.items():
+            if name not in config.variables:
+                self.api.SetVariable(name, default)
+        for name, value in config.variables.items():
+            if name not in self.defaults:
+                self.defaults[name] = self.api.GetVariableAsString(name) or ""
+            self.api.SetVariable(name, value)
+        self.api.SetPageSegMode(config.psm)
+
+
+class TesseractEngine:
+    """Pool of long-lived Tesseract API handles in the current process"""
+
+    def __init__(self, max_handles: Optional[int] = None, backend: Optional[str] = None) -> None:
+        """
+        Initialize Tesseract engine
+
+        Args:
+            max_handles: Handles per language/OEM pair (parallel jobs in one process)
+            backend: "auto", "tesserocr" or "pytesseract" (defaults to OCR_TESSERACT_BACKEND)
+        """
+        self.max_handles = max_handles or settings.OCR_TESSERACT_HANDLES
+        backend = backend or settings.OCR_TESSERACT_BACKEND
+        if backend == "tesserocr" and not TESSEROCR_AVAILABLE:
+            logger.warning("OCR_TESSERACT_BACKEND=tesserocr but tesserocr is not installed")
+        self.available = TESSEROCR_AVAILABLE and backend in ("auto", "tesserocr")
+        self._handles: Dict[Tuple[str, int], "queue.Queue[_Handle]"] = {}
+        self._created: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"jobs": 0, "timeouts": 0, "handles_created": 0}
+
+    def _create_handle(self, lang: str, oem: int) -> _Handle:
+        try:
+            api = tesserocr.PyTessBaseAPI(lang=lang, oem=oem)
+        except RuntimeError as e:
+            # Ten sam kształt komunikatu co błąd CLI - obsługa fallbacku języka go rozpoznaje
+            traineddata = ", ".join(f"{code}.traineddata" for code in lang.split("+"))
+            raise RuntimeError(
+                f"Failed loading language data from tessdata ({traineddata}): {e}"
+            ) from e
+        self._stats["handles_created"] += 1
+        logger.info(f"Tesseract handle initialized (lang={lang}, oem={oem})")
+        return _Handle(api)
+
+    @contextmanager
+    def _handle(self, lang: str, oem: int, timeout: float) -> Iterator[_Handle]:
+        key = (lang, oem)
+        with self._lock:
+            handles = self._handles.setdefault(key, queue.Queue())
+            create = handles.empty() and self._created.get(key, 0) < self.max_handles
+            if create:
+                self._created[key] = self._created.get(key, 0) + 1
+
+        if create:
+            try:
+                handle = self._create_handle(lang, oem)
+            except BaseException:
+                with self._lock:
+                    self._created[key] -= 1
+                raise
+        else:
+            try:
+                handle = handles.get(timeout=timeout)
+            except queue.Empty:
+                self._stats["timeouts"] += 1
+                raise TimeoutError(f"No free Tesseract handle within {timeout:.0f}s")
+
+        try:
+            yield handle
+        finally:
+            handle.api.Clear()
+            handles.put(handle)
+
+    def preload(self, config: Optional[str]) -> None:
+        """Initialize one handle for the language/OEM of ``config`` ahead of the first job"""
+        if not self.available:
+            return
+        parsed = parse_config(config)
+        try:
+            with self._handle(parsed.lang, parsed.oem, timeout=0.1):
+                pass
+        except TimeoutError:
+            pass  # Uchwyty już istnieją i są zajęte
+
+    @contextmanager
+    def _recognized(self, image: Any, config: Optional[str], timeout: float) -> Iterator[Any]:
+        """Run recognition on a pooled handle and yield the API holding the result"""
+        parsed = parse_config(config)
+        if isinstance(image, Image.Image) and image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("L")
+        pixels = np.ascontiguousarray(np.asarray(image), dtype=np.uint8)
+        if pixels.ndim not in (2, 3):
+            raise ValueError(f"Unsupported image shape for OCR: {pixels.shape}")
+        height, width = pixels.shape[:2]
+        bytes_per_pixel = 1 if pixels.ndim == 2 else pixels.shape[2]
+
+        with self._handle(parsed.lang, parsed.oem, timeout) as handle:
+            handle.configure(parsed)
+            handle.api.SetImageBytes(
+                pixels.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel
+            )
+            self._stats["jobs"] += 1
+            if not handle.api.Recognize(int(timeout * 1000)):
+                self._stats["timeouts"] += 1
+                raise TimeoutError(f"OCR processing timed out after {timeout:.0f} seconds")
+            yield handle.api
+
+    def image_to_data(
+        self, image: Any, config: Optional[str] = None, timeout: Optional[float] = None
+    ) -> Dict[str, List[Any]]:
+        """Word-level text and confidences, like ``pytesseract.image_to_data`` (DICT)"""
+        timeout = timeout or settings.OCR_JOB_TIMEOUT
+        words: Dict[str, List[Any]] = {"text": [], "conf": []}
+        with self._recognized(image, config, timeout) as api:
+            iterator = api.GetIterator()
+            if iterator is None:
+                return words
+            level = tesserocr.RIL.WORD
+            for word in tesserocr.iterate_level(iterator, level):
+                text = word.GetUTF8Text(level)
+                if text is None:
+                    continue
+                words["text"].append(text)
+                words["conf"].append(word.Confidence(level))
+        return words
+
+    def image_to_string(
+        self, image: Any, config: Optional[str] = None, timeout: Optional[float] = None
+    ) -> str:
+        """Recognized text, like ``pytesseract.image_to_string``"""
+        timeout = timeout or settings.OCR_JOB_TIMEOUT
+        with self._recognized(image, config, timeout) as api:
+            return api.GetUTF8Text()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "available": self.available,
+            "handles": dict(
+                (f"{lang}/oem{oem}", count) for (lang, oem), count in self._created.items()
+            ),
+        }
+
+
+# Uchwyty tego procesu (każdy proces puli OCR ma własne)
+tesseract_engine = TesseractEngine()
@@ -4,9 +4,12 @@ Zgodnie z regułami MDC dla zarządzania pamięcią i optymalizacji
 """
 
 import asyncio
+import json
 import logging
 import os
-import weakref
+import sqlite3
+import threading
+import uuid
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from datetime import datetime
@@ -15,6 +18,8 @@ from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 
+from backend.settings import settings
+
 try:
     import faiss
 
@@ -109,46 +114,303 @@ class SmartChunker:
         return chunks
 
 
-class VectorStore:
-    """FAISS-based vector store with proper memory management and optimizations"""
+class ChunkPayloadStore:
+    """Compact SQLite side store owning chunk payloads and their embeddings
+
+    Row ids are stable int64 values (AUTOINCREMENT, never reused) and are the
+    same ids that are stored in the FAISS ``IndexIDMap2``.
+    """
+
+    def __init__(self, db_path: str = ":memory:") -> None:
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database lazily so importing the module has no side effects"""
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            if self.db_path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    doc_id TEXT NOT NULL UNIQUE,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    directory_path TEXT NOT NULL DEFAULT 'default',
+                    created_at TEXT,
+                    embedding BLOB
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_directory "
+                "ON chunks(directory_path)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chunks_created_at ON chunks(created_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _row_to_chunk(row: Tuple[Any, ...]) -> DocumentChunk:
+        doc_id, content, metadata, created_at = row
+        return DocumentChunk(
+            id=doc_id,
+            content=content,
+            metadata=json.loads(metadata),
+            created_at=created_at,
+        )
 
-    def __init__(self, dimension: int = 768, index_type: str = "IndexIVFFlat") -> None:
-        self.dimension = dimension
-        self.index_type = index_type
+    def upsert(self, documents: List[DocumentChunk]) -> Tuple[List[int], List[int]]:
+        """
+        Insert or replace chunks keyed by doc_id
+
+        Returns:
+            Tuple of (new row ids in input order, row ids of replaced chunks)
+        """
+        new_ids: List[int] = []
+        replaced_ids: List[int] = []
+        with self._lock:
+            conn = self._connection()
+            for doc in documents:
+                row = conn.execute(
+                    "SELECT id FROM chunks WHERE doc_id = ?", (doc.id,)
+                ).fetchone()
+                if row:
+                    replaced_ids.append(int(row[0]))
+                    conn.execute("DELETE FROM chunks WHERE id = ?", (row[0],))
+                metadata = doc.metadata if isinstance(doc.metadata, dict) else {}
+                cursor = conn.execute(
+                    "INSERT INTO chunks "
+                    "(doc_id, content, metadata, directory_path, created_at, embedding) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        doc.id,
+                        doc.content,
+                        json.dumps(metadata, ensure_ascii=False, default=str),
+                        str(metadata.get("directory_path", "default")),
+                        doc.created_at,
+                        np.asarray(doc.embedding, dtype=np.float32).tobytes(),
+                    ),
+                )
+                new_ids.append(int(cursor.lastrowid))
+            conn.commit()
+        return new_ids, replaced_ids
+
+    def next_id(self) -> int:
+        """Id that the next inserted chunk will receive"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'chunks'"
+            ).fetchone()
+        return (int(row[0]) if row else 0) + 1
+
+    def get_by_ids(self, ids: List[int]) -> Dict[int, DocumentChunk]:
+        """Fetch chunks by row ids in a single query"""
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT id, doc_id, content, metadata, created_at FROM chunks "
+                f"WHERE id IN ({placeholders})",
+                [int(i) for i in ids],
+            ).fetchall()
+        return {int(row[0]): self._row_to_chunk(row[1:]) for row in rows}
+
+    def get_by_doc_id(self, doc_id: str) -> Optional[Tuple[int, DocumentChunk]]:
+        """Fetch a chunk and its row id by doc_id"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT id, doc_id, content, metadata, created_at FROM chunks "
+                "WHERE doc_id = ?",
+                (doc_id,),
+            ).fetchone()
+        if not row:
+            return None
+        return int(row[0]), self._row_to_chunk(row[1:])
+
+    def delete(self, ids: List[int]) -> int:
+        """Delete chunks by row ids"""
+        if not ids:
+            return 0
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                f"DELETE FROM chunks WHERE id IN ({placeholders})", [int(i) for i in ids]
+            )
+            conn.commit()
+        return cursor.rowcount
+
+    def ids_matching(self, metadata_filter: Dict[str, Any]) -> List[int]:
+        """Row ids of chunks whose metadata contains all key/value pairs of the filter"""
+        remaining = dict(metadata_filter)
+        query = "SELECT id, metadata FROM chunks"
+        args: List[Any] = []
+        # directory_path has its own indexed column
+        if "directory_path" in remaining:
+            query += " WHERE directory_path = ?"
+            args.append(str(remaining.pop("directory_path")))
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(query, args).fetchall()
+        matching = []
+        for row_id, metadata in rows:
+            data = json.loads(metadata) if remaining else {}
+            if all(data.get(key) == value for key, value in remaining.items()):
+                matching.append(int(row_id))
+        return matching
+
+    def oldest_ids(self, count: int) -> List[int]:
+        """Row ids of the oldest chunks"""
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT id FROM chunks ORDER BY created_at ASC, id ASC LIMIT ?", (count,)
+            ).fetchall()
+        return [int(row[0]) for row in rows]
+
+    def all_ids(self, on_snapshot: Optional[Callable[[], None]] = None) -> np.ndarray:
+        """
+        All row ids as an int64 array
+
+        Args:
+            on_snapshot: Called while the lock is still held, before any other write
+        """
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute("SELECT id FROM chunks ORDER BY id").fetchall()
+            if on_snapshot is not None:
+                on_snapshot()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def embeddings_for(self, ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Stored embeddings for the given row ids (ids, vectors)"""
+        found_ids: List[int] = []
+        vectors: List[np.ndarray] = []
+        for start in range(0, len(ids), 900):
+            batch = [int(i) for i in ids[start : start + 900]]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                conn = self._connection()
+                rows = conn.execute(
+                    f"SELECT id, embedding FROM chunks WHERE id IN ({placeholders})",
+                    batch,
+                ).fetchall()
+            for row_id, blob in rows:
+                if blob:
+                    found_ids.append(int(row_id))
+                    vectors.append(np.frombuffer(blob, dtype=np.float32))
+        if not vectors:
+            return np.array([], dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.array(found_ids, dtype=np.int64), np.vstack(vectors)
+
+    def directory_counts(self) -> Dict[str, int]:
+        """Number of chunks per directory_path"""
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT directory_path, COUNT(*) FROM chunks GROUP BY directory_path"
+            ).fetchall()
+        return {path: count for path, count in rows}
+
+    def count(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            return int(conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM chunks")
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
 
-        # Initialize optimized FAISS index
-        if index_type == "IndexFlatL2":
-            self.index = faiss.IndexFlatL2(dimension)
-        elif index_type == "IndexIVFFlat":
-            # Use IVF for better memory efficiency and speed
-            quantizer = faiss.IndexFlatL2(dimension)
-            self.index = faiss.IndexIVFFlat(quantizer, dimension, 100)
-            # Train the index (will be done when vectors are added)
-            self._is_trained = False
-        elif index_type == "IndexIVFPQ":
-            # Use Product Quantization for memory efficiency
-            quantizer = faiss.IndexFlatL2(dimension)
-            # 8 bits per sub-vector, 8 sub-vectors
-            self.index = faiss.IndexIVFPQ(quantizer, dimension, 100, 8, 8)
-            self._is_trained = False
-        else:
+
+class VectorStore:
+    """FAISS-based vector store owning its chunk payloads
+
+    Vectors live in a ``faiss.IndexIDMap2`` keyed by stable int64 ids; chunk
+    content, metadata and the raw embeddings live in a SQLite side store under
+    the same ids. With ``storage_path`` set, both survive restarts and the
+    index can always be rebuilt from the side store.
+
+    ``index_type`` is the target index. Vectors are buffered in a flat index
+    until ``train_threshold`` chunks are stored; the target index is then
+    trained and filled in the background from the side store (searches keep
+    using the flat index meanwhile) and its ``nprobe``/``efSearch`` is tuned
+    to ``target_recall``. The index is retrained whenever the corpus grows
+    ``RETRAIN_GROWTH_FACTOR`` times past the last training size.
+    """
+
+    INDEX_FILENAME = "index.faiss"
+    PAYLOAD_FILENAME = "chunks.db"
+    MANIFEST_FILENAME = "manifest.json"
+    SUPPORTED_INDEX_TYPES = ("IndexFlatL2", "IndexIVFFlat", "IndexIVFPQ", "IndexHNSWFlat")
+    RETRAIN_GROWTH_FACTOR = 4
+    BUILD_BATCH_SIZE = 10000
+    RECALL_SAMPLE_SIZE = 100
+    RECALL_K = 10
+    # Filtered searches with at most this many candidates are scored exactly
+    EXACT_FILTER_LIMIT = 4096
+    FILTER_CACHE_SIZE = 128
+
+    def __init__(
+        self,
+        dimension: int = 768,
+        index_type: str = "IndexIVFFlat",
+        storage_path: Optional[str] = None,
+        max_documents: int = 200000,
+        train_threshold: Optional[int] = None,
+        target_recall: Optional[float] = None,
+    ) -> None:
+        if index_type not in self.SUPPORTED_INDEX_TYPES:
             raise ValueError(f"Unsupported index type: {index_type}")
 
-        # Use weak references to avoid memory leaks
-        self._documents: Dict[str, weakref.ref[DocumentChunk]] = {}
-        self._document_ids: List[str] = []
+        self.dimension = dimension
+        self.index_type = index_type
+        self.storage_path = storage_path
+        self.train_threshold = train_threshold or settings.RAG_INDEX_TRAIN_THRESHOLD
+        self.target_recall = target_recall or settings.RAG_INDEX_TARGET_RECALL
+
+        # Start with a flat buffer index, the target index is trained later
+        self.index = self._create_flat_index()
+        self.active_index_type = "IndexFlatL2"
+        self.search_params: Dict[str, Any] = {}
+        self._trained_size = 0
+        self._promotion_task: Optional[asyncio.Task] = None
+        # Index changes made while a promotion is building the new index
+        self._pending_changes: Optional[List[Tuple[str, List[int]]]] = None
+        # Allowed row ids per metadata filter, dropped on every write
+        self._filter_cache: Dict[Tuple[Tuple[str, str], ...], np.ndarray] = {}
+
+        # Chunk payloads are owned by the side store (not weak references)
+        payload_path = (
+            str(Path(storage_path) / self.PAYLOAD_FILENAME) if storage_path else ":memory:"
+        )
+        self._payloads = ChunkPayloadStore(payload_path)
 
         # Memory management
-        self._max_documents = 10000
-        self._cleanup_threshold = 8000
+        self._max_documents = max_documents
+        self._cleanup_threshold = int(max_documents * 0.8)
         self._cleanup_lock = asyncio.Lock()
 
-        # Cache for frequently accessed vectors
-        self._vector_cache: Dict[str, np.ndarray] = {}
-        self._cache_max_size = 1000
-        self._cache_hits = 0
-        self._cache_misses = 0
-
         # Memory mapping for large indices
         self._use_memory_mapping = False
         self._index_file_path: Optional[str] = None
@@ -159,102 +421,308 @@ class VectorStore:
             "total_vectors": 0,
             "last_cleanup": 0.0,
             "cleanup_count": 0,
-            "cache_hits": 0,
-            "cache_misses": 0,
+            "promotions": 0,
+            "last_promotion_seconds": 0.0,
         }
 
         # Track chunks since last save
         self.chunks_since_save = 0
 
-    def _cleanup_callback(self, weak_ref) -> None:
-        """Callback when document is garbage collected"""
-        for doc_id, ref in list(self._documents.items()):
-            if ref is weak_ref:
-                del self._documents[doc_id]
-                if doc_id in self._document_ids:
-                    self._document_ids.remove(doc_id)
-                # Remove from cache if present
-                if doc_id in self._vector_cache:
-                    del self._vector_cache[doc_id]
-                logger.debug(f"Cleaned up garbage collected document: {doc_id}")
-                break
+    def _create_flat_index(self) -> "faiss.IndexIDMap2":
+        """Create an empty ID-mapped brute-force index"""
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(self.dimension))
+
+    def _create_trainable_index(self, index_type: str, n: int) -> Tuple[Any, int]:
+        """
+        Create an untrained base index sized for ``n`` vectors
+
+        Returns:
+            Tuple of (base index, number of training vectors to sample)
+        """
+        # ~4*sqrt(n) lists, with at least 39 training points per list
+        nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+        if index_type == "IndexIVFFlat":
+            quantizer = faiss.IndexFlatL2(self.dimension)
+            return faiss.IndexIVFFlat(quantizer, self.dimension, nlist), nlist * 64
+        if index_type == "IndexIVFPQ":
+            # Largest sub-quantizer count dividing the dimension
+            m = next(c for c in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1) if self.dimension % c == 0)
+            quantizer = faiss.IndexFlatL2(self.dimension)
+            # 8 bits per sub-vector code needs at least 256 * 39 training points
+            return (
+                faiss.IndexIVFPQ(quantizer, self.dimension, nlist, m, 8),
+                max(nlist * 64, 256 * 39),
+            )
+        if index_type == "IndexHNSWFlat":
+            return faiss.IndexHNSWFlat(self.dimension, 32), 0
+        raise ValueError(f"Unsupported index type: {index_type}")
 
-    def _get_cached_embedding(self, doc_id: str) -> Optional[np.ndarray]:
-        """Get embedding from cache"""
-        if doc_id in self._vector_cache:
-            self._stats["cache_hits"] = int(self._stats.get("cache_hits", 0)) + 1
-            return self._vector_cache[doc_id]
-        self._stats["cache_misses"] = int(self._stats.get("cache_misses", 0)) + 1
+    @staticmethod
+    def _index_remove(index: Any, ids: np.ndarray) -> None:
+        """Remove ids from an index; HNSW cannot delete, its vectors become tombstones"""
+        try:
+            index.remove_ids(ids)
+        except RuntimeError:
+            # Search skips vectors whose payload no longer exists
+            logger.debug(f"Index does not support removal, left {len(ids)} tombstones")
+
+    @staticmethod
+    def _coerce_embedding(response: Any) -> Optional[List[float]]:
+        """Accept both list and {"embedding": [...]} responses from LLM clients"""
+        if isinstance(response, dict):
+            response = response.get("embedding")
+        if response and any(response):
+            return list(response)
         return None
 
-    def _cache_embedding(self, doc_id: str, embedding: np.ndarray) -> None:
-        """Cache embedding with LRU eviction"""
-        if len(self._vector_cache) >= self._cache_max_size:
-            # Remove oldest entry (simple LRU)
-            oldest_key = next(iter(self._vector_cache))
-            del self._vector_cache[oldest_key]
-        self._vector_cache[doc_id] = embedding
-
     async def add_document(
-        self, text: str, metadata: Dict[str, Any], auto_embed: bool = False
+        self,
+        text: str,
+        metadata: Dict[str, Any],
+        auto_embed: bool = False,
+        embedding: Optional[List[float]] = None,
+        doc_id: Optional[str] = None,
     ) -> None:
-        """Add a single document to the vector store"""
+        """Add a single document to the vector store
+
+        A precomputed ``embedding`` takes precedence over ``auto_embed``.
+        Adding a chunk with an existing ``doc_id`` replaces it.
+        """
         # Create a simple document chunk
-        doc = DocumentChunk(
-            id=f"doc_{len(self._documents)}", content=text, metadata=metadata
-        )
+        doc = DocumentChunk(id=doc_id or "", content=text, metadata=metadata)
 
+        if embedding and len(embedding) != self.dimension:
+            logger.warning(
+                f"Embedding dimension {len(embedding)} does not match index "
+                f"dimension {self.dimension}, skipping precomputed embedding"
+            )
+            embedding = None
+
+        if embedding:
+            doc.embedding = np.array(embedding, dtype=np.float32)
         # Generate embedding if auto_embed is True
-        if auto_embed:
+        elif auto_embed:
             try:
                 # Import here to avoid circular imports
                 from backend.core.llm_client import llm_client
 
                 # Use default embedding model
-                embedding_response = await llm_client.embed(model="nomic-embed-text", text=text)
-                if embedding_response and "embedding" in embedding_response:
-                    doc.embedding = np.array(
-                        embedding_response["embedding"], dtype=np.float32
-                    )
+                embedding_response = self._coerce_embedding(
+                    await llm_client.embed(model="nomic-embed-text", text=text)
+                )
+                if embedding_response and len(embedding_response) == self.dimension:
+                    doc.embedding = np.array(embedding_response, dtype=np.float32)
             except Exception as e:
                 logger.warning(f"Failed to auto-generate embedding: {e}")
 
         await self.add_documents([doc])
 
     async def add_documents(self, documents: List[DocumentChunk]) -> None:
-        """Add documents to vector store with memory management and caching"""
-        if len(self._documents) + len(documents) >= self._max_documents:
+        """Add documents to vector store with memory management"""
+        documents = [doc for doc in documents if doc.embedding is not None]
+        if not documents:
+            return
+
+        if self._payloads.count() + len(documents) >= self._max_documents:
             await self._cleanup_old_documents()
-        embeddings = []
-        for doc in documents:
-            if doc.embedding is not None:
-                embeddings.append(doc.embedding)
-                self._cache_embedding(doc.id, doc.embedding)
-                self._documents[doc.id] = weakref.ref(doc, self._cleanup_callback)
-                self._document_ids.append(doc.id)
-                self._stats["total_documents"] = (
-                    int(self._stats.get("total_documents", 0)) + 1
-                )
-                self.chunks_since_save += 1
-        if embeddings:
-            embeddings_array = np.array(embeddings, dtype=np.float32)
-            if hasattr(self, "_is_trained") and not self._is_trained:
-                if len(embeddings_array) >= 100:
-                    self.index.train(embeddings_array)
-                    self._is_trained = True
-                    logger.info("Trained FAISS index")
+
+        # Chunks without an id get one derived from their future row id
+        next_id = self._payloads.next_id()
+        for offset, doc in enumerate(documents):
+            if not doc.id:
+                doc.id = f"chunk_{next_id + offset}_{uuid.uuid4().hex[:8]}"
+
+        new_ids, replaced_ids = self._payloads.upsert(documents)
+        if replaced_ids:
+            self._index_remove(self.index, np.array(replaced_ids, dtype=np.int64))
+            self._record_change("remove", replaced_ids)
+
+        embeddings_array = np.array(
+            [doc.embedding for doc in documents], dtype=np.float32
+        ).reshape(len(documents), self.dimension)
+        self.index.add_with_ids(embeddings_array, np.array(new_ids, dtype=np.int64))
+        self._record_change("add", new_ids)
+
+        self.chunks_since_save += len(documents)
+        self._stats["total_documents"] = self._payloads.count()
+        self._stats["total_vectors"] = int(self.index.ntotal)
+        logger.debug(f"Added {len(documents)} documents to vector store")
+
+        self._maybe_schedule_promotion()
+
+    def _record_change(self, operation: str, ids: List[int]) -> None:
+        """Remember index changes so an in-flight promotion can replay them"""
+        self._filter_cache.clear()
+        if self._pending_changes is not None and ids:
+            self._pending_changes.append((operation, list(ids)))
+
+    def _maybe_schedule_promotion(self) -> None:
+        """Start a background index promotion when the corpus outgrew the index"""
+        if self.index_type == "IndexFlatL2":
+            return
+        if self._promotion_task is not None and not self._promotion_task.done():
+            return
+
+        total = self._payloads.count()
+        if self.active_index_type == "IndexFlatL2":
+            needed = total >= self.train_threshold
+        else:
+            needed = total >= self._trained_size * self.RETRAIN_GROWTH_FACTOR
+        if needed:
+            self._promotion_task = asyncio.create_task(self.rebuild_index())
+
+    async def rebuild_index(self) -> Dict[str, Any]:
+        """
+        Train the target index from the side store and swap it in
+
+        Runs the expensive work in a worker thread; searches and writes keep
+        using the current index, writes made meanwhile are replayed onto the
+        new index before the swap.
+
+        Returns:
+            Summary of the promotion (index type, size, tuned search params)
+        """
+        if self.index_type == "IndexFlatL2":
+            return {"index_type": self.active_index_type, "skipped": True}
+
+        started = datetime.now()
+
+        def start_recording() -> None:
+            self._pending_changes = []
+
+        try:
+            # Changes are recorded from the snapshot on, atomically with it
+            ids = await asyncio.to_thread(self._payloads.all_ids, start_recording)
+            if len(ids) == 0:
+                return {"index_type": self.active_index_type, "skipped": True}
+
+            new_index, params = await asyncio.to_thread(
+                self._build_index, self.index_type, ids
+            )
+
+            # Replay writes made while building (no awaits below: atomic on the loop)
+            snapshot = set(ids.tolist())
+            for operation, changed_ids in self._pending_changes:
+                if operation == "add":
+                    # Rows stored just before the snapshot are recorded after it
+                    changed_ids = [i for i in changed_ids if i not in snapshot]
+                    add_ids, vectors = self._payloads.embeddings_for(changed_ids)
+                    if len(add_ids):
+                        new_index.add_with_ids(vectors, add_ids)
                 else:
-                    self.index = faiss.IndexFlatL2(self.dimension)
-                    logger.info("Using FlatL2 index for small dataset")
-            self.index.add(embeddings_array)
+                    self._index_remove(new_index, np.array(changed_ids, dtype=np.int64))
+
+            self.index = new_index
+            self.active_index_type = self.index_type
+            self.search_params = params
+            self._trained_size = len(ids)
+            self.chunks_since_save += 1
+
+            elapsed = (datetime.now() - started).total_seconds()
+            self._stats["promotions"] = int(self._stats.get("promotions", 0)) + 1
+            self._stats["last_promotion_seconds"] = elapsed
             self._stats["total_vectors"] = int(self.index.ntotal)
-            logger.debug(f"Added {len(documents)} documents to vector store")
+            logger.info(
+                f"Promoted vector index to {self.index_type} with {len(ids)} vectors "
+                f"in {elapsed:.1f}s, search params: {params}"
+            )
+            return {
+                "index_type": self.active_index_type,
+                "trained_size": self._trained_size,
+                "search_params": params,
+                "seconds": elapsed,
+            }
+        except Exception as e:
+            logger.error(f"Vector index promotion failed: {e}")
+            return {"index_type": self.active_index_type, "error": str(e)}
+        finally:
+            self._pending_changes = None
+
+    def _build_index(self, index_type: str, ids: np.ndarray) -> Tuple[Any, Dict[str, Any]]:
+        """Build, fill and tune a new index from stored embeddings (worker thread)"""
+        n = len(ids)
+        rng = np.random.default_rng(0)
+        base, train_size = self._create_trainable_index(index_type, n)
+        index = faiss.IndexIDMap2(base)
+
+        if not index.is_trained:
+            sample_ids = rng.choice(ids, size=min(n, train_size), replace=False)
+            _, train_vectors = self._payloads.embeddings_for(sample_ids.tolist())
+            index.train(train_vectors)
+
+        # Exact top-k of sampled stored vectors, used as recall ground truth
+        query_ids = rng.choice(ids, size=min(n, self.RECALL_SAMPLE_SIZE), replace=False)
+        _, queries = self._payloads.embeddings_for(query_ids.tolist())
+        k = min(self.RECALL_K, n)
+        best_dist = np.full((len(queries), k), np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        query_norms = (queries**2).sum(axis=1)[:, None]
+
+        for start in range(0, n, self.BUILD_BATCH_SIZE):
+            batch_ids, vectors = self._payloads.embeddings_for(
+                ids[start : start + self.BUILD_BATCH_SIZE].tolist()
+            )
+            if not len(batch_ids):
+                continue
+            index.add_with_ids(vectors, batch_ids)
+
+            dist = query_norms - 2 * queries @ vectors.T + (vectors**2).sum(axis=1)[None, :]
+            all_dist = np.hstack([best_dist, dist.astype(np.float32)])
+            all_ids = np.hstack([best_ids, np.broadcast_to(batch_ids, dist.shape)])
+            top = np.argsort(all_dist, axis=1)[:, :k]
+            best_dist = np.take_along_axis(all_dist, top, axis=1)
+            best_ids = np.take_along_axis(all_ids, top, axis=1)
+
+        return index, self._tune_search_params(index, index_type, queries, best_ids, k)
+
+    def _tune_search_params(
+        self,
+        index: Any,
+        index_type: str,
+        queries: np.ndarray,
+        ground_truth: np.ndarray,
+        k: int,
+    ) -> Dict[str, Any]:
+        """Pick the cheapest nprobe/efSearch reaching the target recall@k"""
+        if index_type == "IndexHNSWFlat":
+            name, candidates = "efSearch", [16, 32, 64, 128, 256, 512]
+        else:
+            nlist = faiss.extract_index_ivf(index).nlist
+            name = "nprobe"
+            candidates = [p for p in (1, 2, 4, 8, 16, 32, 64, 128, 256) if p < nlist]
+            candidates.append(nlist)
+
+        parameter_space = faiss.ParameterSpace()
+        recall = 0.0
+        value = candidates[-1]
+        for value in candidates:
+            parameter_space.set_index_parameter(index, name, value)
+            _, found = index.search(queries, k)
+            recall = float(
+                np.mean(
+                    [
+                        len(set(found_row) & set(truth_row)) / k
+                        for found_row, truth_row in zip(found, ground_truth)
+                    ]
+                )
+            )
+            if recall >= self.target_recall:
+                break
+        return {name: int(value), "recall": round(recall, 4)}
+
+    def _apply_search_params(self) -> None:
+        """Re-apply tuned search parameters (e.g. after loading)"""
+        parameter_space = faiss.ParameterSpace()
+        for name, value in self.search_params.items():
+            if name in ("nprobe", "efSearch"):
+                parameter_space.set_index_parameter(self.index, name, int(value))
 
     async def search(
         self, query_embedding: np.ndarray, k: int = 5
     ) -> List[Tuple[DocumentChunk, float]]:
-        """Search for similar documents with caching and proper error handling"""
+        """Search for similar documents and resolve payloads from the side store"""
         try:
+            query_embedding = np.asarray(query_embedding, dtype=np.float32)
             # Ensure query embedding is 2D
             if query_embedding.ndim == 1:
                 query_embedding = query_embedding.reshape(1, -1)
@@ -265,57 +733,135 @@ class VectorStore:
                 return []
 
             # Search in FAISS index
-            distances, indices = self.index.search(query_embedding, k)
-
-            # Check if search returned any results
-            if len(distances) == 0 or len(indices) == 0:
+            distances, ids = self.index.search(query_embedding, k)
+            if len(distances) == 0 or len(distances[0]) == 0:
                 logger.warning("FAISS search returned no results")
                 return []
 
-            # Ensure we have valid arrays
-            if len(distances[0]) == 0 or len(indices[0]) == 0:
-                logger.warning("FAISS search returned empty result arrays")
-                return []
+            hits = [
+                (int(row_id), float(distance))
+                for distance, row_id in zip(distances[0], ids[0])
+                if row_id >= 0
+            ]
+            payloads = self._payloads.get_by_ids([row_id for row_id, _ in hits])
 
             results = []
-            for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
-                # Check if index is valid
-                if idx < 0 or idx >= len(self._document_ids):
-                    logger.warning(f"Invalid document index: {idx}, skipping")
-                    continue
-                    
-                doc_id = self._document_ids[idx]
-
-                # Try cache first
-                cached_embedding = self._get_cached_embedding(doc_id)
-                if cached_embedding is not None:
-                    # Create minimal document chunk with cached data
-                    doc = DocumentChunk(
-                        id=doc_id,
-                        content="",  # Content not cached for memory efficiency
-                        metadata={"cached": True},
-                        embedding=cached_embedding,
-                    )
-                    results.append((doc, float(distance)))
+            for row_id, distance in hits:
+                doc_chunk = payloads.get(row_id)
+                if doc_chunk is None:
+                    logger.warning(f"Missing payload for vector id {row_id}, skipping")
                     continue
+                results.append((doc_chunk, distance))
+            return results
+        except Exception as e:
+            logger.error(f"Error during vector search: {e}")
+            return []
 
-                weak_ref = self._documents.get(doc_id)
+    def _allowed_ids(self, metadata_filter: Dict[str, Any]) -> np.ndarray:
+        """Sorted row ids matching the filter, cached until the next write"""
+        key = tuple(
+            sorted((name, json.dumps(value, default=str)) for name, value in metadata_filter.items())
+        )
+        allowed = self._filter_cache.get(key)
+        if allowed is None:
+            allowed = np.array(sorted(self._payloads.ids_matching(metadata_filter)), dtype=np.int64)
+            if len(self._filter_cache) >= self.FILTER_CACHE_SIZE:
+                self._filter_cache.pop(next(iter(self._filter_cache)))
+            self._filter_cache[key] = allowed
+        return allowed
+
+    def _filtered_search_params(self, allowed: np.ndarray) -> "faiss.SearchParameters":
+        """Search parameters restricting the active index to the allowed ids"""
+        selector = faiss.IDSelectorBatch(allowed)
+        if self.active_index_type in ("IndexIVFFlat", "IndexIVFPQ"):
+            nprobe = int(self.search_params.get("nprobe", 1))
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+        elif self.active_index_type == "IndexHNSWFlat":
+            ef_search = int(self.search_params.get("efSearch", 16))
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        # The selector is not owned by the parameters object
+        params._selector = selector
+        return params
+
+    def _exact_search(
+        self, queries: np.ndarray, allowed: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force L2 search over a small set of stored embeddings"""
+        ids, vectors = self._payloads.embeddings_for(allowed.tolist())
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        labels = np.full((len(queries), k), -1, dtype=np.int64)
+        if not len(ids):
+            return distances, labels
+        dist = (
+            (queries**2).sum(axis=1)[:, None]
+            - 2 * queries @ vectors.T
+            + (vectors**2).sum(axis=1)[None, :]
+        )
+        top = np.argsort(dist, axis=1)[:, :k]
+        found = top.shape[1]
+        distances[:, :found] = np.take_along_axis(dist, top, axis=1)
+        labels[:, :found] = ids[top]
+        return distances, labels
 
-                doc_chunk: Optional[DocumentChunk] = (
-                    weak_ref() if weak_ref else None
-                )
-                if doc_chunk is not None:
-                    results.append((doc_chunk, float(distance)))
+    async def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        k: int = 5,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[DocumentChunk, float]]]:
+        """
+        Search several queries at once, optionally restricted by metadata
+
+        The filter is applied before ranking: small candidate sets are scored
+        exactly from the stored embeddings, larger ones are searched in the
+        index through an id selector, so ``k`` results are returned whenever
+        ``k`` chunks match.
+
+        Returns:
+            One list of (chunk, distance) pairs per query row
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if len(queries) == 0:
+            return []
+        if self.index.ntotal == 0:
+            logger.warning("Vector store is empty, no search results available")
+            return [[] for _ in range(len(queries))]
+
+        try:
+            if metadata_filter:
+                allowed = self._allowed_ids(metadata_filter)
+                if len(allowed) == 0:
+                    return [[] for _ in range(len(queries))]
+                if len(allowed) <= self.EXACT_FILTER_LIMIT:
+                    distances, ids = self._exact_search(queries, allowed, k)
                 else:
-                    # Clean up invalid reference
-                    if doc_id in self._documents:
-                        del self._documents[doc_id]
-                    if doc_id in self._document_ids:
-                        self._document_ids.remove(doc_id)
+                    distances, ids = self.index.search(
+                        queries, k, params=self._filtered_search_params(allowed)
+                    )
+            else:
+                distances, ids = self.index.search(queries, k)
+
+            # One payload lookup for all queries
+            payloads = self._payloads.get_by_ids(
+                list({int(row_id) for row_id in ids.ravel() if row_id >= 0})
+            )
+            results: List[List[Tuple[DocumentChunk, float]]] = []
+            for distance_row, id_row in zip(distances, ids):
+                results.append(
+                    [
+                        (payloads[int(row_id)], float(distance))
+                        for distance, row_id in zip(distance_row, id_row)
+                        if row_id >= 0 and int(row_id) in payloads
+                    ]
+                )
             return results
         except Exception as e:
-            logger.error(f"Error during vector search: {e}")
-            return []
+            logger.error(f"Error during batch vector search: {e}")
+            return [[] for _ in range(len(queries))]
 
     async def search_text(
         self, query: str, k: int = 5, min_similarity: float = 0.0
@@ -326,14 +872,14 @@ class VectorStore:
             from backend.core.llm_client import llm_client
 
             # Generate embedding for the query
-            embedding_response = await llm_client.embed(model="nomic-embed-text", text=query)
-            if not embedding_response or "embedding" not in embedding_response:
+            embedding_response = self._coerce_embedding(
+                await llm_client.embed(model="nomic-embed-text", text=query)
+            )
+            if not embedding_response:
                 logger.error("Failed to generate embedding for query")
                 return []
 
-            query_embedding = np.array(
-                embedding_response["embedding"], dtype=np.float32
-            )
+            query_embedding = np.array(embedding_response, dtype=np.float32)
 
             # Search using the embedding
             results = await self.search(query_embedding, k)
@@ -357,101 +903,69 @@ class VectorStore:
             return []
 
     async def get_document(self, doc_id: str) -> Optional[DocumentChunk]:
-        """Get document by ID with cleanup and caching"""
-        cached_embedding = self._get_cached_embedding(doc_id)
-        if cached_embedding is not None:
-            return DocumentChunk(
-                id=doc_id,
-                content="",  # Content not cached
-                metadata={"cached": True},
-                embedding=cached_embedding,
-            )
-        weak_ref = self._documents.get(doc_id)
-        doc: Optional[DocumentChunk] = weak_ref() if weak_ref else None
-        if doc is not None:
-            return doc
-        else:
-            if doc_id in self._documents:
-                del self._documents[doc_id]
-            if doc_id in self._document_ids:
-                self._document_ids.remove(doc_id)
-            logger.debug(f"Cleaned up invalid weak reference for document: {doc_id}")
-        return None
+        """Get document by ID"""
+        found = self._payloads.get_by_doc_id(doc_id)
+        return found[1] if found else None
+
+    def _remove_ids(self, ids: List[int]) -> int:
+        """Remove vectors and payloads for the given row ids"""
+        if not ids:
+            return 0
+        self._index_remove(self.index, np.array(ids, dtype=np.int64))
+        self._record_change("remove", ids)
+        removed = self._payloads.delete(ids)
+        self._stats["total_documents"] = self._payloads.count()
+        self._stats["total_vectors"] = int(self.index.ntotal)
+        self.chunks_since_save += removed
+        return removed
 
     async def remove_document(self, doc_id: str) -> bool:
-        """Remove document from vector store and cache"""
-        if doc_id in self._documents:
-            del self._documents[doc_id]
-            if doc_id in self._document_ids:
-                self._document_ids.remove(doc_id)
-            # Remove from cache
-            if doc_id in self._vector_cache:
-                del self._vector_cache[doc_id]
-            self._stats["total_documents"] = len(self._documents)
-            logger.debug(f"Removed document: {doc_id}")
-            return True
-        return False
+        """Remove document vector and payload from vector store"""
+        found = self._payloads.get_by_doc_id(doc_id)
+        if not found:
+            return False
+        self._remove_ids([found[0]])
+        logger.debug(f"Removed document: {doc_id}")
+        return True
+
+    async def delete_by_metadata(self, metadata_filter: Dict[str, Any]) -> int:
+        """Remove all chunks whose metadata matches the filter"""
+        removed = self._remove_ids(self._payloads.ids_matching(metadata_filter))
+        logger.info(f"Removed {removed} chunks matching {metadata_filter}")
+        return removed
 
     async def _cleanup_old_documents(self) -> None:
-        """Remove old documents when limit is reached with proper locking"""
+        """Remove the oldest chunks when the limit is reached"""
         async with self._cleanup_lock:
-            if len(self._documents) <= self._cleanup_threshold:
+            total = self._payloads.count()
+            if total <= self._cleanup_threshold:
                 return
-            valid_documents = []
-            for doc_id, weak_ref in self._documents.items():
-                doc = weak_ref()
-                if doc:
-                    created_at = doc.created_at or ""
-                    valid_documents.append((doc_id, doc, created_at))
-                else:
-                    del self._documents[doc_id]
-                    if doc_id in self._document_ids:
-                        self._document_ids.remove(doc_id)
-                    if doc_id in self._vector_cache:
-                        del self._vector_cache[doc_id]
-            valid_documents.sort(key=lambda x: str(x[2]), reverse=True)
-            docs_to_keep = valid_documents[: self._cleanup_threshold]
-            new_documents = {}
-            new_document_ids = []
-            for doc_id, doc, _ in docs_to_keep:
-                new_documents[doc_id] = weakref.ref(doc, self._cleanup_callback)
-                new_document_ids.append(doc_id)
-            removed_count = len(self._documents) - len(new_documents)
-            self._documents = new_documents
-            self._document_ids = new_document_ids
-            self._stats["total_documents"] = len(self._documents)
+            removed_count = self._remove_ids(
+                self._payloads.oldest_ids(total - self._cleanup_threshold)
+            )
             self._stats["last_cleanup"] = float(asyncio.get_event_loop().time())
             self._stats["cleanup_count"] = int(self._stats.get("cleanup_count", 0)) + 1
             logger.info(
                 f"Cleaned up {removed_count} old documents. "
-                f"Total documents: {len(self._documents)}"
+                f"Total documents: {self._payloads.count()}"
             )
 
     async def get_stats(self) -> Dict[str, Any]:
-        """Get vector store statistics with cleanup and cache info"""
-        await self._cleanup_old_documents()
-
-        valid_documents = []
-        for weak_ref in self._documents.values():
-            doc = weak_ref()
-            if doc:
-                valid_documents.append(doc)
-
-        cache_hits = int(self._stats.get("cache_hits", 0))
-        cache_misses = int(self._stats.get("cache_misses", 0))
-        total_cache_attempts = cache_hits + cache_misses
-
+        """Get vector store statistics"""
         return {
-            "total_documents": len(valid_documents),
+            "total_documents": self._payloads.count(),
             "total_vectors": int(self.index.ntotal),
             "max_documents": self._max_documents,
             "cleanup_threshold": self._cleanup_threshold,
             "index_type": self.index_type,
+            "active_index_type": self.active_index_type,
+            "trained_size": self._trained_size,
+            "train_threshold": self.train_threshold,
+            "search_params": self.search_params,
+            "promotion_in_progress": self._pending_changes is not None,
             "dimension": self.dimension,
-            "cache_size": len(self._vector_cache),
-            "cache_hits": cache_hits,
-            "cache_misses": cache_misses,
-            "cache_hit_rate": cache_hits / max(1, total_cache_attempts),
+            "storage_path": self.storage_path,
+            "chunks_since_save": self.chunks_since_save,
             "stats": self._stats,
         }
 
@@ -461,19 +975,21 @@ class VectorStore:
 
     async def is_empty(self) -> bool:
         """Check if vector store is empty"""
-        return len(self._documents) == 0
+        return self._payloads.count() == 0
 
     async def clear_all(self) -> None:
         """Clear all documents and reset vector store"""
         async with self._cleanup_lock:
-            self._documents.clear()
-            self._document_ids.clear()
-            self._vector_cache.clear()
-            self.index.reset()
+            if self._promotion_task is not None and not self._promotion_task.done():
+                self._promotion_task.cancel()
+            self._payloads.clear()
+            self._filter_cache.clear()
+            self.index = self._create_flat_index()
+            self.active_index_type = "IndexFlatL2"
+            self.search_params = {}
+            self._trained_size = 0
             self._stats["total_documents"] = 0
             self._stats["total_vectors"] = 0
-            self._stats["cache_hits"] = 0
-            self._stats["cache_misses"] = 0
             self._stats["last_cleanup"] = float(asyncio.get_event_loop().time())
             self._stats["cleanup_count"] = int(self._stats.get("cleanup_count", 0)) + 1
             self.chunks_since_save = 0
@@ -481,10 +997,30 @@ class VectorStore:
 
     async def save_index_async(self) -> None:
         """Save index asynchronously"""
-        if self._index_file_path:
-            self.save_index(self._index_file_path)
+        path = self._index_file_path or (
+            str(Path(self.storage_path) / self.INDEX_FILENAME)
+            if self.storage_path
+            else None
+        )
+        if path:
+            await asyncio.to_thread(self.save_index, path)
             self.chunks_since_save = 0
 
+    async def load_index_async(self) -> bool:
+        """Load index and payloads from storage_path if a saved index exists"""
+        if not self.storage_path:
+            return False
+        path = Path(self.storage_path) / self.INDEX_FILENAME
+        if not path.exists():
+            # Payloads may exist without a saved index (crash before first save)
+            if self._payloads.count():
+                await asyncio.to_thread(self._reconcile_with_payloads)
+                self._maybe_schedule_promotion()
+            return False
+        await asyncio.to_thread(self.load_index, str(path))
+        self._maybe_schedule_promotion()
+        return True
+
     @asynccontextmanager
     async def context_manager(self) -> AsyncGenerator["VectorStore", None]:
         """Async context manager for vector store lifecycle"""
@@ -503,47 +1039,110 @@ class VectorStore:
         await self.clear_all()
 
     def save_index(self, filepath: str) -> None:
-        """Save FAISS index to file with memory mapping support"""
+        """Save FAISS index atomically next to a manifest describing it
+
+        Payloads are committed to the side store on every write; the index
+        file and manifest are written to temporary files and moved into place
+        with os.replace, so a crash never leaves a half-written index.
+        """
         try:
-            faiss.write_index(self.index, filepath)
-            self._index_file_path = filepath
+            target = Path(filepath)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_index = target.with_name(target.name + ".tmp")
+            faiss.write_index(self.index, str(tmp_index))
+            os.replace(tmp_index, target)
+
+            manifest = {
+                "index_type": self.index_type,
+                "active_index_type": self.active_index_type,
+                "trained_size": self._trained_size,
+                "search_params": self.search_params,
+                "dimension": self.dimension,
+                "ntotal": int(self.index.ntotal),
+                "saved_at": datetime.now().isoformat(),
+            }
+            manifest_path = target.with_name(self.MANIFEST_FILENAME)
+            tmp_manifest = manifest_path.with_name(manifest_path.name + ".tmp")
+            tmp_manifest.write_text(json.dumps(manifest))
+            os.replace(tmp_manifest, manifest_path)
+
+            self._index_file_path = str(target)
             logger.info(f"Saved FAISS index to: {filepath}")
         except Exception as e:
             logger.error(f"Error saving FAISS index: {e}")
             raise
 
     def load_index(self, filepath: str, use_memory_mapping: bool = False) -> None:
-        """Load FAISS index from file with optional memory mapping"""
+        """Load FAISS index from file and reconcile it with the payload store"""
         try:
             if use_memory_mapping and os.path.exists(filepath):
                 # Use memory mapping for large indices
-                self.index = faiss.read_index(filepath, faiss.IO_FLAG_MMAP)
+                index = faiss.read_index(filepath, faiss.IO_FLAG_MMAP)
                 self._use_memory_mapping = True
-                self._index_file_path = filepath
                 logger.info(f"Loaded FAISS index with memory mapping from: {filepath}")
             else:
-                self.index = faiss.read_index(filepath)
+                index = faiss.read_index(filepath)
                 self._use_memory_mapping = False
                 logger.info(f"Loaded FAISS index from: {filepath}")
+            self._index_file_path = filepath
 
-            self._stats["total_vectors"] = self.index.ntotal
+            manifest_path = Path(filepath).with_name(self.MANIFEST_FILENAME)
+            manifest = (
+                json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+            )
+
+            if isinstance(index, faiss.IndexIDMap2):
+                self.index = index
+                self.active_index_type = manifest.get(
+                    "active_index_type", type(faiss.downcast_index(index.index)).__name__
+                )
+                self._trained_size = int(manifest.get("trained_size", index.ntotal))
+                self.search_params = manifest.get("search_params", {})
+                self._apply_search_params()
+            else:
+                # Legacy position-based index, ids cannot be trusted
+                logger.warning("Loaded index has no id map, rebuilding from payloads")
+                self.index = self._create_flat_index()
+                self.active_index_type = "IndexFlatL2"
+
+            self._reconcile_with_payloads()
+            self._stats["total_vectors"] = int(self.index.ntotal)
+            self._stats["total_documents"] = self._payloads.count()
+            self.chunks_since_save = 0
         except Exception as e:
             logger.error(f"Error loading FAISS index: {e}")
             raise
 
+    def _reconcile_with_payloads(self) -> None:
+        """Make the index ids match the payload store ids
+
+        Vectors without a payload are removed, payloads without a vector are
+        re-added from their stored embeddings.
+        """
+        self._filter_cache.clear()
+        if self.index.ntotal:
+            index_ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        else:
+            index_ids = np.array([], dtype=np.int64)
+        payload_ids = self._payloads.all_ids()
+
+        orphaned = np.setdiff1d(index_ids, payload_ids)
+        if len(orphaned):
+            self._index_remove(self.index, orphaned)
+            logger.warning(f"Removed {len(orphaned)} vectors without payload")
+
+        missing = np.setdiff1d(payload_ids, index_ids)
+        if len(missing):
+            ids, vectors = self._payloads.embeddings_for(missing.tolist())
+            if len(ids):
+                self.index.add_with_ids(vectors, ids)
+            logger.info(f"Re-added {len(ids)} vectors from payload store")
+
     async def list_directories(self) -> list[dict]:
         """Zwraca listę katalogów z liczbą dokumentów"""
-        directories = {}
-        for doc_id, ref in self._documents.items():
-            doc = ref()
-            if doc and hasattr(doc, "metadata"):
-                dir_path = doc.metadata.get("directory_path", "default")
-                if dir_path not in directories:
-                    directories[dir_path] = 0
-                directories[dir_path] += 1
         return [
             {"path": path, "document_count": count}
-            for path, count in directories.items()
+            for path, count in self._payloads.directory_counts().items()
         ]
 
 
@@ -715,7 +1314,11 @@ class AsyncDocumentLoader:
 # Global instance with optimized index - only create if FAISS is available and not in testing
 if FAISS_AVAILABLE and not os.environ.get('DISABLE_FAISS'):
     try:
-        vector_store = VectorStore(index_type="IndexIVFFlat")
+        from backend.settings import settings
+
+        vector_store = VectorStore(
+            index_type="IndexIVFFlat", storage_path=settings.RAG_VECTOR_STORE_PATH
+        )
     except Exception as e:
         logger.warning(f"Failed to create global vector store instance: {e}")
         vector_store = None
@@ -30,6 +30,14 @@ class LLMClient:
             logger.error(f"Error generating embeddings: {e}")
             return []
 
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for several texts in one request"""
+        try:
+            return await hybrid_llm_client.embed_batch(texts=texts)
+        except Exception as e:
+            logger.error(f"Error generating batch embeddings: {e}")
+            return [[] for _ in texts]
+
     async def chat(
         self, messages: list[Dict[str, str]], **kwargs: Any
     ) -> Optional[str]:
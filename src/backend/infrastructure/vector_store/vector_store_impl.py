@@ -1,7 +1,9 @@
+import asyncio
 import logging
 from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 
+from backend.core import vector_store as vector_store_module
 from backend.core.vector_store import VectorStore, DocumentChunk
 from backend.infrastructure.llm_api.llm_client import LLMClient
 
@@ -9,9 +11,14 @@ logger = logging.getLogger(__name__)
 
 
 class EnhancedVectorStoreImpl:
-    def __init__(self, llm_client: LLMClient) -> None:
+    def __init__(
+        self, llm_client: LLMClient, vector_store: Optional[VectorStore] = None
+    ) -> None:
         self.llm_client = llm_client
-        self.vector_store = VectorStore()
+        # Share the persistent global store when it exists
+        self.vector_store = (
+            vector_store or vector_store_module.vector_store or VectorStore()
+        )
 
     async def add_documents(self, documents: List[str]) -> None:
         """Add documents to vector store"""
@@ -26,17 +33,92 @@ class EnhancedVectorStoreImpl:
             logger.error(f"Error adding documents: {e}")
             raise
 
-    async def add_document(self, text: str, metadata: Dict[str, Any]) -> None:
-        """Add a single document to vector store"""
+    async def add_document(
+        self,
+        text: str,
+        metadata: Dict[str, Any],
+        embedding: Optional[List[float]] = None,
+        doc_id: Optional[str] = None,
+    ) -> None:
+        """Add a single document to vector store (reuses a precomputed embedding)"""
         try:
             await self.vector_store.add_document(
-                text=text, metadata=metadata, auto_embed=True
+                text=text,
+                metadata=metadata,
+                auto_embed=not embedding,
+                embedding=embedding,
+                doc_id=doc_id,
             )
             logger.info("Added document to vector store")
         except Exception as e:
             logger.error(f"Error adding document: {e}")
             raise
 
+    async def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed all queries in one batch when the client supports it"""
+        if hasattr(self.llm_client, "embed_batch"):
+            return await self.llm_client.embed_batch(queries)
+        return list(await asyncio.gather(*(self.llm_client.embed(q) for q in queries)))
+
+    async def search_many(
+        self,
+        queries: List[str],
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        similarity_threshold: float = 0.65,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for several queries in one round trip
+
+        Queries are embedded in a single batch and searched with one FAISS call;
+        ``filters`` restrict the candidates before ranking (not afterwards).
+
+        Returns:
+            One {"chunks", "total"} result per query, in query order
+        """
+        empty: Dict[str, Any] = {"chunks": [], "total": 0}
+        if not queries:
+            return []
+        try:
+            embeddings = await self._embed_queries(queries)
+
+            # Queries that failed to embed get an empty result
+            valid = [
+                i
+                for i, embedding in enumerate(embeddings)
+                if embedding and len(embedding) == self.vector_store.dimension
+            ]
+            if len(valid) < len(queries):
+                logger.warning(
+                    f"Failed to generate embeddings for {len(queries) - len(valid)} queries"
+                )
+            results: List[Dict[str, Any]] = [dict(empty) for _ in queries]
+            if not valid:
+                return results
+
+            query_matrix = np.array([embeddings[i] for i in valid], dtype=np.float32)
+            batch_results = await self.vector_store.search_batch(
+                query_matrix, k=k, metadata_filter=filters
+            )
+
+            for i, hits in zip(valid, batch_results):
+                chunks = []
+                for doc_chunk, distance in hits:
+                    similarity = 1.0 - (distance / 2.0)  # Convert distance to similarity
+                    if similarity < similarity_threshold:
+                        continue
+                    chunks.append({
+                        "content": doc_chunk.content,
+                        "metadata": doc_chunk.metadata,
+                        "similarity": similarity,
+                        "id": doc_chunk.id
+                    })
+                results[i] = {"chunks": chunks, "total": len(chunks)}
+            return results
+        except Exception as e:
+            logger.error(f"Error in batch search: {e}")
+            return [{**empty, "error": str(e)} for _ in queries]
+
     async def search(
         self, 
         query: str, 
@@ -45,54 +127,13 @@ class EnhancedVectorStoreImpl:
         filter_metadata: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Search for similar documents with the interface expected by RAG integration"""
-        try:
-            # Generate query embedding
-            embedding_response = await self.llm_client.embed(query)
-            if not embedding_response:
-                logger.warning("Failed to generate embedding for query")
-                return {"chunks": [], "total": 0}
-
-            # Convert to numpy array
-            query_embedding = np.array(embedding_response, dtype=np.float32)
-
-            # Search vector store
-            results = await self.vector_store.search(
-                query_embedding=query_embedding, k=top_k
-            )
-
-            # Filter results by similarity threshold and metadata
-            filtered_results = []
-            for doc_chunk, distance in results:
-                similarity = 1.0 - (distance / 2.0)  # Convert distance to similarity
-                
-                # Check similarity threshold
-                if similarity < similarity_threshold:
-                    continue
-                
-                # Check metadata filter if provided
-                if filter_metadata:
-                    metadata_match = True
-                    for key, value in filter_metadata.items():
-                        if doc_chunk.metadata.get(key) != value:
-                            metadata_match = False
-                            break
-                    if not metadata_match:
-                        continue
-                
-                filtered_results.append({
-                    "content": doc_chunk.content,
-                    "metadata": doc_chunk.metadata,
-                    "similarity": similarity,
-                    "id": doc_chunk.id
-                })
-
-            return {
-                "chunks": filtered_results,
-                "total": len(filtered_results)
-            }
-        except Exception as e:
-            logger.error(f"Error in search: {e}")
-            return {"chunks": [], "total": 0, "error": str(e)}
+        results = await self.search_many(
+            [query],
+            k=top_k,
+            filters=filter_metadata,
+            similarity_threshold=similarity_threshold,
+        )
+        return results[0]
 
     async def similarity_search(self, query: str, k: int = 4) -> List[str]:
         """Search for similar documents (legacy method)"""
@@ -126,9 +167,8 @@ class EnhancedVectorStoreImpl:
     async def delete_by_metadata(self, metadata_filter: Dict[str, Any]) -> bool:
         """Delete documents by metadata filter"""
         try:
-            # This is a simplified implementation
-            # In a full implementation, you would iterate through documents and delete matching ones
-            logger.info(f"Delete by metadata called with filter: {metadata_filter}")
+            removed = await self.vector_store.delete_by_metadata(metadata_filter)
+            logger.info(f"Deleted {removed} chunks matching filter: {metadata_filter}")
             return True
         except Exception as e:
             logger.error(f"Error deleting by metadata: {e}")
@@ -145,8 +185,7 @@ class EnhancedVectorStoreImpl:
     async def clear_all(self) -> None:
         """Clear all documents from vector store"""
         try:
-            # This would need to be implemented in the base VectorStore
-            logger.info("Clear all called")
+            await self.vector_store.clear_all()
         except Exception as e:
             logger.error(f"Error clearing vector store: {e}")
             raise
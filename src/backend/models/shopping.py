@@ -114,3 +114,28 @@ Index("ix_product_consumed_date", Product.is_consumed, Product.expiration_date)
 Index("ix_trip_date", ShoppingTrip.trip_date)
 Index("ix_trip_store_date", ShoppingTrip.store_name, ShoppingTrip.trip_date)
 Index("ix_trip_created", ShoppingTrip.created_at)
+
+
+class DailyExpenseRollup(Base):
+    """Dzienne sumy paragonów per sklep (utrzymywane przez backend.core.expense_rollups)."""
+
+    __tablename__ = "daily_expense_rollups"
+    __table_args__ = {"extend_existing": True}
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    store_name: Mapped[str] = mapped_column(String, primary_key=True)
+    trip_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_amount: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    product_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class DailyCategoryRollup(Base):
+    """Dzienne sumy cen produktów per kategoria (utrzymywane przez backend.core.expense_rollups)."""
+
+    __tablename__ = "daily_category_rollups"
+    __table_args__ = {"extend_existing": True}
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    category: Mapped[str] = mapped_column(String, primary_key=True)
+    amount: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    product_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -5,6 +5,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload  # <--- Kluczowy import!
 
+from backend.core.expense_rollups import get_trip_days, refresh_expense_rollups
 from backend.models.shopping import Product, ShoppingTrip
 from backend.schemas import shopping_schemas
 
@@ -27,6 +28,8 @@ async def create_shopping_trip(
         db_product = Product(**product_data.model_dump(), trip_id=db_trip.id)
         db.add(db_product)
 
+    await db.flush()
+    await refresh_expense_rollups(db, [db_trip.trip_date])
     await db.commit()
 
     # Zamiast odświeżać, pobieramy świeżo utworzony obiekt jeszcze raz,
@@ -88,10 +91,13 @@ async def update_shopping_trip(
     update_data = trip_update.model_dump(exclude_unset=True)
 
     # 3. Zaktualizuj pola obiektu bazodanowego
+    previous_date = db_trip.trip_date
     for key, value in update_data.items():
         setattr(db_trip, key, value)
 
-    # 4. Zapisz zmiany w bazie
+    # 4. Zapisz zmiany w bazie (razem z agregatami starego i nowego dnia)
+    await db.flush()
+    await refresh_expense_rollups(db, [previous_date, db_trip.trip_date])
     await db.commit()
     await db.refresh(db_trip)
 
@@ -117,10 +123,15 @@ async def update_product(
     update_data = product_update.model_dump(exclude_unset=True)
 
     # 3. Zaktualizuj pola obiektu bazodanowego
+    previous_trip_id = db_product.trip_id
     for key, value in update_data.items():
         setattr(db_product, key, value)
 
-    # 4. Zapisz zmiany w bazie
+    # 4. Zapisz zmiany w bazie (agregaty dnia starego i nowego paragonu)
+    await db.flush()
+    await refresh_expense_rollups(
+        db, await get_trip_days(db, [previous_trip_id, db_product.trip_id])
+    )
     await db.commit()
     await db.refresh(db_product)
 
@@ -145,7 +156,10 @@ async def delete_shopping_trip(db: AsyncSession, trip_id: int) -> bool:
         return False  # Paragonu nie znaleziono
 
     # 2. Usuń paragon (produkty zostaną usunięte automatycznie dzięki cascade)
+    trip_date = db_trip.trip_date
     await db.delete(db_trip)
+    await db.flush()
+    await refresh_expense_rollups(db, [trip_date])
     await db.commit()
 
     return True
@@ -166,7 +180,10 @@ async def delete_product(db: AsyncSession, product_id: int) -> bool:
         return False  # Produktu nie znaleziono
 
     # 2. Usuń obiekt i zapisz zmiany
+    days = await get_trip_days(db, [db_product.trip_id])
     await db.delete(db_product)
+    await db.flush()
+    await refresh_expense_rollups(db, days)
     await db.commit()
 
     return True
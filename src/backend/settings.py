@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 import secrets
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -117,9 +117,71 @@ class Settings(BaseSettings):
     FALLBACK_TIMEOUT: int = 60  # sekundy przed przełączeniem na fallback
     VALIDATE_MODELS_ON_STARTUP: bool = True  # Walidacja modeli przy starcie
 
+    # Monitor zdrowia Ollama w tle (sekundy między sondami)
+    OLLAMA_HEALTH_CHECK_INTERVAL: float = 15.0
+    OLLAMA_HEALTH_CHECK_DOWN_INTERVAL: float = 2.0  # gdy serwer jest niedostępny
+
+    # Wspólna pula połączeń HTTP do Ollama
+    OLLAMA_MAX_CONNECTIONS: int = 32
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = 16
+    OLLAMA_KEEPALIVE_EXPIRY: float = 60.0  # sekundy
+    OLLAMA_MAX_CONCURRENCY_PER_MODEL: int = 4  # równoległe żądania do jednego modelu
+    OLLAMA_REQUEST_TIMEOUT: float = 120.0  # sekundy (generowanie bywa wolne)
+    LLM_SETTINGS_POLL_INTERVAL: float = 2.0  # sekundy między sprawdzeniami llm_settings.json
+    OLLAMA_KEEP_ALIVE: str = "30m"  # jak długo model (i jego KV-cache) zostaje w pamięci
+    OLLAMA_NUM_CTX: int = 8192  # stały rozmiar kontekstu - zmiana wymusza przeładowanie modelu
+    OLLAMA_MODEL_NUM_CTX: Dict[str, int] = {}  # nadpisania num_ctx per model
+
     # Konfiguracja dla modelu MMLW (opcjonalny, lepszy dla języka polskiego)
     USE_MMLW_EMBEDDINGS: bool = True  # Automatycznie włączone
     MMLW_MODEL_NAME: str = "sdadas/mmlw-retrieval-roberta-base"
+    MMLW_BATCH_MAX_SIZE: int = 32  # Maks. liczba zapytań zebranych w jeden mikro-batch
+    MMLW_BATCH_MAX_WAIT: float = 0.005  # Ile sekund czekać na kolejne zapytania do batcha
+    MMLW_BATCH_BUCKET_SIZE: int = 8  # Teksty o podobnej długości w jednym przebiegu modelu
+    MMLW_BACKEND: str = "torch"  # "torch" (fp32) lub "onnx" (int8 ONNX Runtime, tylko CPU)
+    MMLW_ONNX_CACHE_DIR: str = "./data/cache/onnx"  # Wyeksportowane modele ONNX
+    MMLW_ONNX_QUANTIZE: bool = True  # Dynamiczna kwantyzacja wag do int8
+    MMLW_ONNX_INTRA_OP_THREADS: int = 0  # Wątki ONNX Runtime (0 = wszystkie rdzenie)
+    MMLW_ONNX_MIN_RECALL: float = 0.95  # Minimalny recall@k względem modelu fp32
+
+    # Trwały magazyn embeddingów (klucz: model + hash znormalizowanego chunka)
+    USE_EMBEDDING_STORE: bool = True
+    EMBEDDING_STORE_PATH: str = "./data/cache/embeddings.db"
+    EMBEDDING_BATCH_SIZE: int = 32  # Liczba chunków w jednym wywołaniu modelu
+
+    # Trwała pamięć kategorii produktów przypisanych przez AI (klucz: wersja tabeli kategorii + nazwa)
+    USE_CATEGORY_MEMO: bool = True
+    CATEGORY_MEMO_PATH: str = "./data/cache/product_categories.db"
+
+    # Trwały vector store RAG (indeks FAISS + magazyn chunków SQLite)
+    RAG_VECTOR_STORE_PATH: str = "./data/vector_store"
+    RAG_INDEX_TRAIN_THRESHOLD: int = 20000  # Liczba chunków przed treningiem indeksu IVF/HNSW
+    RAG_INDEX_TARGET_RECALL: float = 0.95  # Docelowy recall@10 przy strojeniu nprobe/efSearch
+
+    # Semantyczny cache odpowiedzi LLM (parafrazy tego samego pytania)
+    SEMANTIC_CACHE_ENABLED: bool = False  # Opt-in
+    SEMANTIC_CACHE_SIMILARITY_THRESHOLD: float = 0.92  # Minimalne podobieństwo kosinusowe
+    SEMANTIC_CACHE_TTL: float = 3600.0  # Czas ważności odpowiedzi (sekundy)
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 2000  # Maks. liczba zapamiętanych odpowiedzi
+    SEMANTIC_CACHE_SEARCH_K: int = 4  # Liczba kandydatów sprawdzanych w indeksie
+    SEMANTIC_CACHE_MAX_PROMPT_CHARS: int = 500  # Dłuższe wypowiedzi nie są cache'owane
+
+    # Pula procesów OCR (strony PDF i partie obrazów przetwarzane równolegle)
+    OCR_POOL_ENABLED: bool = False  # Opt-in
+    OCR_POOL_WORKERS: int = 0  # Liczba procesów (0 = liczba rdzeni)
+    OCR_POOL_MAX_PENDING: int = 0  # Maks. zadań w locie (0 = 2 x liczba procesów)
+    OCR_POOL_LANGUAGES: List[str] = ["pol"]  # Języki przygotowane w każdym procesie
+
+    # Kaskadowy preprocessing OCR (szybka ścieżka, droższe etapy przy niskiej pewności)
+    OCR_PREPROCESSING_MODE: str = "tiered"  # "tiered" (kaskada z wczesnym wyjściem) lub "full"
+    OCR_CASCADE_MIN_CONFIDENCE: float = 0.75  # Pewność (ConfidenceScorer) kończąca kaskadę
+    OCR_CASCADE_ALT_PSM: List[int] = [4, 11]  # Tryby PSM próbowane, gdy pełny preprocessing nie wystarczy
+    OCR_CASCADE_PDF_MAX_STAGES: int = 2  # Limit etapów dla stron PDF (nie zawsze są paragonami)
+
+    # Trwałe uchwyty Tesseract (tesserocr zamiast procesu tesseract na każdy obraz)
+    OCR_TESSERACT_BACKEND: str = "auto"  # "auto" (tesserocr, jeśli zainstalowany), "tesserocr" lub "pytesseract"
+    OCR_TESSERACT_HANDLES: int = 2  # Uchwyty na parę język/OEM w jednym procesie
+    OCR_JOB_TIMEOUT: float = 25.0  # Limit czasu jednego zadania OCR (sekundy)
 
     # Konfiguracja bazy danych
     DATABASE_URL: str = "sqlite+aiosqlite:///./foodsave_dev.db"
@@ -161,13 +223,23 @@ class Settings(BaseSettings):
     
     # Konfiguracja pamięci konwersacji
     MEMORY_MAX_CONTEXTS: int = 1000
+    MEMORY_MAX_CACHE_BYTES: int = 64 * 1024 * 1024  # przybliżony limit pamięci kontekstów
+    MEMORY_CONTEXT_IDLE_TTL: float = 1800.0  # sekundy bezczynności przed wyrzuceniem z pamięci
     MEMORY_CLEANUP_THRESHOLD_RATIO: float = 0.8
     MEMORY_ENABLE_PERSISTENCE: bool = True
     MEMORY_ENABLE_SEMANTIC_CACHE: bool = True
+    MEMORY_PERSIST_FLUSH_INTERVAL: float = 1.0  # sekundy między zbiorczymi zapisami
+    MEMORY_PERSIST_BATCH_SIZE: int = 500  # wiadomości w jednym INSERT
+    MEMORY_PERSIST_QUEUE_SIZE: int = 10000  # maks. wiadomości czekających na zapis
+    MEMORY_LOAD_WINDOW: int = 50  # ostatnie wiadomości wczytywane przy odtwarzaniu sesji
     
     # Konfiguracja planisty
     PLANNER_TEMPERATURE: float = 0.1  # Niska temperatura dla spójności planów
     PLANNER_MAX_TOKENS: int = 4000  # Maksymalna liczba tokenów dla planisty
+    PLAN_CACHE_SIZE: int = 256  # Liczba zapamiętanych szablonów zapytań z planami
+    PLAN_CACHE_TTL: float = 3600.0  # Czas ważności planu w cache (sekundy)
+    PLAN_FAST_PATH_MAX_WORDS: int = 8  # Najdłuższe zapytanie obsługiwane bez planisty
+    PLAN_FAST_PATH_MIN_CONFIDENCE: float = 0.9  # Minimalna pewność klasyfikatora słów kluczowych
     
     # Konfiguracja syntezatora
     SYNTHESIZER_TEMPERATURE: float = 0.3  # Średnia temperatura dla kreatywności
@@ -176,6 +248,10 @@ class Settings(BaseSettings):
     # Konfiguracja egzekutora
     EXECUTOR_MAX_STEPS: int = 10  # Maksymalna liczba kroków w planie
     EXECUTOR_STEP_TIMEOUT: int = 60  # Timeout dla pojedynczego kroku (sekundy)
+    EXECUTOR_MAX_PARALLEL_STEPS: int = 4  # Niezależne kroki wykonywane równolegle
+
+    # Streaming /memory_chat: maks. liczba zdarzeń czekających na klienta
+    CHAT_STREAM_QUEUE_SIZE: int = 256
 
     # Ta linia mówi Pydantic, aby wczytał zmienne z pliku .env w głównym katalogu
     class Config:
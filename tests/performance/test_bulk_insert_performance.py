@@ -0,0 +1,117 @@
+"""
+Micro-benchmark zapisu paragonów: INSERT executemany vs obiekty ORM dodawane po jednym.
+
+Dwa scenariusze na plikowym SQLite: pojedynczy paragon z 50 produktami
+oraz import 500 paragonów po 20 produktów.
+"""
+
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.core import crud
+from backend.core.database import Base
+from backend.models.shopping import (DailyCategoryRollup, DailyExpenseRollup,
+                                     Product, ShoppingTrip)
+
+TABLES = [
+    ShoppingTrip.__table__,
+    Product.__table__,
+    DailyExpenseRollup.__table__,
+    DailyCategoryRollup.__table__,
+]
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bench.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+def make_trips(trip_count, product_count):
+    return [
+        {
+            "paragon_info": {"sklep": f"Sklep {i % 7}", "data": "2024-04-01"},
+            "produkty": [
+                {
+                    "nazwa_artykulu": f"Produkt {j}",
+                    "cena_jednostkowa": 1.5,
+                    "ilosc": 2,
+                    "kategoria": "Spożywcze",
+                    "cena_calkowita": 3.0,
+                }
+                for j in range(product_count)
+            ],
+        }
+        for i in range(trip_count)
+    ]
+
+
+async def orm_create_trip(db, data):
+    """Poprzednia implementacja create_shopping_trip (obiekt ORM na każdy produkt)"""
+    trip = ShoppingTrip(**crud._trip_values(data))
+    db.add(trip)
+    await db.flush()
+    for product_data in data.get("produkty", []):
+        values = crud._product_values(product_data, trip.id)
+        db.add(Product(**values))
+    await db.commit()
+    await db.refresh(trip)
+    return trip
+
+
+async def timed(session_factory, fn):
+    async with session_factory() as db:
+        start_time = time.perf_counter()
+        await fn(db)
+        elapsed = time.perf_counter() - start_time
+        count = await db.scalar(select(func.count()).select_from(Product))
+        await db.execute(Product.__table__.delete())
+        await db.execute(ShoppingTrip.__table__.delete())
+        await db.commit()
+    return elapsed, count
+
+
+@pytest.mark.asyncio
+async def test_single_receipt_insert_latency(session_factory):
+    """Test czasu zapisu jednego paragonu z 50 produktami."""
+    (data,) = make_trips(1, 50)
+
+    orm_time, orm_count = await timed(session_factory, lambda db: orm_create_trip(db, data))
+    bulk_time, bulk_count = await timed(
+        session_factory, lambda db: crud.create_shopping_trip(db, data)
+    )
+
+    print("\nSingle receipt, 50 products:")
+    print(f"  ORM per row: {orm_time * 1000:.1f} ms")
+    print(f"  bulk insert: {bulk_time * 1000:.1f} ms")
+
+    assert orm_count == bulk_count == 50
+
+
+@pytest.mark.asyncio
+async def test_history_import_throughput(session_factory):
+    """Test przepustowości importu 500 paragonów po 20 produktów."""
+    trips = make_trips(500, 20)
+
+    async def orm_import(db):
+        for data in trips:
+            await orm_create_trip(db, data)
+
+    orm_time, orm_count = await timed(session_factory, orm_import)
+    bulk_time, bulk_count = await timed(
+        session_factory, lambda db: crud.import_shopping_trips(db, trips)
+    )
+
+    print("\nImport, 500 receipts x 20 products:")
+    print(f"  ORM per row: {orm_time:.2f} s ({orm_count / orm_time:.0f} products/s)")
+    print(f"  bulk insert: {bulk_time:.2f} s ({bulk_count / bulk_time:.0f} products/s)")
+
+    assert orm_count == bulk_count == 10000
+    assert bulk_time < orm_time
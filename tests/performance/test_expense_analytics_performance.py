@@ -0,0 +1,115 @@
+"""
+Micro-benchmark analityki wydatków: dzienne agregaty vs ładowanie paragonów z produktami.
+
+Czas zapytań na agregatach zależy od liczby dni w okresie, nie od długości
+historii zakupów - porównanie dla 200 i 4000 paragonów na plikowym SQLite.
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from backend.core import crud
+from backend.core.database import Base
+from backend.core.expense_rollups import (get_category_expenses,
+                                          get_expense_totals,
+                                          get_monthly_expenses)
+from backend.models.shopping import (DailyCategoryRollup, DailyExpenseRollup,
+                                     Product, ShoppingTrip)
+
+TABLES = [
+    ShoppingTrip.__table__,
+    Product.__table__,
+    DailyExpenseRollup.__table__,
+    DailyCategoryRollup.__table__,
+]
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'analytics.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+def make_trips(count, days, seed):
+    rng = random.Random(seed)
+    return [
+        {
+            "paragon_info": {
+                "sklep": rng.choice(["Biedronka", "Lidl", "Żabka"]),
+                "data": (date(2024, 12, 31) - timedelta(days=rng.randrange(days))).isoformat(),
+            },
+            "produkty": [
+                {
+                    "nazwa_artykulu": f"Produkt {j}",
+                    "cena_jednostkowa": 2.5,
+                    "kategoria": str(rng.randint(1, 12)),
+                    "cena_calkowita": 2.5,
+                }
+                for j in range(15)
+            ],
+        }
+        for _ in range(count)
+    ]
+
+
+async def python_analytics(db, start, end):
+    """Poprzednia ścieżka: wszystkie paragony z okresu z produktami, agregacja w Pythonie"""
+    result = await db.execute(
+        select(ShoppingTrip)
+        .options(selectinload(ShoppingTrip.products))
+        .where(ShoppingTrip.trip_date.between(start, end))
+    )
+    trips = result.scalars().all()
+    categories = {}
+    for trip in trips:
+        for product in trip.products:
+            categories[product.category] = categories.get(product.category, 0) + (product.unit_price or 0)
+    return sum(t.total_amount or 0 for t in trips), categories
+
+
+async def rollup_analytics(db, start, end):
+    totals = await get_expense_totals(db, start, end)
+    categories = await get_category_expenses(db, start, end)
+    await get_monthly_expenses(db, start, end)
+    return totals["total_expenses"], categories
+
+
+async def timed(fn, db, repeats=5):
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        await fn(db, date(2024, 1, 1), date(2024, 12, 31))
+    return (time.perf_counter() - start_time) / repeats
+
+
+@pytest.mark.asyncio
+async def test_analytics_latency_vs_history_size(session_factory):
+    """Test czasu analityki rocznej przy rosnącej historii zakupów."""
+    timings = []
+    async with session_factory() as db:
+        imported = 0
+        for count in (200, 4000):
+            await crud.import_shopping_trips(db, make_trips(count - imported, 365, seed=count))
+            imported = count
+            python_time = await timed(python_analytics, db)
+            rollup_time = await timed(rollup_analytics, db)
+            timings.append((count, python_time, rollup_time))
+
+            python_total, _ = await python_analytics(db, date(2024, 1, 1), date(2024, 12, 31))
+            rollup_total, _ = await rollup_analytics(db, date(2024, 1, 1), date(2024, 12, 31))
+            assert rollup_total == pytest.approx(python_total)
+
+    print("\nYearly expense analytics (trips: Python aggregation / rollups):")
+    for count, python_time, rollup_time in timings:
+        print(f"  {count:5d}: {python_time * 1000:.1f} ms / {rollup_time * 1000:.1f} ms")
+
+    assert timings[-1][2] < timings[-1][1]
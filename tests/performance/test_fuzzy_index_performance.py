@@ -0,0 +1,71 @@
+"""
+Benchmark dopasowania fuzzy nazw produktów: indeks n-gramów vs pełny przegląd słownika.
+
+Mierzy czas na jedną linię paragonu w zależności od rozmiaru słownika.
+"""
+
+import random
+import time
+from difflib import SequenceMatcher
+
+import pytest
+
+from backend.core.fuzzy_index import NGramIndex
+
+SYLLABLES = ["ma", "ka", "ser", "mle", "ko", "chleb", "żyt", "ni", "jo", "gurt", "sok", "łko", "piwo", "ba", "nan"]
+
+
+def build_dictionary(size: int, rng: random.Random):
+    keys = set()
+    while len(keys) < size:
+        keys.add(
+            " ".join(
+                "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+                for _ in range(rng.randint(1, 3))
+            )
+        )
+    return sorted(keys)
+
+
+def receipt_line(key: str, rng: random.Random) -> str:
+    chars = list(key)
+    for _ in range(2):
+        chars[rng.randrange(len(chars))] = rng.choice("abcdeilnorstuz")
+    return "".join(chars)
+
+
+def linear_scan(query, keys):
+    return max(SequenceMatcher(None, query, key).ratio() for key in keys)
+
+
+def indexed_scan(query, index):
+    candidates = index.similar(query)
+    return max((SequenceMatcher(None, query, index.keys[i]).ratio() for i in candidates), default=0.0)
+
+
+@pytest.mark.parametrize("size", [100, 1000, 5000])
+def test_fuzzy_match_latency_per_line(size):
+    """Test czasu dopasowania jednej linii dla różnych rozmiarów słownika."""
+    rng = random.Random(size)
+    keys = build_dictionary(size, rng)
+    lines = [receipt_line(rng.choice(keys), rng) for _ in range(20)]
+
+    start_time = time.perf_counter()
+    index = NGramIndex(keys)
+    build_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    linear_scores = [linear_scan(line, keys) for line in lines]
+    linear_time = (time.perf_counter() - start_time) / len(lines)
+
+    start_time = time.perf_counter()
+    indexed_scores = [indexed_scan(line, index) for line in lines]
+    indexed_time = (time.perf_counter() - start_time) / len(lines)
+
+    print(f"\nFuzzy match, {size} entries (index build {build_time * 1000:.1f} ms):")
+    print(f"  linear scan: {linear_time * 1000:.2f} ms/line")
+    print(f"  n-gram index: {indexed_time * 1000:.2f} ms/line")
+
+    assert indexed_scores == pytest.approx(linear_scores, abs=0.1)
+    if size >= 1000:
+        assert indexed_time < linear_time / 5, "Indeks powinien być wielokrotnie szybszy"
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark kategoryzacji słownikowej: automat Aho-Corasick vs pętla po kategoriach.
+
+Kategorie i słowa kluczowe z data/config/filtered_gpt_categories.json
+(podzbiór Google Product Taxonomy).
+"""
+
+import json
+import random
+import time
+from pathlib import Path
+
+from backend.core.keyword_automaton import KeywordAutomaton
+
+CATEGORIES_FILE = (
+    Path(__file__).resolve().parents[2] / "data" / "config" / "filtered_gpt_categories.json"
+)
+
+
+def category_loop(categories, product_lower):
+    best_id, best_score = None, 0.0
+    for category in categories:
+        for keyword in category.get("keywords", []):
+            keyword_lower = keyword.lower()
+            if keyword_lower in product_lower:
+                score = len(keyword_lower) / len(product_lower)
+                if score > best_score:
+                    best_id, best_score = category["id"], score
+    return best_id, best_score
+
+
+def test_keyword_categorization_latency():
+    """Test czasu kategoryzacji słownikowej jednej nazwy produktu."""
+    categories = json.loads(CATEGORIES_FILE.read_text(encoding="utf-8"))["categories"]
+    keyword_categories = {}
+    for category in categories:
+        for keyword in category.get("keywords", []):
+            keyword_categories.setdefault(keyword.lower(), category["id"])
+
+    start_time = time.perf_counter()
+    automaton = KeywordAutomaton(keyword_categories)
+    build_time = time.perf_counter() - start_time
+
+    rng = random.Random(0)
+    keywords = list(keyword_categories)
+    names = [
+        f"{rng.choice(keywords)} {rng.choice(['1l', '500g', 'bio', 'promo', 'x2'])}"
+        for _ in range(5000)
+    ]
+
+    start_time = time.perf_counter()
+    loop_results = [category_loop(categories, name) for name in names]
+    loop_time = (time.perf_counter() - start_time) / len(names)
+
+    start_time = time.perf_counter()
+    automaton_results = []
+    for name in names:
+        pattern_id = automaton.longest_match(name)
+        keyword = automaton.patterns[pattern_id]
+        automaton_results.append((keyword_categories[keyword], len(keyword) / len(name)))
+    automaton_time = (time.perf_counter() - start_time) / len(names)
+
+    print(
+        f"\nKeyword categorization, {len(categories)} categories / {len(automaton)} keywords "
+        f"(automaton build {build_time * 1000:.1f} ms):"
+    )
+    print(f"  category loop: {loop_time * 1e6:.1f} us/name")
+    print(f"  Aho-Corasick:  {automaton_time * 1e6:.1f} us/name")
+
+    assert automaton_results == loop_results
+    assert automaton_time < loop_time
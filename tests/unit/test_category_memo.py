@@ -0,0 +1,82 @@
+"""
+Testy pamięci kategorii produktów (klucz: wersja tabeli kategorii + znormalizowana nazwa)
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from backend.core.category_memo import (CategoryMemo, category_table_version,
+                                        normalize_product_key)
+
+
+@pytest.fixture
+def memo(tmp_path):
+    memo = CategoryMemo(str(tmp_path / "categories.db"))
+    yield memo
+    memo.close()
+
+
+def test_names_are_normalized_for_lookup(memo):
+    memo.put_many("v1", [("Mleko  ŁACIATE 3,2%", "1", 0.9, "bielik_ai_batch")])
+
+    results = memo.get_many("v1", ["mleko łaciate 3,2%", "Chleb"])
+
+    assert results[0] == {"category_id": "1", "confidence": 0.9, "method": "bielik_ai_batch"}
+    assert results[1] is None
+    assert normalize_product_key(" Ser  Gouda* ") == "ser gouda"
+    stats = memo.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_entries_are_scoped_to_category_table_version(memo):
+    categories = [{"id": "1", "name_pl": "Nabiał", "keywords": ["mleko"]}]
+    version = category_table_version(categories)
+    changed = category_table_version(categories + [{"id": "2", "name_pl": "Pieczywo"}])
+    memo.put_many(version, [("kefir", "1", 0.9, "bielik_ai_batch")])
+
+    assert version != changed
+    assert memo.get_many(changed, ["kefir"]) == [None]
+    assert memo.get_many(version, ["kefir"])[0]["category_id"] == "1"
+
+
+def test_memo_survives_reopening(tmp_path):
+    path = str(tmp_path / "categories.db")
+    first = CategoryMemo(path)
+    first.put_many("v1", [("kefir", "1", 0.9, "bielik_ai_batch")])
+    first.close()
+
+    second = CategoryMemo(path)
+    assert second.get_many("v1", ["Kefir"])[0]["category_id"] == "1"
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_sends_only_unseen_names_to_llm(memo):
+    pytest.importorskip("pydantic")
+    from backend.core.product_categorizer import (CATEGORY_MEMO_HITS_KEY,
+                                                  ProductCategorizer)
+
+    categorizer = ProductCategorizer("/nonexistent/categories.json", memo=memo)
+    llm = AsyncMock(return_value={"message": {"content": "1,2"}})
+
+    with patch("backend.core.product_categorizer.hybrid_llm_client") as client:
+        client.chat = llm
+        first = [{"name": "Kefir naturalny"}, {"name": "Bagietka"}, {"name": "KEFIR naturalny"}]
+        await categorizer._categorize_products_with_ai_batch(first)
+
+        prompt = llm.call_args[1]["messages"][1]["content"]
+        assert "1. Kefir naturalny" in prompt and "KEFIR" not in prompt
+        assert [p["category_method"] for p in first] == ["bielik_ai_batch"] * 3
+        assert first[2]["category"] == "Nabiał"
+
+        llm.reset_mock()
+        second = [{"name": "kefir naturalny"}, {"name": "Bagietka"}]
+        await categorizer._categorize_products_with_ai_batch(second)
+
+    llm.assert_not_called()
+    assert [p["category"] for p in second] == ["Nabiał", "Pieczywo"]
+    stats = categorizer.get_category_statistics(second)
+    assert stats[CATEGORY_MEMO_HITS_KEY] == 2
+    assert stats["Nabiał"] == stats["Pieczywo"] == 1
+    assert categorizer.get_category_statistics(first)[CATEGORY_MEMO_HITS_KEY] == 0
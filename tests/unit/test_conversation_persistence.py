@@ -0,0 +1,94 @@
+"""
+Testy zapisu rozmów write-behind (znacznik persisted_count, zbiorcze zapisy)
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from backend.agents.conversation_persistence import ConversationWriter
+from backend.agents.memory_manager import MemoryContext, MemoryManager
+
+
+@pytest.fixture
+def writer():
+    writer = ConversationWriter(flush_interval=60, batch_size=3, queue_size=100)
+    writer._write_batch = AsyncMock(side_effect=lambda batch: len(batch))
+    return writer
+
+
+@pytest.mark.asyncio
+async def test_only_new_messages_are_queued(writer):
+    manager = MemoryManager(enable_semantic_cache=False, writer=writer)
+    writer.enqueue = AsyncMock()
+    context = MemoryContext("s1")
+
+    context.add_message("user", "Cześć")
+    context.add_message("assistant", "Dzień dobry")
+    await manager._persist_context(context)
+    context.add_message("user", "Co na obiad?")
+    await manager._persist_context(context)
+    await manager._persist_context(context)
+
+    assert writer.enqueue.await_count == 2
+    second_call = writer.enqueue.await_args_list[1]
+    assert [m["content"] for m in second_call.args[1]] == ["Co na obiad?"]
+    assert context.persisted_count == 3
+
+
+@pytest.mark.asyncio
+async def test_flush_batches_messages_from_many_sessions(writer):
+    await writer.enqueue("s1", [{"role": "user", "content": "a"}, {"role": "user", "content": "b"}])
+    await writer.enqueue("s2", [{"role": "user", "content": "c"}, {"role": "user", "content": "d"}])
+
+    written = await writer.flush()
+    await writer.stop()
+
+    assert written == 4
+    batches = [call.args[0] for call in writer._write_batch.await_args_list]
+    assert [len(batch) for batch in batches] == [3, 1]
+    assert {session_id for session_id, _ in batches[0]} == {"s1", "s2"}
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_on_next_flush(writer):
+    writer._write_batch = AsyncMock(side_effect=[RuntimeError("database is locked"), 2])
+    messages = [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}]
+    await writer.enqueue("s1", messages)
+
+    assert await writer.flush() == 0
+    assert writer.get_stats()["pending"] == 2
+    assert await writer.flush() == 2
+    await writer.stop()
+
+    retried = writer._write_batch.await_args_list[1].args[0]
+    assert [message["content"] for _, message in retried] == ["a", "b"]
+    assert writer.get_stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_messages_survive_writer_restart(writer):
+    await writer.enqueue("s1", [{"role": "user", "content": "a"}])
+    writer._task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await writer._task
+
+    await writer.enqueue("s1", [{"role": "user", "content": "b"}])
+
+    assert await writer.flush() == 2
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_unresolved_conversation_is_left_out():
+    writer = ConversationWriter(flush_interval=60)
+    empty = MagicMock()
+    empty.all.return_value = []
+    db = AsyncMock()
+    # SELECT -> brak, INSERT -> konflikt z innym workerem, ponowny SELECT -> brak
+    db.execute.side_effect = [empty, IntegrityError("insert", {}, Exception()), empty]
+
+    assert await writer._resolve_conversation_ids(db, ["s1"]) == {}
+    db.rollback.assert_awaited_once()
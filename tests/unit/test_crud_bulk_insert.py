@@ -0,0 +1,174 @@
+"""
+Testy masowego zapisu paragonów i produktów (SQLite oraz PostgreSQL, jeśli ustawiono TEST_POSTGRES_URL)
+"""
+
+import os
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.core import crud
+from backend.core.database import Base
+from backend.models.shopping import (DailyCategoryRollup, DailyExpenseRollup,
+                                     Product, ShoppingTrip)
+
+TABLES = [
+    ShoppingTrip.__table__,
+    Product.__table__,
+    DailyExpenseRollup.__table__,
+    DailyCategoryRollup.__table__,
+]
+
+
+@pytest_asyncio.fixture(params=["sqlite", "postgresql"])
+async def db(request, tmp_path):
+    if request.param == "sqlite":
+        url = f"sqlite+aiosqlite:///{tmp_path / 'shopping.db'}"
+    else:
+        url = os.environ.get("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all, tables=TABLES)
+        await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all, tables=TABLES)
+    await engine.dispose()
+
+
+def receipt(store, day, products):
+    return {
+        "paragon_info": {"sklep": store, "data": day},
+        "produkty": products,
+    }
+
+
+async def snapshot(db):
+    """Zawartość tabel bez znaczników czasu - porównywalna między bazami"""
+    trips = (await db.execute(select(ShoppingTrip).order_by(ShoppingTrip.id))).scalars().all()
+    products = (await db.execute(select(Product).order_by(Product.id))).scalars().all()
+    return (
+        [(t.id, t.trip_date, t.store_name, t.total_amount) for t in trips],
+        [
+            (p.trip_id, p.name, p.category, p.unit_price, p.quantity, p.is_consumed)
+            for p in products
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_shopping_trip_maps_fields_and_keeps_order(db):
+    data = receipt(
+        "Biedronka",
+        "2024-03-12",
+        [
+            {"nazwa_artykulu": "Mleko", "cena_jednostkowa": 3.5, "ilosc": 2, "kategoria": "Nabiał", "cena_calkowita": 7.0},
+            {"nazwa_artykulu": "Chleb", "cena_jednostkowa": 4.0, "ilosc": 1, "cena_calkowita": 4.0},
+            {"nazwa_artykulu": "Masło", "cena_jednostkowa": 7.5, "ilosc": 1, "kategoria": "Nabiał", "cena_calkowita": 7.5},
+        ],
+    )
+
+    trip = await crud.create_shopping_trip(db, data)
+
+    assert trip.total_amount == 18.5
+    assert [p.name for p in sorted(trip.products, key=lambda p: p.id)] == ["Mleko", "Chleb", "Masło"]
+    assert all(p.created_at is not None for p in trip.products)
+    trips, products = await snapshot(db)
+    assert trips == [(trip.id, date(2024, 3, 12), "Biedronka", 18.5)]
+    assert products == [
+        (trip.id, "Mleko", "Nabiał", 3.5, 2.0, 0),
+        (trip.id, "Chleb", None, 4.0, 1.0, 0),
+        (trip.id, "Masło", "Nabiał", 7.5, 1.0, 0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_shopping_trips_returns_ids_in_input_order(db):
+    trips = [
+        receipt(
+            f"Sklep {i}",
+            f"2024-01-{i + 1:02d}",
+            [
+                {"nazwa_artykulu": f"Produkt {i}.{j}", "cena_jednostkowa": 1.0 + j, "ilosc": 1, "cena_calkowita": 1.0 + j}
+                for j in range(i % 3)
+            ],
+        )
+        for i in range(12)
+    ]
+
+    trip_ids = await crud.import_shopping_trips(db, trips)
+
+    assert len(trip_ids) == 12
+    stored_trips, products = await snapshot(db)
+    assert [t[0] for t in stored_trips] == trip_ids
+    assert [t[2] for t in stored_trips] == [f"Sklep {i}" for i in range(12)]
+    by_trip = {}
+    for trip_id, name, *_ in products:
+        by_trip.setdefault(trip_id, []).append(name)
+    for i, trip_id in enumerate(trip_ids):
+        assert by_trip.get(trip_id, []) == [f"Produkt {i}.{j}" for j in range(i % 3)]
+
+
+@pytest.mark.asyncio
+async def test_rows_with_different_columns_get_defaults(db):
+    trip_ids = await crud.import_shopping_trips(
+        db,
+        [
+            receipt(
+                "Lidl",
+                "2024-02-01",
+                [
+                    {"nazwa_artykulu": "Jogurt", "is_consumed": 1},
+                    {"nazwa_artykulu": "Kefir"},
+                    {"nazwa_artykulu": "Ser", "notes": "plastry"},
+                ],
+            )
+        ],
+    )
+
+    _, products = await snapshot(db)
+    assert [(p[1], p[5]) for p in products] == [("Jogurt", 1), ("Kefir", 0), ("Ser", 0)]
+    assert all(p[0] == trip_ids[0] for p in products)
+
+
+@pytest.mark.asyncio
+async def test_add_products_to_trip_appends_and_updates_total(db):
+    trip = await crud.create_shopping_trip(
+        db,
+        receipt("Żabka", "2024-05-05", [{"nazwa_artykulu": "Woda", "cena_calkowita": 2.0}]),
+    )
+
+    updated = await crud.add_products_to_trip(
+        db,
+        trip.id,
+        [
+            {"nazwa_artykulu": "Sok", "cena_calkowita": 5.0},
+            {"nazwa_artykulu": "Baton", "cena_calkowita": 2.5},
+        ],
+    )
+
+    assert updated.total_amount == 9.5
+    assert sorted(p.name for p in updated.products) == ["Baton", "Sok", "Woda"]
+
+
+@pytest.mark.asyncio
+async def test_failed_import_is_rolled_back(db):
+    trips = [
+        receipt("Netto", "2024-06-01", [{"nazwa_artykulu": "Ryż"}]),
+        # Brak nazwy produktu - naruszenie NOT NULL
+        receipt("Netto", "2024-06-02", [{"cena_jednostkowa": 1.0}]),
+    ]
+
+    with pytest.raises(Exception):
+        await crud.import_shopping_trips(db, trips)
+
+    assert await snapshot(db) == ([], [])
@@ -0,0 +1,63 @@
+"""
+Testy mikro-batchowania embeddingów (łączenie zapytań, kubełki długości, błędy)
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from backend.core.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        self.threads.add(threading.current_thread().name)
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_batch():
+    encoder = FakeEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=16, max_wait=0.05, bucket_size=16)
+
+    results = await asyncio.gather(*(batcher.submit("x" * n) for n in range(1, 6)))
+    await batcher.stop()
+
+    assert results == [[float(n)] for n in range(1, 6)]
+    assert len(encoder.calls) == 1
+    assert batcher.get_stats()["batches"] == 1
+    assert threading.current_thread().name not in encoder.threads
+
+
+@pytest.mark.asyncio
+async def test_encode_buckets_by_length_and_keeps_order():
+    encoder = FakeEncoder()
+    batcher = EmbeddingBatcher(encoder, bucket_size=2)
+    texts = ["aaaa", "a", "aaa", "aa"]
+
+    results = await batcher.encode(texts)
+
+    assert results == [[4.0], [1.0], [3.0], [2.0]]
+    assert encoder.calls == [["a", "aa"], ["aaa", "aaaa"]]
+
+
+@pytest.mark.asyncio
+async def test_encoder_failure_is_raised_to_every_caller():
+    def broken(texts):
+        raise RuntimeError("model crashed")
+
+    batcher = EmbeddingBatcher(broken, max_wait=0.05)
+
+    results = await asyncio.gather(
+        batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+    )
+    await batcher.stop()
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert batcher.get_stats()["failed"] == 2
@@ -0,0 +1,118 @@
+"""
+Testy dla trwałego magazynu embeddingów i wsadowego embedowania w RAG
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from backend.core import rag_document_processor
+from backend.core.embedding_store import EmbeddingStore, chunk_content_hash
+from backend.core.rag_document_processor import RAGDocumentProcessor
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Magazyn embeddingów w katalogu tymczasowym"""
+    store = EmbeddingStore(db_path=str(tmp_path / "embeddings.db"))
+    yield store
+    store.close()
+
+
+class TestEmbeddingStore:
+    """Testy dla EmbeddingStore"""
+
+    def test_hash_ignores_whitespace_changes(self):
+        assert chunk_content_hash("Mleko  2%\n1L") == chunk_content_hash(" Mleko 2% 1L ")
+        assert chunk_content_hash("Mleko") != chunk_content_hash("mleko")
+
+    def test_put_and_get_many(self, store):
+        stored = store.put_many("m", ["a chunk", "b chunk"], [[0.1, 0.2], [0.3, 0.4]])
+
+        assert stored == 2
+        results = store.get_many("m", ["b chunk", "missing", "a chunk"])
+        assert results[0] == pytest.approx([0.3, 0.4])
+        assert results[1] is None
+        assert results[2] == pytest.approx([0.1, 0.2])
+
+    def test_keys_are_scoped_by_model(self, store):
+        store.put_many("model-a", ["chunk"], [[1.0, 2.0]])
+
+        assert store.get_many("model-b", ["chunk"]) == [None]
+
+    def test_fallback_vectors_are_not_stored(self, store):
+        stored = store.put_many("m", ["empty", "zeros"], [[], [0.0, 0.0]])
+
+        assert stored == 0
+        assert store.get_stats()["total_embeddings"] == 0
+
+    def test_survives_reopen(self, tmp_path):
+        path = str(tmp_path / "embeddings.db")
+        first = EmbeddingStore(db_path=path)
+        first.put_many("m", ["chunk"], [[0.5, 0.25]])
+        first.close()
+
+        second = EmbeddingStore(db_path=path)
+        assert second.get_many("m", ["chunk"])[0] == pytest.approx([0.5, 0.25])
+        second.close()
+
+
+class TestBatchEmbedding:
+    """Testy wsadowego embedowania w RAGDocumentProcessor"""
+
+    @pytest.fixture
+    def processor(self, store):
+        vector_store = AsyncMock()
+        processor = RAGDocumentProcessor(
+            vector_store=vector_store, chunk_size=20, chunk_overlap=0, embedding_store=store
+        )
+        backend = AsyncMock(side_effect=lambda texts: [[float(len(t)), 1.0] for t in texts])
+        processor._embedding_backends = lambda: [("test-model", backend)]
+        return processor, vector_store, backend
+
+    @pytest.mark.asyncio
+    async def test_chunks_embedded_once_in_a_single_batch(self, processor):
+        rag_processor, vector_store, backend = processor
+        content = " ".join(f"word{i}" for i in range(50))
+
+        chunks = await rag_processor.process_document(content, "doc")
+
+        assert len(chunks) > 1
+        assert backend.await_count == 1
+        for call in vector_store.add_document.await_args_list:
+            assert call.kwargs["embedding"]
+
+    @pytest.mark.asyncio
+    async def test_resync_of_unchanged_content_makes_no_model_calls(self, processor):
+        rag_processor, _, backend = processor
+        content = " ".join(f"word{i}" for i in range(50))
+
+        await rag_processor.process_document(content, "doc")
+        backend.reset_mock()
+        await rag_processor.process_document(content, "doc")
+
+        backend.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_mmlw_vectors_are_keyed_by_backend(self, store, monkeypatch):
+        client = SimpleNamespace(backend="onnx", model_name="mmlw-test")
+        monkeypatch.setattr(rag_document_processor, "mmlw_client", client, raising=False)
+
+        def embed_after_fallback(texts):
+            # Brak ONNX Runtime - inicjalizacja przełącza się na PyTorch
+            client.backend = "torch"
+            return [[1.0, 2.0] for _ in texts]
+
+        rag_processor = RAGDocumentProcessor(
+            vector_store=AsyncMock(), chunk_size=20, chunk_overlap=0, embedding_store=store
+        )
+        backend = AsyncMock(side_effect=embed_after_fallback)
+        rag_processor._embedding_backends = lambda: [
+            (RAGDocumentProcessor._mmlw_model_key(), backend)
+        ]
+
+        await rag_processor.process_document("kiszone ogórki", "doc")
+
+        assert store.get_many("mmlw:torch:mmlw-test", ["kiszone ogórki"])[0]
+        assert store.get_many("mmlw:onnx:mmlw-test", ["kiszone ogórki"])[0] is None
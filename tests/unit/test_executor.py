@@ -0,0 +1,144 @@
+"""
+Testy egzekutora planów (wykonanie grafu zależności, memoizacja, timeouty)
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from backend.agents.executor import Executor
+from backend.agents.planner import ExecutionPlan, PlanStep
+
+
+class FakeRegistry:
+    def __init__(self, tools):
+        self.tools = tools
+
+    def get_tool(self, name):
+        function = self.tools.get(name)
+        return SimpleNamespace(function=function) if function else None
+
+
+def _plan(steps):
+    return ExecutionPlan(
+        query="test", steps=steps, total_steps=len(steps), estimated_complexity="medium"
+    )
+
+
+@pytest.fixture
+def executor():
+    with patch("backend.agents.executor.GeneralConversationAgent"):
+        yield Executor()
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently(executor):
+    running = 0
+    peak = 0
+
+    async def slow_tool(name: str):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return name
+
+    executor.tool_registry = FakeRegistry({"slow": slow_tool})
+    plan = _plan(
+        [
+            PlanStep(step=1, tool="slow", args={"name": "pogoda"}, description="", depends_on=[]),
+            PlanStep(step=2, tool="slow", args={"name": "spiżarnia"}, description="", depends_on=[]),
+            PlanStep(step=3, tool="slow", args={"name": "rag"}, description="", depends_on=[]),
+        ]
+    )
+
+    result = await executor.execute_plan(plan)
+
+    assert result.success
+    assert peak == 3
+    assert [r.result for r in result.step_results] == ["pogoda", "spiżarnia", "rag"]
+
+
+@pytest.mark.asyncio
+async def test_dependent_step_sees_dependency_results(executor):
+    async def first():
+        return "deszcz"
+
+    async def second(step_1_result=None):
+        return f"przepis na {step_1_result}"
+
+    executor.tool_registry = FakeRegistry({"first": first, "second": second})
+    plan = _plan(
+        [
+            PlanStep(step=1, tool="first", args={}, description="", depends_on=[]),
+            PlanStep(step=2, tool="second", args={}, description="", depends_on=[1]),
+        ]
+    )
+
+    result = await executor.execute_plan(plan)
+
+    assert result.final_result == "przepis na deszcz"
+
+
+@pytest.mark.asyncio
+async def test_identical_tool_calls_are_memoized(executor):
+    calls = 0
+
+    async def weather(location: str):
+        nonlocal calls
+        calls += 1
+        return f"słońce w {location}"
+
+    executor.tool_registry = FakeRegistry({"weather": weather})
+    plan = _plan(
+        [
+            PlanStep(step=1, tool="weather", args={"location": "Gdańsk"}, description="", depends_on=[]),
+            PlanStep(step=2, tool="weather", args={"location": "Gdańsk"}, description="", depends_on=[]),
+        ]
+    )
+
+    result = await executor.execute_plan(plan)
+
+    assert calls == 1
+    assert result.step_results[1].result == "słońce w Gdańsk"
+    assert result.step_results[1].metadata["memoized"] is True
+
+
+@pytest.mark.asyncio
+async def test_step_timeout_fails_only_that_step(executor):
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def quick():
+        return "ok"
+
+    executor.tool_registry = FakeRegistry({"hang": hang, "quick": quick})
+    plan = _plan(
+        [
+            PlanStep(step=1, tool="hang", args={}, description="", depends_on=[]),
+            PlanStep(step=2, tool="quick", args={}, description="", depends_on=[]),
+        ]
+    )
+
+    with patch("backend.agents.executor.settings.EXECUTOR_STEP_TIMEOUT", 0.05):
+        result = await executor.execute_plan(plan)
+
+    assert not result.step_results[0].success
+    assert "timed out" in result.step_results[0].error
+    assert result.step_results[1].result == "ok"
+
+
+def test_missing_depends_on_keeps_sequential_order(executor):
+    steps = [
+        PlanStep(step=1, tool="a", args={}, description=""),
+        PlanStep(step=2, tool="b", args={}, description=""),
+        PlanStep(step=3, tool="c", args={}, description="", depends_on=[1, 7]),
+    ]
+
+    dependencies, ancestors = executor._resolve_dependencies(steps)
+
+    assert dependencies == [set(), {0}, {0}]
+    assert ancestors == [[], [0], [0]]
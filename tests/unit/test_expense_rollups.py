@@ -0,0 +1,287 @@
+"""
+Testy dziennych agregatów wydatków - wyniki zapytań GROUP BY porównywane z agregacją w Pythonie
+"""
+
+import os
+import random
+from datetime import date, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from backend.agents.tools.tools import generate_clarification_question_text
+from backend.core import crud
+from backend.core.database import Base
+from backend.core.expense_rollups import (ensure_expense_rollups,
+                                          get_category_expenses,
+                                          get_expense_totals,
+                                          get_monthly_expenses, get_top_trips,
+                                          month_end, month_start,
+                                          rebuild_expense_rollups)
+from backend.models.shopping import (DailyCategoryRollup, DailyExpenseRollup,
+                                     Product, ShoppingTrip)
+
+TABLES = [
+    ShoppingTrip.__table__,
+    Product.__table__,
+    DailyExpenseRollup.__table__,
+    DailyCategoryRollup.__table__,
+]
+STORES = ["Biedronka", "Lidl", "Żabka", "Auchan"]
+CATEGORIES = ["1", "2", "3", "Nabiał", None, ""]
+
+
+@pytest_asyncio.fixture(params=["sqlite", "postgresql"])
+async def db(request, tmp_path):
+    if request.param == "sqlite":
+        url = f"sqlite+aiosqlite:///{tmp_path / 'rollups.db'}"
+    else:
+        url = os.environ.get("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all, tables=TABLES)
+        await conn.run_sync(Base.metadata.create_all, tables=TABLES)
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all, tables=TABLES)
+    await engine.dispose()
+
+
+def generate_trips(count, seed):
+    rng = random.Random(seed)
+    trips = []
+    for _ in range(count):
+        day = date(2024, 1, 1) + timedelta(days=rng.randint(0, 240))
+        products = [
+            {
+                "nazwa_artykulu": f"Produkt {rng.randint(1, 50)}",
+                "cena_jednostkowa": rng.choice([None, round(rng.uniform(0.5, 40), 2)]),
+                "ilosc": rng.randint(1, 3),
+                "kategoria": rng.choice(CATEGORIES),
+                "cena_calkowita": round(rng.uniform(0.5, 80), 2),
+            }
+            for _ in range(rng.randint(0, 6))
+        ]
+        trips.append(
+            {
+                "paragon_info": {"sklep": rng.choice(STORES), "data": day.isoformat()},
+                "produkty": products,
+            }
+        )
+    return trips
+
+
+async def load_trips(db):
+    # populate_existing - produkty usunięte w teście nie zostają w załadowanych kolekcjach
+    result = await db.execute(
+        select(ShoppingTrip)
+        .options(selectinload(ShoppingTrip.products))
+        .execution_options(populate_existing=True)
+    )
+    return list(result.scalars().unique().all())
+
+
+def python_analytics(trips, start, end, category=None):
+    """Agregacja w Pythonie jak w dotychczasowym get_expense_analytics (na datach zakupów)"""
+    if category is not None:
+        trips = [t for t in trips if any(p.category == category for p in t.products)]
+    in_period = [t for t in trips if start <= t.trip_date <= end]
+
+    category_expenses = {}
+    for trip in in_period:
+        for product in trip.products:
+            if product.category:
+                category_expenses[product.category] = (
+                    category_expenses.get(product.category, 0) + (product.unit_price or 0)
+                )
+
+    monthly = {}
+    for trip in trips:
+        key = (trip.trip_date.year, trip.trip_date.month)
+        totals = monthly.setdefault(key, {"total": 0.0, "trip_count": 0})
+        totals["total"] += trip.total_amount or 0
+        totals["trip_count"] += 1
+
+    expensive = sorted(
+        [t for t in in_period if t.total_amount], key=lambda t: (-t.total_amount, t.id)
+    )[:5]
+
+    return {
+        "total_expenses": sum(t.total_amount for t in in_period if t.total_amount),
+        "trip_count": len(in_period),
+        "total_products": sum(len(t.products) for t in in_period),
+        "categories": category_expenses,
+        "monthly": monthly,
+        "expensive": [t.id for t in expensive],
+    }
+
+
+async def sql_analytics(db, start, end, category=None):
+    totals = await get_expense_totals(db, start, end, category)
+    return {
+        **totals,
+        "categories": await get_category_expenses(db, start, end, category),
+        "monthly": await get_monthly_expenses(db, date(2023, 1, 1), date(2025, 12, 31), category),
+        "expensive": [t["id"] for t in await get_top_trips(db, start, end, category)],
+    }
+
+
+def assert_same(sql, expected):
+    assert sql["trip_count"] == expected["trip_count"]
+    assert sql["total_products"] == expected["total_products"]
+    assert sql["total_expenses"] == pytest.approx(expected["total_expenses"])
+    assert sql["categories"] == pytest.approx(expected["categories"])
+    assert list(sql["categories"].values()) == sorted(sql["categories"].values(), reverse=True)
+    assert sql["monthly"].keys() == expected["monthly"].keys()
+    for key, totals in expected["monthly"].items():
+        assert sql["monthly"][key]["trip_count"] == totals["trip_count"]
+        assert sql["monthly"][key]["total"] == pytest.approx(totals["total"])
+    assert sql["expensive"] == expected["expensive"]
+
+
+async def rollup_rows(db):
+    expense = (
+        await db.execute(select(DailyExpenseRollup.__table__).order_by("day", "store_name"))
+    ).all()
+    categories = (
+        await db.execute(select(DailyCategoryRollup.__table__).order_by("day", "category"))
+    ).all()
+    return (
+        [(r.day, r.store_name, r.trip_count, round(r.total_amount, 6), r.product_count) for r in expense],
+        [(r.day, r.category, round(r.amount, 6), r.product_count) for r in categories],
+    )
+
+
+def test_calendar_month_helpers():
+    assert month_start(date(2024, 3, 15)) == date(2024, 3, 1)
+    assert month_start(date(2024, 3, 15), 5) == date(2023, 10, 1)
+    assert month_start(date(2024, 12, 2), -1) == date(2025, 1, 1)
+    assert month_end(date(2024, 2, 10)) == date(2024, 2, 29)
+    assert month_end(date(2023, 12, 31)) == date(2023, 12, 31)
+
+
+@pytest.mark.asyncio
+async def test_rollups_match_python_aggregation(db):
+    await crud.import_shopping_trips(db, generate_trips(300, seed=3))
+    trips = await load_trips(db)
+
+    for start, end in [
+        (date(2024, 1, 1), date(2024, 12, 31)),
+        (date(2024, 2, 10), date(2024, 3, 9)),
+        (date(2024, 6, 1), date(2024, 6, 1)),
+        (date(2025, 1, 1), date(2025, 1, 31)),
+    ]:
+        assert_same(await sql_analytics(db, start, end), python_analytics(trips, start, end))
+        assert_same(
+            await sql_analytics(db, start, end, "Nabiał"),
+            python_analytics(trips, start, end, "Nabiał"),
+        )
+
+
+@pytest.mark.asyncio
+async def test_incremental_rollups_equal_full_rebuild(db):
+    trip_ids = await crud.import_shopping_trips(db, generate_trips(80, seed=11))
+    await crud.create_shopping_trip(db, generate_trips(1, seed=12)[0])
+    await crud.add_products_to_trip(
+        db,
+        trip_ids[0],
+        [{"nazwa_artykulu": "Ser", "cena_jednostkowa": 9.99, "kategoria": "Nabiał", "cena_calkowita": 9.99}],
+    )
+
+    trips = {t.id: t for t in await load_trips(db)}
+    moved = trips[trip_ids[1]]
+    assert await crud.execute_action(
+        db, "UPDATE_PURCHASE", moved, [{"pole_do_zmiany": "data_zakupow", "nowa_wartosc": date(2024, 12, 24)}]
+    )
+    assert await crud.execute_action(db, "DELETE_PURCHASE", trips[trip_ids[2]], None)
+    product = next(p for t in trips.values() for p in t.products if t.id not in trip_ids[:3])
+    assert await crud.execute_action(db, "DELETE_ITEM", product, None)
+
+    incremental = await rollup_rows(db)
+    await rebuild_expense_rollups(db)
+    await db.commit()
+
+    assert incremental == await rollup_rows(db)
+    start, end = date(2024, 1, 1), date(2024, 12, 31)
+    assert_same(await sql_analytics(db, start, end), python_analytics(await load_trips(db), start, end))
+
+
+@pytest.mark.asyncio
+async def test_summary_list_returns_one_row_per_trip(db):
+    trip_ids = await crud.import_shopping_trips(db, generate_trips(20, seed=5))
+    trips = {t.id: t for t in await load_trips(db)}
+
+    rows = await crud.get_summary(db, {"metryka": "lista_wszystkiego"})
+
+    assert all(
+        set(row) == {"id", "trip_date", "store_name", "total_amount", "product_count"}
+        for row in rows
+    )
+    assert sorted(row["id"] for row in rows) == sorted(trip_ids)
+    dates = [row["trip_date"] for row in rows]
+    assert dates == sorted(dates, reverse=True)
+    for row in rows:
+        trip = trips[row["id"]]
+        assert (row["store_name"], row["total_amount"], row["product_count"]) == (
+            trip.store_name,
+            trip.total_amount,
+            len(trip.products),
+        )
+
+    text = generate_clarification_question_text(rows[:2])
+    assert f"1. Paragon ze sklepu '{rows[0]['store_name']}'" in text
+    assert f"({rows[0]['product_count']} produktów" in text
+    assert "{" not in text
+
+
+@pytest.mark.asyncio
+async def test_backfill_runs_once(db):
+    await crud.import_shopping_trips(db, generate_trips(30, seed=7))
+    expected = await rollup_rows(db)
+    await db.execute(DailyExpenseRollup.__table__.delete())
+    await db.execute(DailyCategoryRollup.__table__.delete())
+    await db.commit()
+
+    assert await ensure_expense_rollups(db) is True
+    assert await ensure_expense_rollups(db) is False
+    assert await rollup_rows(db) == expected
+
+
+class _MoveProduct:
+    """Aktualizacja produktu przenosząca go na inny paragon"""
+
+    def __init__(self, trip_id):
+        self.trip_id = trip_id
+
+    def model_dump(self, exclude_unset=False):
+        return {"trip_id": self.trip_id}
+
+
+@pytest.mark.asyncio
+async def test_moving_product_refreshes_both_days(db):
+    from backend.services import shopping_service
+
+    first, second = await crud.import_shopping_trips(
+        db,
+        [
+            {"paragon_info": {"sklep": "Lidl", "data": "2024-03-01"}, "produkty": [{"nazwa_artykulu": "Ser", "cena_jednostkowa": 8.0, "kategoria": "Nabiał"}]},
+            {"paragon_info": {"sklep": "Lidl", "data": "2024-03-02"}, "produkty": []},
+        ],
+    )
+    product_id = await db.scalar(select(Product.id).where(Product.trip_id == first))
+
+    await shopping_service.update_product(db, product_id, _MoveProduct(second))
+
+    incremental = await rollup_rows(db)
+    await rebuild_expense_rollups(db)
+    assert incremental == await rollup_rows(db)
+    assert [(r[0], r[3]) for r in incremental[1]] == [(date(2024, 3, 2), 1)]
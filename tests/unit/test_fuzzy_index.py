@@ -0,0 +1,144 @@
+"""
+Testy indeksu n-gramów i normalizatorów korzystających z niego (zgodność z pełnym przeglądem)
+"""
+
+import json
+import os
+import random
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import pytest
+
+from backend.core.fuzzy_index import FUZZY_SCORE_TOLERANCE, NGramIndex
+from backend.core.product_name_normalizer import ProductNameNormalizer
+from backend.core.store_normalizer import StoreNormalizer
+
+CONFIG_DIR = Path(__file__).resolve().parents[2] / "data" / "config"
+
+
+def perturb(text: str, rng: random.Random) -> str:
+    """Literówki jak z OCR: usunięte, wstawione i podmienione znaki"""
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        position = rng.randrange(len(chars) + 1)
+        operation = rng.random()
+        if operation < 0.3 and len(chars) > 1:
+            chars.pop(min(position, len(chars) - 1))
+        elif operation < 0.6:
+            chars.insert(position, rng.choice("abcdeilnorstuzą0123456789 "))
+        elif chars:
+            chars[min(position, len(chars) - 1)] = rng.choice("abcdeilnorstuz")
+    noisy = "".join(chars).strip()
+    if rng.random() < 0.3:
+        noisy = f"{noisy} {rng.choice(['500g', 'bio', 'PROMO', 'x2'])}"
+    return noisy.lower() or "x"
+
+
+def linear_best(query, keys):
+    best_id, best_score = None, 0.0
+    for key_id, key in enumerate(keys):
+        score = SequenceMatcher(None, query, key).ratio()
+        if score > best_score:
+            best_id, best_score = key_id, score
+    return best_id, best_score
+
+
+def test_containment_candidates_are_exact():
+    rng = random.Random(7)
+    keys = ["ml", "mleko", "mleko 3,2%", "ser żółty", "ser", "chleb żytni", "a", "żytni"]
+    index = NGramIndex(keys)
+    queries = ["mleko 3,2% 1l", "ser", "chleb żytni krojony", "żyt", "a", "x"]
+    queries += [perturb(rng.choice(keys), rng) for _ in range(200)]
+
+    for query in queries:
+        assert index.substrings_of(query) == [i for i, k in enumerate(keys) if k in query]
+        assert index.superstrings_of(query) == [i for i, k in enumerate(keys) if query in k]
+
+
+def test_similar_finds_linear_best_within_tolerance():
+    rng = random.Random(11)
+    syllables = ["ma", "ka", "ser", "mle", "ko", "chleb", "żyt", "ni", "jo", "gurt", "sok", "łko"]
+    keys = sorted(
+        {
+            " ".join(
+                "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+                for _ in range(rng.randint(1, 2))
+            )
+            for _ in range(1000)
+        }
+    )
+    index = NGramIndex(keys)
+
+    for _ in range(100):
+        query = perturb(rng.choice(keys), rng)
+        _, expected = linear_best(query, keys)
+        scores = [SequenceMatcher(None, query, keys[i]).ratio() for i in index.similar(query)]
+        assert max(scores, default=0.0) >= expected - FUZZY_SCORE_TOLERANCE
+
+
+@pytest.mark.parametrize(
+    "normalizer_class, dictionary, entries",
+    [
+        (
+            ProductNameNormalizer,
+            "product_name_normalization.json",
+            lambda data: [n["original"] for n in data["normalizations"]],
+        ),
+        (
+            StoreNormalizer,
+            "polish_stores.json",
+            lambda data: [v for s in data["stores"] for v in s.get("variations", [])],
+        ),
+    ],
+)
+def test_normalizers_match_linear_scan_on_shipped_dictionaries(
+    normalizer_class, dictionary, entries
+):
+    path = CONFIG_DIR / dictionary
+    normalizer = normalizer_class(str(path))
+    names = entries(json.loads(path.read_text(encoding="utf-8")))
+    keys = [name.lower() for name in names]
+    rng = random.Random(3)
+
+    for _ in range(300):
+        query = perturb(rng.choice(names), rng)
+        match = normalizer._find_fuzzy_match(query)
+        _, expected = linear_best(query, keys)
+        if expected > 0.6 + FUZZY_SCORE_TOLERANCE:
+            assert match is not None
+            assert match["confidence"] >= expected - FUZZY_SCORE_TOLERANCE
+
+
+def test_partial_match_keeps_keyword_priority():
+    normalizer = ProductNameNormalizer("/nonexistent/normalization.json")
+
+    match = normalizer._find_partial_match("mleko 3,2% laciate")
+
+    assert match["normalized"] == "Mleko 3.2%"
+    assert match["method"] == "partial_match"
+    assert normalizer._find_partial_match("kawa") is None
+
+
+def test_index_is_rebuilt_when_dictionary_file_changes(tmp_path):
+    path = tmp_path / "stores.json"
+    store = {
+        "id": "1",
+        "normalized_name": "Biedronka",
+        "normalized_name_en": "Biedronka",
+        "variations": ["Biedronka"],
+        "chain": "Biedronka",
+        "type": "discount_store",
+    }
+    path.write_text(json.dumps({"stores": [store]}), encoding="utf-8")
+    normalizer = StoreNormalizer(str(path))
+    assert normalizer.normalize_store_name("Netto Polska")["id"] == "999"
+
+    netto = dict(store, id="2", normalized_name="Netto", normalized_name_en="Netto", variations=["Netto"])
+    path.write_text(json.dumps({"stores": [store, netto]}), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    normalizer._last_reload_check -= normalizer.RELOAD_CHECK_INTERVAL
+
+    assert normalizer.normalize_store_name("Netto Polska")["normalized_name"] == "Netto"
+    assert normalizer._find_fuzzy_match("Neto")["normalized_name"] == "Netto"
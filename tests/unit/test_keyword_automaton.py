@@ -0,0 +1,99 @@
+"""
+Testy automatu słów kluczowych i kategoryzacji słownikowej (wyniki identyczne z przeglądem kategorii)
+"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from backend.core.keyword_automaton import KeywordAutomaton
+
+CATEGORIES_FILE = (
+    Path(__file__).resolve().parents[2] / "data" / "config" / "filtered_gpt_categories.json"
+)
+
+
+def legacy_keyword_match(categories, product_name):
+    """Poprzednia implementacja _categorize_by_keywords (pętla po kategoriach)"""
+    product_lower = product_name.lower()
+    best_match = None
+    best_score = 0.0
+    for category in categories:
+        for keyword in category.get("keywords", []):
+            keyword_lower = keyword.lower()
+            if keyword_lower in product_lower:
+                score = len(keyword_lower) / len(product_lower)
+                if score > best_score:
+                    best_score = score
+                    best_match = {
+                        "id": category["id"],
+                        "name_pl": category["name_pl"],
+                        "name_en": category["name_en"],
+                        "gpt_path": category.get("gpt_path", ""),
+                        "confidence": score,
+                        "method": "keyword_match",
+                    }
+    return best_match if best_score > 0.3 else None
+
+
+def receipt_names(keywords, count, seed):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        parts = [rng.choice(keywords) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.5:
+            parts.append(rng.choice(["1l", "500g", "BIO", "promo", "x2", "Łaciate"]))
+        name = " ".join(parts)
+        if rng.random() < 0.3:
+            name = name.upper()
+        if rng.random() < 0.2:
+            name = name[: rng.randint(1, len(name))]
+        names.append(name)
+    return names
+
+
+def test_iter_matches_finds_overlapping_keywords():
+    automaton = KeywordAutomaton(["mleko", "ko", "mleko uht", "uht", "", "ko"])
+
+    matches = sorted(
+        (end, automaton.patterns[pattern_id])
+        for end, pattern_id in automaton.iter_matches("mleko uht")
+    )
+
+    assert len(automaton) == 4
+    assert matches == [(5, "ko"), (5, "mleko"), (9, "mleko uht"), (9, "uht")]
+
+
+def test_longest_match_prefers_length_then_priority():
+    automaton = KeywordAutomaton(["ser", "sok", "ser żółty", "jogurt", "żółty ser"])
+
+    assert automaton.patterns[automaton.longest_match("ser żółty gouda")] == "ser żółty"
+    assert automaton.patterns[automaton.longest_match("sok i ser")] == "ser"
+    assert automaton.longest_match("chleb") is None
+
+
+def test_longest_match_agrees_with_brute_force():
+    rng = random.Random(5)
+    alphabet = "abcąe "
+    patterns = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(60)]
+    automaton = KeywordAutomaton(patterns)
+
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        contained = [i for i, p in enumerate(automaton.patterns) if p in text]
+        expected = min(contained, key=lambda i: (-len(automaton.patterns[i]), i), default=None)
+        assert automaton.longest_match(text) == expected
+
+
+def test_categorizer_scores_match_category_loop():
+    pytest.importorskip("pydantic")
+    from backend.core.product_categorizer import ProductCategorizer
+
+    categorizer = ProductCategorizer(str(CATEGORIES_FILE))
+    keywords = [k for c in categorizer.categories for k in c.get("keywords", [])]
+
+    for name in receipt_names(keywords, 2000, seed=1):
+        assert categorizer._categorize_by_keywords(name) == legacy_keyword_match(
+            categorizer.categories, name
+        )
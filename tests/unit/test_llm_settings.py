@@ -0,0 +1,53 @@
+"""
+Testy cache'owanych ustawień LLM (jednorazowy odczyt, przeładowanie, callbacki)
+"""
+
+import json
+from unittest.mock import patch
+
+from backend.core.llm_settings import DEFAULT_SELECTED_MODEL, LLMSettingsStore
+
+
+def test_missing_file_uses_default_model(tmp_path):
+    store = LLMSettingsStore(str(tmp_path / "llm_settings.json"), poll_interval=1)
+
+    assert store.snapshot().selected_model == DEFAULT_SELECTED_MODEL
+    assert store.snapshot().version == 1
+
+
+def test_file_is_read_once_until_modified(tmp_path):
+    path = tmp_path / "llm_settings.json"
+    path.write_text(json.dumps({"selected_model": "gemma3:12b"}))
+    store = LLMSettingsStore(str(path), poll_interval=1)
+
+    store.snapshot()
+    with patch("builtins.open", side_effect=AssertionError("file read")):
+        for _ in range(3):
+            assert store.snapshot().selected_model == "gemma3:12b"
+        assert store.reload() is False
+
+
+def test_update_notifies_subscribers_with_new_version(tmp_path):
+    store = LLMSettingsStore(str(tmp_path / "config" / "llm_settings.json"), poll_interval=1)
+    seen = []
+    store.subscribe(lambda snapshot: seen.append((snapshot.version, snapshot.selected_model)))
+
+    store.snapshot()
+    store.update(selected_model="llama3:8b")
+
+    assert seen == [(1, DEFAULT_SELECTED_MODEL), (2, "llama3:8b")]
+    assert json.loads((tmp_path / "config" / "llm_settings.json").read_text()) == {
+        "selected_model": "llama3:8b"
+    }
+
+
+def test_invalid_file_keeps_previous_snapshot(tmp_path):
+    path = tmp_path / "llm_settings.json"
+    path.write_text(json.dumps({"selected_model": "gemma3:12b"}))
+    store = LLMSettingsStore(str(path), poll_interval=1)
+    store.snapshot()
+
+    path.write_text("{ niepoprawny json")
+
+    assert store.reload(force=True) is False
+    assert store.snapshot().selected_model == "gemma3:12b"
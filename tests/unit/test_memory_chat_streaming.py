@@ -0,0 +1,87 @@
+"""
+Testy strumieniowania /memory_chat (zdarzenia wysyłane na bieżąco, anulowanie)
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from backend.api import chat
+from backend.api.chat import MemoryChatRequest, memory_chat_generator
+
+
+def _orchestrator(process_command):
+    context = MagicMock()
+    memory_manager = SimpleNamespace(
+        get_context=AsyncMock(return_value=context), update_context=AsyncMock()
+    )
+    return SimpleNamespace(
+        orchestrator_id="test",
+        process_command=process_command,
+        memory_manager=memory_manager,
+    )
+
+
+@pytest.mark.asyncio
+async def test_tokens_are_yielded_before_orchestration_finishes():
+    release = asyncio.Event()
+
+    async def process_command(stream_callback, **kwargs):
+        await stream_callback({"type": "token", "text": "Dzień"})
+        await release.wait()
+        await stream_callback({"type": "token", "text": " dobry"})
+        return SimpleNamespace(text="Dzień dobry", success=True, data={})
+
+    orchestrator = _orchestrator(process_command)
+    with patch.object(
+        chat.orchestrator_pool, "get_healthy_orchestrator", AsyncMock(return_value=orchestrator)
+    ), patch.object(chat.orchestrator_pool, "release_orchestrator"):
+        stream = memory_chat_generator(MemoryChatRequest(message="Cześć", session_id="s1"), db=None)
+
+        first = json.loads(await stream.__anext__())
+        assert first == {
+            "text": "Dzień",
+            "type": "token",
+            "success": True,
+            "session_id": "s1",
+        }
+
+        release.set()
+        rest = [json.loads(line) async for line in stream]
+
+    assert rest[0]["text"] == " dobry"
+    assert rest[-1]["type"] == "done"
+    assert rest[-1]["text"] == ""
+    assert rest[-1]["full_text"] == "Dzień dobry"
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_orchestration():
+    cancelled = asyncio.Event()
+
+    async def process_command(stream_callback, **kwargs):
+        await stream_callback({"type": "plan_started", "total_steps": 1})
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    http_request = SimpleNamespace(is_disconnected=AsyncMock(return_value=True))
+    orchestrator = _orchestrator(process_command)
+    with patch.object(
+        chat.orchestrator_pool, "get_healthy_orchestrator", AsyncMock(return_value=orchestrator)
+    ), patch.object(chat.orchestrator_pool, "release_orchestrator") as release:
+        lines = [
+            line
+            async for line in memory_chat_generator(
+                MemoryChatRequest(message="Cześć", session_id="s1"), db=None, http_request=http_request
+            )
+        ]
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    assert lines == []
+    release.assert_called_once_with(orchestrator)
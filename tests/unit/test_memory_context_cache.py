@@ -0,0 +1,136 @@
+"""
+Testy cache'u LRU kontekstów w MemoryManager (limity, wyrzucanie do bazy, metryki)
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from backend.agents.memory_manager import MemoryManager
+
+
+@pytest.fixture
+def writer():
+    writer = MagicMock()
+    writer.enqueue = AsyncMock()
+    writer.flush = AsyncMock(return_value=0)
+    writer.load_tail = AsyncMock(return_value=None)
+    writer.get_stats = MagicMock(return_value={})
+    return writer
+
+
+@pytest.mark.asyncio
+async def test_hot_session_is_served_from_memory(writer):
+    manager = MemoryManager(enable_semantic_cache=False, writer=writer)
+
+    first = await manager.get_context("s1")
+    first.add_message("user", "Cześć")
+    await manager.update_context(first)
+    second = await manager.get_context("s1")
+
+    assert second is first
+    stats = manager.get_memory_stats()
+    assert stats["context_cache_hits"] == 1
+    assert stats["context_cache_misses"] == 1
+    writer.load_tail.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_persists_pending_messages(writer):
+    manager = MemoryManager(max_contexts=2, enable_persistence=False, enable_semantic_cache=False, writer=writer)
+
+    s1 = await manager.get_context("s1")
+    s2 = await manager.get_context("s2")
+    s2.add_message("user", "Niezapisana wiadomość")
+    await manager.get_context("s1")  # s2 is now least recently used
+    manager._enable_persistence = True
+    await manager.get_context("s3")
+
+    assert list(manager._contexts) == ["s1", "s3"]
+    session_id, messages = writer.enqueue.await_args_list[0].args
+    assert session_id == "s2"
+    assert messages[0]["content"] == "Niezapisana wiadomość"
+    assert manager.get_memory_stats()["context_cache_evictions"] == 1
+    assert manager._contexts["s1"] is s1
+
+
+@pytest.mark.asyncio
+async def test_size_limit_evicts_oldest(writer):
+    manager = MemoryManager(
+        enable_persistence=False, enable_semantic_cache=False, writer=writer, max_cache_bytes=5000
+    )
+
+    big = await manager.get_context("big")
+    big.add_message("user", "x" * 4000)
+    await manager.update_context(big)
+    small = await manager.get_context("small")
+    small.add_message("user", "y" * 2000)
+    await manager.update_context(small)
+
+    assert list(manager._contexts) == ["small"]
+    assert manager.get_memory_stats()["context_cache_bytes"] <= 5000
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once(writer):
+    async def slow_load(session_id):
+        await asyncio.sleep(0.01)
+        return None
+
+    writer.load_tail = AsyncMock(side_effect=slow_load)
+    manager = MemoryManager(enable_semantic_cache=False, writer=writer)
+
+    contexts = await asyncio.gather(*(manager.get_context("s1") for _ in range(5)))
+
+    assert all(c is contexts[0] for c in contexts)
+    writer.load_tail.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_turns_of_one_session_are_serialized(writer):
+    from backend.agents.interfaces import AgentResponse, IntentData
+    from backend.agents.orchestrator import Orchestrator
+
+    manager = MemoryManager(enable_semantic_cache=False, writer=writer)
+    events = []
+
+    async def route_to_agent(intent, context, user_command=None):
+        events.append(("start", user_command))
+        context.add_message("user", user_command)
+        await asyncio.sleep(0.01)
+        context.add_message("assistant", f"odpowiedź na {user_command}")
+        events.append(("end", user_command))
+        return AgentResponse(success=True, text=f"odpowiedź na {user_command}")
+
+    intent_detector = MagicMock()
+    intent_detector.detect_intent = AsyncMock(return_value=IntentData(type="general_conversation"))
+    agent_router = MagicMock()
+    agent_router.route_to_agent = route_to_agent
+    orchestrator = Orchestrator(
+        db_session=MagicMock(),
+        intent_detector=intent_detector,
+        agent_router=agent_router,
+        memory_manager=manager,
+    )
+    # Bez wyłącznika obwodu (pybreaker.call_async wymaga tornado)
+    orchestrator.circuit_breaker = MagicMock(call_async=lambda fn, *args, **kwargs: fn(*args, **kwargs))
+
+    await asyncio.gather(
+        orchestrator.process_command("pierwsze", "s1"),
+        orchestrator.process_command("drugie", "s1"),
+    )
+
+    assert events == [
+        ("start", "pierwsze"),
+        ("end", "pierwsze"),
+        ("start", "drugie"),
+        ("end", "drugie"),
+    ]
+    history = (await manager.get_context("s1")).history
+    assert [message["content"] for message in history] == [
+        "pierwsze",
+        "odpowiedź na pierwsze",
+        "drugie",
+        "odpowiedź na drugie",
+    ]
@@ -0,0 +1,48 @@
+"""
+Testy backendu ONNX dla MMLW (ścieżka artefaktu, zgodność wyszukiwania z fp32)
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.core.mmlw_onnx import onnx_artifact_path, recall_parity  # noqa: E402
+
+DOCUMENTS = ["mleko", "chleb", "masło", "jajka"]
+VECTORS = {
+    "mleko": [1.0, 0.0, 0.0],
+    "chleb": [0.0, 1.0, 0.0],
+    "masło": [0.0, 0.0, 1.0],
+    "jajka": [0.7, 0.7, 0.0],
+    "nabiał": [0.9, 0.1, 0.1],
+}
+
+
+def reference(texts):
+    return [VECTORS[t] for t in texts]
+
+
+def test_artifact_path_is_per_model_and_precision(tmp_path):
+    path = onnx_artifact_path("sdadas/mmlw-retrieval-roberta-base", str(tmp_path))
+
+    assert path == tmp_path / "sdadas__mmlw-retrieval-roberta-base" / "model.int8.onnx"
+    assert onnx_artifact_path("m", str(tmp_path), quantize=False).name == "model.onnx"
+
+
+def test_slightly_perturbed_encoder_keeps_full_recall():
+    def candidate(texts):
+        return [[v + 0.01 for v in VECTORS[t]] for t in texts]
+
+    report = recall_parity(reference, candidate, ["nabiał"], DOCUMENTS, k=2)
+
+    assert report["recall_at_2"] == 1.0
+    assert report["min_cosine"] > 0.99
+
+
+def test_broken_encoder_loses_recall():
+    def candidate(texts):
+        return [[0.0, 1.0, 0.0] if t == "nabiał" else VECTORS[t] for t in texts]
+
+    report = recall_parity(reference, candidate, ["nabiał"], DOCUMENTS, k=1)
+
+    assert report["recall_at_1"] == 0.0
@@ -0,0 +1,137 @@
+"""
+Testy kaskadowego OCR (szybka ścieżka, wczesne wyjście, alternatywne PSM, statystyki)
+"""
+
+import io
+from unittest.mock import patch
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from PIL import Image  # noqa: E402
+
+from backend.core import ocr  # noqa: E402
+from backend.core.ocr import OCRProcessor, ocr_cascade_stats  # noqa: E402
+
+GOOD = {
+    "text": ["Biedronka", "12.03.2024", "Mleko", "3.99", "PLN", "SUMA", "3.99", "PLN"],
+    "conf": [95, 93, 94, 96, 92, 95, 96, 92],
+}
+BAD = {"text": ["~~", "|"], "conf": [20, 15]}
+
+
+@pytest.fixture
+def image_bytes():
+    array = np.full((200, 120, 3), 255, dtype=np.uint8)
+    array[50:60, 10:110] = 0
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    ocr_cascade_stats.reset()
+    yield
+    ocr_cascade_stats.reset()
+
+
+def test_clean_scan_exits_after_fast_path(image_bytes):
+    processor = OCRProcessor(languages=["pol"], mode="tiered")
+    processor._tesseract_config = "--oem 1 --psm 6 -l eng"
+
+    with patch("pytesseract.image_to_data", return_value=GOOD) as image_to_data:
+        result = processor.process_image(image_bytes)
+
+    image_to_data.assert_called_once()
+    assert result.metadata["cascade"]["stage"] == "fast"
+    assert "Mleko" in result.text
+    stats = ocr_cascade_stats.get_stats()
+    assert stats["fast"]["runs"] == 1
+    assert stats["fast"]["hit_rate"] == 1.0
+    assert "full" not in stats
+
+
+def test_low_confidence_escalates_to_alternative_psm(image_bytes):
+    processor = OCRProcessor(languages=["pol"], mode="tiered")
+    processor._tesseract_config = "--oem 1 --psm 6 -c tessedit_pageseg_mode=6 -l eng"
+
+    with patch(
+        "pytesseract.image_to_data", side_effect=[BAD, BAD, GOOD]
+    ) as image_to_data, patch("backend.core.ocr.settings") as settings:
+        settings.OCR_CASCADE_MIN_CONFIDENCE = 0.75
+        settings.OCR_CASCADE_ALT_PSM = [4, 11]
+        result = processor.process_image(image_bytes)
+
+    assert image_to_data.call_count == 3
+    psm_config = image_to_data.call_args[1]["config"]
+    assert "--psm 4" in psm_config and "tessedit_pageseg_mode=4" in psm_config
+    cascade = result.metadata["cascade"]
+    assert cascade["stage"] == "psm_4"
+    assert [s["stage"] for s in cascade["stages"]] == ["fast", "full", "psm_4"]
+    assert ocr_cascade_stats.get_stats()["full"]["hit_rate"] == 0.0
+
+
+def test_best_stage_returned_when_nothing_passes(image_bytes):
+    processor = OCRProcessor(languages=["pol"], mode="tiered")
+
+    with patch("pytesseract.image_to_data", return_value=BAD) as image_to_data:
+        result = processor.process_image(image_bytes, config="--oem 1 --psm 6")
+
+    # Własna konfiguracja: bez alternatywnych PSM
+    assert image_to_data.call_count == 2
+    assert result.metadata["cascade"]["stage"] == "fast"
+
+
+def test_full_mode_runs_single_pass(image_bytes):
+    processor = OCRProcessor(languages=["pol"], mode="full")
+
+    with patch("pytesseract.image_to_data", return_value=BAD) as image_to_data:
+        result = processor.process_image(image_bytes, config="--oem 1 --psm 6")
+
+    image_to_data.assert_called_once()
+    assert "cascade" not in result.metadata
+
+
+def test_process_image_file_uses_cascade(image_bytes, monkeypatch):
+    monkeypatch.setattr(ocr.tesseract_engine, "available", False)
+    monkeypatch.setattr(OCRProcessor, "_build_tesseract_config", lambda self: "--oem 1 --psm 6 -l eng")
+
+    with patch("pytesseract.image_to_data", return_value=GOOD) as image_to_data:
+        text = ocr.process_image_file(image_bytes)
+
+    image_to_data.assert_called_once()
+    assert "Mleko" in text
+    assert ocr_cascade_stats.get_stats()["fast"]["runs"] == 1
+
+
+def test_pdf_pages_are_capped_at_max_stages(image_bytes, monkeypatch):
+    monkeypatch.setattr(ocr.tesseract_engine, "available", False)
+    processor = OCRProcessor(languages=["pol"], mode="tiered")
+    processor._tesseract_config = "--oem 1 --psm 6 -l eng"
+    page = np.array(Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+
+    with patch("pytesseract.image_to_data", return_value=BAD) as image_to_data:
+        result = processor.process_array(page, source="pdf_page")
+
+    # Strona PDF nie musi być paragonem: bez alternatywnych PSM
+    assert image_to_data.call_count == 2
+    assert [s["stage"] for s in result.metadata["cascade"]["stages"]] == ["fast", "full"]
+
+
+def test_process_pdf_file_reads_in_memory_pdf(monkeypatch):
+    fitz = pytest.importorskip("fitz")
+    document = fitz.open()
+    document.new_page(width=200, height=120).insert_text((20, 60), "Mleko 3.99")
+    pdf_bytes = document.tobytes()
+    document.close()
+    monkeypatch.setattr(ocr.tesseract_engine, "available", False)
+    monkeypatch.setattr(OCRProcessor, "_build_tesseract_config", lambda self: "--oem 1 --psm 6 -l eng")
+
+    with patch("pytesseract.image_to_data", return_value=GOOD) as image_to_data:
+        text = ocr.process_pdf_file(pdf_bytes)
+
+    image_to_data.assert_called_once()
+    assert "Mleko" in text
@@ -134,7 +134,8 @@ class TestOCREnhanced:
         mock_pix = Mock()
         mock_pix.width = 100
         mock_pix.height = 100
-        mock_pix.samples = b"test_samples" * (100 * 100 * 3)  # Poprawne dane RGB
+        mock_pix.n = 3
+        mock_pix.samples_mv = memoryview(b"\x00" * (100 * 100 * 3))  # Poprawne dane RGB
 
         mock_page.get_pixmap.return_value = mock_pix
         mock_doc.load_page.return_value = mock_page
@@ -227,7 +228,8 @@ class TestOCREnhanced:
         mock_pix = Mock()
         mock_pix.width = 100
         mock_pix.height = 100
-        mock_pix.samples = b"test_samples" * (100 * 100 * 3)  # Poprawne dane RGB
+        mock_pix.n = 3
+        mock_pix.samples_mv = memoryview(b"\x7f" * (100 * 100 * 3))  # Poprawne dane RGB
 
         mock_page.get_pixmap.return_value = mock_pix
         mock_doc.load_page.return_value = mock_page
@@ -0,0 +1,105 @@
+"""
+Testy puli procesów OCR (pamięć współdzielona, kolejność wyników, backpressure)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.core import ocr_pool  # noqa: E402
+from backend.core.ocr_pool import OCRWorkerPool  # noqa: E402
+
+
+class FakeProcessor:
+    def __init__(self, release=None):
+        self.release = release
+        self.blocks = []
+
+    def process_array(self, array, config=None, source="image"):
+        if self.release is not None:
+            self.release.wait(timeout=5)
+        return {"sum": int(array.sum()), "shape": array.shape, "source": source}
+
+    def process_image(self, image_bytes, config=None):
+        return {"bytes": image_bytes}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Pool running jobs in threads of this process (same shared-memory path)"""
+    pool = OCRWorkerPool(workers=2, max_pending=2, languages=["pol"], enabled=True)
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(pool, "_get_executor", lambda: executor)
+    yield pool
+    executor.shutdown(wait=True)
+
+
+def test_pixels_reach_worker_through_shared_memory(pool, monkeypatch):
+    monkeypatch.setattr(ocr_pool, "_worker_processor", lambda languages: FakeProcessor())
+    pages = [np.full((4, 3, 3), i, dtype=np.uint8) for i in range(5)]
+
+    futures = [pool.submit_array(page, source="pdf_page") for page in pages]
+    results = pool._collect(futures)
+
+    assert [r["sum"] for r in results] == [i * 36 for i in range(5)]
+    assert all(r["shape"] == (4, 3, 3) for r in results)
+    assert all(r["source"] == "pdf_page" for r in results)
+    assert pool.get_stats()["pending"] == 0
+    assert pool.get_stats()["completed"] == 5
+
+
+def test_shared_memory_is_released_after_job(pool, monkeypatch):
+    monkeypatch.setattr(ocr_pool, "_worker_processor", lambda languages: FakeProcessor())
+    created = []
+    original = shared_memory.SharedMemory
+
+    def tracking(*args, **kwargs):
+        block = original(*args, **kwargs)
+        if kwargs.get("create"):
+            created.append(block.name)
+        return block
+
+    monkeypatch.setattr(ocr_pool.shared_memory, "SharedMemory", tracking)
+    pool.submit_array(np.ones((2, 2), dtype=np.uint8)).result()
+
+    with pytest.raises(FileNotFoundError):
+        original(name=created[0])
+
+
+def test_submit_blocks_when_queue_is_full(pool, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(
+        ocr_pool, "_worker_processor", lambda languages: FakeProcessor(release)
+    )
+    page = np.zeros((2, 2), dtype=np.uint8)
+    pool.submit_array(page)
+    pool.submit_array(page)
+
+    third_submitted = threading.Event()
+
+    def submit_third():
+        pool.submit_array(page)
+        third_submitted.set()
+
+    threading.Thread(target=submit_third, daemon=True).start()
+    assert not third_submitted.wait(timeout=0.2)
+
+    release.set()
+    assert third_submitted.wait(timeout=5)
+    assert pool.get_stats()["backpressure_waits"] == 1
+
+
+def test_worker_failure_becomes_error_result(pool, monkeypatch):
+    class Broken(FakeProcessor):
+        def process_image(self, image_bytes, config=None):
+            raise RuntimeError("tesseract crashed")
+
+    monkeypatch.setattr(ocr_pool, "_worker_processor", lambda languages: Broken())
+    results = pool.ocr_images([b"a", b"b"])
+
+    assert [r.metadata["error"] for r in results] == ["tesseract crashed"] * 2
+    assert pool.get_stats()["failed"] == 2
@@ -97,7 +97,8 @@ class TestOCRProcessing:
         mock_page.get_pixmap.return_value = mock_pixmap
         mock_pixmap.width = 100
         mock_pixmap.height = 100
-        mock_pixmap.samples = b"\x00" * (100 * 100 * 3)
+        mock_pixmap.n = 3
+        mock_pixmap.samples_mv = memoryview(b"\x00" * (100 * 100 * 3))
 
         # Set the PDF to have 2 pages
         mock_pdf.__len__ = lambda _: 2
@@ -105,7 +106,7 @@ class TestOCRProcessing:
         with patch("tempfile.NamedTemporaryFile") as mock_temp, patch(
             "fitz.open", return_value=mock_pdf
         ) as mock_open, patch("PIL.Image.frombytes") as mock_frombytes, patch(
-            "backend.core.ocr._extract_text_from_image_obj", return_value=page_text
+            "backend.core.ocr._recognize_receipt_image", return_value=page_text
         ) as mock_extract:
 
             # Setup the context manager returns
@@ -118,8 +119,10 @@ class TestOCRProcessing:
             assert mock_open.called
             assert mock_pdf.load_page.call_count == 2  # Called once per page
             assert mock_page.get_pixmap.call_count == 2
-            assert mock_frombytes.call_count == 2
+            # Piksele strony trafiają do OCR bez kopii przez PIL
+            assert mock_frombytes.call_count == 0
             assert mock_extract.call_count == 2
+            assert mock_extract.call_args[0][0].shape == (100, 100, 3)
 
             # Verify the result combines text from all pages
             assert result == f"{page_text}\n{page_text}"
@@ -169,20 +172,18 @@ class TestOCRProcessing:
             assert result.metadata["error"] == "Mock error"
 
     def test_ocr_processor_process_pdf(self):
-        """Test OCRProcessor.process_pdf with mocked PyMuPDF and PIL."""
+        """Test OCRProcessor.process_pdf with mocked PyMuPDF."""
         sample_bytes = b"mock_pdf_data"
         processor = OCRProcessor(languages=["pol"])
 
-        # Create a mock for process_image that returns a known result
+        # Create a mock for process_array that returns a known result
         mock_result = OCRResult(
-            text="Page content", confidence=90.0, metadata={"source": "image"}
+            text="Page content", confidence=90.0, metadata={"source": "pdf_page"}
         )
 
-        with patch("tempfile.NamedTemporaryFile") as mock_temp, patch(
-            "fitz.open"
-        ) as mock_open, patch.object(
-            processor, "process_image", return_value=mock_result
-        ) as mock_process_image:
+        with patch("fitz.open") as mock_open, patch.object(
+            processor, "process_array", return_value=mock_result
+        ) as mock_process_array:
 
             # Setup mock PDF with 2 pages
             mock_pdf = MagicMock()
@@ -194,8 +195,9 @@ class TestOCRProcessing:
             mock_pdf.load_page.return_value = mock_page
             mock_page.get_pixmap.return_value = mock_pixmap
             mock_pixmap.width = 100
-            mock_pixmap.height = 100
-            mock_pixmap.samples = b"\x00" * (100 * 100 * 3)
+            mock_pixmap.height = 80
+            mock_pixmap.n = 3
+            mock_pixmap.samples_mv = memoryview(b"\x00" * (100 * 80 * 3))
 
             # Set the PDF to have 2 pages
             mock_pdf.__len__ = lambda _: 2
@@ -205,10 +207,13 @@ class TestOCRProcessing:
 
             result = processor.process_pdf(sample_bytes)
 
-            # Verify function calls
-            assert mock_open.called
+            # Verify function calls: PDF opened from memory, raw pixels per page
+            mock_open.assert_called_once_with(stream=sample_bytes, filetype="pdf")
             assert mock_pdf.load_page.call_count == 2
-            assert mock_process_image.call_count == 2
+            assert mock_process_array.call_count == 2
+            pixels = mock_process_array.call_args[0][0]
+            assert pixels.shape == (80, 100, 3)
+            mock_pdf.close.assert_called_once()
 
             # Verify result
             assert isinstance(result, OCRResult)
@@ -222,9 +227,7 @@ class TestOCRProcessing:
         sample_bytes = b"mock_pdf_data"
         processor = OCRProcessor()
 
-        with patch(
-            "tempfile.NamedTemporaryFile", side_effect=Exception("Mock PDF error")
-        ):
+        with patch("fitz.open", side_effect=Exception("Mock PDF error")):
             result = processor.process_pdf(sample_bytes)
 
             # Verify error handling
@@ -0,0 +1,84 @@
+"""
+Testy dla monitora zdrowia Ollama (stan cache'owany, brak I/O na gorącej ścieżce)
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from backend.core.llm_client import EnhancedLLMClient, OllamaHealthMonitor
+
+
+@pytest.fixture
+def monitor():
+    return OllamaHealthMonitor("http://ollama:11434", interval=60, down_interval=60)
+
+
+@pytest.mark.asyncio
+async def test_probe_caches_models(monitor):
+    response = httpx.Response(
+        200,
+        json={"models": [{"name": "bielik:latest"}]},
+        request=httpx.Request("GET", "http://ollama:11434/api/tags"),
+    )
+    with patch("httpx.AsyncClient.get", AsyncMock(return_value=response)):
+        assert await monitor.probe() is True
+
+    assert monitor.has_model("bielik") is True
+    assert monitor.has_model("gemma3:12b") is False
+    await monitor.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_marks_backend_down(monitor):
+    with patch("httpx.AsyncClient.get", AsyncMock(side_effect=httpx.ConnectError("refused"))):
+        assert await monitor.probe() is False
+
+    assert monitor.available is False
+    assert "refused" in monitor.last_error
+
+
+@pytest.mark.asyncio
+async def test_hot_path_does_no_io(monitor):
+    client = EnhancedLLMClient()
+    client.health_monitor = monitor
+    monitor.start = lambda: None
+
+    with patch("httpx.AsyncClient.get", AsyncMock()) as get:
+        assert await client._check_ollama_availability() is True
+        monitor.mark_down(httpx.ConnectError("refused"))
+        assert await client._check_ollama_availability() is False
+
+    get.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_transport_error_in_request_marks_down(monitor):
+    client = EnhancedLLMClient()
+    client.health_monitor = monitor
+    monitor.start = lambda: None
+
+    with patch(
+        "backend.core.llm_client.ollama_transport.embeddings",
+        AsyncMock(side_effect=httpx.ConnectError("down")),
+    ):
+        await client.embed(model="nomic-embed-text", text="mleko")
+
+    assert monitor.available is False
+
+
+@pytest.mark.asyncio
+async def test_monitor_reprobes_quickly_while_down():
+    monitor = OllamaHealthMonitor("http://ollama:11434", interval=60, down_interval=0.01)
+    monitor.available = False
+    probe = AsyncMock(return_value=False)
+    monitor.probe = probe
+
+    monitor.start()
+    while probe.await_count < 3:
+        await asyncio.sleep(0.01)
+    await monitor.stop()
+
+    assert probe.await_count >= 3
@@ -0,0 +1,65 @@
+"""
+Testy dla wspólnego transportu Ollama (pula połączeń, limity na model)
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.core.ollama_transport import OllamaTransport
+
+
+def _bind(transport: OllamaTransport, handler) -> None:
+    transport._client = httpx.AsyncClient(
+        base_url=transport.base_url, transport=httpx.MockTransport(handler)
+    )
+    transport._loop = asyncio.get_running_loop()
+
+
+@pytest.mark.asyncio
+async def test_per_model_concurrency_cap():
+    transport = OllamaTransport("http://ollama:11434", per_model_concurrency=2)
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json={"embeddings": [[0.1, 0.2]]})
+
+    _bind(transport, handler)
+    await asyncio.gather(
+        *(transport.embed(model="nomic-embed-text", input=["mleko"]) for _ in range(6))
+    )
+    await transport.aclose()
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_yields_ndjson_chunks():
+    transport = OllamaTransport("http://ollama:11434")
+    lines = [
+        {"message": {"role": "assistant", "content": "Dzień"}, "done": False},
+        {"message": {"role": "assistant", "content": " dobry"}, "done": True},
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content="\n".join(json.dumps(l) for l in lines))
+
+    _bind(transport, handler)
+    chunks = [
+        chunk
+        async for chunk in transport.chat_stream(
+            model="bielik", messages=[{"role": "user", "content": "Cześć"}]
+        )
+    ]
+    await transport.aclose()
+
+    assert "".join(c["message"]["content"] for c in chunks) == "Dzień dobry"
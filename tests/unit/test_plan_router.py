@@ -0,0 +1,70 @@
+"""
+Testy szybkiej ścieżki i cache planów przed planistą LLM
+"""
+
+from backend.agents.plan_router import PlanRouter, normalize_query
+from backend.agents.planner import ExecutionPlan, PlanStep
+
+
+def _llm_plan(query, args):
+    return ExecutionPlan(
+        query=query,
+        steps=[PlanStep(step=1, tool="search_knowledge_base", args=args, description="")],
+        total_steps=1,
+        estimated_complexity="simple",
+    )
+
+
+def test_routine_queries_use_fast_path():
+    router = PlanRouter()
+
+    pantry = router.route("Pokaż moją spiżarnię")
+    weather = router.route("Jaka pogoda w Krakowie?")
+    greeting = router.route("Cześć!")
+
+    assert pantry.steps[0].tool == "get_pantry_items"
+    assert weather.steps[0].args == {"location": "Krakowie"}
+    assert greeting.steps[0].tool == "general_conversation"
+    assert greeting.source == "fast_path"
+    assert router.get_stats()["fast_path"] == 3
+
+
+def test_long_query_goes_to_planner():
+    router = PlanRouter(max_words=4)
+
+    assert router.route("Zaplanuj menu na cały tydzień dla czterech osób z budżetem") is None
+    assert router.get_stats()["misses"] == 1
+
+
+def test_cached_plan_is_reused_for_same_template():
+    router = PlanRouter()
+    query = "Jakie są zasady przechowywania kiszonek?"
+    router.remember(query, _llm_plan(query, {"query": query}))
+
+    plan = router.route("jakie są zasady przechowywania kiszonek")
+
+    assert plan.source == "cache"
+    assert plan.steps[0].args["query"] == "jakie są zasady przechowywania kiszonek"
+    assert router.get_stats()["cache_hits"] == 1
+
+
+def test_fallback_and_number_specific_plans_are_not_cached():
+    router = PlanRouter()
+    query = "Ile kalorii ma 200 gramów kaszy gryczanej ugotowanej na sypko"
+    fallback = _llm_plan(query, {"query": query})
+    fallback.source = "fallback"
+
+    router.remember(query, fallback)
+    router.remember(query, _llm_plan(query, {"query": "kasza 200 g kalorie"}))
+
+    assert router.get_stats()["cached_plans"] == 0
+    assert normalize_query(query).startswith("ile kalorii ma <num>")
+
+
+def test_multi_intent_queries_go_to_planner():
+    router = PlanRouter()
+
+    assert router.route("Co ugotować z rzeczy w lodówce?") is None
+    assert router.route("Dodaj mleko do lodówki") is None
+    assert router.route("Pogoda jutro i co w lodówce?") is None
+    assert router.get_stats()["fast_path"] == 0
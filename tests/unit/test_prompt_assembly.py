@@ -0,0 +1,77 @@
+"""
+Testy składania promptów ze stałym prefiksem (KV-cache Ollamy)
+"""
+
+from unittest.mock import patch
+
+from backend.core.prompt_assembly import PromptAssembler
+
+
+def test_static_preamble_is_rendered_once():
+    assembler = PromptAssembler()
+    calls = []
+
+    def render():
+        calls.append(1)
+        return "  Instrukcje systemowe\n"
+
+    first = assembler.static("planner", render)
+    second = assembler.static("planner", render)
+
+    assert first is second
+    assert first == "Instrukcje systemowe"
+    assert len(calls) == 1
+
+    assembler.invalidate("planner")
+    assembler.static("planner", render)
+    assert len(calls) == 2
+
+
+def test_dynamic_context_follows_history():
+    assembler = PromptAssembler()
+    history = [
+        {"role": "user", "content": "Cześć"},
+        {"role": "assistant", "content": "Dzień dobry"},
+        {"invalid": "entry"},
+    ]
+
+    messages = assembler.build(
+        "STAŁY PROMPT", "Co mam w lodówce?", history=history, context="mleko, jajka"
+    )
+
+    assert messages == [
+        {"role": "system", "content": "STAŁY PROMPT"},
+        {"role": "user", "content": "Cześć"},
+        {"role": "assistant", "content": "Dzień dobry"},
+        {"role": "system", "content": "mleko, jajka"},
+        {"role": "user", "content": "Co mam w lodówce?"},
+    ]
+
+
+def test_consecutive_turns_share_prefix():
+    assembler = PromptAssembler()
+    turn_1 = assembler.build("STAŁY PROMPT", "Pytanie 1", context="kontekst A")
+    history = [
+        {"role": "user", "content": "Pytanie 1"},
+        {"role": "assistant", "content": "Odpowiedź 1"},
+    ]
+    turn_2 = assembler.build(
+        "STAŁY PROMPT", "Pytanie 2", history=history, context="kontekst B"
+    )
+
+    assert turn_2[0] == turn_1[0]
+    assert turn_2[1] == turn_1[-1]
+
+
+def test_request_params_use_per_model_num_ctx():
+    assembler = PromptAssembler()
+    with patch("backend.core.prompt_assembly.settings") as settings:
+        settings.OLLAMA_KEEP_ALIVE = "30m"
+        settings.OLLAMA_NUM_CTX = 8192
+        settings.OLLAMA_MODEL_NUM_CTX = {"gemma3:12b": 16384}
+
+        assert assembler.request_params("gemma3:12b") == {
+            "keep_alive": "30m",
+            "num_ctx": 16384,
+        }
+        assert assembler.request_params("bielik")["num_ctx"] == 8192
@@ -0,0 +1,61 @@
+"""
+Testy semantycznego cache odpowiedzi (parafrazy, kontekst, TTL, unieważnianie)
+"""
+
+import pytest
+
+pytest.importorskip("faiss")
+
+from backend.core.semantic_response_cache import SemanticResponseCache  # noqa: E402
+
+VECTORS = {
+    "przepis na naleśniki": [1.0, 0.0, 0.0],
+    "jak zrobić naleśniki": [0.98, 0.05, 0.0],
+    "jaka będzie pogoda": [0.0, 1.0, 0.0],
+}
+RESPONSE = {"message": {"content": "Mąka, mleko, jajka..."}}
+
+
+async def fake_embed(text):
+    return VECTORS[text]
+
+
+def _messages(text, system="Jesteś asystentem"):
+    return [{"role": "system", "content": system}, {"role": "user", "content": text}]
+
+
+@pytest.fixture
+def cache():
+    return SemanticResponseCache(embed_fn=fake_embed, similarity_threshold=0.9, enabled=True)
+
+
+@pytest.mark.asyncio
+async def test_paraphrase_hits_cached_response(cache):
+    await cache.store(_messages("Przepis na naleśniki?"), "bielik", {}, RESPONSE)
+
+    hit = await cache.lookup(_messages("Jak zrobić naleśniki"), "bielik", {})
+    miss = await cache.lookup(_messages("Jaka będzie pogoda?"), "bielik", {})
+
+    assert hit == RESPONSE
+    assert miss is None
+    assert cache.get_stats()["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_different_context_or_model_misses(cache):
+    await cache.store(_messages("przepis na naleśniki"), "bielik", {}, RESPONSE)
+
+    assert await cache.lookup(_messages("jak zrobić naleśniki", system="Inny"), "bielik", {}) is None
+    assert await cache.lookup(_messages("jak zrobić naleśniki"), "gemma", {}) is None
+
+
+@pytest.mark.asyncio
+async def test_expired_and_invalidated_entries_are_dropped(cache):
+    await cache.store(_messages("przepis na naleśniki"), "bielik", {}, RESPONSE)
+    cache.invalidate("pantry changed")
+    assert await cache.lookup(_messages("przepis na naleśniki"), "bielik", {}) is None
+
+    cache.ttl = -1
+    await cache.store(_messages("przepis na naleśniki"), "bielik", {}, RESPONSE)
+    assert await cache.lookup(_messages("przepis na naleśniki"), "bielik", {}) is None
+    assert cache.get_stats()["entries"] == 0
@@ -0,0 +1,146 @@
+"""
+Testy trwałych uchwytów Tesseract (parsowanie konfiguracji, ponowne użycie uchwytów, limity czasu)
+"""
+
+import types
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.core import tesseract_engine as engine_module  # noqa: E402
+from backend.core.tesseract_engine import TesseractEngine, parse_config  # noqa: E402
+
+
+class FakeAPI:
+    instances = []
+
+    def __init__(self, lang="eng", oem=3):
+        self.lang = lang
+        self.oem = oem
+        self.variables = {"tessedit_char_whitelist": ""}
+        self.psm = None
+        self.image = None
+        self.recognize_ok = True
+        FakeAPI.instances.append(self)
+
+    def SetVariable(self, name, value):
+        self.variables[name] = value
+        return True
+
+    def GetVariableAsString(self, name):
+        return self.variables.get(name)
+
+    def SetPageSegMode(self, psm):
+        self.psm = psm
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        self.image = (len(data), width, height, bytes_per_pixel, bytes_per_line)
+
+    def Recognize(self, timeout_ms):
+        return self.recognize_ok
+
+    def GetUTF8Text(self):
+        return f"tekst {self.lang}"
+
+    def Clear(self):
+        self.image = None
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    FakeAPI.instances = []
+    fake = types.SimpleNamespace(PyTessBaseAPI=FakeAPI)
+    monkeypatch.setattr(engine_module, "tesserocr", fake, raising=False)
+    engine = TesseractEngine(max_handles=1, backend="tesserocr")
+    engine.available = True
+    return engine
+
+
+def test_parse_config_matches_cli_options():
+    parsed = parse_config(
+        "--oem 1 --psm 6 -l pol+eng -c tessedit_char_whitelist=0123 -c preserve_interword_spaces=1"
+    )
+
+    assert parsed.oem == 1
+    assert parsed.psm == 6
+    assert parsed.lang == "pol+eng"
+    assert parsed.variables == {
+        "tessedit_char_whitelist": "0123",
+        "preserve_interword_spaces": "1",
+    }
+    assert parse_config(None).lang == "eng"
+
+
+def test_handle_is_reused_between_jobs(engine):
+    image = np.zeros((10, 20), dtype=np.uint8)
+
+    assert engine.image_to_string(image, "--oem 1 --psm 6 -l pol") == "tekst pol"
+    assert engine.image_to_string(image, "--oem 1 --psm 4 -l pol") == "tekst pol"
+
+    assert len(FakeAPI.instances) == 1
+    api = FakeAPI.instances[0]
+    assert api.psm == 4
+    assert api.image is None  # Clear() po zadaniu
+    assert engine.get_stats()["handles"] == {"pol/oem1": 1}
+
+
+def test_variables_from_previous_job_are_reset(engine):
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    engine.image_to_string(image, "-l pol -c tessedit_char_whitelist=0123")
+    api = FakeAPI.instances[0]
+    assert api.variables["tessedit_char_whitelist"] == "0123"
+
+    engine.image_to_string(image, "-l pol")
+    assert api.variables["tessedit_char_whitelist"] == ""
+
+
+def test_recognize_timeout_raises_and_returns_handle(engine):
+    image = np.zeros((4, 4), dtype=np.uint8)
+    engine.preload("-l pol")
+    FakeAPI.instances[0].recognize_ok = False
+
+    with pytest.raises(TimeoutError):
+        engine.image_to_string(image, "-l pol", timeout=1)
+
+    FakeAPI.instances[0].recognize_ok = True
+    assert engine.image_to_string(image, "-l pol", timeout=1) == "tekst pol"
+    assert engine.get_stats()["timeouts"] == 1
+
+
+def test_busy_handles_time_out_in_queue(engine):
+    with engine._handle("pol", 3, timeout=1):
+        with pytest.raises(TimeoutError):
+            with engine._handle("pol", 3, timeout=0.05):
+                pass
+
+
+def test_missing_language_data_keeps_fallback_message(engine, monkeypatch):
+    def failing(lang, oem):
+        raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+    monkeypatch.setattr(engine_module.tesserocr, "PyTessBaseAPI", failing)
+
+    with pytest.raises(RuntimeError) as error:
+        engine.image_to_string(np.zeros((2, 2), dtype=np.uint8), "-l pol")
+
+    assert "tessdata" in str(error.value) and "pol.traineddata" in str(error.value)
+    assert engine._created[("pol", 3)] == 0
+
+
+def test_subprocess_timeout_reaches_caller_as_timeout_error(monkeypatch):
+    pytest.importorskip("cv2")
+    from backend.core import ocr
+
+    def timed_out(*args, **kwargs):
+        raise RuntimeError("Tesseract process timeout")
+
+    monkeypatch.setattr(ocr.tesseract_engine, "available", False)
+    monkeypatch.setattr(ocr.pytesseract, "image_to_data", timed_out)
+
+    with pytest.raises(TimeoutError):
+        ocr._image_to_data(np.zeros((10, 10), dtype=np.uint8), "--psm 6", 1.0)
+    # Ponowienia i mapowanie błędów zostają na publicznej funkcji OCR
+    assert hasattr(ocr._extract_text_from_image_obj, "__wrapped__")
+    assert not hasattr(ocr._image_to_data, "__wrapped__")
@@ -0,0 +1,260 @@
+"""
+Testy dla VectorStore z IndexIDMap2 i magazynem chunków SQLite
+"""
+
+import asyncio
+import gc
+
+import numpy as np
+import pytest
+
+from backend.core.vector_store import DocumentChunk, VectorStore
+
+DIM = 8
+
+
+def _vector(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.random(DIM).astype(np.float32)
+
+
+async def _add(store: VectorStore, doc_id: str, seed: int, **metadata) -> None:
+    await store.add_documents(
+        [
+            DocumentChunk(
+                id=doc_id,
+                content=f"content of {doc_id}",
+                metadata=metadata,
+                embedding=_vector(seed),
+            )
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_payloads_survive_dropped_references():
+    store = VectorStore(dimension=DIM, index_type="IndexFlatL2")
+    await _add(store, "a", 1)
+    await _add(store, "b", 2)
+    gc.collect()
+
+    results = await store.search(_vector(1), k=1)
+
+    assert results[0][0].id == "a"
+    assert results[0][0].content == "content of a"
+
+
+@pytest.mark.asyncio
+async def test_same_doc_id_replaces_vector():
+    store = VectorStore(dimension=DIM, index_type="IndexFlatL2")
+    await _add(store, "a", 1)
+    await _add(store, "a", 2)
+
+    stats = await store.get_stats()
+    assert stats["total_documents"] == 1
+    assert stats["total_vectors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_remove_document_deletes_vector():
+    store = VectorStore(dimension=DIM, index_type="IndexFlatL2")
+    await _add(store, "a", 1)
+    await _add(store, "b", 2)
+
+    assert await store.remove_document("a") is True
+    results = await store.search(_vector(1), k=2)
+
+    assert [doc.id for doc, _ in results] == ["b"]
+    assert store.index.ntotal == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_by_metadata_and_directories():
+    store = VectorStore(dimension=DIM, index_type="IndexFlatL2")
+    await _add(store, "a", 1, source="receipt_1", directory_path="receipts")
+    await _add(store, "b", 2, source="receipt_1", directory_path="receipts")
+    await _add(store, "c", 3, source="pantry", directory_path="pantry")
+
+    assert await store.delete_by_metadata({"source": "receipt_1"}) == 2
+    assert await store.list_directories() == [{"path": "pantry", "document_count": 1}]
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_roundtrip(tmp_path):
+    store = VectorStore(dimension=DIM, index_type="IndexFlatL2", storage_path=str(tmp_path))
+    for i in range(5):
+        await _add(store, f"doc{i}", i)
+    await store.save_index_async()
+
+    restored = VectorStore(dimension=DIM, index_type="IndexFlatL2", storage_path=str(tmp_path))
+    assert await restored.load_index_async() is True
+
+    results = await restored.search(_vector(3), k=1)
+    assert results[0][0].id == "doc3"
+    assert results[0][0].content == "content of doc3"
+    assert (tmp_path / "manifest.json").exists()
+
+
+@pytest.mark.asyncio
+async def test_load_reconciles_chunks_added_after_save(tmp_path):
+    store = VectorStore(dimension=DIM, index_type="IndexFlatL2", storage_path=str(tmp_path))
+    await _add(store, "saved", 1)
+    await store.save_index_async()
+    # Simulated crash: chunks added and removed after the last save
+    await _add(store, "unsaved", 2)
+    await store.remove_document("saved")
+
+    restored = VectorStore(dimension=DIM, index_type="IndexFlatL2", storage_path=str(tmp_path))
+    await restored.load_index_async()
+
+    results = await restored.search(_vector(2), k=5)
+    assert [doc.id for doc, _ in results] == ["unsaved"]
+    assert restored.index.ntotal == 1
+
+
+async def _add_many(store: VectorStore, start: int, count: int) -> None:
+    rng = np.random.default_rng(start)
+    await store.add_documents(
+        [
+            DocumentChunk(
+                id=f"bulk{start + i}",
+                content=f"bulk {start + i}",
+                metadata={},
+                embedding=rng.random(DIM).astype(np.float32),
+            )
+            for i in range(count)
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_small_corpus_stays_flat_without_losing_target_type():
+    store = VectorStore(dimension=DIM, index_type="IndexIVFFlat", train_threshold=1000)
+    await _add_many(store, 0, 50)
+
+    stats = await store.get_stats()
+    assert stats["active_index_type"] == "IndexFlatL2"
+    assert stats["index_type"] == "IndexIVFFlat"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("index_type", ["IndexIVFFlat", "IndexHNSWFlat"])
+async def test_promotion_after_threshold_keeps_results(index_type):
+    store = VectorStore(dimension=DIM, index_type=index_type, train_threshold=2000)
+    await _add_many(store, 0, 2000)
+    await store._promotion_task
+    # Writes after the promotion land in the promoted index
+    await _add(store, "late", 99)
+
+    stats = await store.get_stats()
+    assert stats["active_index_type"] == index_type
+    assert stats["search_params"]["recall"] >= 0.95
+    assert store.index.ntotal == 2001
+    results = await store.search(_vector(99), k=1)
+    assert results[0][0].id == "late"
+
+
+@pytest.mark.asyncio
+async def test_writes_during_promotion_are_replayed():
+    store = VectorStore(dimension=DIM, index_type="IndexIVFFlat", train_threshold=2000)
+    await _add_many(store, 0, 2000)
+    task = store._promotion_task
+    # Let the promotion start building in its worker thread
+    while store._pending_changes is None:
+        await asyncio.sleep(0)
+    await _add(store, "during", 42)
+    await store.remove_document("bulk0")
+    await task
+
+    assert store.active_index_type == "IndexIVFFlat"
+    assert store.index.ntotal == 2000
+    results = await store.search(_vector(42), k=1)
+    assert results[0][0].id == "during"
+
+
+@pytest.mark.asyncio
+async def test_write_recorded_after_snapshot_is_not_added_twice():
+    store = VectorStore(dimension=DIM, index_type="IndexIVFFlat", train_threshold=100000)
+    await _add_many(store, 0, 2000)
+    all_ids = store._payloads.all_ids
+
+    def snapshot_then_record(on_snapshot=None):
+        ids = all_ids(on_snapshot)
+        # Zapis, którego wiersz jest już w migawce, a zmiana zapisana po niej
+        store._pending_changes.append(("add", [int(ids[-1])]))
+        return ids
+
+    store._payloads.all_ids = snapshot_then_record
+    await store.rebuild_index()
+
+    assert store.active_index_type == "IndexIVFFlat"
+    assert store.index.ntotal == 2000
+
+
+@pytest.mark.asyncio
+async def test_payload_database_is_opened_on_first_use(tmp_path):
+    store = VectorStore(dimension=DIM, index_type="IndexFlatL2", storage_path=str(tmp_path))
+    assert not (tmp_path / VectorStore.PAYLOAD_FILENAME).exists()
+
+    await _add(store, "a", 1)
+
+    assert (tmp_path / VectorStore.PAYLOAD_FILENAME).exists()
+
+
+@pytest.mark.asyncio
+async def test_promoted_index_survives_reload(tmp_path):
+    store = VectorStore(
+        dimension=DIM, index_type="IndexIVFFlat", storage_path=str(tmp_path), train_threshold=2000
+    )
+    await _add_many(store, 0, 2000)
+    await store._promotion_task
+    await store.save_index_async()
+
+    restored = VectorStore(
+        dimension=DIM, index_type="IndexIVFFlat", storage_path=str(tmp_path), train_threshold=2000
+    )
+    await restored.load_index_async()
+
+    assert restored.active_index_type == "IndexIVFFlat"
+    assert restored.search_params == store.search_params
+    assert restored.index.ntotal == 2000
+
+
+@pytest.mark.asyncio
+async def test_search_batch_returns_results_per_query():
+    store = VectorStore(dimension=DIM, index_type="IndexFlatL2")
+    for i in range(5):
+        await _add(store, f"doc{i}", i)
+
+    results = await store.search_batch(np.vstack([_vector(1), _vector(3)]), k=1)
+
+    assert [hits[0][0].id for hits in results] == ["doc1", "doc3"]
+
+
+@pytest.mark.asyncio
+async def test_filtered_search_is_applied_before_ranking():
+    store = VectorStore(dimension=DIM, index_type="IndexFlatL2")
+    await _add_many(store, 0, 500)
+    await _add(store, "r1", 1, directory_path="receipts")
+    await _add(store, "r2", 2, directory_path="receipts")
+
+    # The receipts are far from the top-k of the unfiltered search
+    results = await store.search_batch(
+        _vector(7), k=5, metadata_filter={"directory_path": "receipts"}
+    )
+
+    assert sorted(doc.id for doc, _ in results[0]) == ["r1", "r2"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("index_type", ["IndexIVFFlat", "IndexHNSWFlat"])
+async def test_filtered_search_uses_id_selector_on_promoted_index(index_type):
+    store = VectorStore(dimension=DIM, index_type=index_type, train_threshold=2000)
+    store.EXACT_FILTER_LIMIT = 0
+    await _add_many(store, 0, 2000)
+    await store._promotion_task
+    await _add(store, "r1", 1, type="receipt")
+
+    results = await store.search_batch(_vector(1), k=3, metadata_filter={"type": "receipt"})
+
+    assert [doc.id for doc, _ in results[0]] == ["r1"]